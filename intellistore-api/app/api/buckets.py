@@ -7,9 +7,11 @@ from typing import List, Optional, Dict, Any
 
 import structlog
 from fastapi import APIRouter, Depends, HTTPException, status, Request
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, field_validator
 
 from app.api.auth import get_current_user, UserInfo
+from app.services.erasure import ErasureProfile
+from app.services.gc_service import tombstone_bucket
 from app.services.raft_service import RaftService
 from app.services.kafka_service import KafkaService
 
@@ -22,6 +24,16 @@ class BucketCreateRequest(BaseModel):
     description: Optional[str] = Field(None, max_length=500)
     acl: Optional[Dict[str, str]] = Field(default_factory=dict)
     metadata: Optional[Dict[str, str]] = Field(default_factory=dict)
+    dedup_mode: Optional[str] = Field(None, pattern=r'^(fixed|cdc)$')
+    # zstd level for compressible objects (default from settings; 0 disables)
+    compression_level: Optional[int] = Field(None, ge=0, le=22)
+    # Coding profile for new data (default from the tier): rs:K+M or replica:N
+    erasure_profile: Optional[str] = None
+
+    @field_validator("erasure_profile")
+    @classmethod
+    def validate_erasure_profile(cls, value: Optional[str]) -> Optional[str]:
+        return ErasureProfile.parse(value).coding if value else None
 
 
 class BucketResponse(BaseModel):
@@ -35,6 +47,9 @@ class BucketResponse(BaseModel):
     cold_objects: int
     acl: Dict[str, str]
     metadata: Dict[str, str]
+    dedup_mode: Optional[str] = None
+    compression_level: Optional[int] = None
+    erasure_profile: Optional[str] = None
 
 
 class BucketListResponse(BaseModel):
@@ -46,6 +61,18 @@ class BucketUpdateRequest(BaseModel):
     description: Optional[str] = None
     acl: Optional[Dict[str, str]] = None
     metadata: Optional[Dict[str, str]] = None
+    # "none" turns deduplication off for new uploads
+    dedup_mode: Optional[str] = Field(None, pattern=r'^(fixed|cdc|none)$')
+    compression_level: Optional[int] = Field(None, ge=0, le=22)
+    # "none" goes back to the tier's profile; existing objects are converted when migrated
+    erasure_profile: Optional[str] = None
+
+    @field_validator("erasure_profile")
+    @classmethod
+    def validate_erasure_profile(cls, value: Optional[str]) -> Optional[str]:
+        if value is None or value == "none":
+            return value
+        return ErasureProfile.parse(value).coding
 
 
 def get_raft_service(request: Request) -> RaftService:
@@ -83,7 +110,10 @@ async def create_bucket(
             "owner": current_user.username,
             "description": bucket_request.description,
             "acl": bucket_request.acl or {current_user.username: "admin"},
-            "metadata": bucket_request.metadata or {}
+            "metadata": bucket_request.metadata or {},
+            "dedup_mode": bucket_request.dedup_mode,
+            "compression_level": bucket_request.compression_level,
+            "erasure_profile": bucket_request.erasure_profile
         }
         
         # Create bucket in Raft metadata store
@@ -115,7 +145,10 @@ async def create_bucket(
             hot_objects=0,
             cold_objects=0,
             acl=bucket_data["acl"],
-            metadata=bucket_data["metadata"]
+            metadata=bucket_data["metadata"],
+            dedup_mode=bucket_data["dedup_mode"],
+            compression_level=bucket_data["compression_level"],
+            erasure_profile=bucket_data["erasure_profile"]
         )
         
     except HTTPException:
@@ -163,7 +196,10 @@ async def list_buckets(
                     hot_objects=stats.get("hot_objects", 0),
                     cold_objects=stats.get("cold_objects", 0),
                     acl=bucket.get("acl", {}),
-                    metadata=bucket.get("metadata", {})
+                    metadata=bucket.get("metadata", {}),
+                    dedup_mode=bucket.get("dedup_mode"),
+                    compression_level=bucket.get("compression_level"),
+                    erasure_profile=bucket.get("erasure_profile")
                 ))
         
         # Apply pagination
@@ -222,7 +258,10 @@ async def get_bucket(
             hot_objects=stats.get("hot_objects", 0),
             cold_objects=stats.get("cold_objects", 0),
             acl=bucket.get("acl", {}),
-            metadata=bucket.get("metadata", {})
+            metadata=bucket.get("metadata", {}),
+            dedup_mode=bucket.get("dedup_mode"),
+            compression_level=bucket.get("compression_level"),
+            erasure_profile=bucket.get("erasure_profile")
         )
         
     except HTTPException:
@@ -271,6 +310,12 @@ async def update_bucket(
             update_data["acl"] = update_request.acl
         if update_request.metadata is not None:
             update_data["metadata"] = update_request.metadata
+        if update_request.dedup_mode is not None:
+            update_data["dedup_mode"] = None if update_request.dedup_mode == "none" else update_request.dedup_mode
+        if update_request.compression_level is not None:
+            update_data["compression_level"] = update_request.compression_level
+        if update_request.erasure_profile is not None:
+            update_data["erasure_profile"] = None if update_request.erasure_profile == "none" else update_request.erasure_profile
         
         # Update bucket in Raft metadata store
         await raft_service.update_bucket(bucket_name, update_data)
@@ -302,7 +347,10 @@ async def update_bucket(
             hot_objects=stats.get("hot_objects", 0),
             cold_objects=stats.get("cold_objects", 0),
             acl=updated_bucket.get("acl", {}),
-            metadata=updated_bucket.get("metadata", {})
+            metadata=updated_bucket.get("metadata", {}),
+            dedup_mode=updated_bucket.get("dedup_mode"),
+            compression_level=updated_bucket.get("compression_level"),
+            erasure_profile=updated_bucket.get("erasure_profile")
         )
         
     except HTTPException:
@@ -352,8 +400,10 @@ async def delete_bucket(
                     detail="Bucket is not empty. Use force=true to delete non-empty bucket"
                 )
         
-        # Delete bucket from Raft metadata store
+        # Delete bucket from Raft metadata store; shards and data keys are
+        # reclaimed by the garbage collector
         await raft_service.delete_bucket(bucket_name, force=force)
+        tombstone_bucket(bucket_name)
         
         # Log access event
         access_event = {
@@ -5,23 +5,44 @@ Object management API endpoints
 import asyncio
 import hashlib
 import time
-from typing import List, Optional, Dict, Any
+from typing import AsyncIterator, List, Optional, Dict, Any, Tuple
 from io import BytesIO
 
 import structlog
-from fastapi import APIRouter, Depends, HTTPException, status, Request, UploadFile, File, Form
+from fastapi import APIRouter, Depends, HTTPException, status, Request, UploadFile, File, Form, Header
 from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, Field
 
 from app.api.auth import get_current_user, UserInfo
+from app.core.config import get_settings
+from app.core.segmented_aead import FORMAT_NAME as ENCRYPTION_FORMAT
+from app.services.compression_service import (
+    CompressionService,
+    compressed_range,
+    compression_level_for_bucket,
+    create_compression_service,
+)
+from app.services.compute_executor import get_compute_executor
+from app.services.dedup_service import DedupService, create_dedup_service, release_object_data
+from app.services.multipart_service import MAX_PARTS, MultipartService
 from app.services.raft_service import RaftService
 from app.services.kafka_service import KafkaService
+from app.services.migration_scheduler import record_access
+from app.services.migration_service import MigrationExecutor, MigrationQueueFull
 from app.services.vault_service import VaultService
-from app.services.storage_service import StorageService
+from app.services.storage_service import (
+    StorageService,
+    all_shard_infos,
+    create_storage_service,
+    is_reserved_key,
+)
 
 router = APIRouter()
 logger = structlog.get_logger(__name__)
 
+# Bytes read from an upload per iteration while hashing and encrypting
+UPLOAD_READ_SIZE = 1024 * 1024
+
 
 class ObjectResponse(BaseModel):
     bucket_name: str
@@ -49,6 +70,10 @@ class ObjectUploadResponse(BaseModel):
     tier: str
     shards: List[Dict[str, Any]]
     message: str
+    # Chunk counts, bytes saved and dedup ratio for uploads to dedup buckets
+    dedup: Optional[Dict[str, Any]] = None
+    # Codec and compressed size for objects compressed before encryption
+    compression: Optional[Dict[str, Any]] = None
 
 
 class ObjectUpdateRequest(BaseModel):
@@ -56,6 +81,78 @@ class ObjectUpdateRequest(BaseModel):
     metadata: Optional[Dict[str, str]] = None
 
 
+class DedupStatsResponse(BaseModel):
+    bucket_name: str
+    dedup_mode: Optional[str]
+    unique_chunks: int
+    references: int
+    logical_bytes: int
+    stored_bytes: int
+    bytes_saved: int
+    dedup_ratio: Optional[float]
+
+
+class BatchKeysRequest(BaseModel):
+    keys: List[str] = Field(..., min_length=1)
+
+
+class BatchTierRequest(BatchKeysRequest):
+    tier: str
+
+
+class BatchResult(BaseModel):
+    object_key: str
+    # deleted, updated, unchanged, found, not_found or invalid
+    status: str
+    error: Optional[str] = None
+    object: Optional[ObjectResponse] = None
+
+
+class BatchResponse(BaseModel):
+    bucket_name: str
+    results: List[BatchResult]
+    succeeded: int
+    failed: int
+
+
+class MultipartInitiateRequest(BaseModel):
+    object_key: str
+    tier: str = "hot"
+    content_type: str = "application/octet-stream"
+    metadata: Dict[str, str] = Field(default_factory=dict)
+
+
+class MultipartUploadResponse(BaseModel):
+    bucket_name: str
+    object_key: str
+    upload_id: str
+    tier: str
+    initiated_at: float
+
+
+class MultipartPartResponse(BaseModel):
+    part_number: int
+    size: int
+    checksum: str
+
+
+class MultipartPartListResponse(BaseModel):
+    bucket_name: str
+    object_key: str
+    upload_id: str
+    parts: List[MultipartPartResponse]
+
+
+class MultipartCompletePart(BaseModel):
+    part_number: int
+    checksum: Optional[str] = None
+
+
+class MultipartCompleteRequest(BaseModel):
+    # Defaults to every uploaded part in part number order
+    parts: Optional[List[MultipartCompletePart]] = None
+
+
 def get_raft_service(request: Request) -> RaftService:
     """Get Raft service from app state"""
     return request.app.state.raft_service
@@ -101,6 +198,124 @@ async def check_bucket_access(bucket_name: str, user: UserInfo, raft_service: Ra
     return bucket
 
 
+def parse_range_header(range_header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """Parse a single-range 'bytes=' header into a half-open [start, end) interval"""
+    if not range_header:
+        return None
+    
+    unsatisfiable = HTTPException(
+        status_code=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE,
+        detail="Requested range not satisfiable",
+        headers={"Content-Range": f"bytes */{size}"}
+    )
+    
+    unit, _, spec = range_header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in spec:
+        raise unsatisfiable
+    
+    first, _, last = spec.strip().partition("-")
+    try:
+        if first == "":
+            # Suffix range: the last N bytes
+            start, end = max(size - int(last), 0), size
+        else:
+            start = int(first)
+            end = int(last) + 1 if last else size
+    except ValueError:
+        raise unsatisfiable
+    
+    end = min(end, size)
+    if start < 0 or start >= end:
+        raise unsatisfiable
+    return start, end
+
+
+def object_response(obj_data: Dict[str, Any]) -> ObjectResponse:
+    """Public view of an object record"""
+    return ObjectResponse(
+        bucket_name=obj_data["bucket_name"],
+        object_key=obj_data["object_key"],
+        size=obj_data["size"],
+        tier=obj_data["tier"],
+        created_at=obj_data.get("created_at", ""),
+        last_accessed=obj_data.get("last_accessed", ""),
+        content_type=obj_data.get("content_type", "application/octet-stream"),
+        checksum=obj_data["checksum"],
+        metadata=obj_data.get("metadata", {})
+    )
+
+
+def check_object_key(object_key: str):
+    """Reject keys reserved for internal metadata records"""
+    if is_reserved_key(object_key):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Object key '{object_key}' uses a reserved prefix"
+        )
+
+
+async def stream_object_range(storage_service: StorageService,
+                              vault_service: VaultService,
+                              object_metadata: Dict[str, Any],
+                              start: int,
+                              end: int) -> AsyncIterator[bytes]:
+    """Yield the decrypted bytes [start, end) of an object
+
+    Multipart objects are read part by part; the shards of the next part are
+    fetched while the current one is decrypted.  Deduplicated objects are read
+    chunk by chunk the same way.  Compressed objects are decompressed frame by
+    frame after decryption.
+    """
+    if object_metadata.get("chunks") is not None:
+        async for piece in create_dedup_service(storage_service, vault_service).stream_range(object_metadata, start, end):
+            yield piece
+        return
+    
+    bucket_name = object_metadata["bucket_name"]
+    object_key = object_metadata["object_key"]
+    parts = object_metadata.get("parts") or [object_metadata]
+    
+    # Parts overlapping the range, with the range in part-local offsets
+    spans = []
+    offset = 0
+    for part in parts:
+        part_end = offset + part["size"]
+        if offset < end and part_end > start:
+            spans.append((part, max(start, offset) - offset, min(end, part_end) - offset))
+        offset = part_end
+    
+    def fetch(part: Dict[str, Any]) -> asyncio.Task:
+        return asyncio.create_task(storage_service.load_object_data(bucket_name, object_key, part))
+    
+    compression_service = CompressionService()
+    pending = fetch(spans[0][0]) if spans else None
+    try:
+        for i, (part, part_start, part_end) in enumerate(spans):
+            encrypted_data = await pending
+            pending = fetch(spans[i + 1][0]) if i + 1 < len(spans) else None
+            
+            compression = part.get("compression")
+            if not compression:
+                async for piece in vault_service.decrypt_stream(
+                    encrypted_data, object_metadata["encryption_key"], part_start, part_end
+                ):
+                    yield piece
+                continue
+            
+            # Decrypt only the frames covering the range, decompressing as they arrive
+            compressed_start, compressed_end = compressed_range(compression, part_start, part_end)
+            compressed_pieces = vault_service.decrypt_stream(
+                encrypted_data, object_metadata["encryption_key"], compressed_start, compressed_end
+            )
+            async for piece in compression_service.decompress_stream(
+                compressed_pieces, compression, part_start, part_end
+            ):
+                yield piece
+    finally:
+        if pending:
+            pending.cancel()
+
+
 @router.post("/{bucket_name}/objects", response_model=ObjectUploadResponse, status_code=status.HTTP_201_CREATED)
 async def upload_object(
     bucket_name: str,
@@ -123,8 +338,11 @@ async def upload_object(
                 content_type=content_type)
     
     try:
+        check_object_key(object_key)
+        
         # Check bucket access
-        await check_bucket_access(bucket_name, current_user, raft_service, "write")
+        bucket = await check_bucket_access(bucket_name, current_user, raft_service, "write")
+        dedup_mode = bucket.get("dedup_mode")
         
         # Parse metadata
         import json
@@ -133,34 +351,95 @@ async def upload_object(
         except json.JSONDecodeError:
             object_metadata = {}
         
-        # Read file data
-        file_data = await file.read()
-        file_size = len(file_data)
-        
-        # Calculate checksum
-        checksum = hashlib.sha256(file_data).hexdigest()
+        # The object this upload replaces, whatever its placement
+        previous = await raft_service.get_object(bucket_name, object_key)
         
-        logger.info("File read successfully", 
-                   object_key=object_key, 
-                   size=file_size, 
-                   checksum=checksum)
+        # Read, hash and encrypt the file in chunks so the plaintext and the
+        # ciphertext are never both held in memory
+        hasher = hashlib.sha256()
+        executor = get_compute_executor()
+        file_size = 0
         
-        # Get encryption key from Vault
-        encryption_key = await vault_service.get_data_key(bucket_name, object_key)
-        
-        # Encrypt data
-        encrypted_data = await vault_service.encrypt_data(file_data, encryption_key)
+        async def read_chunks():
+            nonlocal file_size
+            while True:
+                chunk = await file.read(UPLOAD_READ_SIZE)
+                if not chunk:
+                    break
+                await executor.run(hasher.update, chunk, task="hash")
+                file_size += len(chunk)
+                yield chunk
         
         # Create storage service instance
-        storage_service = StorageService(raft_service)
+        storage_service = create_storage_service(raft_service)
+        dedup_stats = None
+        compression_stats = None
         
-        # Encode data into shards using Reed-Solomon
-        shards_info = await storage_service.encode_and_store_shards(
-            bucket_name=bucket_name,
-            object_key=object_key,
-            data=encrypted_data,
-            tier=tier
-        )
+        if dedup_mode:
+            # Chunks are encrypted individually with convergent keys
+            plaintext = bytearray()
+            async for chunk in read_chunks():
+                plaintext += chunk
+            checksum = hasher.hexdigest()
+            
+            dedup_service = create_dedup_service(storage_service, vault_service)
+            chunks, dedup_stats = await dedup_service.store_object(bucket_name, plaintext, tier, dedup_mode)
+            placement = {"shards": [], "chunks": chunks}
+        else:
+            # Decide on compression from the content type or a sample
+            compression_service = create_compression_service()
+            compression_level = compression_level_for_bucket(bucket)
+            sample = await file.read(compression_service.probe_size)
+            await file.seek(0)
+            codec = await compression_service.choose_codec(content_type, sample, compression_level)
+            
+            # Get encryption key from Vault
+            encryption_key = await vault_service.get_data_key(bucket_name, object_key)
+            
+            stream = read_chunks()
+            frame_sizes = []
+            if codec:
+                stream = compression_service.compress_stream(stream, compression_level, frame_sizes)
+            
+            encrypted_data = bytearray()
+            async for piece in vault_service.encrypt_stream(stream, encryption_key):
+                encrypted_data += piece
+            
+            checksum = hasher.hexdigest()
+            
+            logger.info("File read and encrypted", 
+                       object_key=object_key, 
+                       size=file_size, 
+                       encrypted_size=len(encrypted_data),
+                       codec=codec,
+                       checksum=checksum)
+            
+            # Store inline, in a pack segment or as Reed-Solomon shards by size
+            placement = await storage_service.store_object_data(
+                bucket_name=bucket_name,
+                object_key=object_key,
+                data=encrypted_data,
+                tier=tier
+            )
+            placement["encryption_key"] = encryption_key
+            
+            if codec:
+                compressed_size = sum(frame_sizes)
+                placement["compression"] = {
+                    "codec": codec,
+                    "level": compression_level,
+                    "uncompressed_size": file_size,
+                    "compressed_size": compressed_size,
+                    "frame_size": compression_service.frame_size,
+                    "frames": frame_sizes
+                }
+                compression_stats = {
+                    "codec": codec,
+                    "uncompressed_size": file_size,
+                    "compressed_size": compressed_size,
+                    "ratio": round(file_size / compressed_size, 3) if compressed_size else None
+                }
+        shards_info = placement["shards"]
         
         # Create object metadata
         object_data = {
@@ -170,8 +449,8 @@ async def upload_object(
             "tier": tier,
             "content_type": content_type,
             "checksum": checksum,
-            "encryption_key": encryption_key,
-            "shards": shards_info,
+            "encryption": ENCRYPTION_FORMAT,
+            **placement,
             "metadata": object_metadata,
             "owner": current_user.username
         }
@@ -179,6 +458,11 @@ async def upload_object(
         # Store metadata in Raft
         await raft_service.create_object(object_data)
         
+        # Free the shards and chunk references of the object this upload
+        # replaced, whichever placement either version uses
+        if previous:
+            await release_object_data(storage_service, previous)
+        
         # Log access event to Kafka
         access_event = {
             "timestamp": time.time(),
@@ -222,7 +506,9 @@ async def upload_object(
             checksum=checksum,
             tier=tier,
             shards=shards_info,
-            message="Object uploaded successfully"
+            message="Object uploaded successfully",
+            dedup=dedup_stats,
+            compression=compression_stats
         )
         
     except HTTPException:
@@ -242,12 +528,13 @@ async def upload_object(
 async def download_object(
     bucket_name: str,
     object_key: str,
+    range_header: Optional[str] = Header(default=None, alias="Range"),
     current_user: UserInfo = Depends(get_current_user),
     raft_service: RaftService = Depends(get_raft_service),
     kafka_service: KafkaService = Depends(get_kafka_service),
     vault_service: VaultService = Depends(get_vault_service)
 ):
-    """Download an object from a bucket"""
+    """Download an object (or a single byte range of it) from a bucket"""
     logger.info("Starting object download", 
                 bucket_name=bucket_name, 
                 object_key=object_key, 
@@ -265,24 +552,33 @@ async def download_object(
                 detail=f"Object '{object_key}' not found in bucket '{bucket_name}'"
             )
         
+        object_size = object_metadata["size"]
+        byte_range = parse_range_header(range_header, object_size)
+        start, end = byte_range or (0, object_size)
+        
         # Create storage service instance
-        storage_service = StorageService(raft_service)
+        storage_service = create_storage_service(raft_service)
         
-        # Retrieve and reconstruct shards
-        encrypted_data = await storage_service.retrieve_and_reconstruct_shards(
-            bucket_name=bucket_name,
-            object_key=object_key,
-            shards_info=object_metadata["shards"]
+        # Retrieve shards and decrypt only the segments covering the requested
+        # range, streaming them out as they are decrypted
+        decrypted_stream = stream_object_range(
+            storage_service,
+            vault_service,
+            object_metadata,
+            start,
+            end
         )
         
-        # Decrypt data
-        decrypted_data = await vault_service.decrypt_data(
-            encrypted_data, 
-            object_metadata["encryption_key"]
-        )
+        # Decrypt the first piece up front so key or integrity errors are
+        # reported before the response headers are sent
+        try:
+            first_piece = await decrypted_stream.__anext__()
+        except StopAsyncIteration:
+            first_piece = b""
         
         # Update last accessed time
         await raft_service.update_object_access_time(bucket_name, object_key)
+        record_access(bucket_name, object_key)
         
         # Log access event
         access_event = {
@@ -300,21 +596,30 @@ async def download_object(
         logger.info("Object downloaded successfully", 
                    bucket_name=bucket_name, 
                    object_key=object_key,
-                   size=len(decrypted_data))
+                   size=end - start,
+                   ranged=byte_range is not None)
         
         # Return streaming response
-        def generate():
-            yield decrypted_data
+        async def generate():
+            yield first_piece
+            async for piece in decrypted_stream:
+                yield piece
+        
+        headers = {
+            "Content-Disposition": f"attachment; filename={object_key}",
+            "Content-Length": str(end - start),
+            "Accept-Ranges": "bytes",
+            "X-Object-Tier": object_metadata["tier"],
+            "X-Object-Checksum": object_metadata["checksum"]
+        }
+        if byte_range:
+            headers["Content-Range"] = f"bytes {start}-{end - 1}/{object_size}"
         
         return StreamingResponse(
             generate(),
+            status_code=status.HTTP_206_PARTIAL_CONTENT if byte_range else status.HTTP_200_OK,
             media_type=object_metadata.get("content_type", "application/octet-stream"),
-            headers={
-                "Content-Disposition": f"attachment; filename={object_key}",
-                "Content-Length": str(object_metadata["size"]),
-                "X-Object-Tier": object_metadata["tier"],
-                "X-Object-Checksum": object_metadata["checksum"]
-            }
+            headers=headers
         )
         
     except HTTPException:
@@ -360,6 +665,8 @@ async def list_objects(
         
         objects = []
         for obj_data in objects_data.get("objects", []):
+            if is_reserved_key(obj_data["object_key"]):
+                continue
             objects.append(ObjectResponse(
                 bucket_name=obj_data["bucket_name"],
                 object_key=obj_data["object_key"],
@@ -561,17 +868,11 @@ async def delete_object(
             )
         
         # Create storage service instance
-        storage_service = StorageService(raft_service)
-        
-        # Delete shards from storage nodes
-        await storage_service.delete_shards(
-            bucket_name=bucket_name,
-            object_key=object_key,
-            shards_info=object_metadata["shards"]
-        )
+        storage_service = create_storage_service(raft_service)
         
-        # Delete object metadata from Raft
+        # Delete object metadata from Raft, then its shards and chunk references
         await raft_service.delete_object(bucket_name, object_key)
+        await release_object_data(storage_service, object_metadata)
         
         # Log access event
         access_event = {
@@ -603,6 +904,633 @@ async def delete_object(
         )
 
 
+async def get_multipart_upload(multipart_service: MultipartService, bucket_name: str, upload_id: str) -> Dict[str, Any]:
+    """Get an in-progress multipart upload or raise 404"""
+    upload = await multipart_service.get_upload(bucket_name, upload_id)
+    if not upload:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Multipart upload '{upload_id}' not found in bucket '{bucket_name}'"
+        )
+    return upload
+
+
+@router.post("/{bucket_name}/multipart-uploads", response_model=MultipartUploadResponse, status_code=status.HTTP_201_CREATED)
+async def initiate_multipart_upload(
+    bucket_name: str,
+    initiate_request: MultipartInitiateRequest,
+    current_user: UserInfo = Depends(get_current_user),
+    raft_service: RaftService = Depends(get_raft_service),
+    vault_service: VaultService = Depends(get_vault_service)
+):
+    """Start a multipart upload"""
+    logger.info("Initiating multipart upload", 
+                bucket_name=bucket_name, 
+                object_key=initiate_request.object_key, 
+                user=current_user.username)
+    
+    try:
+        check_object_key(initiate_request.object_key)
+        
+        # Check bucket access
+        await check_bucket_access(bucket_name, current_user, raft_service, "write")
+        
+        # All parts are encrypted with the object's data key
+        encryption_key = await vault_service.get_data_key(bucket_name, initiate_request.object_key)
+        
+        storage_service = create_storage_service(raft_service)
+        upload = await MultipartService(raft_service, storage_service).initiate_upload(
+            bucket_name=bucket_name,
+            object_key=initiate_request.object_key,
+            tier=initiate_request.tier,
+            content_type=initiate_request.content_type,
+            metadata=initiate_request.metadata,
+            owner=current_user.username,
+            encryption_key=encryption_key
+        )
+        
+        return MultipartUploadResponse(
+            bucket_name=bucket_name,
+            object_key=upload["object_key"],
+            upload_id=upload["upload_id"],
+            tier=upload["tier"],
+            initiated_at=upload["initiated_at"]
+        )
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error("Failed to initiate multipart upload", 
+                    bucket_name=bucket_name, 
+                    object_key=initiate_request.object_key, 
+                    error=str(e))
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Failed to initiate multipart upload"
+        )
+
+
+@router.put("/{bucket_name}/multipart-uploads/{upload_id}/parts/{part_number}", response_model=MultipartPartResponse)
+async def upload_part(
+    bucket_name: str,
+    upload_id: str,
+    part_number: int,
+    request: Request,
+    current_user: UserInfo = Depends(get_current_user),
+    raft_service: RaftService = Depends(get_raft_service),
+    vault_service: VaultService = Depends(get_vault_service)
+):
+    """Upload one part of a multipart upload (the request body is the part data)
+
+    Parts are encrypted and erasure coded independently, so clients can upload
+    them in parallel and retry any single part.
+    """
+    logger.info("Uploading multipart part", 
+                bucket_name=bucket_name, 
+                upload_id=upload_id, 
+                part_number=part_number, 
+                user=current_user.username)
+    
+    try:
+        if not 1 <= part_number <= MAX_PARTS:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Part number must be between 1 and {MAX_PARTS}"
+            )
+        
+        # Check bucket access
+        await check_bucket_access(bucket_name, current_user, raft_service, "write")
+        
+        storage_service = create_storage_service(raft_service)
+        multipart_service = MultipartService(raft_service, storage_service)
+        upload = await get_multipart_upload(multipart_service, bucket_name, upload_id)
+        
+        max_part_size = get_settings().max_chunk_size
+        too_large = HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"Part exceeds the maximum part size of {max_part_size} bytes"
+        )
+        if int(request.headers.get("content-length") or 0) > max_part_size:
+            raise too_large
+        
+        # Hash and encrypt the body as it arrives
+        hasher = hashlib.sha256()
+        executor = get_compute_executor()
+        part_size = 0
+        
+        async def read_chunks():
+            nonlocal part_size
+            async for chunk in request.stream():
+                if not chunk:
+                    continue
+                part_size += len(chunk)
+                if part_size > max_part_size:
+                    raise too_large
+                await executor.run(hasher.update, chunk, task="hash")
+                yield chunk
+        
+        encrypted_data = bytearray()
+        async for piece in vault_service.encrypt_stream(read_chunks(), upload["encryption_key"]):
+            encrypted_data += piece
+        
+        part = await multipart_service.store_part(
+            upload=upload,
+            part_number=part_number,
+            encrypted_data=encrypted_data,
+            size=part_size,
+            checksum=hasher.hexdigest()
+        )
+        
+        return MultipartPartResponse(
+            part_number=part["part_number"],
+            size=part["size"],
+            checksum=part["checksum"]
+        )
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error("Failed to upload multipart part", 
+                    bucket_name=bucket_name, 
+                    upload_id=upload_id, 
+                    part_number=part_number, 
+                    error=str(e))
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Failed to upload part"
+        )
+
+
+@router.get("/{bucket_name}/multipart-uploads/{upload_id}", response_model=MultipartPartListResponse)
+async def list_multipart_parts(
+    bucket_name: str,
+    upload_id: str,
+    current_user: UserInfo = Depends(get_current_user),
+    raft_service: RaftService = Depends(get_raft_service)
+):
+    """List the parts uploaded so far (used to resume an interrupted upload)"""
+    try:
+        # Check bucket access
+        await check_bucket_access(bucket_name, current_user, raft_service, "write")
+        
+        storage_service = create_storage_service(raft_service)
+        multipart_service = MultipartService(raft_service, storage_service)
+        upload = await get_multipart_upload(multipart_service, bucket_name, upload_id)
+        parts = await multipart_service.list_parts(bucket_name, upload_id)
+        
+        return MultipartPartListResponse(
+            bucket_name=bucket_name,
+            object_key=upload["object_key"],
+            upload_id=upload_id,
+            parts=[
+                MultipartPartResponse(part_number=part["part_number"], size=part["size"], checksum=part["checksum"])
+                for part in parts
+            ]
+        )
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error("Failed to list multipart parts", 
+                    bucket_name=bucket_name, 
+                    upload_id=upload_id, 
+                    error=str(e))
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Failed to list parts"
+        )
+
+
+@router.post("/{bucket_name}/multipart-uploads/{upload_id}/complete", response_model=ObjectUploadResponse)
+async def complete_multipart_upload(
+    bucket_name: str,
+    upload_id: str,
+    complete_request: MultipartCompleteRequest,
+    current_user: UserInfo = Depends(get_current_user),
+    raft_service: RaftService = Depends(get_raft_service),
+    kafka_service: KafkaService = Depends(get_kafka_service)
+):
+    """Assemble the uploaded parts into an object"""
+    logger.info("Completing multipart upload", 
+                bucket_name=bucket_name, 
+                upload_id=upload_id, 
+                user=current_user.username)
+    
+    try:
+        # Check bucket access
+        await check_bucket_access(bucket_name, current_user, raft_service, "write")
+        
+        storage_service = create_storage_service(raft_service)
+        multipart_service = MultipartService(raft_service, storage_service)
+        upload = await get_multipart_upload(multipart_service, bucket_name, upload_id)
+        uploaded = {part["part_number"]: part for part in await multipart_service.list_parts(bucket_name, upload_id)}
+        
+        requested = complete_request.parts
+        if requested is None:
+            requested = [MultipartCompletePart(part_number=number) for number in sorted(uploaded)]
+        
+        if not requested:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="A multipart upload needs at least one part"
+            )
+        
+        parts = []
+        for item in requested:
+            part = uploaded.get(item.part_number)
+            if part is None:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail=f"Part {item.part_number} has not been uploaded"
+                )
+            if item.checksum and item.checksum != part["checksum"]:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail=f"Checksum mismatch for part {item.part_number}"
+                )
+            if parts and item.part_number <= parts[-1]["part_number"]:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail="Parts must be listed in ascending part number order"
+                )
+            parts.append(part)
+        
+        listed = {part["part_number"] for part in parts}
+        unused_parts = [part for number, part in uploaded.items() if number not in listed]
+        
+        object_data = await multipart_service.complete_upload(upload, parts, unused_parts)
+        shards_info = all_shard_infos(object_data)
+        
+        # Log access event to Kafka
+        access_event = {
+            "timestamp": time.time(),
+            "user": current_user.username,
+            "action": "upload_object",
+            "bucket": bucket_name,
+            "object": object_data["object_key"],
+            "size": object_data["size"],
+            "tier": object_data["tier"],
+            "success": True,
+            "metadata": {
+                "content_type": object_data["content_type"],
+                "checksum": object_data["checksum"],
+                "shard_count": len(shards_info),
+                "part_count": len(parts)
+            }
+        }
+        await kafka_service.publish_access_log(access_event)
+        
+        # Trigger ML tiering analysis
+        tiering_event = {
+            "timestamp": time.time(),
+            "bucket_name": bucket_name,
+            "object_key": object_data["object_key"],
+            "size": object_data["size"],
+            "current_tier": object_data["tier"],
+            "user": current_user.username,
+            "content_type": object_data["content_type"]
+        }
+        await kafka_service.publish_tiering_request(tiering_event)
+        
+        return ObjectUploadResponse(
+            bucket_name=bucket_name,
+            object_key=object_data["object_key"],
+            size=object_data["size"],
+            checksum=object_data["checksum"],
+            tier=object_data["tier"],
+            shards=shards_info,
+            message="Multipart upload completed successfully"
+        )
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error("Failed to complete multipart upload", 
+                    bucket_name=bucket_name, 
+                    upload_id=upload_id, 
+                    error=str(e))
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Failed to complete multipart upload"
+        )
+
+
+@router.delete("/{bucket_name}/multipart-uploads/{upload_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def abort_multipart_upload(
+    bucket_name: str,
+    upload_id: str,
+    current_user: UserInfo = Depends(get_current_user),
+    raft_service: RaftService = Depends(get_raft_service)
+):
+    """Abort a multipart upload and delete its parts"""
+    logger.info("Aborting multipart upload", 
+                bucket_name=bucket_name, 
+                upload_id=upload_id, 
+                user=current_user.username)
+    
+    try:
+        # Check bucket access
+        await check_bucket_access(bucket_name, current_user, raft_service, "write")
+        
+        storage_service = create_storage_service(raft_service)
+        multipart_service = MultipartService(raft_service, storage_service)
+        upload = await get_multipart_upload(multipart_service, bucket_name, upload_id)
+        await multipart_service.abort_upload(upload)
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error("Failed to abort multipart upload", 
+                    bucket_name=bucket_name, 
+                    upload_id=upload_id, 
+                    error=str(e))
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Failed to abort multipart upload"
+        )
+
+
+@router.get("/{bucket_name}/dedup", response_model=DedupStatsResponse)
+async def get_dedup_stats(
+    bucket_name: str,
+    current_user: UserInfo = Depends(get_current_user),
+    raft_service: RaftService = Depends(get_raft_service),
+    vault_service: VaultService = Depends(get_vault_service)
+):
+    """Get the deduplication ratio and bytes saved for a bucket"""
+    try:
+        # Check bucket access
+        bucket = await check_bucket_access(bucket_name, current_user, raft_service, "read")
+        
+        storage_service = create_storage_service(raft_service)
+        stats = await create_dedup_service(storage_service, vault_service).bucket_stats(bucket_name)
+        
+        return DedupStatsResponse(
+            bucket_name=bucket_name,
+            dedup_mode=bucket.get("dedup_mode"),
+            **stats
+        )
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error("Failed to get dedup stats", 
+                    bucket_name=bucket_name, 
+                    error=str(e))
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Failed to get dedup stats"
+        )
+
+
+def batch_keys(batch_request: BatchKeysRequest) -> List[str]:
+    """Distinct keys of a batch request, in request order"""
+    keys = list(dict.fromkeys(batch_request.keys))
+    max_keys = get_settings().batch_max_keys
+    if len(keys) > max_keys:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"A batch request accepts at most {max_keys} keys"
+        )
+    return keys
+
+
+async def fetch_object_records(raft_service: RaftService, bucket_name: str, keys: List[str]) -> Dict[str, Optional[Dict[str, Any]]]:
+    """Object records for many keys (None for missing or reserved keys)"""
+    semaphore = asyncio.Semaphore(32)
+    
+    async def fetch(object_key: str) -> Optional[Dict[str, Any]]:
+        if is_reserved_key(object_key):
+            return None
+        async with semaphore:
+            return await raft_service.get_object(bucket_name, object_key)
+    
+    records = await asyncio.gather(*[fetch(object_key) for object_key in keys])
+    return dict(zip(keys, records))
+
+
+def batch_response(bucket_name: str, results: List[BatchResult]) -> BatchResponse:
+    failed = sum(1 for result in results if result.status in ("not_found", "invalid"))
+    return BatchResponse(
+        bucket_name=bucket_name,
+        results=results,
+        succeeded=len(results) - failed,
+        failed=failed
+    )
+
+
+@router.post("/{bucket_name}/batch/delete", response_model=BatchResponse)
+async def batch_delete_objects(
+    bucket_name: str,
+    batch_request: BatchKeysRequest,
+    current_user: UserInfo = Depends(get_current_user),
+    raft_service: RaftService = Depends(get_raft_service),
+    kafka_service: KafkaService = Depends(get_kafka_service)
+):
+    """Delete many objects with one metadata commit and per-node shard deletes"""
+    keys = batch_keys(batch_request)
+    logger.info("Batch deleting objects", 
+                bucket_name=bucket_name, 
+                keys=len(keys), 
+                user=current_user.username)
+    
+    try:
+        # Check bucket access once for the whole batch
+        await check_bucket_access(bucket_name, current_user, raft_service, "write")
+        
+        records = await fetch_object_records(raft_service, bucket_name, keys)
+        found = [object_key for object_key in keys if records[object_key]]
+        
+        # Delete all metadata records as a single Raft log entry
+        statuses = {}
+        if found:
+            for result in await raft_service.batch_objects(bucket_name, deletes=found):
+                statuses[result["object_key"]] = result["status"]
+        deleted = [records[object_key] for object_key in found if statuses.get(object_key) == "deleted"]
+        
+        # Then free their storage: shards grouped per node, and chunk references
+        storage_service = create_storage_service(raft_service)
+        shards = [(record["object_key"], info) for record in deleted for info in all_shard_infos(record)]
+        failed_shards = await storage_service.delete_shards_by_node(bucket_name, shards)
+        
+        chunks = [chunk for record in deleted for chunk in record.get("chunks") or []]
+        if chunks:
+            await DedupService(storage_service).release_chunks(bucket_name, chunks)
+        
+        results = [
+            BatchResult(object_key=object_key, status=statuses.get(object_key, "not_found"))
+            if not is_reserved_key(object_key) else
+            BatchResult(object_key=object_key, status="invalid", error="Reserved object key")
+            for object_key in keys
+        ]
+        
+        # Log one access event for the batch
+        access_event = {
+            "timestamp": time.time(),
+            "user": current_user.username,
+            "action": "batch_delete_objects",
+            "bucket": bucket_name,
+            "objects": [record["object_key"] for record in deleted],
+            "size": sum(record["size"] for record in deleted),
+            "success": True,
+            "metadata": {
+                "requested": len(keys),
+                "deleted": len(deleted),
+                "shard_count": len(shards),
+                "failed_shards": failed_shards
+            }
+        }
+        await kafka_service.publish_access_log(access_event)
+        
+        logger.info("Batch delete completed", 
+                   bucket_name=bucket_name, 
+                   requested=len(keys), 
+                   deleted=len(deleted),
+                   shards=len(shards),
+                   failed_shards=failed_shards)
+        
+        return batch_response(bucket_name, results)
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error("Failed to batch delete objects", 
+                    bucket_name=bucket_name, 
+                    error=str(e))
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Failed to batch delete objects"
+        )
+
+
+@router.post("/{bucket_name}/batch/tier", response_model=BatchResponse)
+async def batch_update_tier(
+    bucket_name: str,
+    batch_request: BatchTierRequest,
+    current_user: UserInfo = Depends(get_current_user),
+    raft_service: RaftService = Depends(get_raft_service),
+    kafka_service: KafkaService = Depends(get_kafka_service)
+):
+    """Change the tier of many objects with one metadata commit"""
+    keys = batch_keys(batch_request)
+    logger.info("Batch updating object tier", 
+                bucket_name=bucket_name, 
+                keys=len(keys), 
+                tier=batch_request.tier,
+                user=current_user.username)
+    
+    try:
+        # Check bucket access once for the whole batch
+        await check_bucket_access(bucket_name, current_user, raft_service, "write")
+        
+        records = await fetch_object_records(raft_service, bucket_name, keys)
+        changed = {
+            object_key: {"tier": batch_request.tier}
+            for object_key, record in records.items()
+            if record and record["tier"] != batch_request.tier
+        }
+        
+        statuses = {object_key: "unchanged" for object_key, record in records.items() if record}
+        if changed:
+            for result in await raft_service.batch_objects(bucket_name, updates=changed):
+                statuses[result["object_key"]] = result["status"]
+        
+        # Trigger migration of the objects whose tier changed
+        updated = [records[object_key] for object_key in changed if statuses.get(object_key) == "updated"]
+        await asyncio.gather(*[
+            kafka_service.publish_tier_migration_request({
+                "timestamp": time.time(),
+                "bucket_name": bucket_name,
+                "object_key": record["object_key"],
+                "from_tier": record["tier"],
+                "to_tier": batch_request.tier,
+                "user": current_user.username,
+                "size": record["size"]
+            })
+            for record in updated
+        ])
+        
+        results = [
+            BatchResult(object_key=object_key, status=statuses.get(object_key, "not_found"))
+            if not is_reserved_key(object_key) else
+            BatchResult(object_key=object_key, status="invalid", error="Reserved object key")
+            for object_key in keys
+        ]
+        
+        # Log one access event for the batch
+        access_event = {
+            "timestamp": time.time(),
+            "user": current_user.username,
+            "action": "batch_update_tier",
+            "bucket": bucket_name,
+            "objects": [record["object_key"] for record in updated],
+            "tier": batch_request.tier,
+            "success": True,
+            "metadata": {
+                "requested": len(keys),
+                "updated": len(updated)
+            }
+        }
+        await kafka_service.publish_access_log(access_event)
+        
+        logger.info("Batch tier update completed", 
+                   bucket_name=bucket_name, 
+                   requested=len(keys), 
+                   updated=len(updated),
+                   tier=batch_request.tier)
+        
+        return batch_response(bucket_name, results)
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error("Failed to batch update object tier", 
+                    bucket_name=bucket_name, 
+                    error=str(e))
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Failed to batch update object tier"
+        )
+
+
+@router.post("/{bucket_name}/batch/head", response_model=BatchResponse)
+async def batch_head_objects(
+    bucket_name: str,
+    batch_request: BatchKeysRequest,
+    current_user: UserInfo = Depends(get_current_user),
+    raft_service: RaftService = Depends(get_raft_service)
+):
+    """Get the metadata of many objects"""
+    keys = batch_keys(batch_request)
+    
+    try:
+        # Check bucket access once for the whole batch
+        await check_bucket_access(bucket_name, current_user, raft_service, "read")
+        
+        records = await fetch_object_records(raft_service, bucket_name, keys)
+        results = [
+            BatchResult(object_key=object_key, status="invalid", error="Reserved object key")
+            if is_reserved_key(object_key) else
+            BatchResult(object_key=object_key, status="found", object=object_response(record))
+            if record else
+            BatchResult(object_key=object_key, status="not_found")
+            for object_key, record in records.items()
+        ]
+        
+        return batch_response(bucket_name, results)
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error("Failed to batch head objects", 
+                    bucket_name=bucket_name, 
+                    error=str(e))
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Failed to batch head objects"
+        )
+
+
 class MigrationRequest(BaseModel):
     bucket_name: str
     object_key: str
@@ -619,16 +1547,46 @@ class MigrationResponse(BaseModel):
     to_tier: str
     status: str
     message: str
+    job_id: str
+
+
+class MigrationJobResponse(BaseModel):
+    job_id: str
+    bucket_name: str
+    object_key: str
+    from_tier: Optional[str]
+    to_tier: str
+    status: str
+    bytes_total: Optional[int]
+    bytes_moved: int
+    shards_moved: int
+    error: Optional[str]
+    created_at: float
+    started_at: Optional[float]
+    finished_at: Optional[float]
+
 
+def get_migration_executor(request: Request) -> MigrationExecutor:
+    """Get the migration executor from app state"""
+    executor = getattr(request.app.state, "migration_executor", None)
+    if executor is None:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Migration executor is not available"
+        )
+    return executor
 
-@router.post("/migrate", response_model=MigrationResponse)
+
+@router.post("/migrate", response_model=MigrationResponse, status_code=status.HTTP_202_ACCEPTED)
 async def migrate_object(
     migration_request: MigrationRequest,
     request: Request,
     current_user: UserInfo = Depends(get_current_user)
 ):
     """
-    Migrate an object between storage tiers
+    Queue the migration of an object between storage tiers
+
+    The data is moved in the background; poll /migrate/jobs/{job_id} for progress.
     """
     logger.info("Processing migration request", 
                bucket_name=migration_request.bucket_name,
@@ -640,11 +1598,10 @@ async def migrate_object(
     try:
         # Get services from app state
         raft_service: RaftService = request.app.state.raft_service
-        kafka_service: KafkaService = request.app.state.kafka_service
-        storage_service = StorageService(raft_service)
+        migration_executor = get_migration_executor(request)
         
         # Verify object exists
-        object_metadata = await storage_service.get_object_metadata(
+        object_metadata = await raft_service.get_object(
             migration_request.bucket_name, 
             migration_request.object_key
         )
@@ -655,41 +1612,23 @@ async def migrate_object(
                 detail="Object not found"
             )
         
-        # Check if migration is needed
-        if object_metadata.get("tier") == migration_request.recommended_tier:
-            return MigrationResponse(
-                bucket_name=migration_request.bucket_name,
-                object_key=migration_request.object_key,
-                from_tier=migration_request.current_tier,
-                to_tier=migration_request.recommended_tier,
-                status="skipped",
-                message="Object already in target tier"
-            )
-        
-        # Perform migration (simplified - in reality this would involve moving data)
-        # For now, just update the metadata
-        await storage_service.update_object_tier(
+        # The executor moves whatever shards aren't on the target tier yet
+        # (the tier field may already have been changed by a tier update)
+        job = migration_executor.submit(
             migration_request.bucket_name,
             migration_request.object_key,
-            migration_request.recommended_tier
+            migration_request.recommended_tier,
+            metadata={
+                "user_id": current_user.username,
+                "confidence": migration_request.confidence,
+                "model_version": migration_request.model_version
+            },
+            size=object_metadata.get("size", 0),
+            confidence=migration_request.confidence
         )
         
-        # Log the migration event
-        access_event = {
-            "timestamp": time.time(),
-            "user_id": current_user.user_id,
-            "action": "migrate_object",
-            "bucket": migration_request.bucket_name,
-            "object": migration_request.object_key,
-            "from_tier": migration_request.current_tier,
-            "to_tier": migration_request.recommended_tier,
-            "confidence": migration_request.confidence,
-            "model_version": migration_request.model_version,
-            "success": True
-        }
-        await kafka_service.publish_access_log(access_event)
-        
-        logger.info("Object migrated successfully",
+        logger.info("Object migration queued",
+                   job_id=job["job_id"],
                    bucket_name=migration_request.bucket_name,
                    object_key=migration_request.object_key,
                    from_tier=migration_request.current_tier,
@@ -700,12 +1639,18 @@ async def migrate_object(
             object_key=migration_request.object_key,
             from_tier=migration_request.current_tier,
             to_tier=migration_request.recommended_tier,
-            status="completed",
-            message="Migration completed successfully"
+            status=job["status"],
+            message="Migration queued",
+            job_id=job["job_id"]
         )
         
     except HTTPException:
         raise
+    except MigrationQueueFull as e:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail=str(e)
+        )
     except Exception as e:
         logger.error("Failed to migrate object",
                     bucket_name=migration_request.bucket_name,
@@ -714,4 +1659,21 @@ async def migrate_object(
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Failed to migrate object"
-        )
\ No newline at end of file
+        )
+
+
+@router.get("/migrate/jobs/{job_id}", response_model=MigrationJobResponse)
+async def get_migration_job(
+    job_id: str,
+    request: Request,
+    current_user: UserInfo = Depends(get_current_user)
+):
+    """Get the status and progress of a migration job"""
+    job = get_migration_executor(request).get_job(job_id)
+    if not job:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Migration job '{job_id}' not found"
+        )
+    
+    return MigrationJobResponse(**job)
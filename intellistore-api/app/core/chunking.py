@@ -0,0 +1,91 @@
+"""
+Chunking of object content for deduplication
+
+Two strategies split a buffer into ``(start, end)`` chunk boundaries:
+
+* fixed-size chunks, cheap but shifted by any insertion;
+* content-defined chunks (CDC) using a gear rolling hash, so boundaries move
+  with the content and shared regions dedup even at different offsets.
+
+The gear hash ``h = (h << 1) + GEAR[byte]`` (mod 2**64) only depends on the
+last 64 bytes, so it is computed for every position at once with NumPy by
+window doubling: ``H_2w(i) = H_w(i) + (H_w(i - w) << w)``, six passes over
+the buffer instead of a per-byte Python loop.
+
+The gear table and the boundary rule are part of the stored format: changing
+them changes chunk boundaries and therefore which chunks dedup.
+"""
+
+import hashlib
+from typing import List, Tuple
+
+import numpy as np
+
+GEAR = np.array(
+    [int.from_bytes(hashlib.sha256(b"intellistore-gear-%d" % i).digest()[:8], "big") for i in range(256)],
+    dtype=np.uint64
+)
+
+WINDOW = 64
+
+# Bytes hashed per NumPy pass (bounds the temporary uint64 arrays to 8x this)
+CDC_BLOCK_SIZE = 4 * 1024 * 1024
+
+
+def fixed_chunks(size: int, chunk_size: int) -> List[Tuple[int, int]]:
+    """Fixed-size chunk boundaries (an empty buffer has no chunks)"""
+    return [(start, min(start + chunk_size, size)) for start in range(0, size, chunk_size)]
+
+
+def _gear_hashes(data: np.ndarray) -> np.ndarray:
+    """Rolling gear hash after every byte of ``data``"""
+    hashes = GEAR[data]
+    width = 1
+    while width < WINDOW:
+        hashes[width:] += hashes[:-width] << np.uint64(width)
+        width *= 2
+    return hashes
+
+
+def content_defined_chunks(data, avg_size: int, min_size: int = None, max_size: int = None) -> List[Tuple[int, int]]:
+    """Content-defined chunk boundaries with the given average chunk size
+
+    A boundary follows every byte whose hash has its top ``log2(avg_size)``
+    bits clear, subject to ``min_size`` (default avg/4) and ``max_size``
+    (default avg*4).
+    """
+    size = len(data)
+    if size == 0:
+        return []
+
+    min_size = min_size or max(avg_size // 4, 1)
+    max_size = max_size or avg_size * 4
+    bits = max(int(avg_size).bit_length() - 1, 1)
+    mask = np.uint64(((1 << bits) - 1) << (64 - bits))
+
+    buffer = np.frombuffer(data, dtype=np.uint8)
+    candidates = []
+    for block_start in range(0, size, CDC_BLOCK_SIZE):
+        # Include the preceding window so hashes don't depend on block alignment
+        history_start = max(block_start - (WINDOW - 1), 0)
+        hashes = _gear_hashes(buffer[history_start:block_start + CDC_BLOCK_SIZE])
+        hits = np.flatnonzero((hashes[block_start - history_start:] & mask) == 0)
+        candidates.append(hits + block_start + 1)
+
+    chunks = []
+    start = 0
+    for boundary in np.concatenate(candidates).tolist():
+        while boundary - start > max_size:
+            chunks.append((start, start + max_size))
+            start += max_size
+        if boundary - start >= min_size:
+            chunks.append((start, boundary))
+            start = boundary
+
+    while size - start > max_size:
+        chunks.append((start, start + max_size))
+        start += max_size
+    if start < size:
+        chunks.append((start, size))
+
+    return chunks
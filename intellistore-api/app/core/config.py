@@ -4,7 +4,7 @@ Configuration management for IntelliStore API
 
 import os
 from functools import lru_cache
-from typing import List, Optional
+from typing import Dict, List, Optional
 
 from pydantic import Field, field_validator
 from pydantic_settings import BaseSettings
@@ -35,6 +35,10 @@ class Settings(BaseSettings):
     vault_token: Optional[str] = Field(default=None, description="Vault authentication token", alias="VAULT_TOKEN")
     vault_mount_point: str = Field(default="intellistore", description="Vault mount point")
     
+    # Object encryption (segmented AES-256-GCM)
+    encryption_segment_size: int = Field(default=64 * 1024, description="Plaintext bytes per AES-GCM segment")
+    encryption_segments_per_task: int = Field(default=16, description="Segments encrypted per compute task")
+    
     # Raft metadata service
     raft_leader_addr: str = Field(default="localhost:8001", description="Raft leader address", alias="RAFT_LEADER_ADDR")
     raft_timeout: int = Field(default=10, description="Raft request timeout in seconds")
@@ -61,9 +65,73 @@ class Settings(BaseSettings):
     max_file_size: int = Field(default=10 * 1024 * 1024 * 1024, description="Max file size (10GB)")
     max_chunk_size: int = Field(default=64 * 1024 * 1024, description="Max chunk size (64MB)")
     
+    # Multipart uploads (max part size is max_chunk_size)
+    multipart_upload_ttl: int = Field(default=24 * 3600, description="Seconds before an incomplete multipart upload is garbage collected")
+    multipart_gc_interval: int = Field(default=3600, description="Seconds between multipart upload garbage collection runs")
+    
     # Erasure coding configuration
     data_shards: int = Field(default=6, description="Number of data shards")
     parity_shards: int = Field(default=3, description="Number of parity shards")
+    erasure_stripe_size: int = Field(default=1024 * 1024, description="Shard bytes encoded per compute task")
+    erasure_tier_profiles: Dict[str, str] = Field(default_factory=dict, description="Per-tier coding profile (rs:K+M or replica:N), e.g. {\"hot\": \"replica:3\", \"cold\": \"rs:12+4\"}")
+    
+    # Small objects (thresholds apply to the encrypted size; 0 disables)
+    inline_object_threshold: int = Field(default=4 * 1024, description="Objects up to this size are stored in the metadata record")
+    pack_object_threshold: int = Field(default=256 * 1024, description="Objects up to this size are appended to shared pack segments")
+    pack_segment_size: int = Field(default=8 * 1024 * 1024, description="Pack segment size that triggers an immediate seal")
+    pack_linger_ms: int = Field(default=20, description="Max time a pack segment waits for more objects before it is sealed")
+    pack_compaction_interval: int = Field(default=3600, description="Seconds between pack compaction runs")
+    pack_compaction_min_live_ratio: float = Field(default=0.5, description="Pack segments with less live data than this are rewritten")
+    
+    # Deduplication (for buckets created with a dedup_mode)
+    dedup_chunk_size: int = Field(default=256 * 1024, description="Fixed chunk size, or average chunk size for content-defined chunking")
+    dedup_concurrency: int = Field(default=8, description="Chunks of one object looked up and stored concurrently")
+    
+    # Compression before encryption (buckets may override the level; 0 disables)
+    compression_level: int = Field(default=3, description="Default zstd level for compressible objects")
+    compression_frame_size: int = Field(default=1024 * 1024, description="Uncompressed bytes per independently compressed frame")
+    compression_min_size: int = Field(default=4096, description="Objects smaller than this are stored uncompressed")
+    compression_max_probe_ratio: float = Field(default=0.9, description="Objects of unknown type are compressed if a sample shrinks below this ratio")
+    
+    # Batch operations
+    batch_max_keys: int = Field(default=1000, description="Maximum object keys per batch request")
+    shard_delete_concurrency_per_node: int = Field(default=8, description="Concurrent shard deletes per storage node")
+    
+    # Garbage collection of orphaned shards and data keys
+    gc_interval: int = Field(default=3600, description="Seconds between orphaned shard sweeps")
+    gc_grace_period: int = Field(default=6 * 3600, description="Unreferenced shards younger than this are never collected")
+    gc_delete_rate: float = Field(default=500.0, description="Maximum orphaned shards deleted per second")
+    gc_batch_size: int = Field(default=1000, description="Orphaned shards per delete batch")
+    gc_dry_run: bool = Field(default=False, description="Report orphaned shards and data keys without deleting them")
+    
+    # Integrity scrubbing (bandwidth in bytes/s; 0 = unlimited)
+    scrub_interval: int = Field(default=24 * 3600, description="Seconds between the end of one scrub pass and the start of the next")
+    scrub_bandwidth: float = Field(default=20 * 1024 * 1024, description="Shard bytes verified or read for repair per second")
+    scrub_concurrency: int = Field(default=4, description="Objects scrubbed concurrently")
+    scrub_node_down_grace: int = Field(default=1800, description="Seconds a storage node must be unreachable before its shards are rebuilt elsewhere")
+    scrub_repair: bool = Field(default=True, description="Rebuild missing and corrupt shards found by scrubbing")
+    
+    # Read-repair of shards found missing by degraded reads (bandwidth in bytes/s; 0 = unlimited)
+    read_repair_enabled: bool = Field(default=True, description="Rebuild missing shards found by degraded reads")
+    read_repair_bandwidth: float = Field(default=10 * 1024 * 1024, description="Rebuilt shard bytes written per second")
+    read_repair_concurrency: int = Field(default=2, description="Read-repairs run concurrently")
+    read_repair_max_pending_bytes: int = Field(default=256 * 1024 * 1024, description="Shard bytes held for pending read-repairs before new ones are dropped")
+    
+    # Tier migration (bandwidths in bytes/s; 0 = unlimited)
+    migration_concurrency: int = Field(default=4, description="Objects migrated concurrently")
+    migration_queue_size: int = Field(default=10000, description="Queued migrations before new requests are rejected")
+    migration_node_bandwidth: float = Field(default=50 * 1024 * 1024, description="Migration traffic per storage node (reads and writes)")
+    migration_tier_bandwidth: float = Field(default=200 * 1024 * 1024, description="Migration traffic into each tier")
+    migration_tier_bandwidth_overrides: Dict[str, float] = Field(default_factory=dict, description="Per-tier migration bandwidth, e.g. {\"cold\": 52428800}")
+    migration_job_ttl: int = Field(default=3600, description="Seconds finished migration jobs can still be polled")
+    migration_request_max_age: int = Field(default=900, description="Queued migrations not requested again within this many seconds expire")
+    migration_window: int = Field(default=60, description="Seconds per migration release window")
+    migration_window_limit: int = Field(default=600, description="Migrations started per window (0 = unlimited)")
+    migration_access_half_life: int = Field(default=3600, description="Half-life in seconds of the access rates used to prioritize migrations")
+    
+    # Compute executor for hashing, encryption and erasure coding
+    compute_executor_mode: str = Field(default="thread", description="Compute executor mode: thread | process")
+    compute_workers: Optional[int] = Field(default=None, description="Compute workers (defaults to CPU count)")
     
     # ML tiering configuration
     ml_inference_url: str = Field(
@@ -91,7 +159,16 @@ class Settings(BaseSettings):
         if self.kafka_brokers_str is None:
             return None
         return [item.strip() for item in self.kafka_brokers_str.split(',') if item.strip()]
-    
+
+    @field_validator("erasure_tier_profiles")
+    @classmethod
+    def validate_erasure_tier_profiles(cls, profiles: Dict[str, str]) -> Dict[str, str]:
+        """Reject malformed coding profiles at startup rather than on first upload"""
+        from app.services.erasure import ErasureProfile
+        for coding in profiles.values():
+            ErasureProfile.parse(coding)
+        return profiles
+
     model_config = {
         "env_file": [".env", ".env.development"],
         "env_file_encoding": "utf-8",
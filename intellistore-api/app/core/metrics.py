@@ -0,0 +1,9 @@
+"""
+Prometheus metrics registry for IntelliStore API
+"""
+
+from prometheus_client import CollectorRegistry
+
+# Dedicated registry so module reloads do not register duplicate collectors;
+# every API metric is registered here and exposed on /metrics
+CUSTOM_REGISTRY = CollectorRegistry()
@@ -0,0 +1,56 @@
+"""
+Token buckets for pacing background data movement
+
+Buckets may go into debt: ``acquire`` takes the tokens immediately and then
+sleeps until the bucket is back to zero, so a request larger than the burst
+(e.g. one big shard) still goes through at the configured rate on average
+instead of waiting forever, and concurrent callers are served in order.
+"""
+
+import asyncio
+import time
+from typing import Dict, Iterable, Optional
+
+
+class TokenBucket:
+    """Token bucket refilled at ``rate`` tokens/s up to ``burst`` (0 rate = unlimited)"""
+
+    def __init__(self, rate: float, burst: Optional[float] = None):
+        self.rate = rate
+        self.burst = burst if burst is not None else rate
+        self.tokens = self.burst
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self, amount: float = 1.0):
+        """Take ``amount`` tokens, sleeping while the bucket is in debt"""
+        if self.rate <= 0:
+            return
+
+        self._refill()
+        self.tokens -= amount
+        if self.tokens < 0:
+            await asyncio.sleep(-self.tokens / self.rate)
+
+
+class TokenBucketGroup:
+    """One token bucket per key (node, tier, ...), created on first use"""
+
+    def __init__(self, rate: float, burst: Optional[float] = None, rates: Optional[Dict[str, float]] = None):
+        self.rate = rate
+        self.burst = burst
+        self.rates = rates or {}
+        self.buckets: Dict[str, TokenBucket] = {}
+
+    def bucket(self, key: str) -> TokenBucket:
+        if key not in self.buckets:
+            self.buckets[key] = TokenBucket(self.rates.get(key, self.rate), self.burst)
+        return self.buckets[key]
+
+    async def acquire(self, keys: Iterable[str], amount: float = 1.0):
+        """Take ``amount`` tokens from the bucket of every key"""
+        await asyncio.gather(*[self.bucket(key).acquire(amount) for key in set(keys)])
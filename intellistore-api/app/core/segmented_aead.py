@@ -0,0 +1,169 @@
+"""
+Segmented AES-GCM encryption format for stored objects
+
+Objects are split into fixed-size plaintext segments and every segment is
+sealed independently with AES-256-GCM (the STREAM construction).  The 12 byte
+nonce of segment ``i`` is ``nonce_prefix (7) || i (4, big endian) || last (1)``
+so segments cannot be reordered, dropped or truncated without failing
+authentication, and any segment can be decrypted on its own.  This allows
+streaming encryption/decryption and decryption of arbitrary byte ranges.
+
+Layout::
+
+    header (16 bytes): magic "ISE1" | segment_size (u32) | nonce_prefix (7) | reserved (1)
+    segment 0:         ciphertext || tag (16)
+    ...
+    segment n-1:       ciphertext || tag (16)   <- sealed with last=1
+
+The header is passed as associated data for every segment.
+"""
+
+import os
+import struct
+from typing import Iterator, Tuple
+
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+
+MAGIC = b"ISE1"
+FORMAT_NAME = "aes-256-gcm-stream-v1"
+
+HEADER = struct.Struct(">4sI7sx")
+HEADER_SIZE = HEADER.size
+NONCE_PREFIX_SIZE = 7
+TAG_SIZE = 16
+
+DEFAULT_SEGMENT_SIZE = 64 * 1024
+MAX_SEGMENT_SIZE = 16 * 1024 * 1024
+
+
+def is_segmented(data: bytes) -> bool:
+    """Check whether a blob was produced by this format"""
+    return len(data) >= HEADER_SIZE and data[:len(MAGIC)] == MAGIC
+
+
+def segment_count(plaintext_size: int, segment_size: int) -> int:
+    """Number of segments for a plaintext (an empty object still has one)"""
+    return max(1, (plaintext_size + segment_size - 1) // segment_size)
+
+
+def ciphertext_size(plaintext_size: int, segment_size: int = DEFAULT_SEGMENT_SIZE) -> int:
+    """Size of the encrypted blob for a plaintext of the given size"""
+    return HEADER_SIZE + plaintext_size + segment_count(plaintext_size, segment_size) * TAG_SIZE
+
+
+def plaintext_size(blob_size: int, segment_size: int) -> int:
+    """Size of the plaintext stored in an encrypted blob of the given size"""
+    body = blob_size - HEADER_SIZE
+    sealed_segment = segment_size + TAG_SIZE
+    full, rest = divmod(body, sealed_segment)
+    if rest == 0:
+        # The final segment is always present, possibly full
+        return full * segment_size
+    return full * segment_size + rest - TAG_SIZE
+
+
+class SegmentedAEAD:
+    """AES-256-GCM cipher operating on fixed-size segments"""
+
+    def __init__(self, key: bytes, segment_size: int = DEFAULT_SEGMENT_SIZE):
+        if len(key) not in (16, 24, 32):
+            raise ValueError(f"Invalid AES key length: {len(key)}")
+        if not 0 < segment_size <= MAX_SEGMENT_SIZE:
+            raise ValueError(f"Invalid segment size: {segment_size}")
+        self.aesgcm = AESGCM(key)
+        self.segment_size = segment_size
+
+    def new_header(self, nonce_prefix: bytes = None) -> bytes:
+        """Create a header with a random (or given) nonce prefix"""
+        if nonce_prefix is None:
+            nonce_prefix = os.urandom(NONCE_PREFIX_SIZE)
+        if len(nonce_prefix) != NONCE_PREFIX_SIZE:
+            raise ValueError("Nonce prefix must be 7 bytes")
+        return HEADER.pack(MAGIC, self.segment_size, nonce_prefix)
+
+    @staticmethod
+    def parse_header(data: bytes) -> Tuple[int, bytes]:
+        """Return (segment_size, nonce_prefix) from a blob header"""
+        if len(data) < HEADER_SIZE:
+            raise ValueError("Encrypted data too short")
+        magic, segment_size, nonce_prefix = HEADER.unpack_from(data)
+        if magic != MAGIC:
+            raise ValueError("Not a segmented AEAD blob")
+        if not 0 < segment_size <= MAX_SEGMENT_SIZE:
+            raise ValueError(f"Invalid segment size in header: {segment_size}")
+        return segment_size, nonce_prefix
+
+    @staticmethod
+    def _nonce(header: bytes, index: int, last: bool) -> bytes:
+        return header[8:8 + NONCE_PREFIX_SIZE] + struct.pack(">IB", index, 1 if last else 0)
+
+    def encrypt_segment(self, header: bytes, index: int, plaintext: bytes, last: bool) -> bytes:
+        """Seal a single segment"""
+        return self.aesgcm.encrypt(self._nonce(header, index, last), plaintext, header)
+
+    def decrypt_segment(self, header: bytes, index: int, sealed: bytes, last: bool) -> bytes:
+        """Open a single segment (raises InvalidTag on tampering)"""
+        return self.aesgcm.decrypt(self._nonce(header, index, last), sealed, header)
+
+    def encrypt_segments(self, header: bytes, data: bytes, first: int, final: bool) -> bytes:
+        """Seal consecutive segments starting at index ``first``
+
+        ``data`` holds the plaintext of those segments; unless ``final`` is set
+        its length must be a multiple of the segment size.  When ``final`` is
+        set the last segment in ``data`` is sealed as the end of the stream.
+        """
+        size = self.segment_size
+        view = memoryview(data)
+        count = segment_count(len(data), size)
+        out = []
+        for offset in range(count):
+            chunk = bytes(view[offset * size:(offset + 1) * size])
+            out.append(self.encrypt_segment(header, first + offset, chunk, final and offset == count - 1))
+        return b"".join(out)
+
+    def decrypt_segments(self, header: bytes, sealed: bytes, first: int, final: bool) -> bytes:
+        """Open consecutive sealed segments starting at index ``first``"""
+        size = self.segment_size + TAG_SIZE
+        view = memoryview(sealed)
+        count = max(1, (len(sealed) + size - 1) // size)
+        out = []
+        for offset in range(count):
+            chunk = bytes(view[offset * size:(offset + 1) * size])
+            out.append(self.decrypt_segment(header, first + offset, chunk, final and offset == count - 1))
+        return b"".join(out)
+
+    def encrypt(self, data: bytes) -> bytes:
+        """Encrypt a whole plaintext"""
+        header = self.new_header()
+        return header + self.encrypt_segments(header, data, 0, True)
+
+    def decrypt(self, blob: bytes) -> bytes:
+        """Decrypt a whole blob"""
+        self.segments_in(blob)
+        return self.decrypt_segments(blob[:HEADER_SIZE], blob[HEADER_SIZE:], 0, True)
+
+    def segments_in(self, blob: bytes) -> int:
+        """Number of segments in an encrypted blob, validating its header"""
+        segment_size, _ = self.parse_header(blob)
+        if segment_size != self.segment_size:
+            raise ValueError("Segment size mismatch")
+        if len(blob) < HEADER_SIZE + TAG_SIZE:
+            raise ValueError("Encrypted data truncated")
+        return segment_count(plaintext_size(len(blob), segment_size), segment_size)
+
+    def segment_span(self, start: int, end: int) -> Tuple[int, int]:
+        """Segments [first, last) covering the plaintext byte range [start, end)"""
+        first = start // self.segment_size
+        last = max(first + 1, (end + self.segment_size - 1) // self.segment_size)
+        return first, last
+
+    def sealed_span(self, first: int, last: int) -> Tuple[int, int]:
+        """Blob offsets [start, end) holding the sealed segments [first, last)"""
+        size = self.segment_size + TAG_SIZE
+        return HEADER_SIZE + first * size, HEADER_SIZE + last * size
+
+
+def iter_batches(first: int, last: int, batch: int) -> Iterator[Tuple[int, int]]:
+    """Split the segment range [first, last) into batches of at most ``batch``"""
+    for start in range(first, last, batch):
+        yield start, min(start + batch, last)
@@ -0,0 +1,240 @@
+"""
+Compression stage for the object upload pipeline
+
+Compressible objects are compressed with zstd before they are encrypted, so
+less data is encrypted, erasure coded, shipped and stored.  Whether an object
+is compressed is decided from its content type, and for content types that
+don't say, from compressing a small sample of the object.
+
+Objects are compressed as independent zstd frames of ``frame_size``
+uncompressed bytes, with the compressed size of every frame recorded in the
+object's ``compression`` metadata.  A range read only decrypts and
+decompresses the frames covering the range, and frames are compressed in
+parallel on the compute executor.
+"""
+
+import asyncio
+from collections import deque
+from itertools import accumulate
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+import structlog
+from prometheus_client import Counter
+
+from app.core.config import get_settings
+from app.core.metrics import CUSTOM_REGISTRY
+from app.services.compute_executor import ComputeExecutor, get_compute_executor
+
+logger = structlog.get_logger(__name__)
+
+# Optional zstd support
+try:
+    import zstandard
+    ZSTD_AVAILABLE = True
+except ImportError:
+    logger.warning("zstandard not available - objects are stored uncompressed")
+    ZSTD_AVAILABLE = False
+    zstandard = None
+
+CODEC_ZSTD = "zstd"
+
+# Content types that are always worth compressing
+COMPRESSIBLE_TYPES = {
+    "application/json",
+    "application/x-ndjson",
+    "application/xml",
+    "application/javascript",
+    "application/x-yaml",
+    "application/yaml",
+    "application/csv",
+    "application/sql",
+    "application/x-sh",
+}
+
+# Content types that are already compressed
+INCOMPRESSIBLE_TYPES = {
+    "application/zip",
+    "application/gzip",
+    "application/x-gzip",
+    "application/zstd",
+    "application/x-bzip2",
+    "application/x-xz",
+    "application/x-7z-compressed",
+    "application/x-rar-compressed",
+    "application/vnd.rar",
+    "image/jpeg",
+    "image/png",
+    "image/gif",
+    "image/webp",
+    "image/avif",
+    "image/heic",
+}
+
+COMPRESSION_DECISIONS = Counter(
+    'intellistore_compression_decisions_total',
+    'Upload compression decisions',
+    ['decision'],
+    registry=CUSTOM_REGISTRY
+)
+
+COMPRESSION_BYTES = Counter(
+    'intellistore_compression_bytes_total',
+    'Bytes into and out of the compression stage',
+    ['codec', 'direction'],
+    registry=CUSTOM_REGISTRY
+)
+
+
+def content_type_class(content_type: str) -> Optional[bool]:
+    """True if a content type compresses well, False if it doesn't, None if unknown"""
+    media_type = (content_type or "").split(";")[0].strip().lower()
+    if media_type.startswith("text/") or media_type.endswith(("+json", "+xml")) or media_type in COMPRESSIBLE_TYPES:
+        return True
+    if media_type.startswith(("video/", "audio/")) or media_type in INCOMPRESSIBLE_TYPES:
+        return False
+    return None
+
+
+def _compress_frame(frame: bytes, level: int) -> bytes:
+    return zstandard.ZstdCompressor(level=level).compress(frame)
+
+
+def _decompress_frame(frame: bytes) -> bytes:
+    return zstandard.ZstdDecompressor().decompress(frame)
+
+
+def compressed_range(compression: Dict[str, Any], start: int, end: int) -> Tuple[int, int]:
+    """Compressed byte range of the frames covering uncompressed bytes [start, end)"""
+    frame_size = compression["frame_size"]
+    offsets = [0, *accumulate(compression["frames"])]
+    return offsets[start // frame_size], offsets[(end - 1) // frame_size + 1]
+
+
+class CompressionService:
+    """Service for compressing objects before encryption"""
+
+    def __init__(self,
+                 executor: Optional[ComputeExecutor] = None,
+                 frame_size: int = 1024 * 1024,
+                 min_size: int = 4096,
+                 probe_size: int = 64 * 1024,
+                 max_probe_ratio: float = 0.9):
+        self.executor = executor or get_compute_executor()
+        self.frame_size = frame_size
+        self.min_size = min_size
+        self.probe_size = probe_size
+        self.max_probe_ratio = max_probe_ratio
+
+    async def choose_codec(self, content_type: str, sample: bytes, level: int) -> Optional[str]:
+        """Codec to compress an object with, or None to store it uncompressed
+
+        ``sample`` is the start of the object; objects whose sample is smaller
+        than ``min_size`` are not compressed.
+        """
+        if not ZSTD_AVAILABLE or level <= 0:
+            return None
+
+        if len(sample) < self.min_size:
+            COMPRESSION_DECISIONS.labels(decision="too_small").inc()
+            return None
+
+        compressible = content_type_class(content_type)
+        if compressible is not None:
+            COMPRESSION_DECISIONS.labels(decision="compress" if compressible else "skip_content_type").inc()
+            return CODEC_ZSTD if compressible else None
+
+        # Unknown content type: compress a sample at the fastest level
+        probe = bytes(sample[:self.probe_size])
+        compressed = await self.executor.run(_compress_frame, probe, 1, task="compress")
+        if len(compressed) > len(probe) * self.max_probe_ratio:
+            COMPRESSION_DECISIONS.labels(decision="skip_probe").inc()
+            return None
+
+        COMPRESSION_DECISIONS.labels(decision="compress_probe").inc()
+        return CODEC_ZSTD
+
+    async def compress_stream(self,
+                              chunks: AsyncIterator[bytes],
+                              level: int,
+                              frame_sizes: List[int]) -> AsyncIterator[bytes]:
+        """Compress a byte stream into independent zstd frames
+
+        The compressed size of each frame is appended to ``frame_sizes``.  Up
+        to one frame per compute worker is compressed ahead of the consumer.
+        """
+        pending = deque()
+        buffer = bytearray()
+
+        def submit(frame: bytes):
+            COMPRESSION_BYTES.labels(codec=CODEC_ZSTD, direction="in").inc(len(frame))
+            pending.append(asyncio.ensure_future(self.executor.run(_compress_frame, frame, level, task="compress")))
+
+        async def completed() -> bytes:
+            compressed = await pending.popleft()
+            frame_sizes.append(len(compressed))
+            COMPRESSION_BYTES.labels(codec=CODEC_ZSTD, direction="out").inc(len(compressed))
+            return compressed
+
+        try:
+            async for chunk in chunks:
+                buffer += chunk
+                while len(buffer) >= self.frame_size:
+                    submit(bytes(buffer[:self.frame_size]))
+                    del buffer[:self.frame_size]
+                    if len(pending) >= self.executor.max_workers:
+                        yield await completed()
+
+            if buffer:
+                submit(bytes(buffer))
+
+            while pending:
+                yield await completed()
+        finally:
+            for future in pending:
+                future.cancel()
+
+    async def decompress_stream(self,
+                                pieces: AsyncIterator[bytes],
+                                compression: Dict[str, Any],
+                                start: int,
+                                end: int) -> AsyncIterator[bytes]:
+        """Decompress the frames in ``pieces`` and yield uncompressed bytes [start, end)
+
+        ``pieces`` is the compressed range returned by compressed_range.
+        """
+        frame_sizes = compression["frames"]
+        frame_index = start // compression["frame_size"]
+        position = frame_index * compression["frame_size"]
+        buffer = bytearray()
+
+        async for piece in pieces:
+            buffer += piece
+            while frame_index < len(frame_sizes) and len(buffer) >= frame_sizes[frame_index]:
+                frame = bytes(buffer[:frame_sizes[frame_index]])
+                del buffer[:frame_sizes[frame_index]]
+                frame_index += 1
+
+                data = await self.executor.run(_decompress_frame, frame, task="decompress")
+                lo = max(start - position, 0)
+                hi = min(end - position, len(data))
+                position += len(data)
+                yield data[lo:hi]
+
+                if position >= end:
+                    return
+
+
+def compression_level_for_bucket(bucket: Dict[str, Any]) -> int:
+    """Compression level of a bucket (its own setting or the default; 0 disables)"""
+    level = bucket.get("compression_level")
+    return get_settings().compression_level if level is None else level
+
+
+def create_compression_service() -> CompressionService:
+    """Create a compression service using the configured frame size and probe"""
+    settings = get_settings()
+    return CompressionService(
+        frame_size=settings.compression_frame_size,
+        min_size=settings.compression_min_size,
+        max_probe_ratio=settings.compression_max_probe_ratio
+    )
@@ -0,0 +1,185 @@
+"""
+Compute executor for CPU-bound object pipeline work
+
+Hashing, encryption and erasure coding are dispatched here instead of running
+on the event loop, so a large upload cannot starve concurrent requests.  Work
+that releases the GIL (hashlib, AES-GCM, NumPy) always runs on a thread pool;
+in "process" mode pure-Python stripe work runs on a process pool and large
+input buffers are handed over through shared memory instead of being pickled.
+"""
+
+import asyncio
+import os
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from multiprocessing import resource_tracker, shared_memory
+from typing import Any, Callable, List, Optional
+
+import structlog
+from prometheus_client import Counter, Gauge, Histogram
+
+from app.core.metrics import CUSTOM_REGISTRY
+
+logger = structlog.get_logger(__name__)
+
+COMPUTE_QUEUE_DEPTH = Gauge(
+    'intellistore_compute_queue_depth',
+    'Compute tasks submitted and not yet finished',
+    ['pool'],
+    registry=CUSTOM_REGISTRY
+)
+
+COMPUTE_QUEUE_WAIT = Histogram(
+    'intellistore_compute_queue_wait_seconds',
+    'Time compute tasks wait for a free worker',
+    ['pool'],
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0),
+    registry=CUSTOM_REGISTRY
+)
+
+COMPUTE_BUSY_SECONDS = Counter(
+    'intellistore_compute_busy_seconds_total',
+    'Worker time spent executing compute tasks',
+    ['pool', 'task'],
+    registry=CUSTOM_REGISTRY
+)
+
+COMPUTE_TASKS = Counter(
+    'intellistore_compute_tasks_total',
+    'Compute tasks executed',
+    ['pool', 'task'],
+    registry=CUSTOM_REGISTRY
+)
+
+COMPUTE_WORKERS = Gauge(
+    'intellistore_compute_workers',
+    'Configured compute workers',
+    ['pool'],
+    registry=CUSTOM_REGISTRY
+)
+
+# Buffers smaller than this are pickled rather than copied to shared memory
+SHARED_MEMORY_MIN_SIZE = 256 * 1024
+
+
+def _timed_call(func: Callable, *args) -> tuple:
+    """Run func in a worker and report when it started and how long it ran"""
+    started_at = time.time()
+    start = time.perf_counter()
+    result = func(*args)
+    return result, started_at, time.perf_counter() - start
+
+
+def _call_with_shared_buffer(func: Callable, name: str, size: int, *args):
+    """Worker side of map_buffer: attach to the shared buffer and call func"""
+    shm = shared_memory.SharedMemory(name=name)
+    view = shm.buf[:size]
+    try:
+        return func(view, *args)
+    finally:
+        view.release()
+        shm.close()
+
+
+class ComputeExecutor:
+    """Executor pools with queue-depth and busy-time metrics"""
+
+    def __init__(self, mode: str = "thread", max_workers: Optional[int] = None):
+        if mode not in ("thread", "process"):
+            raise ValueError(f"Invalid compute executor mode: {mode}")
+
+        self.mode = mode
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self._threads = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="compute")
+        self._processes = None
+        if mode == "process":
+            # Workers must share the parent's resource tracker, otherwise each
+            # one tracks the shared buffers it attaches to and unlinks them
+            resource_tracker.ensure_running()
+            self._processes = ProcessPoolExecutor(max_workers=self.max_workers)
+
+        COMPUTE_WORKERS.labels(pool="thread").set(self.max_workers)
+        COMPUTE_WORKERS.labels(pool="process").set(self.max_workers if self._processes else 0)
+
+        logger.info("Compute executor started", mode=mode, workers=self.max_workers)
+
+    async def _submit(self, executor: Executor, pool: str, task: str, func: Callable, *args) -> Any:
+        loop = asyncio.get_running_loop()
+        submitted_at = time.time()
+        COMPUTE_QUEUE_DEPTH.labels(pool=pool).inc()
+        try:
+            result, started_at, elapsed = await loop.run_in_executor(executor, _timed_call, func, *args)
+        finally:
+            COMPUTE_QUEUE_DEPTH.labels(pool=pool).dec()
+
+        COMPUTE_QUEUE_WAIT.labels(pool=pool).observe(max(started_at - submitted_at, 0.0))
+        COMPUTE_BUSY_SECONDS.labels(pool=pool, task=task).inc(elapsed)
+        COMPUTE_TASKS.labels(pool=pool, task=task).inc()
+        return result
+
+    async def run(self, func: Callable, *args, task: str = "compute") -> Any:
+        """Run GIL-releasing work (hashing, AES, NumPy) on the thread pool"""
+        return await self._submit(self._threads, "thread", task, func, *args)
+
+    async def map_buffer(self, func: Callable, buffer, args_list: List[tuple], task: str = "compute") -> List[Any]:
+        """Run func(buffer, *args) for every args tuple on the CPU pool
+
+        In process mode the buffer is copied once into shared memory and each
+        worker receives a memoryview of it; func must not keep references to
+        that view after returning.  In thread mode the buffer is passed as is.
+        """
+        if self._processes is None:
+            return await asyncio.gather(*[self.run(func, buffer, *args, task=task) for args in args_list])
+
+        size = len(buffer)
+        if size < SHARED_MEMORY_MIN_SIZE:
+            data = bytes(buffer)
+            return await asyncio.gather(*[
+                self._submit(self._processes, "process", task, func, data, *args) for args in args_list
+            ])
+
+        shm = shared_memory.SharedMemory(create=True, size=size)
+        try:
+            shm.buf[:size] = buffer
+            return await asyncio.gather(*[
+                self._submit(self._processes, "process", task, _call_with_shared_buffer, func, shm.name, size, *args)
+                for args in args_list
+            ])
+        finally:
+            shm.close()
+            shm.unlink()
+
+    def shutdown(self):
+        """Stop worker pools"""
+        self._threads.shutdown(wait=False)
+        if self._processes:
+            self._processes.shutdown(wait=False)
+        logger.info("Compute executor stopped")
+
+
+_compute_executor: Optional[ComputeExecutor] = None
+
+
+def configure_compute_executor(mode: str = "thread", max_workers: Optional[int] = None) -> ComputeExecutor:
+    """Create the process-wide compute executor (called at startup)"""
+    global _compute_executor
+    if _compute_executor is not None:
+        _compute_executor.shutdown()
+    _compute_executor = ComputeExecutor(mode=mode, max_workers=max_workers)
+    return _compute_executor
+
+
+def get_compute_executor() -> ComputeExecutor:
+    """Get the process-wide compute executor, creating a thread pool by default"""
+    global _compute_executor
+    if _compute_executor is None:
+        _compute_executor = ComputeExecutor()
+    return _compute_executor
+
+
+def shutdown_compute_executor():
+    """Stop the process-wide compute executor"""
+    global _compute_executor
+    if _compute_executor is not None:
+        _compute_executor.shutdown()
+        _compute_executor = None
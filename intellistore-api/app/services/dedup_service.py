@@ -0,0 +1,312 @@
+"""
+Content-addressed deduplication
+
+Objects in buckets created with a ``dedup_mode`` are split into fixed-size or
+content-defined chunks (see ``app.core.chunking``) and only chunks the bucket
+does not already hold are stored.
+
+Chunks are identified by an HMAC of their SHA-256 under a per-bucket secret
+kept in Vault, and encrypted with a key derived the same way (convergent
+encryption): identical chunks in a bucket get the same ID and key and are
+stored once, while chunk IDs say nothing about content in other buckets.
+
+The dedup index lives in the metadata layer as hidden records
+``__intellistore__.dedup.{chunk_id}`` holding a reference count and the
+chunk's placement (inline, packed or sharded, like any object).  Objects list
+their chunks as ``{"id", "hash", "size"}``; deleting or overwriting an object
+releases its references and a chunk is freed when its count drops to zero.
+
+The metadata API has no compare-and-swap, so reference count updates are
+serialized with per-chunk locks within this API process.
+"""
+
+import asyncio
+import base64
+import hashlib
+import hmac
+import time
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+import structlog
+from prometheus_client import Counter
+
+from app.core.chunking import content_defined_chunks, fixed_chunks
+from app.core.config import get_settings
+from app.core.metrics import CUSTOM_REGISTRY
+from app.services.storage_service import (
+    RESERVED_KEY_PREFIX,
+    StorageService,
+    all_shard_infos,
+    list_object_records,
+)
+
+logger = structlog.get_logger(__name__)
+
+DEDUP_KEY_PREFIX = f"{RESERVED_KEY_PREFIX}dedup."
+DEDUP_MODES = ("fixed", "cdc")
+
+# Name of the per-bucket dedup secret in Vault (stored like an object data key)
+DEDUP_SECRET_NAME = f"{RESERVED_KEY_PREFIX}dedup"
+
+_LOCK_STRIPES = 1024
+_chunk_locks = [asyncio.Lock() for _ in range(_LOCK_STRIPES)]
+
+DEDUP_CHUNKS = Counter(
+    'intellistore_dedup_chunks_total',
+    'Chunks written to dedup buckets',
+    ['result'],
+    registry=CUSTOM_REGISTRY
+)
+
+DEDUP_BYTES_SAVED = Counter(
+    'intellistore_dedup_bytes_saved_total',
+    'Bytes not stored because an identical chunk was already stored',
+    registry=CUSTOM_REGISTRY
+)
+
+
+def chunk_record_key(chunk_id: str) -> str:
+    return f"{DEDUP_KEY_PREFIX}{chunk_id}"
+
+
+def _chunk_lock(chunk_id: str) -> asyncio.Lock:
+    return _chunk_locks[int(chunk_id[:8], 16) % _LOCK_STRIPES]
+
+
+def derive_chunk_secrets(bucket_secret: bytes, digest: bytes) -> Tuple[str, str]:
+    """Chunk ID and base64 convergent encryption key for a chunk's SHA-256"""
+    chunk_id = hmac.new(bucket_secret, b"chunk-id" + digest, hashlib.sha256).hexdigest()
+    key = hmac.new(bucket_secret, b"chunk-key" + digest, hashlib.sha256).digest()
+    return chunk_id, base64.b64encode(key).decode()
+
+
+def split_chunks(data, mode: str, chunk_size: int) -> List[Tuple[int, int]]:
+    """Chunk boundaries of data for a dedup mode"""
+    if mode == "cdc":
+        return content_defined_chunks(data, chunk_size)
+    if mode == "fixed":
+        return fixed_chunks(len(data), chunk_size)
+    raise ValueError(f"Unknown dedup mode: {mode}")
+
+
+def _chunk_digests(data, bounds: List[Tuple[int, int]]) -> List[bytes]:
+    view = memoryview(data)
+    return [hashlib.sha256(view[start:end]).digest() for start, end in bounds]
+
+
+def dedup_ratio(logical_bytes: int, stored_bytes: int) -> Optional[float]:
+    """Logical bytes per stored byte (None when nothing was stored)"""
+    return round(logical_bytes / stored_bytes, 3) if stored_bytes else None
+
+
+class DedupService:
+    """Service for storing and reading deduplicated objects"""
+
+    def __init__(self,
+                 storage_service: StorageService,
+                 vault_service=None,
+                 chunk_size: int = 256 * 1024,
+                 concurrency: int = 8):
+        self.storage_service = storage_service
+        self.raft_service = storage_service.raft_service
+        self.vault_service = vault_service
+        self.executor = storage_service.executor
+        self.chunk_size = chunk_size
+        self.concurrency = concurrency
+
+    async def _bucket_secret(self, bucket_name: str) -> bytes:
+        key = await self.vault_service.get_data_key(bucket_name, DEDUP_SECRET_NAME)
+        return base64.b64decode(key)
+
+    async def store_object(self,
+                           bucket_name: str,
+                           data: bytes,
+                           tier: str,
+                           mode: str) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+        """Store the chunks of an object that the bucket doesn't hold yet
+
+        Returns the object's chunk list and the dedup stats of this upload.
+        Every listed chunk holds one reference for the object.
+        """
+        try:
+            bounds = await self.executor.run(split_chunks, data, mode, self.chunk_size, task="chunk")
+            digests = await self.executor.run(_chunk_digests, data, bounds, task="hash")
+            bucket_secret = await self._bucket_secret(bucket_name)
+
+            view = memoryview(data)
+            semaphore = asyncio.Semaphore(self.concurrency)
+            chunks = [None] * len(bounds)
+            created = [False] * len(bounds)
+
+            async def add_chunk(i: int):
+                start, end = bounds[i]
+                chunk_id, key = derive_chunk_secrets(bucket_secret, digests[i])
+                async with semaphore:
+                    created[i] = await self._acquire_chunk(bucket_name, tier, chunk_id, key, view[start:end])
+                chunks[i] = {"id": chunk_id, "hash": digests[i].hex(), "size": end - start}
+
+            results = await asyncio.gather(*[add_chunk(i) for i in range(len(bounds))], return_exceptions=True)
+            errors = [result for result in results if isinstance(result, Exception)]
+            if errors:
+                # Drop the references taken so far; the object is not written
+                await self.release_chunks(bucket_name, [chunk for chunk in chunks if chunk])
+                raise errors[0]
+
+            stored_bytes = sum(chunk["size"] for chunk, new in zip(chunks, created) if new)
+            stats = {
+                "mode": mode,
+                "chunks": len(chunks),
+                "new_chunks": sum(created),
+                "logical_bytes": len(data),
+                "stored_bytes": stored_bytes,
+                "bytes_saved": len(data) - stored_bytes,
+                "dedup_ratio": dedup_ratio(len(data), stored_bytes)
+            }
+            DEDUP_BYTES_SAVED.inc(stats["bytes_saved"])
+
+            logger.info("Object chunks stored", bucket=bucket_name, **stats)
+            return chunks, stats
+
+        except Exception as e:
+            logger.error("Failed to store deduplicated object",
+                        bucket=bucket_name,
+                        size=len(data),
+                        error=str(e))
+            raise
+
+    async def _acquire_chunk(self, bucket_name: str, tier: str, chunk_id: str, key: str, data) -> bool:
+        """Take a reference on a chunk, storing it if it is new; returns True if stored"""
+        record_key = chunk_record_key(chunk_id)
+        async with _chunk_lock(chunk_id):
+            record = await self.raft_service.get_object(bucket_name, record_key)
+            if record and record.get("dedup_chunk"):
+                info = dict(record["dedup_chunk"])
+                info["refcount"] += 1
+                await self.raft_service.update_object(bucket_name, record_key, {"dedup_chunk": info})
+                DEDUP_CHUNKS.labels(result="duplicate").inc()
+                return False
+
+            encrypted_data = await self.vault_service.encrypt_data(bytes(data), key)
+            placement = await self.storage_service.store_object_data(bucket_name, record_key, encrypted_data, tier)
+
+            await self.raft_service.create_object({
+                "bucket_name": bucket_name,
+                "object_key": record_key,
+                "size": len(data),
+                "tier": tier,
+                "content_type": "application/x-intellistore-chunk",
+                "checksum": "",
+                **placement,
+                "metadata": {},
+                "dedup_chunk": {
+                    "chunk_id": chunk_id,
+                    "size": len(data),
+                    "refcount": 1,
+                    "created_at": time.time()
+                }
+            })
+            DEDUP_CHUNKS.labels(result="new").inc()
+            return True
+
+    async def release_chunks(self, bucket_name: str, chunks: List[Dict[str, Any]]):
+        """Drop one reference per listed chunk, freeing chunks nothing references"""
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def release(chunk: Dict[str, Any]):
+            async with semaphore:
+                await self._release_chunk(bucket_name, chunk["id"])
+
+        await asyncio.gather(*[release(chunk) for chunk in chunks])
+
+    async def _release_chunk(self, bucket_name: str, chunk_id: str):
+        record_key = chunk_record_key(chunk_id)
+        async with _chunk_lock(chunk_id):
+            record = await self.raft_service.get_object(bucket_name, record_key)
+            if not record or not record.get("dedup_chunk"):
+                logger.warning("Released chunk not found", bucket=bucket_name, chunk_id=chunk_id)
+                return
+
+            info = dict(record["dedup_chunk"])
+            info["refcount"] -= 1
+            if info["refcount"] > 0:
+                await self.raft_service.update_object(bucket_name, record_key, {"dedup_chunk": info})
+                return
+
+            # Packed chunks are reclaimed by pack compaction once unreferenced
+            await self.storage_service.delete_shards(bucket_name, record_key, all_shard_infos(record))
+            await self.raft_service.delete_object(bucket_name, record_key)
+            logger.debug("Chunk freed", bucket=bucket_name, chunk_id=chunk_id, size=info["size"])
+
+    async def stream_range(self, object_metadata: Dict[str, Any], start: int, end: int) -> AsyncIterator[bytes]:
+        """Yield the decrypted bytes [start, end) of a deduplicated object
+
+        The next chunk is fetched while the current one is decrypted.
+        """
+        bucket_name = object_metadata["bucket_name"]
+        bucket_secret = await self._bucket_secret(bucket_name)
+
+        spans = []
+        offset = 0
+        for chunk in object_metadata["chunks"]:
+            chunk_end = offset + chunk["size"]
+            if offset < end and chunk_end > start:
+                spans.append((chunk, max(start, offset) - offset, min(end, chunk_end) - offset))
+            offset = chunk_end
+
+        async def load(chunk: Dict[str, Any]) -> bytes:
+            record_key = chunk_record_key(chunk["id"])
+            record = await self.raft_service.get_object(bucket_name, record_key)
+            if not record:
+                raise ValueError(f"Chunk {chunk['id']} of object '{object_metadata['object_key']}' is missing")
+            return await self.storage_service.load_object_data(bucket_name, record_key, record)
+
+        def fetch(chunk: Dict[str, Any]) -> asyncio.Task:
+            return asyncio.create_task(load(chunk))
+
+        pending = fetch(spans[0][0]) if spans else None
+        try:
+            for i, (chunk, chunk_start, chunk_end) in enumerate(spans):
+                encrypted_data = await pending
+                pending = fetch(spans[i + 1][0]) if i + 1 < len(spans) else None
+
+                _, key = derive_chunk_secrets(bucket_secret, bytes.fromhex(chunk["hash"]))
+                async for piece in self.vault_service.decrypt_stream(encrypted_data, key, chunk_start, chunk_end):
+                    yield piece
+        finally:
+            if pending:
+                pending.cancel()
+
+    async def bucket_stats(self, bucket_name: str) -> Dict[str, Any]:
+        """Unique chunks, logical and stored bytes of a bucket's dedup index"""
+        records = await list_object_records(self.raft_service, bucket_name, DEDUP_KEY_PREFIX)
+        infos = [record["dedup_chunk"] for record in records if record.get("dedup_chunk")]
+
+        stored_bytes = sum(info["size"] for info in infos)
+        logical_bytes = sum(info["size"] * info["refcount"] for info in infos)
+        return {
+            "unique_chunks": len(infos),
+            "references": sum(info["refcount"] for info in infos),
+            "logical_bytes": logical_bytes,
+            "stored_bytes": stored_bytes,
+            "bytes_saved": logical_bytes - stored_bytes,
+            "dedup_ratio": dedup_ratio(logical_bytes, stored_bytes)
+        }
+
+
+async def release_object_data(storage_service: StorageService, object_metadata: Dict[str, Any]):
+    """Free the storage of an object record: its shards and its chunk references"""
+    bucket_name = object_metadata["bucket_name"]
+    await storage_service.delete_shards(bucket_name, object_metadata["object_key"], all_shard_infos(object_metadata))
+    if object_metadata.get("chunks"):
+        await DedupService(storage_service).release_chunks(bucket_name, object_metadata["chunks"])
+
+
+def create_dedup_service(storage_service: StorageService, vault_service) -> DedupService:
+    """Create a dedup service using the configured chunk size"""
+    settings = get_settings()
+    return DedupService(
+        storage_service,
+        vault_service,
+        chunk_size=settings.dedup_chunk_size,
+        concurrency=settings.dedup_concurrency
+    )
@@ -0,0 +1,264 @@
+"""
+Erasure coding profiles and Reed-Solomon coding over GF(2^8)
+
+A profile (recorded as ``coding`` on every shard info) says how an object's
+data is spread over its shards:
+
+* ``rs:K+M``    - K data shards holding consecutive slices of the data and M
+  Reed-Solomon parity shards; any K of the K+M shards recover the data.
+* ``replica:N`` - N full copies; any one of them recovers the data.
+
+The code matrix is the one github.com/klauspost/reedsolomon (used by the
+storage core) builds by default - a Vandermonde matrix made systematic - so
+shards are interchangeable with the Go encoder.
+
+Shards stored before profiles were recorded have no ``coding``; their parity
+shards are copies of the XOR of the data shards (``xor:K+M``), which
+recovers at most one lost data shard.
+
+The functions working on shard bytes are module-level so they can run in
+compute worker processes.
+"""
+
+import functools
+import re
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+
+SCHEME_RS = "rs"
+SCHEME_REPLICA = "replica"
+SCHEME_XOR = "xor"
+
+_CODING_PATTERN = re.compile(r'^(?:(rs|xor):)?(\d+)\+(\d+)$|^replica:(\d+)$')
+
+
+def _build_tables():
+    """exp/log tables of GF(2^8) with the polynomial x^8+x^4+x^3+x^2+1, and the full product table"""
+    exp = np.zeros(510, dtype=np.int32)
+    log = np.zeros(256, dtype=np.int32)
+    x = 1
+    for i in range(255):
+        exp[i] = x
+        log[x] = i
+        x <<= 1
+        if x & 0x100:
+            x ^= 0x11d
+    exp[255:] = exp[:255]
+
+    mul = np.zeros((256, 256), dtype=np.uint8)
+    mul[1:, 1:] = exp[log[1:, None] + log[None, 1:]]
+    return exp, log, mul
+
+
+_EXP, _LOG, _MUL = _build_tables()
+
+
+def _gf_mul(a: int, b: int) -> int:
+    return int(_MUL[a, b])
+
+
+def _gf_inv(a: int) -> int:
+    if a == 0:
+        raise ZeroDivisionError("0 has no inverse in GF(256)")
+    return int(_EXP[255 - _LOG[a]])
+
+
+def _gf_exp(a: int, n: int) -> int:
+    if n == 0:
+        return 1
+    if a == 0:
+        return 0
+    return int(_EXP[(_LOG[a] * n) % 255])
+
+
+def _mat_mul(a: List[List[int]], b: List[List[int]]) -> List[List[int]]:
+    result = []
+    for row in a:
+        out = []
+        for c in range(len(b[0])):
+            value = 0
+            for t, coef in enumerate(row):
+                value ^= _gf_mul(coef, b[t][c])
+            out.append(value)
+        result.append(out)
+    return result
+
+
+def _invert(matrix: List[List[int]]) -> List[List[int]]:
+    """Invert a square matrix over GF(2^8) by Gauss-Jordan elimination"""
+    n = len(matrix)
+    work = [list(row) + [1 if i == j else 0 for j in range(n)] for i, row in enumerate(matrix)]
+    for col in range(n):
+        pivot = next((r for r in range(col, n) if work[r][col]), None)
+        if pivot is None:
+            raise ValueError("Matrix is singular")
+        work[col], work[pivot] = work[pivot], work[col]
+
+        scale = _gf_inv(work[col][col])
+        work[col] = [_gf_mul(scale, value) for value in work[col]]
+        for r in range(n):
+            if r != col and work[r][col]:
+                factor = work[r][col]
+                work[r] = [value ^ _gf_mul(factor, pivot_value) for value, pivot_value in zip(work[r], work[col])]
+    return [row[n:] for row in work]
+
+
+@functools.lru_cache(maxsize=64)
+def _coding_matrix(data_shards: int, parity_shards: int) -> List[List[int]]:
+    """(K+M) x K systematic encoding matrix: identity on top, parity rows below"""
+    total = data_shards + parity_shards
+    vandermonde = [[_gf_exp(r, c) for c in range(data_shards)] for r in range(total)]
+    top_inverse = _invert(vandermonde[:data_shards])
+    return _mat_mul(vandermonde, top_inverse)
+
+
+def _mul_add(coefficients: Sequence[int], rows: Sequence[np.ndarray]) -> np.ndarray:
+    """XOR-sum of coefficient x row over GF(2^8), row by row with the product table"""
+    out = np.zeros(len(rows[0]), dtype=np.uint8)
+    for coef, row in zip(coefficients, rows):
+        if coef == 1:
+            out ^= row
+        elif coef:
+            out ^= _MUL[coef][row]
+    return out
+
+
+@dataclass(frozen=True)
+class ErasureProfile:
+    """How an object's data is split into shards"""
+    scheme: str
+    data_shards: int
+    parity_shards: int
+
+    @classmethod
+    def parse(cls, coding: str) -> "ErasureProfile":
+        """Parse ``rs:K+M`` (or ``K+M``), ``replica:N`` or ``xor:K+M``"""
+        match = _CODING_PATTERN.match(coding.strip().lower())
+        if not match:
+            raise ValueError(f"Invalid erasure coding profile: {coding!r}")
+        if match.group(4):
+            copies = int(match.group(4))
+            if copies < 1:
+                raise ValueError(f"Invalid erasure coding profile: {coding!r}")
+            return cls(SCHEME_REPLICA, 1, copies - 1)
+
+        data_shards, parity_shards = int(match.group(2)), int(match.group(3))
+        if data_shards < 1 or data_shards + parity_shards > 256:
+            raise ValueError(f"Invalid erasure coding profile: {coding!r}")
+        return cls(match.group(1) or SCHEME_RS, data_shards, parity_shards)
+
+    @classmethod
+    def of_shards(cls, shards_info: List[Dict[str, Any]]) -> "ErasureProfile":
+        """The profile an object's shards were encoded with"""
+        for info in shards_info:
+            if info.get("coding"):
+                return cls.parse(info["coding"])
+
+        # Stored before profiles were recorded: parity indices start at K
+        parity = [info["index"] for info in shards_info if info.get("shard_type") == "parity"]
+        data = [info["index"] for info in shards_info if info.get("shard_type") == "data"]
+        data_shards = min(parity) if parity else max(data, default=-1) + 1
+        return cls(SCHEME_XOR, max(data_shards, 1), max(parity, default=data_shards - 1) + 1 - data_shards)
+
+    @property
+    def total_shards(self) -> int:
+        return self.data_shards + self.parity_shards
+
+    @property
+    def coding(self) -> str:
+        if self.scheme == SCHEME_REPLICA:
+            return f"{SCHEME_REPLICA}:{self.total_shards}"
+        return f"{self.scheme}:{self.data_shards}+{self.parity_shards}"
+
+    @property
+    def storage_overhead(self) -> float:
+        """Bytes stored per byte of data"""
+        return self.total_shards / self.data_shards
+
+    def shard_type(self, index: int) -> str:
+        if index < self.data_shards:
+            return "data"
+        return "replica" if self.scheme == SCHEME_REPLICA else "parity"
+
+    def __str__(self) -> str:
+        return self.coding
+
+
+def encode_parity(block: np.ndarray, coding: str) -> List[bytes]:
+    """Parity (or replica) shards for a K x n block of data shard bytes"""
+    profile = ErasureProfile.parse(coding)
+    if not profile.parity_shards:
+        return []
+    if profile.scheme == SCHEME_REPLICA:
+        return [block[0].tobytes()] * profile.parity_shards
+    if profile.scheme == SCHEME_XOR:
+        return [np.bitwise_xor.reduce(block, axis=0).tobytes()] * profile.parity_shards
+
+    matrix = _coding_matrix(profile.data_shards, profile.parity_shards)
+    return [
+        _mul_add(matrix[profile.data_shards + i], block).tobytes()
+        for i in range(profile.parity_shards)
+    ]
+
+
+def reconstruct(shards: Dict[int, bytes], coding: str, wanted: Optional[Iterable[int]] = None) -> Dict[int, bytes]:
+    """Recompute shards from the available ones
+
+    ``shards`` maps shard index to shard bytes; returns the ``wanted``
+    indices (default: every data shard).  Raises ValueError if too few
+    shards are available.
+    """
+    profile = ErasureProfile.parse(coding)
+    wanted = list(range(profile.data_shards) if wanted is None else wanted)
+    if not shards:
+        raise ValueError("No shards available")
+
+    if profile.scheme == SCHEME_REPLICA:
+        copy = next(iter(shards.values()))
+        return {index: copy for index in wanted}
+
+    k = profile.data_shards
+    data = {index: np.frombuffer(shard, dtype=np.uint8) for index, shard in shards.items() if index < k}
+    missing = [index for index in range(k) if index not in data]
+
+    if missing and profile.scheme == SCHEME_XOR:
+        parity = next((shard for index, shard in shards.items() if index >= k), None)
+        if len(missing) > 1 or parity is None:
+            raise ValueError(f"Cannot recover {len(missing)} data shards from XOR parity")
+        rows = list(data.values()) + [np.frombuffer(parity, dtype=np.uint8)]
+        data[missing[0]] = np.bitwise_xor.reduce(np.stack(rows), axis=0)
+    elif missing:
+        available = sorted(shards)[:k]
+        if len(available) < k:
+            raise ValueError(f"Insufficient shards for reconstruction: need {k}, have {len(available)}")
+        matrix = _coding_matrix(k, profile.parity_shards)
+        decode_matrix = _invert([matrix[index] for index in available])
+        rows = [np.frombuffer(shards[index], dtype=np.uint8) for index in available]
+        for index in missing:
+            data[index] = _mul_add(decode_matrix[index], rows)
+
+    result = {}
+    parity_rows = None
+    for index in wanted:
+        if index < k:
+            result[index] = shards[index] if index in shards else data[index].tobytes()
+        else:
+            if parity_rows is None:
+                parity_rows = encode_parity(np.stack([data[i] for i in range(k)]), profile.coding)
+            result[index] = parity_rows[index - k]
+    return result
+
+
+def decode(shards: Dict[int, bytes], coding: str, original_size: Optional[int] = None) -> bytes:
+    """Reassemble the data from any sufficient set of shards"""
+    profile = ErasureProfile.parse(coding)
+    data_shards = reconstruct(shards, coding)
+    joined = b"".join(data_shards[index] for index in range(profile.data_shards))
+
+    # Objects stored before sizes were recorded are zero-stripped, which is
+    # only safe for Fernet's base64 output
+    if original_size is not None:
+        return joined[:original_size]
+    return joined.rstrip(b'\x00')
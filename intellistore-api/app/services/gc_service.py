@@ -0,0 +1,327 @@
+"""
+Garbage collection of orphaned shards and data keys
+
+A shard is orphaned when no object record references it: deleting a bucket
+drops its records but not its shards, an upload that fails part way leaves
+the shards it already stored, and a failed shard delete leaves the shard
+behind.  The collector finds orphans by listing every storage node
+(``/shard/list``) and diffing against the shards referenced by the records
+(hidden ones included) of each bucket:
+
+* every shard of a bucket that no longer exists is an orphan;
+* a shard of a live bucket is an orphan if no record references it on that node.
+
+Orphans younger than the grace period are left alone, since their upload may
+not have committed its record yet.  Data keys in Vault are deleted for buckets
+that no longer exist.
+
+Deleting a bucket tombstones it with the collector of the API process that
+handled the delete, which reclaims the bucket's shards and data keys on its
+next pass without waiting for the grace period.  Tombstones are not
+persisted; whatever they miss is found by the periodic sweep.
+
+Orphans are deleted in batches through StorageService.delete_shards_by_node,
+paced to ``delete_rate`` shards per second.
+"""
+
+import asyncio
+import re
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+import structlog
+from prometheus_client import Counter, Gauge, Histogram
+
+from app.core.metrics import CUSTOM_REGISTRY
+from app.services.storage_service import all_shard_infos, create_storage_service, list_object_records
+
+logger = structlog.get_logger(__name__)
+
+GC_RECLAIMABLE_BYTES = Gauge(
+    'intellistore_gc_reclaimable_bytes',
+    'Bytes of orphaned shards found by the last sweep and not yet deleted',
+    ['state'],
+    registry=CUSTOM_REGISTRY
+)
+
+GC_SHARDS_DELETED = Counter(
+    'intellistore_gc_shards_deleted_total',
+    'Orphaned shards deleted by garbage collection',
+    ['reason'],
+    registry=CUSTOM_REGISTRY
+)
+
+GC_BYTES_DELETED = Counter(
+    'intellistore_gc_bytes_deleted_total',
+    'Bytes of orphaned shards deleted by garbage collection',
+    ['reason'],
+    registry=CUSTOM_REGISTRY
+)
+
+GC_DATA_KEYS_DELETED = Counter(
+    'intellistore_gc_data_keys_deleted_total',
+    'Vault data keys of deleted buckets removed by garbage collection',
+    registry=CUSTOM_REGISTRY
+)
+
+GC_PASS_DURATION = Histogram(
+    'intellistore_gc_pass_duration_seconds',
+    'Garbage collection pass duration',
+    ['kind'],
+    buckets=(1, 5, 15, 60, 300, 900, 3600),
+    registry=CUSTOM_REGISTRY
+)
+
+# Storage nodes listed concurrently
+_LIST_CONCURRENCY = 4
+
+# Deleted buckets waiting for reclamation, with their deletion time
+_tombstones: Dict[str, float] = {}
+_tombstone_added: Optional[asyncio.Event] = None
+
+
+def _tombstone_event() -> asyncio.Event:
+    global _tombstone_added
+    if _tombstone_added is None:
+        _tombstone_added = asyncio.Event()
+    return _tombstone_added
+
+
+def tombstone_bucket(bucket_name: str):
+    """Queue a deleted bucket for reclamation by this process's collector"""
+    _tombstones[bucket_name] = time.time()
+    _tombstone_event().set()
+
+
+def referenced_shards(record: Dict[str, Any]) -> Set[Tuple[str, str]]:
+    """``(node_addr, shard_id)`` of every shard an object record references"""
+    shards = all_shard_infos(record) + list((record.get("pack") or {}).get("shards") or [])
+    return {(shard["node_addr"], shard["shard_id"]) for shard in shards}
+
+
+def _uploaded_at(shard: Dict[str, Any]) -> Optional[float]:
+    """Upload time of a listed shard as a Unix timestamp (None if unknown)"""
+    # Go writes RFC 3339 with up to nanosecond precision; keep microseconds
+    match = re.match(r"(.+T\d\d:\d\d:\d\d)(\.\d+)?(Z|[+-]\d\d:\d\d)$", shard.get("uploadedAt") or "")
+    if not match:
+        return None
+    zone = "+00:00" if match.group(3) == "Z" else match.group(3)
+    try:
+        return datetime.fromisoformat(match.group(1) + (match.group(2) or "")[:7] + zone).timestamp()
+    except ValueError:
+        return None
+
+
+class GarbageCollector:
+    """Finds and deletes orphaned shards and data keys"""
+
+    def __init__(self,
+                 storage_service,
+                 vault_service=None,
+                 grace_period: float = 6 * 3600,
+                 delete_rate: float = 500.0,
+                 batch_size: int = 1000,
+                 dry_run: bool = False):
+        self.storage_service = storage_service
+        self.raft_service = storage_service.raft_service
+        self.vault_service = vault_service
+        self.grace_period = grace_period
+        self.delete_rate = delete_rate
+        self.batch_size = batch_size
+        self.dry_run = dry_run
+
+    async def reclaim_tombstones(self) -> Dict[str, int]:
+        """Delete the shards and data keys of tombstoned buckets"""
+        stats = {"buckets": 0, "shards_deleted": 0, "bytes_deleted": 0, "data_keys_deleted": 0}
+
+        for bucket_name, deleted_at in list(_tombstones.items()):
+            start = time.perf_counter()
+
+            # A recreated bucket is left to the sweep, which checks references
+            if not await self.raft_service.get_bucket(bucket_name):
+                shards = []
+                for node_addr, node_shards in (await self._list_nodes(bucket_name)).items():
+                    for shard in node_shards:
+                        uploaded_at = _uploaded_at(shard)
+                        if shard.get("bucketName") == bucket_name and uploaded_at is not None and uploaded_at <= deleted_at:
+                            shards.append((node_addr, shard))
+                deleted, deleted_bytes = await self._delete_shards(bucket_name, shards, "tombstone")
+                stats["shards_deleted"] += deleted
+                stats["bytes_deleted"] += deleted_bytes
+                stats["data_keys_deleted"] += await self._delete_data_keys(bucket_name)
+                stats["buckets"] += 1
+
+            if _tombstones.get(bucket_name) == deleted_at:
+                del _tombstones[bucket_name]
+            GC_PASS_DURATION.labels(kind="tombstone").observe(time.perf_counter() - start)
+
+        if stats["buckets"]:
+            logger.info("Deleted buckets reclaimed", dry_run=self.dry_run, **stats)
+        return stats
+
+    async def sweep(self) -> Dict[str, int]:
+        """Diff every node's shards against the metadata and delete old orphans"""
+        start = time.perf_counter()
+        stats = {"shards_listed": 0, "orphans": 0, "orphans_in_grace": 0,
+                 "shards_deleted": 0, "bytes_deleted": 0, "data_keys_deleted": 0}
+
+        # List shards and data keys before reading metadata, so nothing
+        # created after the metadata read is seen; uploads that stored shards
+        # before the listing but commit later are covered by the grace period
+        key_buckets = await self.vault_service.list_key_buckets() if self.vault_service else []
+        listings = await self._list_nodes()
+        live = {bucket["name"] for bucket in await self.raft_service.list_buckets() if bucket.get("name")}
+
+        by_bucket: Dict[str, List[Tuple[str, Dict[str, Any]]]] = {}
+        for node_addr, node_shards in listings.items():
+            stats["shards_listed"] += len(node_shards)
+            for shard in node_shards:
+                if shard.get("bucketName") and shard.get("shardId"):
+                    by_bucket.setdefault(shard["bucketName"], []).append((node_addr, shard))
+
+        cutoff = time.time() - self.grace_period
+        orphans: Dict[str, List[Tuple[str, Dict[str, Any]]]] = {}
+        reclaimable = {"eligible": 0, "grace": 0}
+        for bucket_name, shards in by_bucket.items():
+            referenced: Set[Tuple[str, str]] = set()
+            if bucket_name in live or await self.raft_service.get_bucket(bucket_name):
+                for record in await list_object_records(self.raft_service, bucket_name):
+                    referenced |= referenced_shards(record)
+
+            for node_addr, shard in shards:
+                if (node_addr, shard["shardId"]) in referenced:
+                    continue
+                uploaded_at = _uploaded_at(shard)
+                if uploaded_at is None or uploaded_at > cutoff:
+                    stats["orphans_in_grace"] += 1
+                    reclaimable["grace"] += shard.get("size", 0)
+                    continue
+                stats["orphans"] += 1
+                reclaimable["eligible"] += shard.get("size", 0)
+                orphans.setdefault(bucket_name, []).append((node_addr, shard))
+
+        GC_RECLAIMABLE_BYTES.labels(state="grace").set(reclaimable["grace"])
+        GC_RECLAIMABLE_BYTES.labels(state="eligible").set(reclaimable["eligible"])
+
+        for bucket_name, shards in orphans.items():
+            deleted, deleted_bytes = await self._delete_shards(bucket_name, shards, "orphan")
+            stats["shards_deleted"] += deleted
+            stats["bytes_deleted"] += deleted_bytes
+            GC_RECLAIMABLE_BYTES.labels(state="eligible").dec(deleted_bytes)
+
+        for bucket_name in key_buckets:
+            if bucket_name not in live and not await self.raft_service.get_bucket(bucket_name):
+                stats["data_keys_deleted"] += await self._delete_data_keys(bucket_name)
+
+        GC_PASS_DURATION.labels(kind="sweep").observe(time.perf_counter() - start)
+        logger.info("Garbage collection sweep completed",
+                   dry_run=self.dry_run,
+                   nodes=len(listings),
+                   duration=time.perf_counter() - start,
+                   **stats)
+        return stats
+
+    async def _list_nodes(self, bucket_name: Optional[str] = None) -> Dict[str, List[Dict[str, Any]]]:
+        """Shard listings of every storage node that could be listed"""
+        semaphore = asyncio.Semaphore(_LIST_CONCURRENCY)
+
+        async def list_node(node_addr: str):
+            async with semaphore:
+                return await self.storage_service.list_node_shards(node_addr, bucket_name)
+
+        nodes = await self.raft_service.get_storage_nodes()
+        results = await asyncio.gather(*[list_node(node_addr) for node_addr in nodes], return_exceptions=True)
+
+        listings = {}
+        for node_addr, result in zip(nodes, results):
+            if isinstance(result, Exception):
+                # Skipped until the next pass; unlisted shards are never deleted
+                logger.warning("Skipping storage node in garbage collection", node_addr=node_addr, error=str(result))
+            else:
+                listings[node_addr] = result
+        return listings
+
+    async def _delete_shards(self, bucket_name: str, shards: List[Tuple[str, Dict[str, Any]]], reason: str) -> Tuple[int, int]:
+        """Delete listed shards in rate-limited batches; returns (shards, bytes) deleted"""
+        if self.dry_run:
+            return 0, 0
+
+        deleted = deleted_bytes = 0
+        for i in range(0, len(shards), self.batch_size):
+            batch = shards[i:i + self.batch_size]
+            started = time.monotonic()
+
+            failed = await self.storage_service.delete_shards_by_node(bucket_name, [
+                (shard.get("objectKey", ""), {"node_addr": node_addr, "shard_id": shard["shardId"]})
+                for node_addr, shard in batch
+            ])
+
+            # Failures are only counted, so bytes are prorated over the batch
+            batch_bytes = sum(shard.get("size", 0) for _, shard in batch)
+            batch_deleted = len(batch) - failed
+            batch_deleted_bytes = batch_bytes * batch_deleted // len(batch)
+            deleted += batch_deleted
+            deleted_bytes += batch_deleted_bytes
+            GC_SHARDS_DELETED.labels(reason=reason).inc(batch_deleted)
+            GC_BYTES_DELETED.labels(reason=reason).inc(batch_deleted_bytes)
+
+            delay = len(batch) / self.delete_rate - (time.monotonic() - started)
+            if delay > 0:
+                await asyncio.sleep(delay)
+
+        return deleted, deleted_bytes
+
+    async def _delete_data_keys(self, bucket_name: str) -> int:
+        """Delete the data keys of a deleted bucket"""
+        if not self.vault_service or self.dry_run:
+            return 0
+
+        try:
+            count = await self.vault_service.cleanup_bucket_keys(bucket_name)
+            GC_DATA_KEYS_DELETED.inc(count)
+            return count
+        except Exception as e:
+            logger.warning("Failed to delete data keys of deleted bucket", bucket=bucket_name, error=str(e))
+            return 0
+
+
+async def periodic_garbage_collection(raft_service,
+                                      vault_service,
+                                      interval: float,
+                                      grace_period: float,
+                                      delete_rate: float,
+                                      batch_size: int,
+                                      dry_run: bool = False):
+    """Reclaim tombstoned buckets as they are deleted and sweep for orphans every interval"""
+    tombstone_added = _tombstone_event()
+    next_sweep = time.monotonic() + interval
+    while True:
+        try:
+            try:
+                await asyncio.wait_for(tombstone_added.wait(), timeout=max(next_sweep - time.monotonic(), 0))
+            except asyncio.TimeoutError:
+                pass
+            tombstone_added.clear()
+
+            storage_service = create_storage_service(raft_service)
+            try:
+                collector = GarbageCollector(
+                    storage_service,
+                    vault_service,
+                    grace_period=grace_period,
+                    delete_rate=delete_rate,
+                    batch_size=batch_size,
+                    dry_run=dry_run
+                )
+                await collector.reclaim_tombstones()
+                if time.monotonic() >= next_sweep:
+                    next_sweep = time.monotonic() + interval
+                    await collector.sweep()
+            finally:
+                await storage_service.close()
+
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error("Error collecting garbage", error=str(e))
@@ -0,0 +1,253 @@
+"""
+Priority scheduling of tier migrations
+
+The ML service asks for a promotion every time it scores an access above its
+threshold, so a popular object is requested over and over, and a burst of
+low-value requests used to delay the few that matter.  The scheduler keeps
+pending requests (one per caller-chosen key, e.g. per object) in a heap
+ordered by the expected saving per unit of migration work:
+
+    saving   = confidence x access rate x (request overhead + size / read bandwidth)
+    cost     = move overhead + size / move bandwidth
+    priority = saving / cost
+
+i.e. the read time a promotion is expected to save per second, per second of
+transfer it takes, so frequently read objects go first and, among those, the
+ones that are cheap to move.  Demotions are ranked by the transfer time they
+free per second of work, discounted by how often the object is still read.
+
+Repeated requests refresh the pending entry (latest confidence, new request
+time) instead of queueing again.  Requests the ML service has not repeated
+for ``max_age`` seconds are dropped, and at most ``window_limit`` migrations
+are released per ``window`` seconds.
+
+Access rates come from an AccessTracker fed by the download path
+(``record_access``).
+"""
+
+import heapq
+import itertools
+import math
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Callable, Deque, Dict, Hashable, List, Optional, Tuple
+
+# Cost model defaults: extra latency of a read from a slower tier, and the
+# cost of moving an object (one migration round trip plus the transfer)
+READ_OVERHEAD = 0.01
+READ_BANDWIDTH = 100 * 1024 * 1024
+MOVE_OVERHEAD = 0.05
+MOVE_BANDWIDTH = 50 * 1024 * 1024
+
+PROMOTION_TIERS = ("hot",)
+
+
+class AccessTracker:
+    """Exponentially decayed per-object access rates (accesses/s)"""
+
+    def __init__(self,
+                 half_life: float = 3600,
+                 max_objects: int = 100000,
+                 clock: Callable[[], float] = time.time):
+        self.tau = half_life / math.log(2)
+        self.max_objects = max_objects
+        self.clock = clock
+        # (bucket, key) -> (decayed count, time of last update), least recently accessed first
+        self.counts: Dict[Tuple[str, str], Tuple[float, float]] = {}
+
+    def record(self, bucket_name: str, object_key: str, now: Optional[float] = None):
+        now = self.clock() if now is None else now
+        key = (bucket_name, object_key)
+        count, updated = self.counts.pop(key, (0.0, now))
+        self.counts[key] = (count * math.exp(-(now - updated) / self.tau) + 1, now)
+        if len(self.counts) > self.max_objects:
+            del self.counts[next(iter(self.counts))]
+
+    def rate(self, bucket_name: str, object_key: str, now: Optional[float] = None) -> float:
+        """Current access rate; objects never seen count as one access per time constant"""
+        now = self.clock() if now is None else now
+        count, updated = self.counts.get((bucket_name, object_key), (0.0, now))
+        return (count * math.exp(-(now - updated) / self.tau) + 1) / self.tau
+
+
+_access_tracker: Optional[AccessTracker] = None
+
+
+def configure_access_tracker(half_life: float) -> AccessTracker:
+    """Create the process-wide access tracker (called at startup)"""
+    global _access_tracker
+    _access_tracker = AccessTracker(half_life=half_life)
+    return _access_tracker
+
+
+def get_access_tracker() -> AccessTracker:
+    """Get the process-wide access tracker, creating one with defaults if needed"""
+    global _access_tracker
+    if _access_tracker is None:
+        _access_tracker = AccessTracker()
+    return _access_tracker
+
+
+def record_access(bucket_name: str, object_key: str):
+    """Count a read of an object towards its migration priority"""
+    get_access_tracker().record(bucket_name, object_key)
+
+
+@dataclass
+class PendingMigration:
+    item: Any
+    bucket_name: str
+    object_key: str
+    to_tier: str
+    size: int
+    confidence: float
+    priority: float
+    requested_at: float
+    requests: int = 1
+    seq: int = 0
+
+
+class MigrationScheduler:
+    """Deduplicating priority queue of migrations with a release cap per time window
+
+    Not thread-safe; ``clock`` is injectable so the scheduler can be driven
+    in simulated time.
+    """
+
+    def __init__(self,
+                 max_pending: int = 10000,
+                 max_age: float = 900,
+                 window: float = 60,
+                 window_limit: int = 0,
+                 tracker: Optional[AccessTracker] = None,
+                 read_overhead: float = READ_OVERHEAD,
+                 read_bandwidth: float = READ_BANDWIDTH,
+                 move_overhead: float = MOVE_OVERHEAD,
+                 move_bandwidth: float = MOVE_BANDWIDTH,
+                 on_drop: Optional[Callable[[Any], None]] = None,
+                 clock: Callable[[], float] = time.time):
+        self.max_pending = max_pending
+        self.max_age = max_age
+        self.window = window
+        self.window_limit = window_limit
+        self.tracker = tracker or get_access_tracker()
+        self.read_overhead = read_overhead
+        self.read_bandwidth = read_bandwidth
+        self.move_overhead = move_overhead
+        self.move_bandwidth = move_bandwidth
+        self.on_drop = on_drop
+        self.clock = clock
+        self.pending: Dict[Hashable, PendingMigration] = {}
+        self.heap: List[Tuple[float, int, Hashable]] = []
+        self.released: Deque[float] = deque()
+        self.seq = itertools.count()
+        self.stats = {"requests": 0, "merged": 0, "dropped": 0, "released": 0}
+
+    def __len__(self) -> int:
+        return len(self.pending)
+
+    def full(self) -> bool:
+        return len(self.pending) >= self.max_pending
+
+    def priority(self, bucket_name: str, object_key: str, to_tier: str, size: int, confidence: float) -> float:
+        """Expected saving per unit of migration work (see module docstring)"""
+        rate = self.tracker.rate(bucket_name, object_key, self.clock())
+        read_time = self.read_overhead + size / self.read_bandwidth
+        cost = self.move_overhead + size / self.move_bandwidth
+        if to_tier in PROMOTION_TIERS:
+            return confidence * rate * read_time / cost
+        return confidence * (size / self.move_bandwidth) / cost / (1 + rate * self.tracker.tau)
+
+    def push(self,
+             key: Hashable,
+             item: Any,
+             bucket_name: str,
+             object_key: str,
+             to_tier: str,
+             size: int,
+             confidence: float) -> PendingMigration:
+        """Queue a migration, or refresh the pending one with the same key
+
+        Returns the pending entry, whose ``item`` is the one first queued.
+        The caller must check ``full()`` before pushing a new key.
+        """
+        now = self.clock()
+        self.stats["requests"] += 1
+        entry = self.pending.get(key)
+        if entry:
+            self.stats["merged"] += 1
+            entry.requests += 1
+        else:
+            entry = PendingMigration(item, bucket_name, object_key, to_tier, size, confidence, 0.0, now)
+            self.pending[key] = entry
+
+        entry.to_tier = to_tier
+        entry.size = size
+        entry.confidence = confidence
+        entry.requested_at = now
+        entry.priority = self.priority(bucket_name, object_key, to_tier, size, confidence)
+        entry.seq = next(self.seq)
+        heapq.heappush(self.heap, (-entry.priority, entry.seq, key))
+
+        # Refreshed entries leave their old heap items behind; rebuild once
+        # they dominate the heap
+        if len(self.heap) > 4 * max(len(self.pending), 256):
+            self.heap = [(-pending.priority, pending.seq, pending_key)
+                         for pending_key, pending in self.pending.items()]
+            heapq.heapify(self.heap)
+        return entry
+
+    def discard(self, key: Hashable) -> Optional[PendingMigration]:
+        """Remove a pending migration without releasing it"""
+        return self.pending.pop(key, None)
+
+    def expire(self) -> int:
+        """Drop every pending migration older than ``max_age``"""
+        cutoff = self.clock() - self.max_age
+        stale = [key for key, entry in self.pending.items() if entry.requested_at < cutoff]
+        for key in stale:
+            self._drop(key)
+        return len(stale)
+
+    def ready_in(self) -> Optional[float]:
+        """Seconds until ``pop`` may release a migration (None if nothing is pending)"""
+        if not self.pending:
+            return None
+        if not self.window_limit:
+            return 0.0
+        now = self.clock()
+        while self.released and self.released[0] <= now - self.window:
+            self.released.popleft()
+        if len(self.released) < self.window_limit:
+            return 0.0
+        return self.released[0] + self.window - now
+
+    def pop(self) -> Optional[PendingMigration]:
+        """Release the highest-priority pending migration, if the window allows one"""
+        if self.ready_in() != 0.0:
+            return None
+
+        now = self.clock()
+        while self.heap:
+            _, seq, key = heapq.heappop(self.heap)
+            entry = self.pending.get(key)
+            if not entry or entry.seq != seq:
+                continue
+            if entry.requested_at < now - self.max_age:
+                self._drop(key)
+                continue
+
+            del self.pending[key]
+            if self.window_limit:
+                self.released.append(now)
+            self.stats["released"] += 1
+            return entry
+
+        return None
+
+    def _drop(self, key: Hashable):
+        entry = self.pending.pop(key)
+        self.stats["dropped"] += 1
+        if self.on_drop:
+            self.on_drop(entry.item)
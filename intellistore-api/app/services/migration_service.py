@@ -0,0 +1,285 @@
+"""
+Migration executor for moving objects between storage tiers
+
+/migrate requests are queued as jobs and executed in the background by a
+fixed number of workers, so a burst of ML-driven tier changes neither ties
+up API requests nor saturates the storage network:
+
+* queued jobs are released by a MigrationScheduler, highest expected benefit
+  first and at most ``window_limit`` per ``window`` seconds;
+* at most ``concurrency`` objects are migrated at once (and one at a time
+  per object);
+* every shard transfer takes tokens from the source and target nodes'
+  bandwidth buckets and from the target tier's bucket.
+
+Jobs are kept in memory with their progress for ``job_ttl`` seconds after
+they finish and can be polled by ID.  A request for an object that already
+has a queued or running job to the same tier returns that job (refreshing
+its priority if it is still queued), a request to another tier supersedes
+the queued one, and queued jobs that are not requested again within
+``max_age`` seconds expire.
+"""
+
+import asyncio
+import time
+import uuid
+import zlib
+from typing import Any, Dict, List, Optional, Tuple
+
+import structlog
+from prometheus_client import Counter, Gauge, Histogram
+
+from app.core.metrics import CUSTOM_REGISTRY
+from app.core.rate_limit import TokenBucketGroup
+from app.services.migration_scheduler import MOVE_BANDWIDTH, MigrationScheduler
+from app.services.storage_service import create_storage_service
+
+logger = structlog.get_logger(__name__)
+
+MIGRATION_JOBS = Counter(
+    'intellistore_migration_jobs_total',
+    'Migration jobs finished, by outcome',
+    ['status'],
+    registry=CUSTOM_REGISTRY
+)
+
+MIGRATION_JOBS_ACTIVE = Gauge(
+    'intellistore_migration_jobs_active',
+    'Migration jobs queued or running',
+    ['state'],
+    registry=CUSTOM_REGISTRY
+)
+
+MIGRATION_DURATION = Histogram(
+    'intellistore_migration_duration_seconds',
+    'Time to migrate one object, excluding queueing',
+    buckets=(0.1, 0.5, 1, 5, 15, 60, 300, 1800),
+    registry=CUSTOM_REGISTRY
+)
+
+# Migrations of the same object are serialized on one of these locks
+_object_locks = [asyncio.Lock() for _ in range(256)]
+
+
+def _object_lock(bucket_name: str, object_key: str) -> asyncio.Lock:
+    return _object_locks[zlib.crc32(f"{bucket_name}/{object_key}".encode()) % len(_object_locks)]
+
+
+class MigrationQueueFull(Exception):
+    """Raised when the migration queue cannot take more jobs"""
+
+
+class MigrationExecutor:
+    """Bounded, rate-limited executor for object tier migrations"""
+
+    def __init__(self,
+                 raft_service,
+                 kafka_service=None,
+                 concurrency: int = 4,
+                 queue_size: int = 10000,
+                 node_bandwidth: float = 0,
+                 tier_bandwidth: float = 0,
+                 tier_bandwidth_overrides: Optional[Dict[str, float]] = None,
+                 job_ttl: float = 3600,
+                 max_age: float = 900,
+                 window: float = 60,
+                 window_limit: int = 0):
+        self.raft_service = raft_service
+        self.kafka_service = kafka_service
+        self.concurrency = concurrency
+        self.scheduler = MigrationScheduler(
+            max_pending=queue_size,
+            max_age=max_age,
+            window=window,
+            window_limit=window_limit,
+            move_bandwidth=node_bandwidth or MOVE_BANDWIDTH,
+            on_drop=lambda job_id: self._cancel(job_id, "expired")
+        )
+        self._wakeup = asyncio.Event()
+        self.node_bandwidth = TokenBucketGroup(node_bandwidth)
+        self.tier_bandwidth = TokenBucketGroup(tier_bandwidth, rates=tier_bandwidth_overrides)
+        self.job_ttl = job_ttl
+        self.jobs: Dict[str, Dict[str, Any]] = {}
+        self._active: Dict[Tuple[str, str, str], str] = {}
+        self._workers: List[asyncio.Task] = []
+
+    def start(self):
+        """Start the worker tasks"""
+        self._workers = [asyncio.create_task(self._worker()) for _ in range(self.concurrency)]
+        logger.info("Migration executor started", concurrency=self.concurrency)
+
+    async def stop(self):
+        """Stop the workers; queued and running jobs are abandoned"""
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    def submit(self,
+               bucket_name: str,
+               object_key: str,
+               to_tier: str,
+               metadata: Optional[Dict[str, Any]] = None,
+               size: int = 0,
+               confidence: float = 1.0) -> Dict[str, Any]:
+        """Queue a migration and return its job (or the active job for the same move)"""
+        self._prune_jobs()
+
+        active_key = (bucket_name, object_key, to_tier)
+        if active_key in self._active:
+            job = self.jobs[self._active[active_key]]
+            if job["status"] == "queued":
+                self.scheduler.push((bucket_name, object_key), job["job_id"],
+                                    bucket_name, object_key, to_tier, size, confidence)
+                job["metadata"] = metadata or {}
+            return job
+
+        # A queued move of the object to another tier is superseded
+        queued = self.scheduler.discard((bucket_name, object_key))
+        if queued:
+            self._cancel(queued.item, "superseded")
+
+        if self.scheduler.full() and not self.scheduler.expire():
+            raise MigrationQueueFull(f"Migration queue is full ({self.scheduler.max_pending} jobs)")
+
+        job = {
+            "job_id": uuid.uuid4().hex,
+            "bucket_name": bucket_name,
+            "object_key": object_key,
+            "from_tier": None,
+            "to_tier": to_tier,
+            "status": "queued",
+            "bytes_total": None,
+            "bytes_moved": 0,
+            "shards_moved": 0,
+            "error": None,
+            "metadata": metadata or {},
+            "created_at": time.time(),
+            "started_at": None,
+            "finished_at": None
+        }
+        self.jobs[job["job_id"]] = job
+        self._active[active_key] = job["job_id"]
+        self.scheduler.push((bucket_name, object_key), job["job_id"],
+                            bucket_name, object_key, to_tier, size, confidence)
+        self._wakeup.set()
+        self._update_gauges()
+        return job
+
+    def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        return self.jobs.get(job_id)
+
+    async def _next_job(self) -> str:
+        """Wait until the scheduler releases a job"""
+        while True:
+            pending = self.scheduler.pop()
+            if pending:
+                return pending.item
+
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.scheduler.ready_in())
+            except asyncio.TimeoutError:
+                pass
+
+    async def _worker(self):
+        while True:
+            job_id = await self._next_job()
+            try:
+                await self._run(self.jobs[job_id])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error("Unexpected migration worker error", job_id=job_id, error=str(e))
+
+    def _cancel(self, job_id: str, status: str):
+        """Finish a queued job without running it"""
+        job = self.jobs[job_id]
+        job["status"] = status
+        job["finished_at"] = time.time()
+        self._active.pop((job["bucket_name"], job["object_key"], job["to_tier"]), None)
+        MIGRATION_JOBS.labels(status=status).inc()
+        self._update_gauges()
+
+    async def _run(self, job: Dict[str, Any]):
+        bucket_name = job["bucket_name"]
+        object_key = job["object_key"]
+        to_tier = job["to_tier"]
+
+        async with _object_lock(bucket_name, object_key):
+            job["status"] = "running"
+            job["started_at"] = time.time()
+            self._update_gauges()
+
+            def progress(bytes_moved: int, bytes_total: int):
+                job["bytes_moved"] = bytes_moved
+                job["bytes_total"] = bytes_total
+
+            async def throttle(nodes: List[str], nbytes: int):
+                await asyncio.gather(
+                    self.node_bandwidth.acquire(nodes, nbytes),
+                    self.tier_bandwidth.acquire([to_tier], nbytes)
+                )
+
+            storage_service = create_storage_service(self.raft_service)
+            storage_service.transfer_throttle = throttle
+            try:
+                result = await storage_service.migrate_object(bucket_name, object_key, to_tier, progress)
+                job["from_tier"] = result["from_tier"]
+                job["shards_moved"] = result["shards_moved"]
+                job["status"] = "skipped" if not result["shards_moved"] and result["from_tier"] == to_tier else "completed"
+            except Exception as e:
+                job["status"] = "failed"
+                job["error"] = str(e)
+                logger.error("Migration failed",
+                            job_id=job["job_id"],
+                            bucket=bucket_name,
+                            object=object_key,
+                            to_tier=to_tier,
+                            error=str(e))
+            finally:
+                await storage_service.close()
+                job["finished_at"] = time.time()
+                self._active.pop((bucket_name, object_key, to_tier), None)
+                self._update_gauges()
+
+        MIGRATION_JOBS.labels(status=job["status"]).inc()
+        MIGRATION_DURATION.observe(job["finished_at"] - job["started_at"])
+
+        if job["status"] == "completed":
+            logger.info("Object migrated successfully",
+                       job_id=job["job_id"],
+                       bucket=bucket_name,
+                       object=object_key,
+                       from_tier=job["from_tier"],
+                       to_tier=to_tier,
+                       bytes_moved=job["bytes_moved"])
+
+        if self.kafka_service and job["status"] != "skipped":
+            await self.kafka_service.publish_access_log({
+                "timestamp": time.time(),
+                "user_id": job["metadata"].get("user_id"),
+                "action": "migrate_object",
+                "bucket": bucket_name,
+                "object": object_key,
+                "from_tier": job["from_tier"],
+                "to_tier": to_tier,
+                "confidence": job["metadata"].get("confidence"),
+                "model_version": job["metadata"].get("model_version"),
+                "job_id": job["job_id"],
+                "shards_moved": job["shards_moved"],
+                "bytes_moved": job["bytes_moved"],
+                "success": job["status"] == "completed"
+            })
+
+    def _prune_jobs(self):
+        """Forget jobs that finished more than ``job_ttl`` seconds ago"""
+        cutoff = time.time() - self.job_ttl
+        for job_id in [job_id for job_id, job in self.jobs.items()
+                       if job["finished_at"] and job["finished_at"] < cutoff]:
+            del self.jobs[job_id]
+
+    def _update_gauges(self):
+        running = sum(1 for job_id in self._active.values() if self.jobs[job_id]["status"] == "running")
+        MIGRATION_JOBS_ACTIVE.labels(state="running").set(running)
+        MIGRATION_JOBS_ACTIVE.labels(state="queued").set(len(self._active) - running)
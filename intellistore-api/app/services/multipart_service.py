@@ -0,0 +1,351 @@
+"""
+Multipart upload service
+
+Large objects are uploaded as independently encrypted and erasure coded parts.
+In-progress uploads are tracked as hidden object records in the Raft metadata
+store (under ``RESERVED_KEY_PREFIX``) so they survive API restarts and can be
+resumed from any API instance::
+
+    __intellistore__.multipart.{upload_id}                 upload record
+    __intellistore__.multipart.{upload_id}.part.{nnnnn}    part record
+
+Completing an upload writes the object with a ``parts`` manifest and removes
+the records; the part shards become the object's shards.  Uploads that are
+neither completed nor aborted are garbage collected after a TTL.
+"""
+
+import asyncio
+import hashlib
+import time
+import uuid
+from typing import Any, Dict, List, Optional
+
+import structlog
+
+from app.core.segmented_aead import FORMAT_NAME as ENCRYPTION_FORMAT
+from app.services.dedup_service import release_object_data
+from app.services.storage_service import (
+    RESERVED_KEY_PREFIX,
+    StorageService,
+    create_storage_service,
+    list_object_records,
+)
+
+logger = structlog.get_logger(__name__)
+
+MULTIPART_KEY_PREFIX = f"{RESERVED_KEY_PREFIX}multipart."
+MAX_PARTS = 10000
+
+
+def upload_record_key(upload_id: str) -> str:
+    return f"{MULTIPART_KEY_PREFIX}{upload_id}"
+
+
+def part_record_key(upload_id: str, part_number: int) -> str:
+    return f"{upload_record_key(upload_id)}.part.{part_number:05d}"
+
+
+def composite_checksum(part_checksums: List[str]) -> str:
+    """Checksum of a multipart object: sha256 over the part digests plus part count"""
+    digest = hashlib.sha256(b"".join(bytes.fromhex(checksum) for checksum in part_checksums))
+    return f"{digest.hexdigest()}-{len(part_checksums)}"
+
+
+class MultipartService:
+    """Service for multipart upload bookkeeping"""
+
+    def __init__(self, raft_service, storage_service: StorageService):
+        self.raft_service = raft_service
+        self.storage_service = storage_service
+
+    async def initiate_upload(self,
+                              bucket_name: str,
+                              object_key: str,
+                              tier: str,
+                              content_type: str,
+                              metadata: Dict[str, str],
+                              owner: str,
+                              encryption_key: str) -> Dict[str, Any]:
+        """Start a multipart upload and persist its record"""
+        try:
+            upload = {
+                "upload_id": uuid.uuid4().hex,
+                "bucket_name": bucket_name,
+                "object_key": object_key,
+                "tier": tier,
+                "content_type": content_type,
+                "metadata": metadata,
+                "owner": owner,
+                "encryption_key": encryption_key,
+                "initiated_at": time.time()
+            }
+
+            await self.raft_service.create_object({
+                "bucket_name": bucket_name,
+                "object_key": upload_record_key(upload["upload_id"]),
+                "size": 0,
+                "tier": tier,
+                "content_type": "application/x-intellistore-multipart",
+                "checksum": "",
+                "shards": [],
+                "metadata": {},
+                "owner": owner,
+                "multipart_upload": upload
+            })
+
+            logger.info("Multipart upload initiated",
+                       bucket=bucket_name,
+                       object=object_key,
+                       upload_id=upload["upload_id"])
+
+            return upload
+
+        except Exception as e:
+            logger.error("Failed to initiate multipart upload",
+                        bucket=bucket_name,
+                        object=object_key,
+                        error=str(e))
+            raise
+
+    async def get_upload(self, bucket_name: str, upload_id: str) -> Optional[Dict[str, Any]]:
+        """Get an in-progress upload, or None if it does not exist"""
+        record = await self.raft_service.get_object(bucket_name, upload_record_key(upload_id))
+        if not record:
+            return None
+        return record.get("multipart_upload")
+
+    async def list_parts(self, bucket_name: str, upload_id: str) -> List[Dict[str, Any]]:
+        """Uploaded parts of an upload, ordered by part number"""
+        records = await list_object_records(self.raft_service, bucket_name, f"{upload_record_key(upload_id)}.part.")
+        parts = [record["multipart_part"] for record in records if record.get("multipart_part")]
+        return sorted(parts, key=lambda part: part["part_number"])
+
+    async def store_part(self,
+                         upload: Dict[str, Any],
+                         part_number: int,
+                         encrypted_data: bytes,
+                         size: int,
+                         checksum: str) -> Dict[str, Any]:
+        """Erasure code and store one encrypted part, replacing any earlier attempt"""
+        bucket_name = upload["bucket_name"]
+        object_key = upload["object_key"]
+        upload_id = upload["upload_id"]
+        record_key = part_record_key(upload_id, part_number)
+
+        try:
+            previous = await self.raft_service.get_object(bucket_name, record_key)
+
+            # Each attempt gets its own shard IDs so a retried part never
+            # overwrites shards that a concurrent or earlier attempt recorded
+            attempt = uuid.uuid4().hex[:8]
+            shards_info = await self.storage_service.encode_and_store_shards(
+                bucket_name=bucket_name,
+                object_key=object_key,
+                data=encrypted_data,
+                tier=upload["tier"],
+                shard_prefix=f"{bucket_name}-{object_key}-{upload_id}-{part_number}-{attempt}"
+            )
+
+            part = {
+                "upload_id": upload_id,
+                "part_number": part_number,
+                "size": size,
+                "checksum": checksum,
+                "shards": shards_info,
+                "uploaded_at": time.time()
+            }
+
+            await self.raft_service.create_object({
+                "bucket_name": bucket_name,
+                "object_key": record_key,
+                "size": size,
+                "tier": upload["tier"],
+                "content_type": "application/x-intellistore-multipart-part",
+                "checksum": checksum,
+                "shards": shards_info,
+                "metadata": {},
+                "owner": upload["owner"],
+                "multipart_part": part
+            })
+
+            if previous and previous.get("multipart_part"):
+                await self.storage_service.delete_shards(
+                    bucket_name, object_key, previous["multipart_part"].get("shards", [])
+                )
+
+            logger.info("Multipart part stored",
+                       bucket=bucket_name,
+                       object=object_key,
+                       upload_id=upload_id,
+                       part_number=part_number,
+                       size=size)
+
+            return part
+
+        except Exception as e:
+            logger.error("Failed to store multipart part",
+                        bucket=bucket_name,
+                        object=object_key,
+                        upload_id=upload_id,
+                        part_number=part_number,
+                        error=str(e))
+            raise
+
+    async def complete_upload(self,
+                              upload: Dict[str, Any],
+                              parts: List[Dict[str, Any]],
+                              unused_parts: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Write the object with its part manifest and drop the upload records
+
+        ``parts`` are the validated parts in object order; shards of
+        ``unused_parts`` (uploaded but not listed by the client) are deleted.
+        """
+        bucket_name = upload["bucket_name"]
+        object_key = upload["object_key"]
+        upload_id = upload["upload_id"]
+
+        try:
+            previous = await self.raft_service.get_object(bucket_name, object_key)
+
+            object_data = {
+                "bucket_name": bucket_name,
+                "object_key": object_key,
+                "size": sum(part["size"] for part in parts),
+                "tier": upload["tier"],
+                "content_type": upload["content_type"],
+                "checksum": composite_checksum([part["checksum"] for part in parts]),
+                "encryption_key": upload["encryption_key"],
+                "encryption": ENCRYPTION_FORMAT,
+                "shards": [],
+                "parts": [
+                    {
+                        "part_number": part["part_number"],
+                        "size": part["size"],
+                        "checksum": part["checksum"],
+                        "shards": part["shards"]
+                    }
+                    for part in parts
+                ],
+                "upload_id": upload_id,
+                "metadata": upload["metadata"],
+                "owner": upload["owner"]
+            }
+
+            await self.raft_service.create_object(object_data)
+
+            # The object now owns the part shards; only the records go away
+            await self._delete_records(bucket_name, upload_id, parts + unused_parts)
+
+            for part in unused_parts:
+                await self.storage_service.delete_shards(bucket_name, object_key, part.get("shards", []))
+
+            if previous and previous.get("upload_id") != upload_id:
+                await release_object_data(self.storage_service, previous)
+
+            logger.info("Multipart upload completed",
+                       bucket=bucket_name,
+                       object=object_key,
+                       upload_id=upload_id,
+                       parts=len(parts),
+                       size=object_data["size"])
+
+            return object_data
+
+        except Exception as e:
+            logger.error("Failed to complete multipart upload",
+                        bucket=bucket_name,
+                        object=object_key,
+                        upload_id=upload_id,
+                        error=str(e))
+            raise
+
+    async def abort_upload(self, upload: Dict[str, Any]):
+        """Delete all parts of an upload and its records"""
+        bucket_name = upload["bucket_name"]
+        object_key = upload["object_key"]
+        upload_id = upload["upload_id"]
+
+        try:
+            parts = await self.list_parts(bucket_name, upload_id)
+
+            for part in parts:
+                await self.storage_service.delete_shards(bucket_name, object_key, part.get("shards", []))
+
+            await self._delete_records(bucket_name, upload_id, parts)
+
+            logger.info("Multipart upload aborted",
+                       bucket=bucket_name,
+                       object=object_key,
+                       upload_id=upload_id,
+                       parts=len(parts))
+
+        except Exception as e:
+            logger.error("Failed to abort multipart upload",
+                        bucket=bucket_name,
+                        object=object_key,
+                        upload_id=upload_id,
+                        error=str(e))
+            raise
+
+    async def _delete_records(self, bucket_name: str, upload_id: str, parts: List[Dict[str, Any]]):
+        """Delete part records, then the upload record"""
+        await asyncio.gather(*[
+            self.raft_service.delete_object(bucket_name, part_record_key(upload_id, part["part_number"]))
+            for part in parts
+        ])
+        await self.raft_service.delete_object(bucket_name, upload_record_key(upload_id))
+
+    async def cleanup_expired_uploads(self, max_age: float) -> int:
+        """Abort uploads initiated more than ``max_age`` seconds ago"""
+        cutoff = time.time() - max_age
+        cleaned = 0
+
+        for bucket in await self.raft_service.list_buckets():
+            bucket_name = bucket.get("name")
+            if not bucket_name:
+                continue
+
+            records = await list_object_records(self.raft_service, bucket_name, MULTIPART_KEY_PREFIX)
+            for record in records:
+                upload = record.get("multipart_upload")
+                if not upload or upload.get("initiated_at", 0) > cutoff:
+                    continue
+
+                try:
+                    # An upload whose object was written but whose records were
+                    # not removed (interrupted completion) must keep its shards
+                    current = await self.raft_service.get_object(bucket_name, upload["object_key"])
+                    if current and current.get("upload_id") == upload["upload_id"]:
+                        parts = await self.list_parts(bucket_name, upload["upload_id"])
+                        await self._delete_records(bucket_name, upload["upload_id"], parts)
+                    else:
+                        await self.abort_upload(upload)
+                    cleaned += 1
+                except Exception as e:
+                    logger.warning("Failed to clean up multipart upload",
+                                  bucket=bucket_name,
+                                  upload_id=upload.get("upload_id"),
+                                  error=str(e))
+
+        if cleaned:
+            logger.info("Expired multipart uploads cleaned up", count=cleaned)
+
+        return cleaned
+
+
+async def periodic_multipart_cleanup(raft_service, interval: float, max_age: float):
+    """Garbage collect abandoned multipart uploads"""
+    while True:
+        try:
+            await asyncio.sleep(interval)
+
+            storage_service = create_storage_service(raft_service)
+            try:
+                await MultipartService(raft_service, storage_service).cleanup_expired_uploads(max_age)
+            finally:
+                await storage_service.close()
+
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error("Error cleaning up multipart uploads", error=str(e))
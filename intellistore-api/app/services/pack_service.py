@@ -0,0 +1,320 @@
+"""
+Pack segments for small objects
+
+Small objects are appended to a shared, log-structured pack segment per
+(bucket, tier) that is erasure coded and stored as a single unit, so a 2 KB
+object costs a share of nine shard writes instead of nine of its own.  Appends
+are group committed: a segment is sealed when it reaches the segment size or
+after a short linger, and every upload waits until its segment is durable.
+
+Each sealed segment has a hidden record ``__intellistore__.pack.{pack_id}``;
+objects reference their entry with ``{"pack_id", "offset", "length", "shards"}``.
+Deleting an object only drops its record.  Compaction finds the live entries
+of each segment from the object records, deletes empty segments and rewrites
+sparse ones.
+"""
+
+import asyncio
+import time
+import uuid
+from typing import Any, Dict, List, Optional, Tuple
+
+import structlog
+from prometheus_client import Counter, Histogram
+
+from app.core.metrics import CUSTOM_REGISTRY
+from app.services.storage_service import (
+    PACK_KEY_PREFIX,
+    create_storage_service,
+    list_object_records,
+    pack_record_key,
+)
+
+logger = structlog.get_logger(__name__)
+
+PACK_SEGMENTS_WRITTEN = Counter(
+    'intellistore_pack_segments_written_total',
+    'Pack segments sealed and stored',
+    ['reason'],
+    registry=CUSTOM_REGISTRY
+)
+
+PACK_SEGMENT_ENTRIES = Histogram(
+    'intellistore_pack_segment_entries',
+    'Objects per sealed pack segment',
+    buckets=(1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500),
+    registry=CUSTOM_REGISTRY
+)
+
+PACK_BYTES_RECLAIMED = Counter(
+    'intellistore_pack_bytes_reclaimed_total',
+    'Bytes of deleted pack entries reclaimed by compaction',
+    registry=CUSTOM_REGISTRY
+)
+
+
+class _OpenSegment:
+    """A pack segment still accepting appends"""
+
+    def __init__(self, storage_service, bucket_name: str, tier: str):
+        self.pack_id = uuid.uuid4().hex
+        self.storage_service = storage_service
+        self.bucket_name = bucket_name
+        self.tier = tier
+        self.buffer = bytearray()
+        self.entries: List[Dict[str, Any]] = []
+        self.done = asyncio.get_running_loop().create_future()
+        # Waiters may all be cancelled; don't warn about an unretrieved error
+        self.done.add_done_callback(lambda future: future.cancelled() or future.exception())
+        self.timer: Optional[asyncio.TimerHandle] = None
+
+
+async def write_pack_segment(storage_service,
+                             bucket_name: str,
+                             tier: str,
+                             pack_id: str,
+                             data: bytes,
+                             entry_count: int) -> List[Dict[str, Any]]:
+    """Erasure code a pack segment, store it and record it in Raft"""
+    record_key = pack_record_key(pack_id)
+    shards_info = await storage_service.encode_and_store_shards(
+        bucket_name=bucket_name,
+        object_key=record_key,
+        data=data,
+        tier=tier,
+        shard_prefix=f"{bucket_name}-pack-{pack_id}"
+    )
+
+    await storage_service.raft_service.create_object({
+        "bucket_name": bucket_name,
+        "object_key": record_key,
+        "size": len(data),
+        "tier": tier,
+        "content_type": "application/x-intellistore-pack",
+        "checksum": "",
+        "shards": shards_info,
+        "metadata": {},
+        "pack_segment": {
+            "pack_id": pack_id,
+            "entry_count": entry_count,
+            "created_at": time.time()
+        }
+    })
+
+    PACK_SEGMENT_ENTRIES.observe(entry_count)
+    return shards_info
+
+
+class PackWriter:
+    """Group-committing writer of small objects into pack segments"""
+
+    def __init__(self, segment_size: int = 8 * 1024 * 1024, linger: float = 0.02):
+        self.segment_size = segment_size
+        self.linger = linger
+        self._open: Dict[Tuple[str, str], _OpenSegment] = {}
+        self._flushing = set()
+
+    async def append(self, storage_service, bucket_name: str, tier: str, object_key: str, data: bytes) -> Dict[str, Any]:
+        """Append an object to the open segment and wait until it is stored"""
+        key = (bucket_name, tier)
+        segment = self._open.get(key)
+        if segment is None:
+            segment = _OpenSegment(storage_service, bucket_name, tier)
+            segment.timer = asyncio.get_running_loop().call_later(self.linger, self._seal, key, segment, "linger")
+            self._open[key] = segment
+
+        offset = len(segment.buffer)
+        segment.buffer += data
+        segment.entries.append({"object_key": object_key, "offset": offset, "length": len(data)})
+
+        if len(segment.buffer) >= self.segment_size:
+            self._seal(key, segment, "full")
+
+        # Shielded so one cancelled upload doesn't fail the whole segment
+        shards_info = await asyncio.shield(segment.done)
+
+        return {
+            "pack_id": segment.pack_id,
+            "offset": offset,
+            "length": len(data),
+            "shards": shards_info
+        }
+
+    def _seal(self, key: Tuple[str, str], segment: _OpenSegment, reason: str):
+        if self._open.get(key) is not segment:
+            return
+        del self._open[key]
+        segment.timer.cancel()
+
+        task = asyncio.create_task(self._flush(segment, reason))
+        self._flushing.add(task)
+        task.add_done_callback(self._flushing.discard)
+
+    async def _flush(self, segment: _OpenSegment, reason: str):
+        try:
+            shards_info = await write_pack_segment(
+                segment.storage_service,
+                segment.bucket_name,
+                segment.tier,
+                segment.pack_id,
+                bytes(segment.buffer),
+                len(segment.entries)
+            )
+            PACK_SEGMENTS_WRITTEN.labels(reason=reason).inc()
+            segment.done.set_result(shards_info)
+
+            logger.debug("Pack segment stored",
+                        bucket=segment.bucket_name,
+                        pack_id=segment.pack_id,
+                        size=len(segment.buffer),
+                        entries=len(segment.entries),
+                        reason=reason)
+
+        except Exception as e:
+            logger.error("Failed to store pack segment",
+                        bucket=segment.bucket_name,
+                        pack_id=segment.pack_id,
+                        error=str(e))
+            segment.done.set_exception(e)
+
+    async def flush(self):
+        """Seal all open segments and wait for them to be stored"""
+        for key, segment in list(self._open.items()):
+            self._seal(key, segment, "shutdown")
+        if self._flushing:
+            await asyncio.gather(*self._flushing, return_exceptions=True)
+
+
+_pack_writer: Optional[PackWriter] = None
+
+
+def configure_pack_writer(segment_size: int, linger: float) -> PackWriter:
+    """Create the process-wide pack writer (called at startup)"""
+    global _pack_writer
+    _pack_writer = PackWriter(segment_size=segment_size, linger=linger)
+    return _pack_writer
+
+
+def get_pack_writer() -> PackWriter:
+    """Get the process-wide pack writer, creating one with defaults if needed"""
+    global _pack_writer
+    if _pack_writer is None:
+        _pack_writer = PackWriter()
+    return _pack_writer
+
+
+async def compact_bucket_packs(storage_service,
+                               bucket_name: str,
+                               min_live_ratio: float = 0.5,
+                               min_age: float = 600.0) -> Dict[str, int]:
+    """Reclaim space held by deleted entries in a bucket's pack segments
+
+    Segments younger than ``min_age`` are skipped: their objects may not have
+    been recorded yet.  Segments with no live entries are deleted; segments
+    whose live fraction is below ``min_live_ratio`` have their live entries
+    copied into a new segment before being deleted.
+    """
+    raft_service = storage_service.raft_service
+    stats = {"segments_deleted": 0, "segments_rewritten": 0, "bytes_reclaimed": 0}
+
+    segments = [
+        record for record in await list_object_records(raft_service, bucket_name, PACK_KEY_PREFIX)
+        if record.get("pack_segment")
+    ]
+    if not segments:
+        return stats
+
+    # Live entries per segment, from the objects that reference them
+    live: Dict[str, List[Dict[str, Any]]] = {}
+    for record in await list_object_records(raft_service, bucket_name):
+        pack_ref = record.get("pack")
+        if pack_ref:
+            live.setdefault(pack_ref["pack_id"], []).append(record)
+
+    cutoff = time.time() - min_age
+    for segment in segments:
+        info = segment["pack_segment"]
+        if info.get("created_at", 0) > cutoff:
+            continue
+
+        pack_id = info["pack_id"]
+        record_key = pack_record_key(pack_id)
+        objects = live.get(pack_id, [])
+        live_bytes = sum(obj["pack"]["length"] for obj in objects)
+        if objects and live_bytes >= segment["size"] * min_live_ratio:
+            continue
+
+        try:
+            if objects:
+                await _rewrite_live_entries(storage_service, bucket_name, segment, objects)
+                stats["segments_rewritten"] += 1
+
+            await storage_service.delete_shards(bucket_name, record_key, segment["shards"])
+            await raft_service.delete_object(bucket_name, record_key)
+
+            reclaimed = segment["size"] - live_bytes
+            stats["segments_deleted"] += 1
+            stats["bytes_reclaimed"] += reclaimed
+            PACK_BYTES_RECLAIMED.inc(reclaimed)
+
+        except Exception as e:
+            logger.warning("Failed to compact pack segment",
+                          bucket=bucket_name,
+                          pack_id=pack_id,
+                          error=str(e))
+
+    if stats["segments_deleted"]:
+        logger.info("Pack segments compacted", bucket=bucket_name, **stats)
+
+    return stats
+
+
+async def _rewrite_live_entries(storage_service, bucket_name: str, segment: Dict[str, Any], objects: List[Dict[str, Any]]):
+    """Copy live entries of a segment into a new segment and repoint their objects"""
+    old_pack_id = segment["pack_segment"]["pack_id"]
+    data = await storage_service.retrieve_and_reconstruct_shards(
+        bucket_name, pack_record_key(old_pack_id), segment["shards"], read_repair=False
+    )
+
+    new_pack_id = uuid.uuid4().hex
+    buffer = bytearray()
+    moved = []
+    for obj in objects:
+        ref = obj["pack"]
+        moved.append((obj["object_key"], ref["offset"], len(buffer), ref["length"]))
+        buffer += data[ref["offset"]:ref["offset"] + ref["length"]]
+
+    shards_info = await write_pack_segment(
+        storage_service, bucket_name, segment["tier"], new_pack_id, bytes(buffer), len(moved)
+    )
+
+    for object_key, old_offset, new_offset, length in moved:
+        # Skip objects that were deleted or overwritten since the scan
+        current = await storage_service.raft_service.get_object(bucket_name, object_key)
+        current_ref = (current or {}).get("pack") or {}
+        if current_ref.get("pack_id") != old_pack_id or current_ref.get("offset") != old_offset:
+            continue
+
+        await storage_service.raft_service.update_object(bucket_name, object_key, {
+            "pack": {"pack_id": new_pack_id, "offset": new_offset, "length": length, "shards": shards_info}
+        })
+
+
+async def periodic_pack_compaction(raft_service, interval: float, min_live_ratio: float, min_age: float):
+    """Compact pack segments in every bucket"""
+    while True:
+        try:
+            await asyncio.sleep(interval)
+
+            storage_service = create_storage_service(raft_service)
+            try:
+                for bucket in await raft_service.list_buckets():
+                    if bucket.get("name"):
+                        await compact_bucket_packs(storage_service, bucket["name"], min_live_ratio, min_age)
+            finally:
+                await storage_service.close()
+
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error("Error compacting pack segments", error=str(e))
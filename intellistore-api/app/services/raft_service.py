@@ -285,6 +285,34 @@ class RaftService:
                         error=str(e))
             raise
     
+    async def batch_objects(self,
+                            bucket_name: str,
+                            deletes: Optional[List[str]] = None,
+                            updates: Optional[Dict[str, Dict[str, Any]]] = None) -> List[Dict[str, Any]]:
+        """Delete and update many objects as a single Raft log entry
+        
+        ``updates`` maps object keys to their update data (currently the
+        tier).  Returns a result per operation with the object key and its
+        status ("deleted", "updated" or "not_found").
+        """
+        try:
+            operations = [{"op": "delete", "objectKey": key} for key in deletes or []]
+            for key, update_data in (updates or {}).items():
+                operations.append({"op": "update", "objectKey": key, **update_data})
+            
+            response = await self._make_request("POST", f"/buckets/{bucket_name}/batch", {"operations": operations})
+            return [
+                {"object_key": result["objectKey"], "status": result["status"]}
+                for result in response.json().get("results") or []
+            ]
+        except Exception as e:
+            logger.error("Failed to apply object batch", 
+                        bucket=bucket_name, 
+                        deletes=len(deletes or []),
+                        updates=len(updates or {}),
+                        error=str(e))
+            raise
+    
     async def update_object_access_time(self, bucket_name: str, object_key: str):
         """Update object last accessed time"""
         try:
@@ -0,0 +1,190 @@
+"""
+Read-repair of shards found missing by degraded reads
+
+A read that finds shards missing still decodes the object from the other
+shards, but without repair every later read of it would be degraded too.
+StorageService.retrieve_and_reconstruct_shards hands the missing shard IDs
+and the shards it has already read to the process-wide ReadRepairer, which
+recomputes the missing shards from those (no further reads), writes them
+to replacement nodes and swaps the record to them (see
+StorageService.rebuild_shards and replace_shards) - so a hot object heals
+after one degraded read.
+
+Repairs run in the background and never delay the read that found them:
+``submit`` only queues.  They are paced to ``bandwidth`` bytes written per
+second, at most ``concurrency`` run at once, and a repair is dropped rather
+than queued once the shards held for pending repairs exceed
+``max_pending_bytes``; the integrity scrubber catches whatever is dropped.
+Only shards the node answered 404 for are repaired; unreachable nodes are
+left to the scrubber's grace period.
+"""
+
+import asyncio
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+import structlog
+from prometheus_client import Counter, Gauge
+
+from app.core.metrics import CUSTOM_REGISTRY
+from app.core.rate_limit import TokenBucket
+
+logger = structlog.get_logger(__name__)
+
+READ_REPAIRS = Counter(
+    'intellistore_read_repairs_total',
+    'Read-repairs of placements with missing shards',
+    ['outcome'],
+    registry=CUSTOM_REGISTRY
+)
+
+READ_REPAIR_SHARDS = Counter(
+    'intellistore_read_repair_shards_total',
+    'Missing shards rebuilt by read-repair',
+    registry=CUSTOM_REGISTRY
+)
+
+READ_REPAIR_PENDING_BYTES = Gauge(
+    'intellistore_read_repair_pending_bytes',
+    'Shard bytes held for queued and running read-repairs',
+    registry=CUSTOM_REGISTRY
+)
+
+
+class ReadRepairer:
+    """Rebuilds missing shards in the background from shards a read already fetched"""
+
+    def __init__(self,
+                 bandwidth: float = 10 * 1024 * 1024,
+                 concurrency: int = 2,
+                 max_pending_bytes: int = 256 * 1024 * 1024):
+        self.budget = TokenBucket(bandwidth)
+        self.max_pending_bytes = max_pending_bytes
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._pending: Set[Tuple[str, str, frozenset]] = set()
+        self._pending_bytes = 0
+        self._tasks: Set[asyncio.Task] = set()
+        self._storage_service = None
+
+    def submit(self,
+               raft_service,
+               bucket_name: str,
+               object_key: str,
+               shards_info: List[Dict[str, Any]],
+               shard_data: Dict[int, bytes],
+               missing: Set[str]) -> bool:
+        """Queue a repair of the ``missing`` shards; returns whether it was queued"""
+        key = (bucket_name, object_key, frozenset(missing))
+        if key in self._pending:
+            READ_REPAIRS.labels(outcome="duplicate").inc()
+            return False
+
+        size = sum(len(shard) for shard in shard_data.values())
+        if self._pending_bytes + size > self.max_pending_bytes:
+            READ_REPAIRS.labels(outcome="dropped").inc()
+            logger.warning("Read-repair backlog full, leaving repair to the scrubber",
+                          bucket=bucket_name,
+                          object=object_key,
+                          missing=len(missing))
+            return False
+
+        self._pending.add(key)
+        self._pending_bytes += size
+        READ_REPAIR_PENDING_BYTES.set(self._pending_bytes)
+        READ_REPAIRS.labels(outcome="queued").inc()
+
+        task = asyncio.create_task(self._repair(raft_service, bucket_name, object_key, shards_info, shard_data, missing))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+        def release(_):
+            self._pending.discard(key)
+            self._pending_bytes -= size
+            READ_REPAIR_PENDING_BYTES.set(self._pending_bytes)
+
+        task.add_done_callback(release)
+        return True
+
+    async def _repair(self,
+                      raft_service,
+                      bucket_name: str,
+                      object_key: str,
+                      shards_info: List[Dict[str, Any]],
+                      shard_data: Dict[int, bytes],
+                      missing: Set[str]):
+        async with self._semaphore:
+            try:
+                storage_service = self._get_storage_service(raft_service)
+
+                # Nothing to do if the object was rewritten, migrated or
+                # repaired since it was read
+                record = await raft_service.get_object(bucket_name, object_key)
+                if not record or not any(
+                    placement.get("shards") == shards_info
+                    for placement in [record] + list(record.get("parts") or [])
+                ):
+                    READ_REPAIRS.labels(outcome="stale").inc()
+                    return
+
+                await self.budget.acquire(sum(info.get("size", 0) for info in shards_info if info["shard_id"] in missing))
+                new_shards = await storage_service.rebuild_shards(
+                    bucket_name, object_key, shards_info, missing, record.get("tier") or "hot", shard_data=shard_data
+                )
+
+                if not await storage_service.replace_shards(bucket_name, object_key, shards_info, new_shards):
+                    old_ids = {info["shard_id"] for info in shards_info}
+                    await storage_service.delete_shards(bucket_name, object_key, [
+                        info for info in new_shards if info["shard_id"] not in old_ids
+                    ])
+                    READ_REPAIRS.labels(outcome="stale").inc()
+                    return
+
+                # Clears any leftover metadata of the missing shards
+                await storage_service.delete_shards(bucket_name, object_key, [
+                    info for info in shards_info if info["shard_id"] in missing
+                ])
+
+                READ_REPAIRS.labels(outcome="repaired").inc()
+                READ_REPAIR_SHARDS.inc(len(missing))
+                logger.info("Missing shards read-repaired",
+                           bucket=bucket_name,
+                           object=object_key,
+                           repaired=len(missing))
+
+            except Exception as e:
+                READ_REPAIRS.labels(outcome="failed").inc()
+                logger.warning("Read-repair failed",
+                              bucket=bucket_name,
+                              object=object_key,
+                              error=str(e))
+
+    def _get_storage_service(self, raft_service):
+        """Storage service owned by the repairer, since readers close theirs when done"""
+        if self._storage_service is None:
+            from app.services.storage_service import create_storage_service
+            self._storage_service = create_storage_service(raft_service)
+        return self._storage_service
+
+    async def stop(self):
+        """Cancel pending repairs (the scrubber finds them later)"""
+        for task in list(self._tasks):
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        if self._storage_service is not None:
+            await self._storage_service.close()
+            self._storage_service = None
+
+
+# Process-wide repairer, configured at startup (None = read-repair disabled)
+_read_repairer: Optional[ReadRepairer] = None
+
+
+def configure_read_repairer(bandwidth: float, concurrency: int, max_pending_bytes: int) -> ReadRepairer:
+    """Create the process-wide read repairer (called at startup)"""
+    global _read_repairer
+    _read_repairer = ReadRepairer(bandwidth=bandwidth, concurrency=concurrency, max_pending_bytes=max_pending_bytes)
+    return _read_repairer
+
+
+def get_read_repairer() -> Optional[ReadRepairer]:
+    """Get the process-wide read repairer, or None if read-repair is disabled"""
+    return _read_repairer
@@ -0,0 +1,396 @@
+"""
+Background integrity scrubbing of stored shards
+
+Corruption or loss of a shard is otherwise only noticed when a read needs
+it.  The scrubber walks every object record (hidden ones included, so pack
+segments and deduplicated chunks are covered) and checks each placement -
+the shards of an object, of a multipart part or of a pack segment:
+
+1. The object records are snapshotted, then every storage node is listed
+   (``/shard/list``), so each snapshotted shard was written before its
+   node was listed.  A shard whose listed size or checksum differs from
+   its shard info is corrupt, and a shard on a node that cannot be listed
+   is unavailable.  A shard its node does not list is suspected missing
+   and confirmed by its node before it is counted or repaired.
+2. Placements are verified in order of how few healthy shards they have
+   left beyond what decoding needs, so the objects closest to data loss are
+   checked and repaired first.  The nodes hash their shards themselves
+   (StorageService.verify_shard), paced to ``bandwidth`` bytes per second
+   together with the shard reads of repairs.
+3. Missing and corrupt shards, and shards on nodes that have been
+   unreachable for longer than ``node_down_grace``, are rebuilt from the
+   surviving ones onto healthy nodes (StorageService.rebuild_shards).  The
+   record is swapped to the new shards (StorageService.replace_shards) and
+   the lost ones are deleted.
+
+Time to repair is measured from the first pass that found a shard lost to
+the pass that replaced it; its histogram's ``_sum / _count`` is the mean
+time to repair.
+"""
+
+import asyncio
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+import structlog
+from prometheus_client import Counter, Gauge, Histogram
+
+from app.core.metrics import CUSTOM_REGISTRY
+from app.core.rate_limit import TokenBucket
+from app.services.erasure import ErasureProfile
+from app.services.storage_service import create_storage_service, list_object_records
+
+logger = structlog.get_logger(__name__)
+
+SCRUB_SHARDS_CHECKED = Counter(
+    'intellistore_scrub_shards_checked_total',
+    'Shards checked by integrity scrubbing',
+    ['result'],
+    registry=CUSTOM_REGISTRY
+)
+
+SCRUB_BYTES_VERIFIED = Counter(
+    'intellistore_scrub_bytes_verified_total',
+    'Shard bytes hashed by integrity scrubbing',
+    registry=CUSTOM_REGISTRY
+)
+
+SCRUB_SHARDS_REPAIRED = Counter(
+    'intellistore_scrub_shards_repaired_total',
+    'Lost shards rebuilt by integrity scrubbing',
+    ['outcome'],
+    registry=CUSTOM_REGISTRY
+)
+
+SCRUB_PROGRESS = Gauge(
+    'intellistore_scrub_progress_ratio',
+    'Fraction of the current scrub pass\'s shard bytes checked',
+    registry=CUSTOM_REGISTRY
+)
+
+SCRUB_DEGRADED_PLACEMENTS = Gauge(
+    'intellistore_scrub_degraded_placements',
+    'Placements with lost shards found by the current scrub pass',
+    ['state'],
+    registry=CUSTOM_REGISTRY
+)
+
+SCRUB_TIME_TO_REPAIR = Histogram(
+    'intellistore_scrub_time_to_repair_seconds',
+    'Time from a lost shard being found to it being rebuilt',
+    buckets=(1, 10, 60, 300, 900, 3600, 6 * 3600, 24 * 3600, 7 * 24 * 3600),
+    registry=CUSTOM_REGISTRY
+)
+
+SCRUB_PASS_DURATION = Histogram(
+    'intellistore_scrub_pass_duration_seconds',
+    'Integrity scrub pass duration',
+    buckets=(60, 300, 900, 3600, 6 * 3600, 24 * 3600, 7 * 24 * 3600),
+    registry=CUSTOM_REGISTRY
+)
+
+# Storage nodes listed concurrently
+_LIST_CONCURRENCY = 4
+
+# When each lost shard (bucket, record key, shard ID) was first found
+_lost_since: Dict[Tuple[str, str, str], float] = {}
+
+# When each storage node was first found unreachable
+_node_down_since: Dict[str, float] = {}
+
+
+@dataclass
+class _Placement:
+    """One set of shards decoded together, and where its record keeps it"""
+    bucket_name: str
+    record: Dict[str, Any]
+    part: Optional[int]
+    shards: List[Dict[str, Any]]
+    profile: ErasureProfile
+    state: Dict[str, str] = field(default_factory=dict)
+
+    @property
+    def object_key(self) -> str:
+        return self.record["object_key"]
+
+    @property
+    def margin(self) -> int:
+        """Healthy shards beyond the number needed to decode"""
+        healthy = sum(1 for info in self.shards if self.state.get(info["shard_id"]) in (None, "ok"))
+        return healthy - self.profile.data_shards
+
+
+def _placements(bucket_name: str, record: Dict[str, Any]) -> List[_Placement]:
+    placements = []
+    if record.get("shards"):
+        placements.append(_Placement(bucket_name, record, None, record["shards"],
+                                     ErasureProfile.of_shards(record["shards"])))
+    for i, part in enumerate(record.get("parts") or []):
+        if part.get("shards"):
+            placements.append(_Placement(bucket_name, record, i, part["shards"],
+                                         ErasureProfile.of_shards(part["shards"])))
+    return placements
+
+
+class IntegrityScrubber:
+    """Verifies stored shards against their checksums and rebuilds lost ones"""
+
+    def __init__(self,
+                 storage_service,
+                 bandwidth: float = 20 * 1024 * 1024,
+                 concurrency: int = 4,
+                 node_down_grace: float = 1800,
+                 repair: bool = True):
+        self.storage_service = storage_service
+        self.raft_service = storage_service.raft_service
+        self.budget = TokenBucket(bandwidth)
+        self.concurrency = concurrency
+        self.node_down_grace = node_down_grace
+        self.repair = repair
+
+    async def scrub(self) -> Dict[str, int]:
+        """Check every placement once, most degraded first, and repair what was lost"""
+        start = time.perf_counter()
+        stats = {"placements": 0, "shards_checked": 0, "bytes_verified": 0, "corrupt": 0, "missing": 0,
+                 "unavailable": 0, "repaired": 0, "repair_failures": 0, "unrecoverable": 0}
+
+        # Records first: a shard written after its node was listed would
+        # otherwise look missing
+        placements = []
+        for bucket in await self.raft_service.list_buckets():
+            if not bucket.get("name"):
+                continue
+            for record in await list_object_records(self.raft_service, bucket["name"]):
+                placements.extend(_placements(bucket["name"], record))
+        listings = await self._list_nodes()
+
+        # Forget lost shards whose object was deleted or rewritten meanwhile
+        current = {(placement.bucket_name, placement.object_key, info["shard_id"])
+                   for placement in placements for info in placement.shards}
+        for key in set(_lost_since) - current:
+            del _lost_since[key]
+
+        for placement in placements:
+            for info in placement.shards:
+                state = self._listed_state(listings, info)
+                if state:
+                    placement.state[info["shard_id"]] = state
+        placements.sort(key=lambda placement: placement.margin)
+
+        stats["placements"] = len(placements)
+        bytes_total = sum(info.get("size", 0) for placement in placements for info in placement.shards) or 1
+        bytes_checked = 0
+        SCRUB_PROGRESS.set(0)
+        SCRUB_DEGRADED_PLACEMENTS.labels(state="repaired").set(0)
+        SCRUB_DEGRADED_PLACEMENTS.labels(state="unrepaired").set(0)
+
+        # Workers take placements in priority order
+        queue: asyncio.Queue = asyncio.Queue()
+        for placement in placements:
+            queue.put_nowait(placement)
+
+        async def worker():
+            nonlocal bytes_checked
+            while not queue.empty():
+                placement = queue.get_nowait()
+                try:
+                    await self._check(placement, stats)
+                except Exception as e:
+                    logger.warning("Failed to scrub placement",
+                                  bucket=placement.bucket_name,
+                                  object=placement.object_key,
+                                  part=placement.part,
+                                  error=str(e))
+                bytes_checked += sum(info.get("size", 0) for info in placement.shards)
+                SCRUB_PROGRESS.set(bytes_checked / bytes_total)
+
+        await asyncio.gather(*[worker() for _ in range(max(self.concurrency, 1))])
+
+        SCRUB_PROGRESS.set(1)
+        SCRUB_PASS_DURATION.observe(time.perf_counter() - start)
+        logger.info("Integrity scrub pass completed",
+                   nodes=len(listings),
+                   duration=time.perf_counter() - start,
+                   **stats)
+        return stats
+
+    async def _list_nodes(self) -> Dict[str, Dict[str, Dict[str, Any]]]:
+        """Shard metadata by shard ID of every node that could be listed"""
+        semaphore = asyncio.Semaphore(_LIST_CONCURRENCY)
+
+        async def list_node(node_addr: str):
+            async with semaphore:
+                return await self.storage_service.list_node_shards(node_addr)
+
+        nodes = await self.raft_service.get_storage_nodes()
+        results = await asyncio.gather(*[list_node(node_addr) for node_addr in nodes], return_exceptions=True)
+
+        listings = {}
+        now = time.time()
+        for node_addr, result in zip(nodes, results):
+            if isinstance(result, Exception):
+                _node_down_since.setdefault(node_addr, now)
+                logger.warning("Storage node unreachable for scrubbing", node_addr=node_addr, error=str(result))
+            else:
+                _node_down_since.pop(node_addr, None)
+                listings[node_addr] = {shard["shardId"]: shard for shard in result if shard.get("shardId")}
+        return listings
+
+    def _listed_state(self, listings: Dict[str, Dict[str, Dict[str, Any]]], info: Dict[str, Any]) -> Optional[str]:
+        """What the node listings say about a shard: None if it looks intact"""
+        if info["node_addr"] not in listings:
+            return "unavailable"
+        listed = listings[info["node_addr"]].get(info["shard_id"])
+        if listed is None:
+            return "missing"
+        if listed.get("size") is not None and info.get("size") is not None and listed["size"] != info["size"]:
+            return "corrupt"
+        if listed.get("checksum") and info.get("checksum") and listed["checksum"] != info["checksum"]:
+            return "corrupt"
+        return None
+
+    async def _check(self, placement: _Placement, stats: Dict[str, int]):
+        """Verify the shards of one placement and repair it if any were lost"""
+        for info in placement.shards:
+            state = placement.state.get(info["shard_id"])
+            # Unlisted shards are confirmed by their node before counting as missing
+            if state in (None, "missing"):
+                state = await self._verify(placement, info)
+                placement.state[info["shard_id"]] = state
+                if state in ("ok", "corrupt"):
+                    stats["bytes_verified"] += info.get("size", 0)
+            stats["shards_checked"] += 1
+            if state != "ok":
+                stats[state] += 1
+            SCRUB_SHARDS_CHECKED.labels(result=state).inc()
+
+        now = time.time()
+        lost = set()
+        down = set()
+        for info in placement.shards:
+            state = placement.state[info["shard_id"]]
+            key = (placement.bucket_name, placement.object_key, info["shard_id"])
+            if state == "ok":
+                _lost_since.pop(key, None)
+                continue
+            if state == "unavailable":
+                down.add(info["node_addr"])
+                if now - _node_down_since.get(info["node_addr"], now) < self.node_down_grace:
+                    continue
+            _lost_since.setdefault(key, now)
+            lost.add(info["shard_id"])
+
+        if not lost:
+            return
+        if not self.repair:
+            SCRUB_DEGRADED_PLACEMENTS.labels(state="unrepaired").inc()
+            return
+
+        if placement.margin < 0:
+            stats["unrecoverable"] += 1
+            SCRUB_DEGRADED_PLACEMENTS.labels(state="unrepaired").inc()
+            logger.error("Placement has too few healthy shards to repair",
+                        bucket=placement.bucket_name,
+                        object=placement.object_key,
+                        part=placement.part,
+                        coding=placement.profile.coding,
+                        lost=len(lost))
+            return
+
+        try:
+            await self._repair(placement, lost, down)
+        except Exception as e:
+            stats["repair_failures"] += 1
+            SCRUB_SHARDS_REPAIRED.labels(outcome="failed").inc(len(lost))
+            SCRUB_DEGRADED_PLACEMENTS.labels(state="unrepaired").inc()
+            logger.warning("Failed to repair placement",
+                          bucket=placement.bucket_name,
+                          object=placement.object_key,
+                          part=placement.part,
+                          error=str(e))
+            return
+
+        stats["repaired"] += len(lost)
+        SCRUB_SHARDS_REPAIRED.labels(outcome="repaired").inc(len(lost))
+        SCRUB_DEGRADED_PLACEMENTS.labels(state="repaired").inc()
+        now = time.time()
+        for shard_id in lost:
+            SCRUB_TIME_TO_REPAIR.observe(now - _lost_since.pop((placement.bucket_name, placement.object_key, shard_id), now))
+
+    async def _verify(self, placement: _Placement, info: Dict[str, Any]) -> str:
+        """Have a shard's node hash it; returns ok, corrupt, missing or unavailable"""
+        await self.budget.acquire(info.get("size", 0))
+        try:
+            checksum = await self.storage_service.verify_shard(
+                info["node_addr"], info["shard_id"], placement.bucket_name, placement.object_key,
+                info.get("checksum", "")
+            )
+        except Exception as e:
+            logger.warning("Failed to verify shard",
+                          node_addr=info["node_addr"],
+                          shard_id=info["shard_id"],
+                          error=str(e))
+            return "unavailable"
+
+        if checksum is None:
+            return "missing"
+        SCRUB_BYTES_VERIFIED.inc(info.get("size", 0))
+        if not checksum or (info.get("checksum") and checksum != info["checksum"]):
+            return "corrupt"
+        return "ok"
+
+    async def _repair(self, placement: _Placement, lost: Set[str], down: Set[str]):
+        """Rebuild the lost shards of a placement, record them and delete the lost ones"""
+        # The survivors read to rebuild count against the budget too
+        await self.budget.acquire(sum(
+            info.get("size", 0) for info in placement.shards[:placement.profile.data_shards]
+        ))
+
+        bucket_name, object_key = placement.bucket_name, placement.object_key
+        tier = placement.record.get("tier") or "hot"
+        new_shards = await self.storage_service.rebuild_shards(
+            bucket_name, object_key, placement.shards, lost, tier, avoid_nodes=down
+        )
+
+        # Swap only if the placement still has the shards that were checked
+        if not await self.storage_service.replace_shards(bucket_name, object_key, placement.shards, new_shards):
+            old_ids = {info["shard_id"] for info in placement.shards}
+            await self.storage_service.delete_shards(bucket_name, object_key, [
+                info for info in new_shards if info["shard_id"] not in old_ids
+            ])
+            raise Exception("Object changed during repair")
+
+        await self.storage_service.delete_shards(bucket_name, object_key, [
+            info for info in placement.shards if info["shard_id"] in lost
+        ])
+
+
+async def periodic_scrub(raft_service,
+                         interval: float,
+                         bandwidth: float,
+                         concurrency: int,
+                         node_down_grace: float,
+                         repair: bool = True):
+    """Run an integrity scrub pass every interval (measured from the end of the last pass)"""
+    while True:
+        try:
+            await asyncio.sleep(interval)
+
+            storage_service = create_storage_service(raft_service)
+            try:
+                scrubber = IntegrityScrubber(
+                    storage_service,
+                    bandwidth=bandwidth,
+                    concurrency=concurrency,
+                    node_down_grace=node_down_grace,
+                    repair=repair
+                )
+                await scrubber.scrub()
+            finally:
+                await storage_service.close()
+
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error("Error scrubbing shards", error=str(e))
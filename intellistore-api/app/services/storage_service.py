@@ -3,56 +3,321 @@ Storage service for managing shards across storage nodes
 """
 
 import asyncio
+import base64
 import hashlib
 import io
+import random
 import time
-from typing import Dict, Any, List, Optional, Tuple
+import uuid
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple
 
 import httpx
+import numpy as np
 import structlog
+from prometheus_client import Counter
+
+from app.core.config import get_settings
+from app.core.metrics import CUSTOM_REGISTRY
+from app.services.compute_executor import ComputeExecutor, get_compute_executor
+from app.services.erasure import SCHEME_REPLICA, SCHEME_RS, ErasureProfile, decode, encode_parity, reconstruct
 
 logger = structlog.get_logger(__name__)
 
+OBJECTS_STORED = Counter(
+    'intellistore_objects_stored_total',
+    'Objects stored by placement',
+    ['placement'],
+    registry=CUSTOM_REGISTRY
+)
+
+SHARD_DELETE_REQUESTS = Counter(
+    'intellistore_shard_delete_requests_total',
+    'Shard delete requests sent to storage nodes',
+    ['mode'],
+    registry=CUSTOM_REGISTRY
+)
+
+SHARDS_MIGRATED = Counter(
+    'intellistore_shards_migrated_total',
+    'Shards moved to another tier, by how they were moved',
+    ['mode'],
+    registry=CUSTOM_REGISTRY
+)
+
+SHARD_BYTES_MIGRATED = Counter(
+    'intellistore_shard_bytes_migrated_total',
+    'Shard bytes moved to another tier, by how they were moved',
+    ['mode'],
+    registry=CUSTOM_REGISTRY
+)
+
+# Shard bytes encoded per compute task
+DEFAULT_STRIPE_SIZE = 1024 * 1024
+
+# Object keys under this prefix hold internal records and are hidden from users
+RESERVED_KEY_PREFIX = "__intellistore__."
+PACK_KEY_PREFIX = f"{RESERVED_KEY_PREFIX}pack."
+
+# Shards per storage node bulk-delete request (nodes accept up to 10000)
+BULK_DELETE_BATCH_SIZE = 1000
+
+# Max time a target node may take to pull a shard during migration
+SHARD_FETCH_TIMEOUT = 600.0
+
+# Page size used when scanning object records
+_LIST_PAGE_SIZE = 1000
+
+
+def is_reserved_key(object_key: str) -> bool:
+    """Check whether an object key belongs to an internal metadata record"""
+    return object_key.startswith(RESERVED_KEY_PREFIX)
+
+
+def pack_record_key(pack_id: str) -> str:
+    return f"{PACK_KEY_PREFIX}{pack_id}"
+
+
+async def list_object_records(raft_service, bucket_name: str, prefix: Optional[str] = None) -> List[Dict[str, Any]]:
+    """List every object record in a bucket (including hidden ones), following pagination"""
+    records = []
+    continuation_token = None
+    while True:
+        page = await raft_service.list_objects(
+            bucket_name=bucket_name,
+            prefix=prefix,
+            limit=_LIST_PAGE_SIZE,
+            continuation_token=continuation_token
+        )
+        records.extend(page.get("objects", []))
+        continuation_token = page.get("next_continuation_token")
+        if not continuation_token:
+            return records
+
+
+def all_shard_infos(object_metadata: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """All shards owned by an object, including those of multipart parts
+
+    Shards of a pack segment are shared and are not included; they are
+    reclaimed by pack compaction.
+    """
+    shards = list(object_metadata.get("shards") or [])
+    for part in object_metadata.get("parts") or []:
+        shards.extend(part.get("shards") or [])
+    return shards
+
+
+def _encode_stripe(buffer, coding: str, data_shards: int, shard_size: int,
+                   start: int, end: int) -> List[bytes]:
+    """Encode bytes [start, end) of every shard of an object
+
+    Module-level so it can run in a worker process; ``buffer`` may be a view of
+    shared memory and is not referenced after returning.
+    """
+    size = len(buffer)
+    block = np.zeros((data_shards, end - start), dtype=np.uint8)
+    for i in range(data_shards):
+        lo = i * shard_size + start
+        hi = min(i * shard_size + end, size)
+        if hi > lo:
+            block[i, :hi - lo] = np.frombuffer(buffer, dtype=np.uint8, count=hi - lo, offset=lo)
+
+    return [block[i].tobytes() for i in range(data_shards)] + encode_parity(block, coding)
+
+
+def _join_stripes(stripes: List[List[bytes]], total_shards: int) -> List[bytes]:
+    """Concatenate per-stripe pieces into whole shards"""
+    if len(stripes) == 1:
+        return stripes[0]
+    return [b"".join(stripe[i] for stripe in stripes) for i in range(total_shards)]
+
+
+def _sha256_hex(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def _is_missing(error: Exception) -> bool:
+    """Whether a failed shard read means the node no longer has the shard"""
+    return isinstance(error, httpx.HTTPStatusError) and error.response.status_code == 404
+
 
 class StorageService:
     """Service for managing data storage across storage nodes"""
     
-    def __init__(self, raft_service, data_shards: int = 6, parity_shards: int = 3):
+    def __init__(self,
+                 raft_service,
+                 data_shards: int = 6,
+                 parity_shards: int = 3,
+                 executor: Optional[ComputeExecutor] = None,
+                 stripe_size: int = DEFAULT_STRIPE_SIZE,
+                 pack_writer=None,
+                 inline_threshold: int = 0,
+                 pack_threshold: int = 0,
+                 delete_concurrency_per_node: int = 8,
+                 tier_profiles: Optional[Dict[str, str]] = None,
+                 read_repairer=None):
         self.raft_service = raft_service
-        self.data_shards = data_shards
-        self.parity_shards = parity_shards
-        self.total_shards = data_shards + parity_shards
+        # Coding profile of new objects: the bucket's, else the tier's, else the default
+        self.default_profile = ErasureProfile(SCHEME_RS, data_shards, parity_shards)
+        self.tier_profiles = {tier: ErasureProfile.parse(coding) for tier, coding in (tier_profiles or {}).items()}
+        self._bucket_profiles: Dict[str, Optional[ErasureProfile]] = {}
+        self.executor = executor or get_compute_executor()
+        self.stripe_size = stripe_size
+        self.pack_writer = pack_writer
+        self.inline_threshold = inline_threshold
+        self.pack_threshold = pack_threshold if pack_writer else 0
+        self.delete_concurrency_per_node = delete_concurrency_per_node
+        # Rebuilds shards found missing by degraded reads (see read_repair)
+        self.read_repairer = read_repairer
+        # Nodes without /shard/bulk-delete get per-shard deletes
+        self._no_bulk_delete = set()
+        # Nodes without /shard/fetch get migrated shards relayed through the API
+        self._no_shard_fetch = set()
+        # Nodes without /shard/verify get shards downloaded for verification
+        self._no_shard_verify = set()
+        # Awaited with (node addresses, bytes) before each migration transfer
+        self.transfer_throttle: Optional[Callable[[List[str], int], Awaitable[None]]] = None
         self.client = httpx.AsyncClient(timeout=httpx.Timeout(30.0))
     
+    async def store_object_data(self,
+                                bucket_name: str,
+                                object_key: str,
+                                data: bytes,
+                                tier: str = "hot") -> Dict[str, Any]:
+        """Store an object's (encrypted) data using the size-threshold policy
+        
+        Returns the placement fields for the object record: ``inline_data``
+        for tiny objects, ``pack`` for small objects appended to a shared pack
+        segment, or ``shards`` for objects erasure coded on their own.
+        """
+        size = len(data)
+        if size <= self.inline_threshold:
+            logger.debug("Storing object inline", bucket=bucket_name, object=object_key, size=size)
+            OBJECTS_STORED.labels(placement="inline").inc()
+            return {"inline_data": base64.b64encode(data).decode(), "shards": []}
+        
+        if size <= self.pack_threshold:
+            pack_ref = await self.pack_writer.append(self, bucket_name, tier, object_key, data)
+            OBJECTS_STORED.labels(placement="pack").inc()
+            return {"pack": pack_ref, "shards": []}
+        
+        # A fresh prefix per write, so an overwrite never replaces the shards
+        # of the version it supersedes before that version is released
+        shard_prefix = f"{bucket_name}-{object_key}-{uuid.uuid4().hex[:8]}"
+        shards_info = await self.encode_and_store_shards(bucket_name, object_key, data, tier, shard_prefix=shard_prefix)
+        OBJECTS_STORED.labels(placement="sharded").inc()
+        return {"shards": shards_info}
+    
+    async def load_object_data(self, bucket_name: str, object_key: str, placement: Dict[str, Any]) -> bytes:
+        """Read data stored by store_object_data (or a multipart part)"""
+        if placement.get("inline_data") is not None:
+            return base64.b64decode(placement["inline_data"])
+        
+        pack_ref = placement.get("pack")
+        if pack_ref:
+            return await self.retrieve_range(
+                bucket_name,
+                pack_record_key(pack_ref["pack_id"]),
+                pack_ref["shards"],
+                pack_ref["offset"],
+                pack_ref["offset"] + pack_ref["length"]
+            )
+        
+        return await self.retrieve_and_reconstruct_shards(bucket_name, object_key, placement["shards"])
+    
+    async def retrieve_range(self,
+                             bucket_name: str,
+                             object_key: str,
+                             shards_info: List[Dict[str, Any]],
+                             start: int,
+                             end: int) -> bytes:
+        """Read bytes [start, end) of encoded data from the data shards covering them
+        
+        Data shards hold consecutive slices of the data (and replicas all of
+        it), so a small range needs one or two ranged shard reads instead of
+        a full reconstruction.  Falls back to reconstructing everything if a
+        shard read fails.
+        """
+        profile = ErasureProfile.of_shards(shards_info)
+        if profile.scheme == SCHEME_REPLICA:
+            for info in random.sample(shards_info, len(shards_info)):
+                try:
+                    return await self._retrieve_shard(info["node_addr"], info["shard_id"], bucket_name,
+                                                      object_key, byte_range=(start, end))
+                except Exception as e:
+                    logger.warning("Ranged replica read failed, trying another replica",
+                                  bucket=bucket_name,
+                                  object=object_key,
+                                  shard_id=info["shard_id"],
+                                  error=str(e))
+            raise Exception(f"All {len(shards_info)} replicas failed")
+        
+        data_shards = sorted((info for info in shards_info if info.get("shard_type") == "data"),
+                             key=lambda info: info["index"])
+        shard_size = data_shards[0]["size"] if data_shards else 0
+        
+        if len(data_shards) == profile.data_shards and shard_size > 0:
+            reads = []
+            for info in data_shards[start // shard_size:(end - 1) // shard_size + 1]:
+                shard_start = info["index"] * shard_size
+                lo = max(start, shard_start) - shard_start
+                hi = min(end, shard_start + shard_size) - shard_start
+                reads.append(self._retrieve_shard(
+                    node_addr=info["node_addr"],
+                    shard_id=info["shard_id"],
+                    bucket_name=bucket_name,
+                    object_key=object_key,
+                    byte_range=(lo, hi)
+                ))
+            
+            try:
+                return b"".join(await asyncio.gather(*reads))
+            except Exception as e:
+                logger.warning("Ranged shard read failed, reconstructing",
+                              bucket=bucket_name,
+                              object=object_key,
+                              error=str(e))
+        
+        data = await self.retrieve_and_reconstruct_shards(bucket_name, object_key, shards_info)
+        return data[start:end]
+    
     async def encode_and_store_shards(self, 
                                     bucket_name: str, 
                                     object_key: str, 
                                     data: bytes, 
-                                    tier: str = "hot") -> List[Dict[str, Any]]:
-        """Encode data into shards and store across storage nodes"""
+                                    tier: str = "hot",
+                                    shard_prefix: Optional[str] = None,
+                                    profile: Optional[ErasureProfile] = None) -> List[Dict[str, Any]]:
+        """Encode data into shards and store across storage nodes
+
+        Shard IDs are ``{shard_prefix}-{index}``; the prefix defaults to
+        ``{bucket_name}-{object_key}``.  ``profile`` defaults to the one
+        configured for the bucket and tier (see erasure_profile).
+        """
         try:
+            profile = profile or await self.erasure_profile(bucket_name, tier)
             logger.info("Starting shard encoding and storage", 
                        bucket=bucket_name, 
                        object=object_key, 
                        size=len(data),
-                       tier=tier)
+                       tier=tier,
+                       coding=profile.coding)
             
-            # Encode data into shards using Reed-Solomon
-            shards = await self._encode_data(data)
+            # Encode data into shards
+            shards = await self._encode_data(data, profile)
             
             # Get available storage nodes for the tier
             storage_nodes = await self.raft_service.get_storage_nodes(tier)
-            if len(storage_nodes) < self.total_shards:
-                raise Exception(f"Insufficient storage nodes: need {self.total_shards}, have {len(storage_nodes)}")
+            if len(storage_nodes) < profile.total_shards:
+                raise Exception(f"Insufficient storage nodes: need {profile.total_shards}, have {len(storage_nodes)}")
             
             # Store shards across nodes
             shard_infos = []
             tasks = []
+            shard_prefix = shard_prefix or f"{bucket_name}-{object_key}"
             
             for i, shard_data in enumerate(shards):
                 node_addr = storage_nodes[i % len(storage_nodes)]
-                shard_id = f"{bucket_name}-{object_key}-{i}"
-                shard_type = "data" if i < self.data_shards else "parity"
+                shard_id = f"{shard_prefix}-{i}"
                 
                 task = self._store_shard(
                     node_addr=node_addr,
@@ -60,8 +325,9 @@ class StorageService:
                     bucket_name=bucket_name,
                     object_key=object_key,
                     shard_data=shard_data,
-                    shard_type=shard_type,
-                    index=i
+                    shard_type=profile.shard_type(i),
+                    index=i,
+                    total_shards=profile.total_shards
                 )
                 tasks.append(task)
             
@@ -77,11 +343,14 @@ class StorageService:
                                shard_index=i, 
                                error=str(result))
                 else:
+                    # Record the unpadded size so decoding can strip padding exactly
+                    result["original_size"] = len(data)
+                    result["coding"] = profile.coding
                     shard_infos.append(result)
             
             # Check if we have enough successful shards
-            if len(failed_shards) > self.parity_shards:
-                raise Exception(f"Too many shard failures: {len(failed_shards)} failed, can only tolerate {self.parity_shards}")
+            if len(failed_shards) > profile.parity_shards:
+                raise Exception(f"Too many shard failures: {len(failed_shards)} failed, can only tolerate {profile.parity_shards}")
             
             logger.info("Shards stored successfully", 
                        bucket=bucket_name, 
@@ -101,47 +370,42 @@ class StorageService:
     async def retrieve_and_reconstruct_shards(self, 
                                             bucket_name: str, 
                                             object_key: str, 
-                                            shards_info: List[Dict[str, Any]]) -> bytes:
-        """Retrieve shards and reconstruct original data"""
+                                            shards_info: List[Dict[str, Any]],
+                                            read_repair: bool = True) -> bytes:
+        """Retrieve shards and reconstruct original data
+        
+        Only as many shards as the object's coding profile needs are read
+        (the data shards, or one replica); other shards are read in their
+        place when a read fails.  Shards found missing are handed to the
+        read repairer, if any, to be rebuilt in the background from the
+        shards already read (pass ``read_repair=False`` for data that is
+        about to be rewritten anyway).
+        """
         try:
+            profile = ErasureProfile.of_shards(shards_info)
             logger.info("Starting shard retrieval and reconstruction", 
                        bucket=bucket_name, 
                        object=object_key,
-                       total_shards=len(shards_info))
+                       total_shards=len(shards_info),
+                       coding=profile.coding)
             
-            # Retrieve shards in parallel
-            tasks = []
-            for shard_info in shards_info:
-                task = self._retrieve_shard(
-                    node_addr=shard_info["node_addr"],
-                    shard_id=shard_info["shard_id"],
-                    bucket_name=bucket_name,
-                    object_key=object_key
-                )
-                tasks.append(task)
-            
-            results = await asyncio.gather(*tasks, return_exceptions=True)
-            
-            # Collect successful shard data
-            shard_data = [None] * len(shards_info)
-            successful_shards = 0
-            
-            for i, result in enumerate(results):
-                if isinstance(result, Exception):
-                    logger.warning("Failed to retrieve shard", 
-                                 shard_index=i, 
-                                 shard_id=shards_info[i]["shard_id"],
-                                 error=str(result))
-                else:
-                    shard_data[i] = result
-                    successful_shards += 1
+            shard_data, failed = await self._retrieve_shard_set(bucket_name, object_key, shards_info, profile)
+            successful_shards = len(shard_data)
             
             # Check if we have enough shards for reconstruction
-            if successful_shards < self.data_shards:
-                raise Exception(f"Insufficient shards for reconstruction: need {self.data_shards}, have {successful_shards}")
+            if successful_shards < profile.data_shards:
+                raise Exception(f"Insufficient shards for reconstruction: need {profile.data_shards}, have {successful_shards}")
             
             # Reconstruct original data
-            reconstructed_data = await self._decode_shards(shard_data)
+            original_size = next((info.get("original_size") for info in shards_info
+                                  if info.get("original_size") is not None), None)
+            reconstructed_data = await self.executor.run(
+                decode, shard_data, profile.coding, original_size, task="erasure_decode"
+            )
+            
+            missing = {info["shard_id"] for info, error in failed if _is_missing(error)}
+            if missing and read_repair and self.read_repairer:
+                self.read_repairer.submit(self.raft_service, bucket_name, object_key, shards_info, shard_data, missing)
             
             logger.info("Data reconstructed successfully", 
                        bucket=bucket_name, 
@@ -158,6 +422,168 @@ class StorageService:
                         error=str(e))
             raise
     
+    async def _retrieve_shard_set(self,
+                                  bucket_name: str,
+                                  object_key: str,
+                                  shards_info: List[Dict[str, Any]],
+                                  profile: ErasureProfile,
+                                  verify: bool = False) -> Tuple[Dict[int, bytes], List[Tuple[Dict[str, Any], Exception]]]:
+        """Read enough shards to decode: (shard bytes by index, failed reads)
+        
+        Reads the data shards (or one random replica) in parallel and another
+        wave of shards for every read that fails.  With ``verify``, shards
+        whose checksum does not match their shard info count as failed reads.
+        Returns fewer than ``profile.data_shards`` shards if not enough could
+        be read.
+        """
+        if profile.scheme == SCHEME_REPLICA:
+            candidates = random.sample(shards_info, len(shards_info))
+        else:
+            candidates = sorted(shards_info, key=lambda info: info["index"])
+        
+        async def read(shard_info: Dict[str, Any]) -> bytes:
+            data = await self._retrieve_shard(
+                node_addr=shard_info["node_addr"],
+                shard_id=shard_info["shard_id"],
+                bucket_name=bucket_name,
+                object_key=object_key
+            )
+            if verify and shard_info.get("checksum"):
+                if await self.executor.run(_sha256_hex, data, task="hash") != shard_info["checksum"]:
+                    raise Exception(f"Checksum mismatch reading shard {shard_info['shard_id']} from {shard_info['node_addr']}")
+            return data
+        
+        # Retrieve shards in parallel, a wave per shortfall
+        shard_data: Dict[int, bytes] = {}
+        failed = []
+        while len(shard_data) < profile.data_shards and candidates:
+            wave = candidates[:profile.data_shards - len(shard_data)]
+            candidates = candidates[len(wave):]
+            results = await asyncio.gather(*[read(shard_info) for shard_info in wave], return_exceptions=True)
+            
+            for shard_info, result in zip(wave, results):
+                if isinstance(result, Exception):
+                    logger.warning("Failed to retrieve shard", 
+                                 shard_index=shard_info["index"], 
+                                 shard_id=shard_info["shard_id"],
+                                 error=str(result))
+                    failed.append((shard_info, result))
+                else:
+                    shard_data[shard_info["index"]] = result
+        
+        return shard_data, failed
+    
+    async def rebuild_shards(self,
+                             bucket_name: str,
+                             object_key: str,
+                             shards_info: List[Dict[str, Any]],
+                             lost: Set[str],
+                             tier: str = "hot",
+                             avoid_nodes: Optional[Set[str]] = None,
+                             shard_data: Optional[Dict[int, bytes]] = None) -> List[Dict[str, Any]]:
+        """Recompute lost shards from the surviving ones and store them on healthy nodes
+        
+        ``lost`` holds the shard IDs to replace.  The survivors are read (and
+        verified) unless ``shard_data`` already holds enough of them by
+        index.  Replacements get new shard IDs and go to nodes of ``tier``
+        that hold no shard of the object if possible, else no surviving
+        one; nodes in ``avoid_nodes`` (known to be down) are never used.
+        Returns ``shards_info`` with the lost shards replaced; the caller
+        records it (see replace_shards) and deletes the lost shards.
+        """
+        try:
+            profile = ErasureProfile.of_shards(shards_info)
+            survivors = [info for info in shards_info if info["shard_id"] not in lost]
+            wanted = sorted(info["index"] for info in shards_info if info["shard_id"] in lost)
+            
+            if shard_data is None:
+                shard_data, _ = await self._retrieve_shard_set(bucket_name, object_key, survivors, profile, verify=True)
+            if len(shard_data) < profile.data_shards:
+                raise Exception(f"Insufficient shards for repair: need {profile.data_shards}, have {len(shard_data)}")
+            rebuilt = await self.executor.run(reconstruct, shard_data, profile.coding, wanted, task="erasure_decode")
+            
+            avoid_nodes = avoid_nodes or set()
+            nodes = [node for node in await self.raft_service.get_storage_nodes(tier) if node not in avoid_nodes]
+            targets = (
+                [node for node in nodes if node not in {info["node_addr"] for info in shards_info}]
+                or [node for node in nodes if node not in {info["node_addr"] for info in survivors}]
+                or nodes
+            )
+            if not targets:
+                raise Exception(f"No healthy storage nodes in tier {tier} to repair onto")
+            
+            # New shard IDs, so a lost shard that reappears is never overwritten
+            shard_prefix = f"{bucket_name}-{object_key}-{uuid.uuid4().hex[:8]}"
+            template = {info["index"]: info for info in shards_info if info["shard_id"] in lost}
+            stored = await asyncio.gather(*[
+                self._store_shard(targets[i % len(targets)], f"{shard_prefix}-{index}", bucket_name, object_key,
+                                  rebuilt[index], template[index]["shard_type"], index, profile.total_shards)
+                for i, index in enumerate(wanted)
+            ], return_exceptions=True)
+            
+            replacements = {}
+            for index, result in zip(wanted, stored):
+                if not isinstance(result, Exception):
+                    replacements[index] = dict(template[index], **result)
+            if len(replacements) < len(wanted):
+                await self.delete_shards(bucket_name, object_key, list(replacements.values()))
+                raise next(result for result in stored if isinstance(result, Exception))
+            
+            logger.info("Shards rebuilt",
+                       bucket=bucket_name,
+                       object=object_key,
+                       coding=profile.coding,
+                       rebuilt=len(wanted))
+            
+            return [
+                replacements[info["index"]] if info["shard_id"] in lost else info
+                for info in shards_info
+            ]
+            
+        except Exception as e:
+            logger.error("Failed to rebuild shards",
+                        bucket=bucket_name,
+                        object=object_key,
+                        error=str(e))
+            raise
+    
+    async def replace_shards(self,
+                             bucket_name: str,
+                             object_key: str,
+                             old_shards: List[Dict[str, Any]],
+                             new_shards: List[Dict[str, Any]]) -> bool:
+        """Point an object record (or one of its parts) at new shards
+        
+        Swaps only if the record still has exactly ``old_shards``, so a
+        concurrent rewrite, migration or repair wins; returns whether it
+        swapped.  Objects packed into a repaired pack segment carry a copy
+        of its shard infos and are repointed too.
+        """
+        record = await self.raft_service.get_object(bucket_name, object_key)
+        if not record:
+            return False
+        
+        if record.get("shards") == old_shards:
+            update_data = {"shards": new_shards}
+        else:
+            parts = list(record.get("parts") or [])
+            index = next((i for i, part in enumerate(parts) if part.get("shards") == old_shards), None)
+            if index is None:
+                return False
+            parts[index] = dict(parts[index], shards=new_shards)
+            update_data = {"parts": parts}
+        await self.raft_service.update_object(bucket_name, object_key, update_data)
+        
+        if record.get("pack_segment"):
+            pack_id = record["pack_segment"]["pack_id"]
+            for packed in await list_object_records(self.raft_service, bucket_name):
+                pack_ref = packed.get("pack") or {}
+                if pack_ref.get("pack_id") == pack_id and pack_ref.get("shards") == old_shards:
+                    await self.raft_service.update_object(bucket_name, packed["object_key"], {
+                        "pack": dict(pack_ref, shards=new_shards)
+                    })
+        return True
+    
     async def delete_shards(self, 
                           bucket_name: str, 
                           object_key: str, 
@@ -169,33 +595,14 @@ class StorageService:
                        object=object_key,
                        shard_count=len(shards_info))
             
-            # Delete shards in parallel
-            tasks = []
-            for shard_info in shards_info:
-                task = self._delete_shard(
-                    node_addr=shard_info["node_addr"],
-                    shard_id=shard_info["shard_id"],
-                    bucket_name=bucket_name,
-                    object_key=object_key
-                )
-                tasks.append(task)
-            
-            results = await asyncio.gather(*tasks, return_exceptions=True)
-            
-            # Log results
-            successful_deletions = 0
-            for i, result in enumerate(results):
-                if isinstance(result, Exception):
-                    logger.warning("Failed to delete shard", 
-                                 shard_id=shards_info[i]["shard_id"],
-                                 error=str(result))
-                else:
-                    successful_deletions += 1
+            failed = await self.delete_shards_by_node(
+                bucket_name, [(object_key, shard_info) for shard_info in shards_info]
+            )
             
             logger.info("Shard deletion completed", 
                        bucket=bucket_name, 
                        object=object_key,
-                       successful_deletions=successful_deletions,
+                       successful_deletions=len(shards_info) - failed,
                        total_shards=len(shards_info))
             
         except Exception as e:
@@ -205,13 +612,83 @@ class StorageService:
                         error=str(e))
             raise
     
+    async def delete_shards_by_node(self, bucket_name: str, shards: List[Tuple[str, Dict[str, Any]]]) -> int:
+        """Delete ``(object_key, shard_info)`` pairs with one bulk request per node
+        
+        Each node's shards are sent in bulk-delete requests of up to
+        BULK_DELETE_BATCH_SIZE shards, with at most
+        ``delete_concurrency_per_node`` requests in flight per node.  A batch
+        whose bulk request fails is retried shard by shard.  Returns the
+        number of shards that could not be deleted (missing shards count as
+        deleted).
+        """
+        by_node: Dict[str, List[Tuple[str, str]]] = {}
+        for object_key, shard_info in shards:
+            by_node.setdefault(shard_info["node_addr"], []).append((object_key, shard_info["shard_id"]))
+        
+        async def delete_on_node(node_addr: str, node_shards: List[Tuple[str, str]]) -> int:
+            semaphore = asyncio.Semaphore(self.delete_concurrency_per_node)
+            
+            async def delete_one(object_key: str, shard_id: str):
+                async with semaphore:
+                    await self._delete_shard(node_addr, shard_id, bucket_name, object_key)
+            
+            async def delete_batch(batch: List[Tuple[str, str]]) -> int:
+                if node_addr not in self._no_bulk_delete:
+                    try:
+                        async with semaphore:
+                            return await self._bulk_delete_shards(node_addr, bucket_name, batch)
+                    except Exception as e:
+                        if isinstance(e, httpx.HTTPStatusError) and e.response.status_code in (404, 405):
+                            self._no_bulk_delete.add(node_addr)
+                        logger.warning("Bulk shard delete failed, deleting shards one by one",
+                                      node_addr=node_addr,
+                                      shards=len(batch),
+                                      error=str(e))
+                
+                results = await asyncio.gather(*[delete_one(*shard) for shard in batch], return_exceptions=True)
+                return sum(1 for result in results if isinstance(result, Exception))
+            
+            batches = [node_shards[i:i + BULK_DELETE_BATCH_SIZE]
+                       for i in range(0, len(node_shards), BULK_DELETE_BATCH_SIZE)]
+            return sum(await asyncio.gather(*[delete_batch(batch) for batch in batches]))
+        
+        failed = sum(await asyncio.gather(*[
+            delete_on_node(node_addr, node_shards) for node_addr, node_shards in by_node.items()
+        ]))
+        
+        logger.debug("Batched shard deletion completed",
+                    bucket=bucket_name,
+                    nodes=len(by_node),
+                    total_shards=len(shards),
+                    failed=failed)
+        return failed
+    
+    async def erasure_profile(self, bucket_name: str, tier: str) -> ErasureProfile:
+        """Coding profile for new data: the bucket's ``erasure_profile``, else the tier's, else the default"""
+        if bucket_name not in self._bucket_profiles:
+            bucket = await self.raft_service.get_bucket(bucket_name)
+            coding = (bucket or {}).get("erasure_profile")
+            self._bucket_profiles[bucket_name] = ErasureProfile.parse(coding) if coding else None
+        return self._bucket_profiles[bucket_name] or self.tier_profiles.get(tier, self.default_profile)
+    
     async def migrate_shards(self, 
                            bucket_name: str, 
                            object_key: str, 
                            shards_info: List[Dict[str, Any]], 
                            from_tier: str, 
-                           to_tier: str) -> List[Dict[str, Any]]:
-        """Migrate shards from one tier to another"""
+                           to_tier: str,
+                           on_copied: Optional[Callable[[int], None]] = None) -> List[Dict[str, Any]]:
+        """Copy shards to nodes of another tier and return the copies' shard infos
+        
+        Shards are copied as they are when they already have the coding
+        profile of the target tier (see erasure_profile), so nothing is
+        decoded or re-encoded; otherwise the data is reconstructed and
+        encoded with the target profile.  The
+        old shards are left in place: the caller swaps the metadata to the
+        returned shards and then deletes them (see migrate_object).
+        ``on_copied`` is called with the size of every source shard moved.
+        """
         try:
             logger.info("Starting shard migration", 
                        bucket=bucket_name, 
@@ -219,29 +696,52 @@ class StorageService:
                        from_tier=from_tier,
                        to_tier=to_tier)
             
-            # Get target storage nodes for the new tier
-            target_nodes = await self.raft_service.get_storage_nodes(to_tier)
-            if len(target_nodes) < len(shards_info):
-                raise Exception(f"Insufficient target nodes: need {len(shards_info)}, have {len(target_nodes)}")
-            
-            # Retrieve data from source shards
-            reconstructed_data = await self.retrieve_and_reconstruct_shards(
-                bucket_name, object_key, shards_info
-            )
+            # Copies get new shard IDs so they never overwrite a source shard,
+            # even when a node serves both tiers
+            shard_prefix = f"{bucket_name}-{object_key}-{uuid.uuid4().hex[:8]}"
             
-            # Store to new tier
-            new_shard_infos = await self.encode_and_store_shards(
-                bucket_name, object_key, reconstructed_data, to_tier
-            )
-            
-            # Delete old shards
-            await self.delete_shards(bucket_name, object_key, shards_info)
+            target_profile = await self.erasure_profile(bucket_name, to_tier)
+            if ErasureProfile.of_shards(shards_info) != target_profile:
+                if self.transfer_throttle:
+                    await asyncio.gather(*[
+                        self.transfer_throttle([info["node_addr"]], info["size"]) for info in shards_info
+                    ])
+                reconstructed_data = await self.retrieve_and_reconstruct_shards(
+                    bucket_name, object_key, shards_info, read_repair=False
+                )
+                new_shard_infos = await self.encode_and_store_shards(
+                    bucket_name, object_key, reconstructed_data, to_tier,
+                    shard_prefix=shard_prefix, profile=target_profile
+                )
+                SHARDS_MIGRATED.labels(mode="reencode").inc(len(new_shard_infos))
+                SHARD_BYTES_MIGRATED.labels(mode="reencode").inc(sum(info["size"] for info in new_shard_infos))
+                if on_copied:
+                    on_copied(sum(info["size"] for info in shards_info))
+            else:
+                target_nodes = await self.raft_service.get_storage_nodes(to_tier)
+                if len(target_nodes) < len(shards_info):
+                    raise Exception(f"Insufficient target nodes: need {len(shards_info)}, have {len(target_nodes)}")
+                
+                ordered = sorted(shards_info, key=lambda info: info["index"])
+                results = await asyncio.gather(*[
+                    self._copy_shard(bucket_name, object_key, info, target_nodes[i % len(target_nodes)],
+                                     f"{shard_prefix}-{info['index']}", on_copied)
+                    for i, info in enumerate(ordered)
+                ], return_exceptions=True)
+                
+                new_shard_infos = [result for result in results if not isinstance(result, Exception)]
+                errors = [result for result in results if isinstance(result, Exception)]
+                if errors:
+                    # Don't leave partial copies behind
+                    await self.delete_shards(bucket_name, object_key, new_shard_infos)
+                    raise errors[0]
             
             logger.info("Shard migration completed", 
                        bucket=bucket_name, 
                        object=object_key,
                        from_tier=from_tier,
-                       to_tier=to_tier)
+                       to_tier=to_tier,
+                       shards=len(new_shard_infos))
             
             return new_shard_infos
             
@@ -254,65 +754,167 @@ class StorageService:
                         error=str(e))
             raise
     
-    async def _encode_data(self, data: bytes) -> List[bytes]:
-        """Encode data into Reed-Solomon shards"""
-        try:
-            # Simple sharding for demo - in production use proper Reed-Solomon
-            shard_size = (len(data) + self.data_shards - 1) // self.data_shards
-            shards = []
-            
-            # Create data shards
-            for i in range(self.data_shards):
-                start = i * shard_size
-                end = min(start + shard_size, len(data))
-                shard = data[start:end]
-                
-                # Pad shard to consistent size
-                if len(shard) < shard_size:
-                    shard += b'\x00' * (shard_size - len(shard))
-                
-                shards.append(shard)
-            
-            # Create parity shards (simplified XOR for demo)
-            for i in range(self.parity_shards):
-                parity_shard = bytearray(shard_size)
-                for j in range(self.data_shards):
-                    for k in range(shard_size):
-                        if k < len(shards[j]):
-                            parity_shard[k] ^= shards[j][k]
-                shards.append(bytes(parity_shard))
+    async def _copy_shard(self,
+                          bucket_name: str,
+                          object_key: str,
+                          source: Dict[str, Any],
+                          target_node: str,
+                          shard_id: str,
+                          on_copied: Optional[Callable[[int], None]] = None) -> Dict[str, Any]:
+        """Copy one shard to ``target_node`` as ``shard_id``, verifying its checksum
+        
+        The target node pulls the shard straight from the source node
+        (/shard/fetch).  Nodes without that endpoint get the shard relayed
+        through this service instead.
+        """
+        target = dict(source, shard_id=shard_id, node_id=target_node, node_addr=target_node)
+        if self.transfer_throttle:
+            await self.transfer_throttle([source["node_addr"], target_node], source["size"])
+        
+        copied = None
+        if target_node not in self._no_shard_fetch:
+            try:
+                response = await self.client.post(f"http://{target_node}/shard/fetch", json={
+                    "sourceAddr": source["node_addr"],
+                    "sourceShardId": source["shard_id"],
+                    "shardId": shard_id,
+                    "bucketName": bucket_name,
+                    "objectKey": object_key,
+                    "shardType": source["shard_type"],
+                    "index": source["index"],
+                    "totalShards": ErasureProfile.of_shards([source]).total_shards,
+                    "checksum": source.get("checksum", "")
+                }, timeout=httpx.Timeout(30.0, read=SHARD_FETCH_TIMEOUT))
+                response.raise_for_status()
+                result = response.json()
+                SHARDS_MIGRATED.labels(mode="copy").inc()
+                SHARD_BYTES_MIGRATED.labels(mode="copy").inc(result.get("size", 0))
+                copied = dict(target, size=result.get("size", source["size"]), checksum=result.get("checksum", ""))
+            except httpx.HTTPStatusError as e:
+                if e.response.status_code not in (404, 405):
+                    raise
+                self._no_shard_fetch.add(target_node)
+        
+        if copied is None:
+            shard_data = await self._retrieve_shard(source["node_addr"], source["shard_id"], bucket_name, object_key)
+            checksum = await self.executor.run(_sha256_hex, shard_data, task="hash")
+            if source.get("checksum") and checksum != source["checksum"]:
+                raise Exception(f"Checksum mismatch reading shard {source['shard_id']} from {source['node_addr']}")
             
-            return shards
-            
-        except Exception as e:
-            logger.error("Failed to encode data", error=str(e))
+            stored = await self._store_shard(target_node, shard_id, bucket_name, object_key,
+                                             shard_data, source["shard_type"], source["index"],
+                                             ErasureProfile.of_shards([source]).total_shards)
+            SHARDS_MIGRATED.labels(mode="relay").inc()
+            SHARD_BYTES_MIGRATED.labels(mode="relay").inc(len(shard_data))
+            copied = dict(target, **stored)
+        
+        if on_copied:
+            on_copied(source["size"])
+        return copied
+    
+    async def migrate_object(self,
+                             bucket_name: str,
+                             object_key: str,
+                             to_tier: str,
+                             progress: Optional[Callable[[int, int], None]] = None) -> Dict[str, Any]:
+        """Move an object's data to another tier and record the new tier
+        
+        Copy-then-swap: the object's shards (and those of its multipart
+        parts) that are not already on nodes of ``to_tier`` with the coding
+        profile new data there gets are copied (or re-encoded) there,
+        the object record is updated to point at the copies, and only then
+        are the old shards deleted.  If the object was deleted or rewritten
+        during the copy, the copies are deleted instead.  Inline, packed and
+        deduplicated data is shared or metadata-resident and is not moved.
+        ``progress`` is called with (bytes moved, bytes to move).
+        """
+        record = await self.raft_service.get_object(bucket_name, object_key)
+        if not record:
+            raise Exception("Object not found")
+        from_tier = record.get("tier")
+        
+        target_nodes = set(await self.raft_service.get_storage_nodes(to_tier))
+        target_profile = await self.erasure_profile(bucket_name, to_tier)
+        placements = ([record] if record.get("shards") else []) + [
+            part for part in record.get("parts") or [] if part.get("shards")
+        ]
+        moves = [
+            placement for placement in placements
+            if any(info["node_addr"] not in target_nodes for info in placement["shards"])
+            or ErasureProfile.of_shards(placement["shards"]) != target_profile
+        ]
+        
+        bytes_total = sum(info["size"] for placement in moves for info in placement["shards"])
+        bytes_moved = 0
+        
+        def on_copied(size: int):
+            nonlocal bytes_moved
+            bytes_moved += size
+            if progress:
+                progress(bytes_moved, bytes_total)
+        
+        if progress:
+            progress(0, bytes_total)
+        
+        copies = {}
+        try:
+            for placement in moves:
+                copies[id(placement)] = await self.migrate_shards(
+                    bucket_name, object_key, placement["shards"], from_tier, to_tier, on_copied
+                )
+        except Exception:
+            for new_shards in copies.values():
+                await self.delete_shards(bucket_name, object_key, new_shards)
             raise
+        
+        old_shards = [info for placement in moves for info in placement["shards"]]
+        new_shards = [info for new in copies.values() for info in new]
+        
+        # Swap only if the object still has the shards that were copied
+        current = await self.raft_service.get_object(bucket_name, object_key)
+        if current is None or all_shard_infos(current) != all_shard_infos(record):
+            await self.delete_shards(bucket_name, object_key, new_shards)
+            raise Exception("Object changed during migration")
+        
+        update_data = {"tier": to_tier, "tier_updated_at": str(int(time.time()))}
+        if id(record) in copies:
+            update_data["shards"] = copies[id(record)]
+        if record.get("parts"):
+            update_data["parts"] = [
+                dict(part, shards=copies[id(part)]) if id(part) in copies else part
+                for part in record["parts"]
+            ]
+        await self.raft_service.update_object(bucket_name, object_key, update_data)
+        
+        if old_shards:
+            await self.delete_shards(bucket_name, object_key, old_shards)
+        
+        return {
+            "from_tier": from_tier,
+            "to_tier": to_tier,
+            "shards_moved": len(new_shards),
+            "bytes_moved": sum(info.get("size", 0) for info in new_shards)
+        }
     
-    async def _decode_shards(self, shard_data: List[Optional[bytes]]) -> bytes:
-        """Decode shards back to original data"""
+    async def _encode_data(self, data: bytes, profile: ErasureProfile) -> List[bytes]:
+        """Encode data into the shards of a coding profile"""
         try:
-            # Simple reconstruction for demo - in production use proper Reed-Solomon
-            available_data_shards = []
+            # Shards are encoded in column stripes so large objects spread over
+            # all compute workers instead of blocking the event loop
+            k = profile.data_shards
+            shard_size = (len(data) + k - 1) // k
+            stripes = [
+                (profile.coding, k, shard_size, start, min(start + self.stripe_size, shard_size))
+                for start in range(0, shard_size, self.stripe_size)
+            ] or [(profile.coding, k, 0, 0, 0)]
             
-            for i in range(self.data_shards):
-                if i < len(shard_data) and shard_data[i] is not None:
-                    available_data_shards.append(shard_data[i])
-            
-            if len(available_data_shards) < self.data_shards:
-                # In a real implementation, we would use parity shards to reconstruct
-                # missing data shards. For demo, we'll just concatenate available ones.
-                logger.warning("Missing data shards, reconstruction may be incomplete")
-            
-            # Concatenate data shards
-            reconstructed = b''.join(available_data_shards)
-            
-            # Remove padding
-            reconstructed = reconstructed.rstrip(b'\x00')
-            
-            return reconstructed
+            encoded = await self.executor.map_buffer(_encode_stripe, data, stripes, task="erasure_encode")
+            if len(encoded) == 1:
+                return encoded[0]
+            return await self.executor.run(_join_stripes, encoded, profile.total_shards, task="erasure_encode")
             
         except Exception as e:
-            logger.error("Failed to decode shards", error=str(e))
+            logger.error("Failed to encode data", error=str(e))
             raise
     
     async def _store_shard(self, 
@@ -322,13 +924,14 @@ class StorageService:
                          object_key: str, 
                          shard_data: bytes, 
                          shard_type: str, 
-                         index: int) -> Dict[str, Any]:
+                         index: int,
+                         total_shards: int) -> Dict[str, Any]:
         """Store a single shard on a storage node"""
         try:
             url = f"http://{node_addr}/shard/upload"
             
             # Calculate checksum
-            checksum = hashlib.sha256(shard_data).hexdigest()
+            checksum = await self.executor.run(_sha256_hex, shard_data, task="hash")
             
             # Prepare multipart form data
             files = {
@@ -341,7 +944,7 @@ class StorageService:
                 'objectKey': object_key,
                 'shardType': shard_type,
                 'index': str(index),
-                'totalShards': str(self.total_shards)
+                'totalShards': str(total_shards)
             }
             
             response = await self.client.post(url, files=files, data=data)
@@ -370,18 +973,25 @@ class StorageService:
                             node_addr: str, 
                             shard_id: str, 
                             bucket_name: str, 
-                            object_key: str) -> bytes:
-        """Retrieve a single shard from a storage node"""
+                            object_key: str,
+                            byte_range: Optional[Tuple[int, int]] = None) -> bytes:
+        """Retrieve a single shard (or the byte range [start, end) of it) from a storage node"""
         try:
             url = f"http://{node_addr}/shard/download/{shard_id}"
             params = {
                 'bucket': bucket_name,
                 'object': object_key
             }
+            headers = {}
+            if byte_range:
+                headers['Range'] = f"bytes={byte_range[0]}-{byte_range[1] - 1}"
             
-            response = await self.client.get(url, params=params)
+            response = await self.client.get(url, params=params, headers=headers)
             response.raise_for_status()
             
+            # Nodes without range support answer 200 with the whole shard
+            if byte_range and response.status_code != 206:
+                return response.content[byte_range[0]:byte_range[1]]
             return response.content
             
         except Exception as e:
@@ -391,6 +1001,41 @@ class StorageService:
                         error=str(e))
             raise
     
+    async def verify_shard(self,
+                           node_addr: str,
+                           shard_id: str,
+                           bucket_name: str,
+                           object_key: str,
+                           checksum: str = "") -> Optional[str]:
+        """Checksum of a shard as stored on its node, or None if the node does not have it
+        
+        The node hashes the shard itself (/shard/verify); nodes without that
+        endpoint have the shard downloaded and hashed here.  An unreadable
+        shard yields an empty checksum.
+        """
+        if node_addr not in self._no_shard_verify:
+            response = await self.client.get(
+                f"http://{node_addr}/shard/verify/{shard_id}",
+                params={'bucket': bucket_name, 'object': object_key, 'checksum': checksum},
+                timeout=httpx.Timeout(30.0, read=SHARD_FETCH_TIMEOUT)
+            )
+            if response.status_code == 200:
+                return response.json().get("checksum", "")
+            if response.status_code not in (404, 405):
+                response.raise_for_status()
+        
+        # A 404 is a missing shard or a node without /shard/verify; the
+        # download tells them apart
+        response = await self.client.get(
+            f"http://{node_addr}/shard/download/{shard_id}",
+            params={'bucket': bucket_name, 'object': object_key}
+        )
+        if response.status_code == 404:
+            return None
+        response.raise_for_status()
+        self._no_shard_verify.add(node_addr)
+        return await self.executor.run(_sha256_hex, response.content, task="hash")
+    
     async def _delete_shard(self, 
                           node_addr: str, 
                           shard_id: str, 
@@ -404,6 +1049,7 @@ class StorageService:
                 'object': object_key
             }
             
+            SHARD_DELETE_REQUESTS.labels(mode="single").inc()
             response = await self.client.delete(url, params=params)
             response.raise_for_status()
             
@@ -414,6 +1060,44 @@ class StorageService:
                         error=str(e))
             raise
     
+    async def _bulk_delete_shards(self, node_addr: str, bucket_name: str, shards: List[Tuple[str, str]]) -> int:
+        """Delete ``(object_key, shard_id)`` pairs on one node; returns the number that failed"""
+        url = f"http://{node_addr}/shard/bulk-delete"
+        payload = {
+            "bucket": bucket_name,
+            "shards": [{"shardId": shard_id, "object": object_key} for object_key, shard_id in shards]
+        }
+        
+        SHARD_DELETE_REQUESTS.labels(mode="bulk").inc()
+        response = await self.client.post(url, json=payload)
+        response.raise_for_status()
+        
+        failed = [result for result in response.json().get("results", []) if result.get("status") == "error"]
+        for result in failed:
+            logger.warning("Failed to delete shard",
+                          node_addr=node_addr,
+                          shard_id=result.get("shardId"),
+                          error=result.get("error"))
+        return len(failed)
+    
+    async def list_node_shards(self, node_addr: str, bucket_name: Optional[str] = None) -> List[Dict[str, Any]]:
+        """List the shard metadata stored on a node, optionally for one bucket"""
+        try:
+            url = f"http://{node_addr}/shard/list"
+            params = {'bucket': bucket_name} if bucket_name else None
+            
+            response = await self.client.get(url, params=params)
+            response.raise_for_status()
+            
+            return response.json().get("shards") or []
+            
+        except Exception as e:
+            logger.error("Failed to list node shards", 
+                        node_addr=node_addr, 
+                        bucket=bucket_name, 
+                        error=str(e))
+            raise
+    
     async def get_shard_health(self, node_addr: str) -> Dict[str, Any]:
         """Get health status of a storage node"""
         try:
@@ -443,16 +1127,15 @@ class StorageService:
                        new_tier=new_tier)
             
             # Get current metadata
-            metadata = await self.get_object_metadata(bucket_name, object_key)
+            metadata = await self.raft_service.get_object(bucket_name, object_key)
             if not metadata:
                 raise Exception("Object not found")
             
-            # Update tier in metadata
-            metadata["tier"] = new_tier
-            metadata["tier_updated_at"] = str(int(time.time()))
-            
-            # Store updated metadata via Raft
-            await self.raft_service.store_object_metadata(bucket_name, object_key, metadata)
+            # Update tier in metadata via Raft
+            await self.raft_service.update_object(bucket_name, object_key, {
+                "tier": new_tier,
+                "tier_updated_at": str(int(time.time()))
+            })
             
             logger.info("Object tier updated successfully", 
                        bucket=bucket_name, 
@@ -473,4 +1156,24 @@ class StorageService:
         """Close storage service"""
         if self.client:
             await self.client.aclose()
-        logger.info("Storage service closed")
\ No newline at end of file
+        logger.info("Storage service closed")
+
+
+def create_storage_service(raft_service) -> StorageService:
+    """Create a storage service using the configured erasure coding, packing and read-repair policy"""
+    from app.services.pack_service import get_pack_writer
+    from app.services.read_repair import get_read_repairer
+    
+    settings = get_settings()
+    return StorageService(
+        raft_service,
+        data_shards=settings.data_shards,
+        parity_shards=settings.parity_shards,
+        stripe_size=settings.erasure_stripe_size,
+        pack_writer=get_pack_writer(),
+        inline_threshold=settings.inline_object_threshold,
+        pack_threshold=settings.pack_object_threshold,
+        delete_concurrency_per_node=settings.shard_delete_concurrency_per_node,
+        tier_profiles=settings.erasure_tier_profiles,
+        read_repairer=get_read_repairer()
+    )
@@ -5,7 +5,8 @@ HashiCorp Vault service for encryption key management
 import asyncio
 import base64
 import json
-from typing import Dict, Any, Optional
+from collections import deque
+from typing import Dict, Any, Optional, AsyncIterator
 
 import hvac
 import structlog
@@ -13,16 +14,36 @@ from cryptography.fernet import Fernet
 from cryptography.hazmat.primitives import hashes
 from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
 
+from app.core.segmented_aead import (
+    DEFAULT_SEGMENT_SIZE,
+    HEADER_SIZE,
+    SegmentedAEAD,
+    is_segmented,
+    iter_batches,
+    plaintext_size,
+    segment_count,
+)
+from app.services.compute_executor import ComputeExecutor, get_compute_executor
+
 logger = structlog.get_logger(__name__)
 
 
 class VaultService:
     """Service for interacting with HashiCorp Vault"""
     
-    def __init__(self, vault_url: str, vault_token: str, mount_point: str = "intellistore"):
+    def __init__(self,
+                 vault_url: str,
+                 vault_token: str,
+                 mount_point: str = "intellistore",
+                 segment_size: int = DEFAULT_SEGMENT_SIZE,
+                 segments_per_task: int = 16,
+                 executor: Optional[ComputeExecutor] = None):
         self.vault_url = vault_url
         self.vault_token = vault_token
         self.mount_point = mount_point
+        self.segment_size = segment_size
+        self.segments_per_task = segments_per_task
+        self.executor = executor or get_compute_executor()
         self.client = None
         self._initialized = False
     
@@ -97,6 +118,17 @@ class VaultService:
             logger.error("Failed to setup KV engine", error=str(e))
             raise
     
+    def _read_data_key(self, key_path: str) -> Optional[str]:
+        """Stored data key at ``key_path``, or None if there is none"""
+        try:
+            response = self.client.secrets.kv.v2.read_secret_version(
+                path=key_path,
+                mount_point=f"{self.mount_point}-kv"
+            )
+            return response["data"]["data"]["key"]
+        except hvac.exceptions.InvalidPath:
+            return None
+    
     async def get_data_key(self, bucket_name: str, object_key: str) -> str:
         """Get or create a data encryption key for an object"""
         if not self._initialized:
@@ -107,15 +139,9 @@ class VaultService:
             key_path = f"data-keys/{bucket_name}/{object_key}"
             
             # Try to get existing key
-            try:
-                response = self.client.secrets.kv.v2.read_secret_version(
-                    path=key_path,
-                    mount_point=f"{self.mount_point}-kv"
-                )
-                return response["data"]["data"]["key"]
-            except hvac.exceptions.InvalidPath:
-                # Key doesn't exist, create new one
-                pass
+            existing = self._read_data_key(key_path)
+            if existing is not None:
+                return existing
             
             # Generate new data key using transit engine
             response = self.client.secrets.transit.generate_data_key(
@@ -127,18 +153,28 @@ class VaultService:
             plaintext_key = response["data"]["plaintext"]
             ciphertext_key = response["data"]["ciphertext"]
             
-            # Store the encrypted key in KV store
-            self.client.secrets.kv.v2.create_or_update_secret(
-                path=key_path,
-                secret={
-                    "key": plaintext_key,
-                    "encrypted_key": ciphertext_key,
-                    "bucket": bucket_name,
-                    "object": object_key,
-                    "created_at": str(asyncio.get_event_loop().time())
-                },
-                mount_point=f"{self.mount_point}-kv"
-            )
+            # Store the encrypted key in KV store, only if no other writer
+            # (another request or API replica) created it in the meantime
+            try:
+                self.client.secrets.kv.v2.create_or_update_secret(
+                    path=key_path,
+                    secret={
+                        "key": plaintext_key,
+                        "encrypted_key": ciphertext_key,
+                        "bucket": bucket_name,
+                        "object": object_key,
+                        "created_at": str(asyncio.get_event_loop().time())
+                    },
+                    cas=0,
+                    mount_point=f"{self.mount_point}-kv"
+                )
+            except hvac.exceptions.InvalidRequest:
+                # Lost the check-and-set race: use the key that was stored
+                existing = self._read_data_key(key_path)
+                if existing is None:
+                    raise
+                logger.debug("Data key created concurrently", bucket=bucket_name, object=object_key)
+                return existing
             
             logger.debug("Data key generated", bucket=bucket_name, object=object_key)
             return plaintext_key
@@ -150,36 +186,91 @@ class VaultService:
                         error=str(e))
             raise
     
+    @staticmethod
+    def _key_bytes(key: str) -> bytes:
+        """Decode a base64 data key from Vault"""
+        return base64.b64decode(key.encode())
+    
+    @staticmethod
+    def _fernet(key: str) -> Fernet:
+        """Cipher for objects written before segmented encryption"""
+        key_bytes = base64.b64decode(key.encode())
+        return Fernet(base64.urlsafe_b64encode(key_bytes[:32]))
+    
+    async def _run(self, func, *args):
+        """Run CPU-bound crypto work on the compute executor's thread pool"""
+        return await self.executor.run(func, *args, task="crypto")
+    
     async def encrypt_data(self, data: bytes, key: str) -> bytes:
-        """Encrypt data using the provided key"""
+        """Encrypt data using the provided key
+        
+        Data is sealed in fixed-size AES-GCM segments; batches of segments are
+        encrypted concurrently on the compute executor.
+        """
         try:
-            # Decode the base64 key
-            key_bytes = base64.b64decode(key.encode())
-            
-            # Create Fernet cipher
-            fernet = Fernet(base64.urlsafe_b64encode(key_bytes[:32]))
-            
-            # Encrypt data
-            encrypted_data = fernet.encrypt(data)
-            
-            logger.debug("Data encrypted", size=len(data), encrypted_size=len(encrypted_data))
+            aead = SegmentedAEAD(self._key_bytes(key), self.segment_size)
+            header = aead.new_header()
+            total = segment_count(len(data), aead.segment_size)
+            view = memoryview(data)
+            
+            tasks = [
+                self._run(aead.encrypt_segments, header, view[first * aead.segment_size:last * aead.segment_size],
+                          first, last == total)
+                for first, last in iter_batches(0, total, self.segments_per_task)
+            ]
+            sealed = await asyncio.gather(*tasks)
+            encrypted_data = header + b"".join(sealed)
+            
+            logger.debug("Data encrypted", size=len(data), encrypted_size=len(encrypted_data), segments=total)
             return encrypted_data
             
         except Exception as e:
             logger.error("Failed to encrypt data", error=str(e))
             raise
     
+    async def encrypt_stream(self, chunks: AsyncIterator[bytes], key: str) -> AsyncIterator[bytes]:
+        """Encrypt an async stream of plaintext chunks, yielding ciphertext
+        
+        Only about one batch of plaintext per compute worker is buffered, so the
+        whole plaintext never has to be held in memory.
+        """
+        aead = SegmentedAEAD(self._key_bytes(key), self.segment_size)
+        header = aead.new_header()
+        batch_bytes = self.segments_per_task * aead.segment_size
+        pending = deque()
+        buffer = bytearray()
+        index = 0
+        
+        yield header
+        try:
+            async for chunk in chunks:
+                buffer += chunk
+                # Keep at least one byte back so the final segment is sealed as last
+                while len(buffer) > batch_bytes:
+                    batch = bytes(buffer[:batch_bytes])
+                    del buffer[:batch_bytes]
+                    pending.append(asyncio.ensure_future(
+                        self._run(aead.encrypt_segments, header, batch, index, False)))
+                    index += self.segments_per_task
+                    if len(pending) >= self.executor.max_workers:
+                        yield await pending.popleft()
+            
+            pending.append(asyncio.ensure_future(
+                self._run(aead.encrypt_segments, header, bytes(buffer), index, True)))
+            while pending:
+                yield await pending.popleft()
+        finally:
+            # The source failed or the consumer stopped early
+            for task in pending:
+                task.cancel()
+    
     async def decrypt_data(self, encrypted_data: bytes, key: str) -> bytes:
         """Decrypt data using the provided key"""
         try:
-            # Decode the base64 key
-            key_bytes = base64.b64decode(key.encode())
-            
-            # Create Fernet cipher
-            fernet = Fernet(base64.urlsafe_b64encode(key_bytes[:32]))
-            
-            # Decrypt data
-            decrypted_data = fernet.decrypt(encrypted_data)
+            if not is_segmented(encrypted_data):
+                decrypted_data = await self._run(self._fernet(key).decrypt, bytes(encrypted_data))
+            else:
+                decrypted_data = b"".join([piece async for piece in self.decrypt_stream(encrypted_data, key)])
             
             logger.debug("Data decrypted", encrypted_size=len(encrypted_data), size=len(decrypted_data))
             return decrypted_data
@@ -188,6 +279,60 @@ class VaultService:
             logger.error("Failed to decrypt data", error=str(e))
             raise
     
+    async def decrypt_stream(self, 
+                           encrypted_data: bytes, 
+                           key: str, 
+                           start: int = 0, 
+                           end: Optional[int] = None) -> AsyncIterator[bytes]:
+        """Decrypt the plaintext byte range [start, end), yielding it in pieces
+        
+        Only the segments covering the range are authenticated and decrypted.
+        Up to one batch per compute worker is decrypted ahead of the consumer.
+        """
+        if not is_segmented(encrypted_data):
+            # Fernet tokens can only be decrypted as a whole
+            decrypted = await self._run(self._fernet(key).decrypt, bytes(encrypted_data))
+            yield decrypted[start:end]
+            return
+        
+        segment_size, _ = SegmentedAEAD.parse_header(encrypted_data)
+        aead = SegmentedAEAD(self._key_bytes(key), segment_size)
+        total = aead.segments_in(encrypted_data)
+        size = plaintext_size(len(encrypted_data), segment_size)
+        end = size if end is None else min(end, size)
+        if start >= end and size > 0:
+            return
+        
+        header = bytes(encrypted_data[:HEADER_SIZE])
+        view = memoryview(encrypted_data)
+        first, last = aead.segment_span(start, end)
+        pending = deque()
+        
+        def submit(batch_first: int, batch_last: int):
+            sealed_start, sealed_end = aead.sealed_span(batch_first, batch_last)
+            future = asyncio.ensure_future(self._run(
+                aead.decrypt_segments, header, view[sealed_start:sealed_end], batch_first, batch_last == total))
+            pending.append((batch_first, future))
+        
+        batches = iter_batches(first, last, self.segments_per_task)
+        for batch in batches:
+            submit(*batch)
+            if len(pending) >= self.executor.max_workers:
+                break
+        
+        while pending:
+            batch_first, future = pending.popleft()
+            plaintext = await future
+            next_batch = next(batches, None)
+            if next_batch:
+                submit(*next_batch)
+            
+            # Trim the first and last batches to the requested range
+            offset = batch_first * segment_size
+            lo = max(start - offset, 0)
+            hi = min(end - offset, len(plaintext))
+            yield plaintext[lo:hi]
+    
     async def delete_data_key(self, bucket_name: str, object_key: str):
         """Delete a data encryption key"""
         if not self._initialized:
@@ -280,31 +425,54 @@ path "{self.mount_point}-kv/data/data-keys/{bucket_name}/*" {{
                         error=str(e))
             raise
     
-    async def get_bucket_keys(self, bucket_name: str) -> list:
-        """List all data keys for a bucket"""
-        if not self._initialized:
-            raise Exception("Vault service not initialized")
-        
+    def _list_key_paths(self, path: str) -> list:
+        """List KV entries under a path ("name/" entries are folders)"""
         try:
-            key_path = f"data-keys/{bucket_name}"
-            
             response = self.client.secrets.kv.v2.list_secrets(
-                path=key_path,
+                path=path,
                 mount_point=f"{self.mount_point}-kv"
             )
-            
             return response["data"]["keys"]
-            
         except hvac.exceptions.InvalidPath:
             return []
+    
+    async def list_key_buckets(self) -> list:
+        """List the buckets that have data keys"""
+        if not self._initialized:
+            raise Exception("Vault service not initialized")
+        
+        try:
+            return [name.rstrip("/") for name in self._list_key_paths("data-keys")]
+        except Exception as e:
+            logger.error("Failed to list data key buckets", error=str(e))
+            raise
+    
+    async def get_bucket_keys(self, bucket_name: str) -> list:
+        """List all data keys for a bucket (object keys containing "/" included)"""
+        if not self._initialized:
+            raise Exception("Vault service not initialized")
+        
+        try:
+            keys = []
+            folders = [""]
+            while folders:
+                folder = folders.pop()
+                for name in self._list_key_paths(f"data-keys/{bucket_name}/{folder}".rstrip("/")):
+                    if name.endswith("/"):
+                        folders.append(folder + name)
+                    else:
+                        keys.append(folder + name)
+            
+            return keys
+            
         except Exception as e:
             logger.error("Failed to list bucket keys", 
                         bucket=bucket_name, 
                         error=str(e))
             raise
     
-    async def cleanup_bucket_keys(self, bucket_name: str):
-        """Delete all data keys for a bucket"""
+    async def cleanup_bucket_keys(self, bucket_name: str) -> int:
+        """Delete all data keys for a bucket; returns the number deleted"""
         if not self._initialized:
             raise Exception("Vault service not initialized")
         
@@ -317,6 +485,7 @@ path "{self.mount_point}-kv/data/data-keys/{bucket_name}/*" {{
                 await self.delete_data_key(bucket_name, key)
             
             logger.info("Bucket keys cleaned up", bucket=bucket_name, count=len(keys))
+            return len(keys)
             
         except Exception as e:
             logger.error("Failed to cleanup bucket keys", 
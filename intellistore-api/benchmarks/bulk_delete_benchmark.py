@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Benchmark batched shard deletion: per-shard DELETE vs per-node bulk-delete
+
+Stores many sharded objects on in-process storage nodes (see
+small_object_benchmark.SimulatedNodes) and deletes them all through
+StorageService.delete_shards_by_node, once against nodes that only support
+per-shard deletes and once against nodes with /shard/bulk-delete.  Reports
+delete time and node requests per object.
+
+Usage:
+    python benchmarks/bulk_delete_benchmark.py [--count 200] [--size 4096] [--latency-ms 2]
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import sys
+import time
+from typing import Dict
+
+sys.path.insert(0, os.path.dirname(__file__))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import httpx  # noqa: E402
+import structlog  # noqa: E402
+
+from app.services.storage_service import StorageService, all_shard_infos  # noqa: E402
+from small_object_benchmark import InMemoryMetadata, SimulatedNodes  # noqa: E402
+
+
+async def run_mode(count: int, size: int, latency: float, bulk_delete: bool) -> Dict[str, float]:
+    nodes = SimulatedNodes(latency, bulk_delete=bulk_delete)
+    service = StorageService(InMemoryMetadata(9))
+    service.client = httpx.AsyncClient(transport=httpx.MockTransport(nodes.handle))
+
+    placements = await asyncio.gather(*[
+        service.store_object_data("bench", f"obj-{i}", os.urandom(size)) for i in range(count)
+    ])
+    shards = [(f"obj-{i}", info) for i, placement in enumerate(placements) for info in all_shard_infos(placement)]
+
+    requests = nodes.requests
+    start = time.perf_counter()
+    failed = await service.delete_shards_by_node("bench", shards)
+    elapsed = time.perf_counter() - start
+    assert failed == 0 and not nodes.shards
+
+    await service.close()
+    return {
+        "time": elapsed,
+        "shards": len(shards),
+        "requests": (nodes.requests - requests) / count,
+    }
+
+
+async def run(count: int, size: int, latency: float):
+    print(f"{count} objects of {size} bytes, {latency * 1000:.1f} ms per node request")
+    print(f"{'mode':>8} {'shards':>8} {'DEL s':>8} {'req/obj':>10}")
+    for name, bulk_delete in (("single", False), ("bulk", True)):
+        stats = await run_mode(count, size, latency, bulk_delete)
+        print(f"{name:>8} {stats['shards']:>8} {stats['time']:>8.3f} {stats['requests']:>10.3f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--count", type=int, default=200, help="Number of objects")
+    parser.add_argument("--size", type=int, default=4096, help="Object size in bytes")
+    parser.add_argument("--latency-ms", type=float, default=2.0, help="Simulated latency per node request")
+    args = parser.parse_args()
+
+    structlog.configure(wrapper_class=structlog.make_filtering_bound_logger(logging.WARNING))
+    asyncio.run(run(args.count, args.size, args.latency_ms / 1000))
+
+
+if __name__ == "__main__":
+    main()
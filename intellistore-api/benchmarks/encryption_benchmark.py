@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Benchmark segmented AES-GCM encryption against whole-object Fernet
+
+Reports encrypt/decrypt throughput (GB/s) and storage overhead for a few
+object sizes.  Runs without Vault: a random data key is used directly.
+
+Usage:
+    python benchmarks/encryption_benchmark.py [--sizes 1,16,64] [--workers 4]
+"""
+
+import argparse
+import asyncio
+import base64
+import logging
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import structlog  # noqa: E402
+from cryptography.fernet import Fernet  # noqa: E402
+
+from app.services.compute_executor import ComputeExecutor  # noqa: E402
+from app.services.vault_service import VaultService  # noqa: E402
+
+MB = 1024 * 1024
+
+
+def gbps(size: int, seconds: float) -> float:
+    return size / seconds / 1e9 if seconds > 0 else float("inf")
+
+
+def best_of(runs: int, func, *args):
+    best = float("inf")
+    result = None
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = func(*args)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+async def best_of_async(runs: int, func, *args):
+    best = float("inf")
+    result = None
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = await func(*args)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+async def run(sizes, workers: int, runs: int):
+    key = base64.b64encode(os.urandom(32)).decode()
+    fernet = Fernet(base64.urlsafe_b64encode(base64.b64decode(key)[:32]))
+    vault = VaultService("http://unused", "unused", executor=ComputeExecutor(max_workers=workers))
+
+    print(f"{'size':>8} {'scheme':>14} {'enc GB/s':>9} {'dec GB/s':>9} {'overhead':>9}")
+    for size_mb in sizes:
+        data = os.urandom(size_mb * MB)
+
+        enc_time, token = best_of(runs, fernet.encrypt, data)
+        dec_time, _ = best_of(runs, fernet.decrypt, token)
+        print(f"{size_mb:>6}MB {'fernet':>14} {gbps(len(data), enc_time):>9.3f} "
+              f"{gbps(len(data), dec_time):>9.3f} {len(token) / len(data) - 1:>8.2%}")
+
+        enc_time, blob = await best_of_async(runs, vault.encrypt_data, data, key)
+        dec_time, plain = await best_of_async(runs, vault.decrypt_data, blob, key)
+        assert plain == data
+        print(f"{size_mb:>6}MB {'aes-gcm-stream':>14} {gbps(len(data), enc_time):>9.3f} "
+              f"{gbps(len(data), dec_time):>9.3f} {len(blob) / len(data) - 1:>8.2%}")
+
+    await vault.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="1,16,64", help="Object sizes in MB (comma-separated)")
+    parser.add_argument("--workers", type=int, default=4, help="Compute thread pool size")
+    parser.add_argument("--runs", type=int, default=3, help="Repetitions per measurement (best is reported)")
+    args = parser.parse_args()
+
+    structlog.configure(wrapper_class=structlog.make_filtering_bound_logger(logging.WARNING))
+    sizes = [int(size) for size in args.sizes.split(",") if size]
+    asyncio.run(run(sizes, args.workers, args.runs))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+Benchmark erasure coding profiles: latency vs storage overhead
+
+Stores and reads back objects through StorageService with each coding
+profile against in-process storage nodes whose requests take a base latency
+plus an exponentially distributed tail plus transfer time, so wide stripes
+pay for their fan-out (the slowest of K reads) and replicas for reading the
+whole object from one node.  Reports storage overhead, encode throughput,
+PUT/GET latency percentiles, GET latency with --down nodes failed, and node
+requests per GET.
+
+Usage:
+    python benchmarks/erasure_profile_benchmark.py [--profiles replica:3,rs:4+2,rs:6+3,rs:12+4]
+        [--count 200] [--size 1048576] [--latency-ms 1] [--tail-ms 2] [--bandwidth-mb 500] [--down 1]
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import random
+import statistics
+import sys
+import time
+from typing import Dict, List
+
+sys.path.insert(0, os.path.dirname(__file__))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import httpx  # noqa: E402
+import structlog  # noqa: E402
+
+from app.services.erasure import ErasureProfile  # noqa: E402
+from app.services.storage_service import StorageService  # noqa: E402
+from small_object_benchmark import InMemoryMetadata, SimulatedNodes  # noqa: E402
+
+
+class SlowNodes(SimulatedNodes):
+    """SimulatedNodes with a latency tail, transfer time and failed nodes"""
+
+    def __init__(self, latency: float, tail: float, bandwidth: float):
+        super().__init__(latency)
+        self.tail = tail
+        self.bandwidth = bandwidth
+        self.down = set()
+
+    async def handle(self, request: httpx.Request) -> httpx.Response:
+        if request.url.host in self.down:
+            self.requests += 1
+            await asyncio.sleep(self.latency)
+            return httpx.Response(503)
+
+        response = await super().handle(request)
+        size = len(request.content) + len(response.content)
+        await asyncio.sleep(random.expovariate(1 / self.tail) + size / self.bandwidth)
+        return response
+
+
+def percentile(values: List[float], pct: float) -> float:
+    return sorted(values)[min(len(values) - 1, int(len(values) * pct))]
+
+
+async def run_profile(coding: str, args) -> Dict[str, float]:
+    profile = ErasureProfile.parse(coding)
+    nodes = SlowNodes(args.latency_ms / 1000, args.tail_ms / 1000, args.bandwidth_mb * 1024 * 1024)
+    service = StorageService(InMemoryMetadata(args.nodes), tier_profiles={"hot": coding})
+    service.client = httpx.AsyncClient(transport=httpx.MockTransport(nodes.handle))
+
+    payloads = [os.urandom(args.size) for _ in range(args.count)]
+
+    start = time.perf_counter()
+    for payload in payloads[:10]:
+        await service._encode_data(payload, profile)
+    encode_rate = 10 * args.size / (time.perf_counter() - start) / 1024 ** 2
+
+    placements = [None] * args.count
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async def put(i: int) -> float:
+        async with semaphore:
+            start = time.perf_counter()
+            placements[i] = await service.store_object_data("bench", f"obj-{i}", payloads[i])
+            return time.perf_counter() - start
+
+    put_times = await asyncio.gather(*[put(i) for i in range(args.count)])
+    stored = sum(len(shard) for shard in nodes.shards.values())
+
+    async def get(i: int) -> float:
+        async with semaphore:
+            start = time.perf_counter()
+            data = await service.load_object_data("bench", f"obj-{i}", placements[i])
+            elapsed = time.perf_counter() - start
+            assert data == payloads[i]
+            return elapsed
+
+    requests = nodes.requests
+    get_times = await asyncio.gather(*[get(i) for i in range(args.count)])
+    get_requests = (nodes.requests - requests) / args.count
+
+    nodes.down = {node.split(":")[0] for node in random.sample(service.raft_service.nodes, args.down)}
+    degraded_times = await asyncio.gather(*[get(i) for i in range(args.count)])
+
+    await service.close()
+    return {
+        "overhead": stored / (args.size * args.count),
+        "encode": encode_rate,
+        "put_p50": statistics.median(put_times),
+        "put_p99": percentile(put_times, 0.99),
+        "get_p50": statistics.median(get_times),
+        "get_p99": percentile(get_times, 0.99),
+        "degraded_p50": statistics.median(degraded_times),
+        "get_requests": get_requests,
+    }
+
+
+async def run(args):
+    print(f"{args.count} objects of {args.size} bytes on {args.nodes} nodes, "
+          f"{args.latency_ms:.1f} ms + exp({args.tail_ms:.1f} ms) + size / {args.bandwidth_mb:.0f} MB/s per request, "
+          f"{args.down} node(s) down for degraded reads")
+    print(f"{'profile':>10} {'overhead':>9} {'enc MB/s':>9} {'PUT p50':>8} {'PUT p99':>8} "
+          f"{'GET p50':>8} {'GET p99':>8} {'degr p50':>9} {'req/GET':>8}")
+    for coding in args.profiles.split(","):
+        stats = await run_profile(coding, args)
+        print(f"{coding:>10} {stats['overhead']:>8.2f}x {stats['encode']:>9.0f} "
+              f"{stats['put_p50'] * 1000:>7.1f}ms {stats['put_p99'] * 1000:>6.1f}ms "
+              f"{stats['get_p50'] * 1000:>6.1f}ms {stats['get_p99'] * 1000:>6.1f}ms "
+              f"{stats['degraded_p50'] * 1000:>7.1f}ms {stats['get_requests']:>8.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--profiles", default="replica:3,rs:4+2,rs:6+3,rs:12+4", help="Comma-separated coding profiles")
+    parser.add_argument("--count", type=int, default=200, help="Number of objects")
+    parser.add_argument("--size", type=int, default=1024 * 1024, help="Object size in bytes")
+    parser.add_argument("--nodes", type=int, default=16, help="Storage nodes")
+    parser.add_argument("--concurrency", type=int, default=1, help="Concurrent PUTs/GETs")
+    parser.add_argument("--latency-ms", type=float, default=1.0, help="Base latency per node request")
+    parser.add_argument("--tail-ms", type=float, default=2.0, help="Mean of the exponential latency tail")
+    parser.add_argument("--bandwidth-mb", type=float, default=500.0, help="Per-request transfer rate in MB/s")
+    parser.add_argument("--down", type=int, default=1, help="Nodes failed for the degraded read pass")
+    args = parser.parse_args()
+
+    structlog.configure(wrapper_class=structlog.make_filtering_bound_logger(logging.CRITICAL))
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+"""
+Simulate hot-tier promotion scheduling: first-come-first-served vs priority
+
+Replays an access log in simulated time.  Every read of an object that is
+not on the hot tier is scored by a stand-in for the ML service (how often
+the object is read over the next --horizon seconds, plus noise) and, like
+the service, a promotion is requested whenever probability_hot >= 0.8.
+Requests are then scheduled either
+
+* fifo     - in arrival order, duplicates included (the tier controller's
+             channel), skipping objects that are already hot, or
+* priority - through MigrationScheduler, with access rates from an
+             AccessTracker fed by the same reads,
+
+and both are capped at --window-limit promotions per --window seconds.  The
+hot tier holds --hot-capacity of the data; promoting past that demotes the
+least recently read hot objects.  Reports the fraction of reads (and of bytes
+read) served from the hot tier against the bytes moved.
+
+The log is JSON lines of download events as published to the access-logs
+topic ({"timestamp", "bucket", "object", "size", "action"}); without --log a
+synthetic Zipf workload whose popular set shifts every --phase seconds is
+generated.
+
+Usage:
+    python benchmarks/migration_scheduler_benchmark.py [--log access.jsonl]
+        [--objects 20000] [--reads 300000] [--duration 21600] [--window-limit 10]
+"""
+
+import argparse
+import bisect
+import json
+import math
+import os
+import random
+import sys
+from collections import OrderedDict, defaultdict, deque
+from typing import Dict, List, Tuple
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from app.services.migration_scheduler import AccessTracker, MigrationScheduler  # noqa: E402
+
+HOT_THRESHOLD = 0.8
+
+Access = Tuple[float, str, str, int]
+
+
+def load_log(path: str) -> List[Access]:
+    accesses = []
+    with open(path) as f:
+        for line in f:
+            event = json.loads(line)
+            if event.get("action", "download_object") == "download_object":
+                accesses.append((event["timestamp"], event["bucket"], event["object"], event.get("size", 0)))
+    accesses.sort()
+    return accesses
+
+
+def synthetic_log(objects: int, reads: int, duration: float, phase: float, skew: float, seed: int) -> List[Access]:
+    rng = random.Random(seed)
+    sizes = [int(min(max(rng.lognormvariate(math.log(256 * 1024), 2.0), 1024), 1024 ** 3)) for _ in range(objects)]
+    weights = [1 / (rank + 1) ** skew for rank in range(objects)]
+    times = sorted(rng.uniform(0, duration) for _ in range(reads))
+
+    accesses = []
+    phases = int(math.ceil(duration / phase))
+    start = 0
+    for p in range(phases):
+        end = bisect.bisect_left(times, (p + 1) * phase)
+        ranking = list(range(objects))
+        rng.shuffle(ranking)
+        cum_weights = []
+        total = 0.0
+        for w in weights:
+            total += w
+            cum_weights.append(total)
+        for t, rank in zip(times[start:end], rng.choices(range(objects), cum_weights=cum_weights, k=end - start)):
+            obj = ranking[rank]
+            accesses.append((t, "bench", f"obj-{obj}", sizes[obj]))
+        start = end
+    return accesses
+
+
+def ml_scores(accesses: List[Access], horizon: float, noise: float, seed: int) -> List[float]:
+    """probability_hot per access: reads of the object in the next ``horizon`` seconds, plus noise"""
+    rng = random.Random(seed)
+    times: Dict[Tuple[str, str], List[float]] = defaultdict(list)
+    for t, bucket, key, _ in accesses:
+        times[(bucket, key)].append(t)
+
+    scores = []
+    for t, bucket, key, _ in accesses:
+        obj_times = times[(bucket, key)]
+        future = bisect.bisect_right(obj_times, t + horizon) - bisect.bisect_right(obj_times, t)
+        score = 1 - math.exp(-future / 3) + rng.gauss(0, noise)
+        scores.append(min(max(score, 0.0), 1.0))
+    return scores
+
+
+class SimClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def simulate(mode: str, accesses: List[Access], scores: List[float], args) -> Dict[str, float]:
+    clock = SimClock()
+    total_bytes = sum({(b, k): s for _, b, k, s in accesses}.values())
+    capacity = total_bytes * args.hot_capacity
+
+    hot: "OrderedDict[Tuple[str, str], int]" = OrderedDict()  # least recently read first
+    hot_bytes = 0
+    stats = {"reads": 0, "hits": 0, "bytes_read": 0, "bytes_hit": 0,
+             "requests": 0, "promotions": 0, "demotions": 0, "bytes_moved": 0}
+
+    tracker = AccessTracker(half_life=args.half_life, clock=clock)
+    scheduler = MigrationScheduler(max_pending=args.queue_size, max_age=args.max_age, window=args.window,
+                                   window_limit=args.window_limit, tracker=tracker, clock=clock)
+    fifo: deque = deque()
+    released: deque = deque()
+
+    def promote(obj: Tuple[str, str], size: int):
+        nonlocal hot_bytes
+        if obj in hot or size > capacity:
+            return
+        while hot_bytes + size > capacity:
+            _, evicted = hot.popitem(last=False)
+            hot_bytes -= evicted
+            stats["demotions"] += 1
+            stats["bytes_moved"] += evicted
+        hot[obj] = size
+        hot_bytes += size
+        stats["promotions"] += 1
+        stats["bytes_moved"] += size
+
+    def release_fifo():
+        while fifo:
+            while released and released[0] <= clock.now - args.window:
+                released.popleft()
+            if len(released) >= args.window_limit:
+                return
+            obj, size = fifo.popleft()
+            if obj not in hot:
+                released.append(clock.now)
+                promote(obj, size)
+
+    def release_priority():
+        while True:
+            pending = scheduler.pop()
+            if not pending:
+                return
+            promote(pending.item, pending.size)
+
+    for (t, bucket, key, size), score in zip(accesses, scores):
+        clock.now = t
+        release_fifo() if mode == "fifo" else release_priority()
+
+        obj = (bucket, key)
+        stats["reads"] += 1
+        stats["bytes_read"] += size
+        tracker.record(bucket, key)
+        if obj in hot:
+            hot.move_to_end(obj)
+            stats["hits"] += 1
+            stats["bytes_hit"] += size
+        elif score >= HOT_THRESHOLD:
+            stats["requests"] += 1
+            if mode == "fifo":
+                if len(fifo) < args.queue_size:
+                    fifo.append((obj, size))
+            elif obj in scheduler.pending or not scheduler.full() or scheduler.expire():
+                scheduler.push(obj, obj, bucket, key, "hot", size, score)
+
+    stats["dropped"] = scheduler.stats["dropped"] if mode == "priority" else 0
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--log", help="Access log (JSON lines); synthetic workload if omitted")
+    parser.add_argument("--objects", type=int, default=20000, help="Synthetic: number of objects")
+    parser.add_argument("--reads", type=int, default=300000, help="Synthetic: number of reads")
+    parser.add_argument("--duration", type=float, default=6 * 3600, help="Synthetic: seconds covered by the log")
+    parser.add_argument("--phase", type=float, default=3600, help="Synthetic: seconds between popularity shifts")
+    parser.add_argument("--skew", type=float, default=1.1, help="Synthetic: Zipf exponent")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--horizon", type=float, default=1800, help="ML stand-in: look-ahead in seconds")
+    parser.add_argument("--noise", type=float, default=0.1, help="ML stand-in: score noise (stddev)")
+    parser.add_argument("--hot-capacity", type=float, default=0.05, help="Hot tier size as a fraction of all data")
+    parser.add_argument("--window", type=float, default=60, help="Seconds per release window")
+    parser.add_argument("--window-limit", type=int, default=10, help="Promotions per window")
+    parser.add_argument("--max-age", type=float, default=900, help="Priority: seconds before an unrepeated request expires")
+    parser.add_argument("--half-life", type=float, default=3600, help="Priority: access rate half-life")
+    parser.add_argument("--queue-size", type=int, default=10000, help="Pending requests kept")
+    args = parser.parse_args()
+
+    if args.log:
+        accesses = load_log(args.log)
+    else:
+        accesses = synthetic_log(args.objects, args.reads, args.duration, args.phase, args.skew, args.seed)
+    scores = ml_scores(accesses, args.horizon, args.noise, args.seed)
+
+    print(f"{len(accesses)} reads, hot tier {args.hot_capacity:.0%} of data, "
+          f"{args.window_limit} promotions per {args.window:.0f}s")
+    print(f"{'mode':>9} {'requests':>9} {'promoted':>9} {'demoted':>8} {'dropped':>8} "
+          f"{'GB moved':>9} {'hit rate':>9} {'byte hit':>9}")
+    for mode in ("fifo", "priority"):
+        stats = simulate(mode, accesses, scores, args)
+        print(f"{mode:>9} {stats['requests']:>9} {stats['promotions']:>9} {stats['demotions']:>8} "
+              f"{stats['dropped']:>8} {stats['bytes_moved'] / 1024 ** 3:>9.2f} "
+              f"{stats['hits'] / stats['reads']:>9.1%} {stats['bytes_hit'] / max(stats['bytes_read'], 1):>9.1%}")
+
+
+if __name__ == "__main__":
+    main()
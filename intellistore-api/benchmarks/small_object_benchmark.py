@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+Benchmark small-object placement: sharded vs packed vs inline
+
+Stores and reads back many small objects through StorageService against
+in-process storage nodes (httpx.MockTransport) with a simulated per-request
+latency, and reports objects/s plus shard requests and shard files per
+object, i.e. the HTTP round trips and node inodes each policy costs.
+
+Usage:
+    python benchmarks/small_object_benchmark.py [--count 500] [--size 2048] [--latency-ms 2]
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import sys
+import time
+from typing import Any, Dict
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import httpx  # noqa: E402
+import structlog  # noqa: E402
+
+from app.services.pack_service import PackWriter  # noqa: E402
+from app.services.storage_service import StorageService  # noqa: E402
+
+
+class SimulatedNodes:
+    """Storage nodes keeping shards in memory, with shard/download Range support
+    and the delete, bulk-delete and fetch (node-to-node copy) endpoints"""
+
+    def __init__(self, latency: float, bulk_delete: bool = True):
+        self.latency = latency
+        self.bulk_delete = bulk_delete
+        self.shards: Dict[str, bytes] = {}
+        self.requests = 0
+
+    async def handle(self, request: httpx.Request) -> httpx.Response:
+        self.requests += 1
+        await asyncio.sleep(self.latency)
+
+        path = request.url.path
+        if path == "/shard/upload":
+            body = request.content
+            boundary = request.headers["content-type"].split("boundary=")[1].encode()
+            fields = {}
+            for part in body.split(b"--" + boundary)[1:-1]:
+                head, _, value = part.partition(b"\r\n\r\n")
+                name = head.split(b'name="')[1].split(b'"')[0].decode()
+                fields[name] = value[:-2]
+            self.shards[fields["shardId"].decode()] = fields["shard"]
+            return httpx.Response(201, json={"status": "ok"})
+
+        if path.startswith("/shard/download/"):
+            data = self.shards[path.rsplit("/", 1)[1]]
+            byte_range = request.headers.get("range")
+            if byte_range:
+                first, last = byte_range.split("=")[1].split("-")
+                return httpx.Response(206, content=data[int(first):int(last) + 1])
+            return httpx.Response(200, content=data)
+
+        if path.startswith("/shard/delete/") and request.method == "DELETE":
+            if self.shards.pop(path.rsplit("/", 1)[1], None) is None:
+                return httpx.Response(404)
+            return httpx.Response(200, json={"status": "deleted"})
+
+        if path == "/shard/fetch":
+            fetch = json.loads(request.content)
+            data = self.shards[fetch["sourceShardId"]]
+            checksum = hashlib.sha256(data).hexdigest()
+            if fetch.get("checksum") and fetch["checksum"] != checksum:
+                return httpx.Response(409)
+            self.shards[fetch["shardId"]] = data
+            return httpx.Response(201, json={"shardId": fetch["shardId"], "size": len(data), "checksum": checksum})
+
+        if path == "/shard/bulk-delete" and self.bulk_delete:
+            results = []
+            for shard in json.loads(request.content)["shards"]:
+                found = self.shards.pop(shard["shardId"], None) is not None
+                results.append({"shardId": shard["shardId"], "status": "deleted" if found else "not_found"})
+            deleted = sum(1 for result in results if result["status"] == "deleted")
+            return httpx.Response(200, json={"results": results, "deleted": deleted, "failed": 0})
+
+        return httpx.Response(404)
+
+
+class InMemoryMetadata:
+    """Just enough of RaftService for StorageService"""
+
+    def __init__(self, nodes: int):
+        self.nodes = [f"node-{i}:8080" for i in range(nodes)]
+        self.objects: Dict[Any, Dict[str, Any]] = {}
+
+    async def get_storage_nodes(self, tier=None):
+        return self.nodes
+
+    async def get_bucket(self, bucket_name):
+        return None
+
+    async def create_object(self, object_data):
+        self.objects[(object_data["bucket_name"], object_data["object_key"])] = object_data
+
+
+async def run_policy(name: str, count: int, size: int, latency: float, **policy) -> Dict[str, float]:
+    nodes = SimulatedNodes(latency)
+    metadata = InMemoryMetadata(9)
+    service = StorageService(metadata, **policy)
+    service.client = httpx.AsyncClient(transport=httpx.MockTransport(nodes.handle))
+
+    payloads = [os.urandom(size) for _ in range(count)]
+
+    start = time.perf_counter()
+    placements = await asyncio.gather(*[
+        service.store_object_data("bench", f"obj-{i}", payload) for i, payload in enumerate(payloads)
+    ])
+    put_time = time.perf_counter() - start
+    put_requests = nodes.requests
+
+    start = time.perf_counter()
+    results = await asyncio.gather(*[
+        service.load_object_data("bench", f"obj-{i}", placement) for i, placement in enumerate(placements)
+    ])
+    get_time = time.perf_counter() - start
+    assert results == payloads
+
+    await service.close()
+    return {
+        "put_rate": count / put_time,
+        "get_rate": count / get_time,
+        "put_requests": put_requests / count,
+        "get_requests": (nodes.requests - put_requests) / count,
+        "files": len(nodes.shards) / count,
+    }
+
+
+async def run(count: int, size: int, latency: float):
+    policies = {
+        "sharded": {},
+        "packed": {"pack_writer": PackWriter(), "pack_threshold": 256 * 1024},
+        "inline": {"inline_threshold": 4 * 1024},
+    }
+
+    print(f"{count} objects of {size} bytes, {latency * 1000:.1f} ms per node request")
+    print(f"{'policy':>8} {'PUT obj/s':>10} {'GET obj/s':>10} {'PUT req/obj':>12} {'GET req/obj':>12} {'files/obj':>10}")
+    for name, policy in policies.items():
+        stats = await run_policy(name, count, size, latency, **policy)
+        print(f"{name:>8} {stats['put_rate']:>10.0f} {stats['get_rate']:>10.0f} {stats['put_requests']:>12.2f} "
+              f"{stats['get_requests']:>12.2f} {stats['files']:>10.3f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--count", type=int, default=500, help="Number of objects")
+    parser.add_argument("--size", type=int, default=2048, help="Object size in bytes")
+    parser.add_argument("--latency-ms", type=float, default=2.0, help="Simulated latency per node request")
+    args = parser.parse_args()
+
+    structlog.configure(wrapper_class=structlog.make_filtering_bound_logger(logging.WARNING))
+    asyncio.run(run(args.count, args.size, args.latency_ms / 1000))
+
+
+if __name__ == "__main__":
+    main()
@@ -29,13 +29,17 @@ from app.core.logging_config import setup_logging
 from app.services.kafka_service import KafkaService
 from app.services.vault_service import VaultService
 from app.services.raft_service import RaftService
+from app.services.compute_executor import configure_compute_executor, shutdown_compute_executor
+from app.services.gc_service import periodic_garbage_collection
+from app.services.migration_scheduler import configure_access_tracker
+from app.services.migration_service import MigrationExecutor
+from app.services.multipart_service import periodic_multipart_cleanup
+from app.services.pack_service import configure_pack_writer, get_pack_writer, periodic_pack_compaction
+from app.services.read_repair import configure_read_repairer, get_read_repairer
+from app.services.scrub_service import periodic_scrub
 
-# Prometheus metrics (clear registry to prevent duplicates)
-from prometheus_client import REGISTRY, CollectorRegistry
-import prometheus_client
-
-# Create a new registry to avoid conflicts
-CUSTOM_REGISTRY = CollectorRegistry()
+# Prometheus metrics (dedicated registry to prevent duplicates)
+from app.core.metrics import CUSTOM_REGISTRY
 
 REQUEST_COUNT = Counter(
     'intellistore_api_requests_total',
@@ -69,12 +73,34 @@ async def lifespan(app: FastAPI):
     logger.info("Initializing services...")
     
     try:
+        # Shared executor for hashing, encryption and erasure coding
+        configure_compute_executor(
+            mode=settings.compute_executor_mode,
+            max_workers=settings.compute_workers
+        )
+        
+        # Group-commit writer for small-object pack segments
+        configure_pack_writer(
+            segment_size=settings.pack_segment_size,
+            linger=settings.pack_linger_ms / 1000
+        )
+        
+        # Background rebuild of shards found missing by degraded reads
+        if settings.read_repair_enabled:
+            configure_read_repairer(
+                bandwidth=settings.read_repair_bandwidth,
+                concurrency=settings.read_repair_concurrency,
+                max_pending_bytes=settings.read_repair_max_pending_bytes
+            )
+        
         # Initialize Vault service (optional)
         if settings.vault_addr and settings.vault_token:
             try:
                 vault_service = VaultService(
                     vault_url=settings.vault_addr,
-                    vault_token=settings.vault_token
+                    vault_token=settings.vault_token,
+                    segment_size=settings.encryption_segment_size,
+                    segments_per_task=settings.encryption_segments_per_task
                 )
                 await vault_service.initialize()
                 logger.info("Vault service initialized")
@@ -113,6 +139,26 @@ async def lifespan(app: FastAPI):
             logger.info("Kafka service disabled (no configuration)")
             kafka_service = None
         
+        # Background executor for tier migrations
+        configure_access_tracker(half_life=settings.migration_access_half_life)
+        if raft_service:
+            app.state.migration_executor = MigrationExecutor(
+                raft_service,
+                kafka_service,
+                concurrency=settings.migration_concurrency,
+                queue_size=settings.migration_queue_size,
+                node_bandwidth=settings.migration_node_bandwidth,
+                tier_bandwidth=settings.migration_tier_bandwidth,
+                tier_bandwidth_overrides=settings.migration_tier_bandwidth_overrides,
+                job_ttl=settings.migration_job_ttl,
+                max_age=settings.migration_request_max_age,
+                window=settings.migration_window,
+                window_limit=settings.migration_window_limit
+            )
+            app.state.migration_executor.start()
+        else:
+            app.state.migration_executor = None
+        
         # Store services in app state
         app.state.kafka_service = kafka_service
         app.state.vault_service = vault_service
@@ -121,6 +167,35 @@ async def lifespan(app: FastAPI):
         # Start background tasks
         try:
             asyncio.create_task(periodic_status_updates())
+            if raft_service:
+                asyncio.create_task(periodic_multipart_cleanup(
+                    raft_service,
+                    interval=settings.multipart_gc_interval,
+                    max_age=settings.multipart_upload_ttl
+                ))
+                asyncio.create_task(periodic_pack_compaction(
+                    raft_service,
+                    interval=settings.pack_compaction_interval,
+                    min_live_ratio=settings.pack_compaction_min_live_ratio,
+                    min_age=max(settings.pack_compaction_interval, 600)
+                ))
+                asyncio.create_task(periodic_garbage_collection(
+                    raft_service,
+                    vault_service,
+                    interval=settings.gc_interval,
+                    grace_period=settings.gc_grace_period,
+                    delete_rate=settings.gc_delete_rate,
+                    batch_size=settings.gc_batch_size,
+                    dry_run=settings.gc_dry_run
+                ))
+                asyncio.create_task(periodic_scrub(
+                    raft_service,
+                    interval=settings.scrub_interval,
+                    bandwidth=settings.scrub_bandwidth,
+                    concurrency=settings.scrub_concurrency,
+                    node_down_grace=settings.scrub_node_down_grace,
+                    repair=settings.scrub_repair
+                ))
             logger.info("Background tasks started")
         except Exception as e:
             logger.warning("Failed to start background tasks", error=str(e))
@@ -136,12 +211,18 @@ async def lifespan(app: FastAPI):
     finally:
         # Cleanup
         logger.info("Shutting down services...")
+        await get_pack_writer().flush()
+        if getattr(app.state, "migration_executor", None):
+            await app.state.migration_executor.stop()
+        if get_read_repairer():
+            await get_read_repairer().stop()
         if kafka_service:
             await kafka_service.close()
         if vault_service:
             await vault_service.close()
         if raft_service:
             await raft_service.close()
+        shutdown_compute_executor()
 
 
 def create_app() -> FastAPI:
@@ -0,0 +1,16 @@
+"""
+Shared test setup: import path, settings and quiet logging
+"""
+
+import logging
+import os
+import sys
+
+import structlog
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+# Settings require a JWT secret
+os.environ.setdefault("JWT_SECRET", "test-secret")
+
+structlog.configure(wrapper_class=structlog.make_filtering_bound_logger(logging.WARNING))
@@ -0,0 +1,87 @@
+"""
+Tests for dedup chunking: content-defined boundaries survive an insert,
+fixed-size boundaries do not
+"""
+
+import hashlib
+import random
+
+import pytest
+
+from app.core import chunking
+from app.core.chunking import content_defined_chunks, fixed_chunks
+from app.services.dedup_service import split_chunks
+
+AVG_SIZE = 8 * 1024
+
+
+@pytest.fixture
+def data():
+    return random.Random(7).randbytes(2 * 1024 * 1024)
+
+
+def digests(data: bytes, bounds):
+    return [hashlib.sha256(data[start:end]).digest() for start, end in bounds]
+
+
+def insert(data: bytes, offset: int, extra: bytes = b"inserted bytes") -> bytes:
+    return data[:offset] + extra + data[offset:]
+
+
+def test_chunks_cover_data(data):
+    bounds = content_defined_chunks(data, AVG_SIZE)
+    assert bounds[0][0] == 0
+    assert bounds[-1][1] == len(data)
+    assert all(end == next_start for (_, end), (next_start, _) in zip(bounds, bounds[1:]))
+
+
+def test_chunk_sizes_within_limits(data):
+    bounds = content_defined_chunks(data, AVG_SIZE, min_size=2048, max_size=16 * 1024)
+    sizes = [end - start for start, end in bounds]
+    assert all(size <= 16 * 1024 for size in sizes)
+    assert all(size >= 2048 for size in sizes[:-1])
+    assert AVG_SIZE / 2 < len(data) / len(bounds) < AVG_SIZE * 2
+
+
+def test_empty_data_has_no_chunks():
+    assert content_defined_chunks(b"", AVG_SIZE) == []
+    assert fixed_chunks(0, AVG_SIZE) == []
+
+
+def test_boundaries_stable_under_insert(data):
+    offset = len(data) // 2
+    edited = insert(data, offset)
+    before = content_defined_chunks(data, AVG_SIZE)
+    after = content_defined_chunks(edited, AVG_SIZE)
+
+    # Chunks ending before the insert are untouched
+    untouched = [bound for bound in before if bound[1] < offset]
+    assert after[:len(untouched)] == untouched
+
+    # Past the insert, boundaries resynchronise: all but a few chunks are shared
+    original = set(digests(data, before))
+    shared = sum(digest in original for digest in digests(edited, after))
+    assert len(after) - shared <= 3
+
+
+def test_fixed_boundaries_shift_under_insert(data):
+    offset = len(data) // 2
+    edited = insert(data, offset)
+    original = set(digests(data, fixed_chunks(len(data), AVG_SIZE)))
+    after = digests(edited, fixed_chunks(len(edited), AVG_SIZE))
+    shared = sum(digest in original for digest in after)
+    assert shared == offset // AVG_SIZE
+
+
+def test_boundaries_independent_of_block_size(data, monkeypatch):
+    expected = content_defined_chunks(data, AVG_SIZE)
+    for block_size in (4096, 10_000, 65_537):
+        monkeypatch.setattr(chunking, "CDC_BLOCK_SIZE", block_size)
+        assert content_defined_chunks(data, AVG_SIZE) == expected
+
+
+def test_split_chunks_modes(data):
+    assert split_chunks(data, "cdc", AVG_SIZE) == content_defined_chunks(data, AVG_SIZE)
+    assert split_chunks(data, "fixed", AVG_SIZE) == fixed_chunks(len(data), AVG_SIZE)
+    with pytest.raises(ValueError):
+        split_chunks(data, "rabin", AVG_SIZE)
@@ -0,0 +1,109 @@
+"""
+Tests for framed zstd compression: any uncompressed range must decode from
+just the frames compressed_range selects
+"""
+
+import asyncio
+import os
+import random
+
+import pytest
+
+from app.services.compression_service import CODEC_ZSTD, CompressionService, compressed_range
+from app.services.compute_executor import ComputeExecutor
+
+FRAME_SIZE = 1000
+
+
+@pytest.fixture
+def service() -> CompressionService:
+    executor = ComputeExecutor("thread", max_workers=2)
+    yield CompressionService(executor=executor, frame_size=FRAME_SIZE, min_size=64, probe_size=4096)
+    executor.shutdown()
+
+
+@pytest.fixture
+def data() -> bytes:
+    rng = random.Random(3)
+    words = [b"tier", b"shard", b"bucket", b"object", b"node", b"parity"]
+    return b" ".join(rng.choice(words) for _ in range(2000))
+
+
+async def _chunks(data: bytes, size: int):
+    for start in range(0, len(data), size):
+        yield data[start:start + size]
+
+
+def _compress(service: CompressionService, data: bytes, chunk_size: int = 700):
+    frame_sizes = []
+
+    async def run():
+        return b"".join([frame async for frame in service.compress_stream(_chunks(data, chunk_size), 3, frame_sizes)])
+
+    blob = asyncio.run(run())
+    return blob, {"codec": CODEC_ZSTD, "frame_size": FRAME_SIZE, "frames": frame_sizes}
+
+
+def _decompress_range(service: CompressionService, blob: bytes, compression, start: int, end: int) -> bytes:
+    lo, hi = compressed_range(compression, start, end)
+
+    async def run():
+        pieces = _chunks(blob[lo:hi], 333)
+        return b"".join([piece async for piece in service.decompress_stream(pieces, compression, start, end)])
+
+    return asyncio.run(run())
+
+
+def test_frames_cover_stream(service, data):
+    blob, compression = _compress(service, data)
+    assert len(compression["frames"]) == -(-len(data) // FRAME_SIZE)
+    assert sum(compression["frames"]) == len(blob)
+    assert len(blob) < len(data)
+    assert _decompress_range(service, blob, compression, 0, len(data)) == data
+
+
+@pytest.mark.parametrize("start,end", [
+    (0, 1),
+    (0, FRAME_SIZE),
+    (FRAME_SIZE - 1, FRAME_SIZE + 1),
+    (FRAME_SIZE, 2 * FRAME_SIZE),
+    (2500, 7321),
+    (5 * FRAME_SIZE + 17, 5 * FRAME_SIZE + 18),
+])
+def test_range_matches_plain_slice(service, data, start, end):
+    blob, compression = _compress(service, data)
+    assert _decompress_range(service, blob, compression, start, end) == data[start:end]
+
+
+def test_random_ranges_match_plain_slices(service, data):
+    blob, compression = _compress(service, data)
+    rng = random.Random(11)
+    for _ in range(50):
+        start = rng.randrange(len(data))
+        end = rng.randrange(start + 1, len(data) + 1)
+        assert _decompress_range(service, blob, compression, start, end) == data[start:end]
+
+
+def test_range_reads_only_covering_frames(service, data):
+    blob, compression = _compress(service, data)
+    frames = compression["frames"]
+    assert compressed_range(compression, 0, len(data)) == (0, len(blob))
+    assert compressed_range(compression, FRAME_SIZE, 2 * FRAME_SIZE) == (frames[0], frames[0] + frames[1])
+    assert compressed_range(compression, FRAME_SIZE - 1, FRAME_SIZE + 1) == (0, frames[0] + frames[1])
+
+
+def test_last_partial_frame(service, data):
+    tail = data[:FRAME_SIZE * 3 + 10]
+    blob, compression = _compress(service, tail)
+    assert len(compression["frames"]) == 4
+    assert _decompress_range(service, blob, compression, len(tail) - 5, len(tail)) == tail[-5:]
+
+
+def test_choose_codec(service, data):
+    assert asyncio.run(service.choose_codec("text/plain", data, 3)) == CODEC_ZSTD
+    assert asyncio.run(service.choose_codec("image/jpeg", data, 3)) is None
+    assert asyncio.run(service.choose_codec("text/plain", data[:10], 3)) is None
+    assert asyncio.run(service.choose_codec("text/plain", data, 0)) is None
+    # Unknown types are probed
+    assert asyncio.run(service.choose_codec("application/x-unknown", data, 3)) == CODEC_ZSTD
+    assert asyncio.run(service.choose_codec("application/x-unknown", os.urandom(8192), 3)) is None
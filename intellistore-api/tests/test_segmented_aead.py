@@ -0,0 +1,161 @@
+"""
+Tests for the segmented AES-GCM object encryption format
+"""
+
+import asyncio
+import base64
+import os
+
+import pytest
+from cryptography.exceptions import InvalidTag
+from cryptography.fernet import Fernet
+
+from app.core.segmented_aead import (
+    HEADER_SIZE,
+    TAG_SIZE,
+    SegmentedAEAD,
+    ciphertext_size,
+    is_segmented,
+    plaintext_size,
+)
+from app.services.compute_executor import ComputeExecutor
+from app.services.vault_service import VaultService
+
+SEGMENT_SIZE = 1024
+SIZES = [0, 1, SEGMENT_SIZE - 1, SEGMENT_SIZE, SEGMENT_SIZE + 1, 5 * SEGMENT_SIZE + 7]
+
+
+@pytest.fixture
+def key() -> str:
+    return base64.b64encode(os.urandom(32)).decode()
+
+
+@pytest.fixture
+def vault(key) -> VaultService:
+    # Encryption only needs the data key, not a Vault connection
+    executor = ComputeExecutor("thread", max_workers=2)
+    service = VaultService("http://vault:8200", "token", segment_size=SEGMENT_SIZE,
+                           segments_per_task=2, executor=executor)
+    yield service
+    executor.shutdown()
+
+
+async def _chunks(data: bytes, size: int):
+    for start in range(0, len(data), size):
+        yield data[start:start + size]
+
+
+def _encrypt(vault: VaultService, data: bytes, key: str, chunk_size: int = 300) -> bytes:
+    async def run():
+        return b"".join([piece async for piece in vault.encrypt_stream(_chunks(data, chunk_size), key)])
+    return asyncio.run(run())
+
+
+def _decrypt_range(vault: VaultService, blob: bytes, key: str, start: int, end: int) -> bytes:
+    async def run():
+        return b"".join([piece async for piece in vault.decrypt_stream(blob, key, start, end)])
+    return asyncio.run(run())
+
+
+def _segments(blob: bytes):
+    sealed = SEGMENT_SIZE + TAG_SIZE
+    return [blob[offset:offset + sealed] for offset in range(HEADER_SIZE, len(blob), sealed)]
+
+
+@pytest.mark.parametrize("size", SIZES)
+def test_round_trip(size):
+    aead = SegmentedAEAD(os.urandom(32), SEGMENT_SIZE)
+    data = os.urandom(size)
+    blob = aead.encrypt(data)
+
+    assert is_segmented(blob)
+    assert len(blob) == ciphertext_size(size, SEGMENT_SIZE)
+    assert plaintext_size(len(blob), SEGMENT_SIZE) == size
+    assert aead.decrypt(blob) == data
+
+
+@pytest.mark.parametrize("size", SIZES)
+def test_stream_round_trip(vault, key, size):
+    data = os.urandom(size)
+    blob = _encrypt(vault, data, key)
+
+    assert len(blob) == ciphertext_size(size, SEGMENT_SIZE)
+    assert asyncio.run(vault.decrypt_data(blob, key)) == data
+    assert asyncio.run(vault.decrypt_data(asyncio.run(vault.encrypt_data(data, key)), key)) == data
+
+
+def test_wrong_key_fails():
+    blob = SegmentedAEAD(os.urandom(32), SEGMENT_SIZE).encrypt(os.urandom(3000))
+    with pytest.raises(InvalidTag):
+        SegmentedAEAD(os.urandom(32), SEGMENT_SIZE).decrypt(blob)
+
+
+@pytest.mark.parametrize("position", [0, HEADER_SIZE - 1, HEADER_SIZE, HEADER_SIZE + SEGMENT_SIZE + 3, -1])
+def test_tampered_byte_fails(position):
+    aead = SegmentedAEAD(os.urandom(32), SEGMENT_SIZE)
+    blob = bytearray(aead.encrypt(os.urandom(3 * SEGMENT_SIZE + 10)))
+    blob[position] ^= 0x01
+    with pytest.raises((InvalidTag, ValueError)):
+        aead.decrypt(bytes(blob))
+
+
+def test_reordered_segments_fail():
+    aead = SegmentedAEAD(os.urandom(32), SEGMENT_SIZE)
+    blob = aead.encrypt(os.urandom(3 * SEGMENT_SIZE + 10))
+    segments = _segments(blob)
+    swapped = blob[:HEADER_SIZE] + segments[1] + segments[0] + b"".join(segments[2:])
+    with pytest.raises(InvalidTag):
+        aead.decrypt(swapped)
+
+
+def test_truncated_blob_fails():
+    aead = SegmentedAEAD(os.urandom(32), SEGMENT_SIZE)
+    blob = aead.encrypt(os.urandom(3 * SEGMENT_SIZE))
+    # Dropping whole segments leaves a valid-looking blob whose new last
+    # segment was not sealed as the end of the stream
+    truncated = blob[:HEADER_SIZE] + b"".join(_segments(blob)[:2])
+    with pytest.raises(InvalidTag):
+        aead.decrypt(truncated)
+
+
+def test_tampered_segment_fails_range_read_of_it_only(vault, key):
+    data = os.urandom(4 * SEGMENT_SIZE)
+    blob = bytearray(_encrypt(vault, data, key))
+    blob[HEADER_SIZE + 2 * (SEGMENT_SIZE + TAG_SIZE) + 5] ^= 0x80
+
+    # Ranges outside the damaged segment still decrypt
+    assert _decrypt_range(vault, bytes(blob), key, 0, 2 * SEGMENT_SIZE) == data[:2 * SEGMENT_SIZE]
+    with pytest.raises(InvalidTag):
+        _decrypt_range(vault, bytes(blob), key, 2 * SEGMENT_SIZE, 2 * SEGMENT_SIZE + 1)
+
+
+@pytest.mark.parametrize("start,end", [
+    (0, 1),
+    (0, SEGMENT_SIZE),
+    (SEGMENT_SIZE - 1, SEGMENT_SIZE + 1),
+    (SEGMENT_SIZE, 2 * SEGMENT_SIZE),
+    (123, 4 * SEGMENT_SIZE + 5),
+    (5 * SEGMENT_SIZE, 5 * SEGMENT_SIZE + 7),
+    (5 * SEGMENT_SIZE + 6, 5 * SEGMENT_SIZE + 7),
+    (0, 5 * SEGMENT_SIZE + 7),
+])
+def test_range_decrypt(vault, key, start, end):
+    data = os.urandom(5 * SEGMENT_SIZE + 7)
+    blob = _encrypt(vault, data, key)
+    assert _decrypt_range(vault, blob, key, start, end) == data[start:end]
+
+
+def test_range_past_end_is_clamped(vault, key):
+    data = os.urandom(2 * SEGMENT_SIZE + 3)
+    blob = _encrypt(vault, data, key)
+    assert _decrypt_range(vault, blob, key, SEGMENT_SIZE, 10 * SEGMENT_SIZE) == data[SEGMENT_SIZE:]
+
+
+def test_legacy_fernet_objects_still_decrypt(vault, key):
+    # Legacy objects were Fernet tokens under the same (standard base64) data key
+    data = os.urandom(5000)
+    token = Fernet(base64.urlsafe_b64encode(base64.b64decode(key))).encrypt(data)
+
+    assert not is_segmented(token)
+    assert asyncio.run(vault.decrypt_data(token, key)) == data
+    assert _decrypt_range(vault, token, key, 100, 200) == data[100:200]
@@ -0,0 +1,179 @@
+"""
+Tests for small-object placement: inline, packed and sharded objects must
+all read back through load_object_data
+"""
+
+import asyncio
+import os
+from typing import Any, Dict
+
+import httpx
+import pytest
+
+from app.services.dedup_service import release_object_data
+from app.services.pack_service import PackWriter, pack_record_key
+from app.services.storage_service import StorageService
+
+
+class MemoryNodes:
+    """Storage nodes keeping shards in memory (upload, ranged download, delete)"""
+
+    def __init__(self):
+        self.shards: Dict[str, bytes] = {}
+        self.requests = 0
+
+    async def handle(self, request: httpx.Request) -> httpx.Response:
+        self.requests += 1
+        path = request.url.path
+        if path == "/shard/upload":
+            boundary = request.headers["content-type"].split("boundary=")[1].encode()
+            fields = {}
+            for part in request.content.split(b"--" + boundary)[1:-1]:
+                head, _, value = part.partition(b"\r\n\r\n")
+                name = head.split(b'name="')[1].split(b'"')[0].decode()
+                fields[name] = value[:-2]
+            self.shards[fields["shardId"].decode()] = fields["shard"]
+            return httpx.Response(201, json={"status": "ok"})
+
+        if path.startswith("/shard/download/"):
+            data = self.shards.get(path.rsplit("/", 1)[1])
+            if data is None:
+                return httpx.Response(404)
+            byte_range = request.headers.get("range")
+            if byte_range:
+                first, last = byte_range.split("=")[1].split("-")
+                return httpx.Response(206, content=data[int(first):int(last) + 1])
+            return httpx.Response(200, content=data)
+
+        if path.startswith("/shard/delete/") and request.method == "DELETE":
+            if self.shards.pop(path.rsplit("/", 1)[1], None) is None:
+                return httpx.Response(404)
+            return httpx.Response(200, json={"status": "deleted"})
+
+        return httpx.Response(404)
+
+
+class MemoryMetadata:
+    """Just enough of RaftService for StorageService"""
+
+    def __init__(self, nodes: int = 9):
+        self.nodes = [f"node-{i}:8080" for i in range(nodes)]
+        self.objects: Dict[Any, Dict[str, Any]] = {}
+
+    async def get_storage_nodes(self, tier=None):
+        return self.nodes
+
+    async def get_bucket(self, bucket_name):
+        return None
+
+    async def create_object(self, object_data):
+        self.objects[(object_data["bucket_name"], object_data["object_key"])] = object_data
+
+
+@pytest.fixture
+def nodes() -> MemoryNodes:
+    return MemoryNodes()
+
+
+@pytest.fixture
+def metadata() -> MemoryMetadata:
+    return MemoryMetadata()
+
+
+def _service(metadata: MemoryMetadata, nodes: MemoryNodes, **policy) -> StorageService:
+    service = StorageService(metadata, **policy)
+    service.client = httpx.AsyncClient(transport=httpx.MockTransport(nodes.handle))
+    return service
+
+
+def _round_trip(service: StorageService, payloads: Dict[str, bytes]):
+    async def run():
+        placements = await asyncio.gather(*[
+            service.store_object_data("bucket", key, data) for key, data in payloads.items()
+        ])
+        placements = dict(zip(payloads, placements))
+        loaded = {key: await service.load_object_data("bucket", key, placement)
+                  for key, placement in placements.items()}
+        await service.close()
+        return placements, loaded
+
+    return asyncio.run(run())
+
+
+def test_inline_round_trip(metadata, nodes):
+    service = _service(metadata, nodes, inline_threshold=1024)
+    payloads = {"empty": b"", "tiny": os.urandom(10), "limit": os.urandom(1024)}
+    placements, loaded = _round_trip(service, payloads)
+
+    assert loaded == payloads
+    assert all(placement["shards"] == [] and "inline_data" in placement for placement in placements.values())
+    assert nodes.requests == 0
+
+
+def test_pack_round_trip(metadata, nodes):
+    service = _service(metadata, nodes, pack_writer=PackWriter(segment_size=64 * 1024, linger=0.01),
+                       pack_threshold=4096)
+    payloads = {f"small-{i}": os.urandom(100 + 37 * i) for i in range(40)}
+    placements, loaded = _round_trip(service, payloads)
+
+    assert loaded == payloads
+    pack_ids = {placement["pack"]["pack_id"] for placement in placements.values()}
+    # Concurrent small objects share a segment, recorded under its pack key
+    assert len(pack_ids) < len(payloads)
+    assert all(("bucket", pack_record_key(pack_id)) in metadata.objects for pack_id in pack_ids)
+    assert len(nodes.shards) == 9 * len(pack_ids)
+
+
+def test_shards_round_trip(metadata, nodes):
+    service = _service(metadata, nodes, inline_threshold=1024, pack_threshold=4096)
+    payloads = {"large": os.urandom(100_000), "odd": os.urandom(4097)}
+    placements, loaded = _round_trip(service, payloads)
+
+    assert loaded == payloads
+    assert all(len(placement["shards"]) == 9 for placement in placements.values())
+
+
+def test_policy_picks_placement_by_size(metadata, nodes):
+    service = _service(metadata, nodes, pack_writer=PackWriter(linger=0.01),
+                       inline_threshold=64, pack_threshold=4096)
+    payloads = {"inline": os.urandom(64), "pack": os.urandom(65), "shards": os.urandom(4097)}
+    placements, loaded = _round_trip(service, payloads)
+
+    assert loaded == payloads
+    assert "inline_data" in placements["inline"]
+    assert "pack" in placements["pack"]
+    assert placements["shards"]["shards"] and "pack" not in placements["shards"]
+
+
+def test_shards_survive_lost_parity_count(metadata, nodes):
+    service = _service(metadata, nodes)
+    data = os.urandom(50_000)
+
+    async def run():
+        placement = await service.store_object_data("bucket", "object", data)
+        for shard in placement["shards"][:3]:
+            del nodes.shards[shard["shard_id"]]
+        loaded = await service.load_object_data("bucket", "object", placement)
+        await service.close()
+        return loaded
+
+    assert asyncio.run(run()) == data
+
+
+def test_overwrite_keeps_new_shards(metadata, nodes):
+    service = _service(metadata, nodes)
+    old, new = os.urandom(50_000), os.urandom(60_000)
+
+    async def run():
+        previous = await service.store_object_data("bucket", "object", old)
+        placement = await service.store_object_data("bucket", "object", new)
+        # An upload releases the version it replaced once the new record is written
+        await release_object_data(service, {"bucket_name": "bucket", "object_key": "object", **previous})
+        loaded = await service.load_object_data("bucket", "object", placement)
+        await service.close()
+        return previous, placement, loaded
+
+    previous, placement, loaded = asyncio.run(run())
+    assert loaded == new
+    assert not {shard["shard_id"] for shard in previous["shards"]} & {shard["shard_id"] for shard in placement["shards"]}
+    assert len(nodes.shards) == 9
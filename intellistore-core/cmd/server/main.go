@@ -199,7 +199,10 @@ func runStorageNode(nodeID, dataDir, httpAddr, tier string, logger *zap.Logger)
 	// Shard operations
 	router.HandleFunc("/shard/upload", shardHandler.HandleUpload).Methods("POST")
 	router.HandleFunc("/shard/download/{shardID}", shardHandler.HandleDownload).Methods("GET")
+	router.HandleFunc("/shard/verify/{shardID}", shardHandler.HandleVerify).Methods("GET")
 	router.HandleFunc("/shard/delete/{shardID}", shardHandler.HandleDelete).Methods("DELETE")
+	router.HandleFunc("/shard/bulk-delete", shardHandler.HandleBulkDelete).Methods("POST")
+	router.HandleFunc("/shard/fetch", shardHandler.HandleFetch).Methods("POST")
 	router.HandleFunc("/shard/list", shardHandler.HandleList).Methods("GET")
 
 	// Health check
@@ -42,6 +42,7 @@ func (a *API) RegisterRoutes(router *mux.Router) {
 	router.HandleFunc("/buckets/{bucketName}/objects/{objectKey}", a.handleDeleteObject).Methods("DELETE")
 	router.HandleFunc("/buckets/{bucketName}/objects/{objectKey}", a.handleGetObject).Methods("GET")
 	router.HandleFunc("/buckets/{bucketName}/objects", a.handleListObjects).Methods("GET")
+	router.HandleFunc("/buckets/{bucketName}/batch", a.handleBatchObjects).Methods("POST")
 
 	// Cluster operations
 	router.HandleFunc("/cluster/status", a.handleClusterStatus).Methods("GET")
@@ -313,6 +314,69 @@ func (a *API) handleDeleteObject(w http.ResponseWriter, r *http.Request) {
 	w.WriteHeader(http.StatusNoContent)
 }
 
+// handleBatchObjects applies many object deletes and updates as one Raft log entry
+func (a *API) handleBatchObjects(w http.ResponseWriter, r *http.Request) {
+	vars := mux.Vars(r)
+	bucketName := vars["bucketName"]
+
+	var req struct {
+		Operations []BatchOperation `json:"operations"`
+	}
+
+	if err := json.NewDecoder(r.Body).Decode(&req); err != nil {
+		http.Error(w, "Invalid JSON", http.StatusBadRequest)
+		return
+	}
+
+	for _, op := range req.Operations {
+		if op.ObjectKey == "" || (op.Op != "delete" && op.Op != "update") {
+			http.Error(w, "Invalid batch operation", http.StatusBadRequest)
+			return
+		}
+	}
+
+	if a.raft.State() != raft.Leader {
+		a.redirectToLeader(w, r)
+		return
+	}
+
+	cmd := Command{
+		Type: "batch_objects",
+		Data: map[string]interface{}{
+			"bucketName": bucketName,
+			"operations": req.Operations,
+		},
+	}
+
+	cmdBytes, err := json.Marshal(cmd)
+	if err != nil {
+		http.Error(w, "Failed to marshal command", http.StatusInternalServerError)
+		return
+	}
+
+	future := a.raft.Apply(cmdBytes, 10*time.Second)
+	if err := future.Error(); err != nil {
+		a.logger.Error("Failed to apply batch objects command", zap.Error(err))
+		http.Error(w, "Failed to apply batch", http.StatusInternalServerError)
+		return
+	}
+
+	var results []BatchResult
+	switch response := future.Response().(type) {
+	case error:
+		http.Error(w, response.Error(), http.StatusBadRequest)
+		return
+	case []BatchResult:
+		results = response
+	}
+
+	w.Header().Set("Content-Type", "application/json")
+	json.NewEncoder(w).Encode(map[string]interface{}{
+		"bucket":  bucketName,
+		"results": results,
+	})
+}
+
 func (a *API) handleGetObject(w http.ResponseWriter, r *http.Request) {
 	vars := mux.Vars(r)
 	bucketName := vars["bucketName"]
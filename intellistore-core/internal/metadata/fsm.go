@@ -48,6 +48,19 @@ type BucketMetadata struct {
 	Metadata    map[string]string `json:"metadata"`
 }
 
+// BatchOperation is one object delete or update in a batch command
+type BatchOperation struct {
+	Op        string `json:"op"` // "delete" or "update"
+	ObjectKey string `json:"objectKey"`
+	Tier      string `json:"tier,omitempty"`
+}
+
+// BatchResult is the outcome of one operation in a batch command
+type BatchResult struct {
+	ObjectKey string `json:"objectKey"`
+	Status    string `json:"status"` // "deleted", "updated" or "not_found"
+}
+
 // Command represents a command to be applied to the FSM
 type Command struct {
 	Type string      `json:"type"`
@@ -99,6 +112,8 @@ func (f *FSM) Apply(log *raft.Log) interface{} {
 		return f.applyDeleteObject(cmd.Data)
 	case "update_access_time":
 		return f.applyUpdateAccessTime(cmd.Data)
+	case "batch_objects":
+		return f.applyBatchObjects(cmd.Data)
 	default:
 		f.logger.Error("Unknown command type", zap.String("type", cmd.Type))
 		return fmt.Errorf("unknown command type: %s", cmd.Type)
@@ -265,6 +280,54 @@ func (f *FSM) applyDeleteObject(data interface{}) interface{} {
 	return nil
 }
 
+func (f *FSM) applyBatchObjects(data interface{}) interface{} {
+	batchData, ok := data.(map[string]interface{})
+	if !ok {
+		return fmt.Errorf("invalid batch data")
+	}
+
+	bucketName, _ := batchData["bucketName"].(string)
+	operations, ok := batchData["operations"].([]interface{})
+	if !ok {
+		return fmt.Errorf("invalid batch operations")
+	}
+
+	results := make([]BatchResult, 0, len(operations))
+	for _, item := range operations {
+		op, ok := item.(map[string]interface{})
+		if !ok {
+			return fmt.Errorf("invalid batch operation")
+		}
+
+		objectKey, _ := op["objectKey"].(string)
+		result := BatchResult{ObjectKey: objectKey, Status: "not_found"}
+		if _, exists := f.objects[fmt.Sprintf("%s/%s", bucketName, objectKey)]; exists {
+			objectData := map[string]interface{}{
+				"bucketName": bucketName,
+				"objectKey":  objectKey,
+			}
+
+			switch op["op"] {
+			case "delete":
+				f.applyDeleteObject(objectData)
+				result.Status = "deleted"
+			case "update":
+				if tier, exists := op["tier"]; exists {
+					objectData["tier"] = tier
+				}
+				f.applyUpdateObject(objectData)
+				result.Status = "updated"
+			}
+		}
+		results = append(results, result)
+	}
+
+	f.logger.Info("Applied object batch",
+		zap.String("bucket", bucketName),
+		zap.Int("operations", len(operations)))
+	return results
+}
+
 func (f *FSM) applyUpdateAccessTime(data interface{}) interface{} {
 	objectData, ok := data.(map[string]interface{})
 	if !ok {
@@ -4,9 +4,11 @@ import (
 	"crypto/sha256"
 	"encoding/hex"
 	"encoding/json"
+	"errors"
 	"fmt"
 	"io"
 	"net/http"
+	"net/url"
 	"os"
 	"path/filepath"
 	"strconv"
@@ -94,86 +96,220 @@ func (h *Handler) HandleUpload(w http.ResponseWriter, r *http.Request) {
 		zap.Int("index", index),
 		zap.Int64("size", header.Size))
 
-	// Create shard directory
-	shardDir := filepath.Join(h.storage.GetDataDir(), "shards", bucketName, objectKey)
-	if err := os.MkdirAll(shardDir, 0755); err != nil {
-		h.logger.Error("Failed to create shard directory", zap.Error(err))
-		http.Error(w, "Failed to create directory", http.StatusInternalServerError)
+	req := UploadRequest{
+		ShardID:     shardID,
+		ObjectKey:   objectKey,
+		BucketName:  bucketName,
+		ShardType:   shardType,
+		Index:       index,
+		TotalShards: totalShards,
+	}
+	bytesWritten, checksum, err := h.writeShard(req, file, "")
+	if err != nil {
+		h.logger.Error("Failed to store shard", zap.String("shardId", shardID), zap.Error(err))
+		http.Error(w, "Failed to store shard", http.StatusInternalServerError)
 		return
 	}
 
-	// Create shard file
-	shardPath := filepath.Join(shardDir, fmt.Sprintf("%s.shard", shardID))
-	outFile, err := os.Create(shardPath)
+	// Update storage metrics
+	h.storage.UpdateMetrics(bytesWritten, time.Since(startTime))
+
+	h.logger.Info("Shard uploaded successfully",
+		zap.String("shardId", shardID),
+		zap.Int64("size", bytesWritten),
+		zap.String("checksum", checksum),
+		zap.Duration("duration", time.Since(startTime)))
+
+	// Return success response
+	response := map[string]interface{}{
+		"shardId":  shardID,
+		"size":     bytesWritten,
+		"checksum": checksum,
+		"message":  "Shard uploaded successfully",
+	}
+
+	w.Header().Set("Content-Type", "application/json")
+	w.WriteHeader(http.StatusCreated)
+	json.NewEncoder(w).Encode(response)
+}
+
+// ErrChecksumMismatch is returned when shard data doesn't match its expected checksum
+var ErrChecksumMismatch = errors.New("shard checksum mismatch")
+
+// writeShard stores shard data and its metadata file. The data is written to
+// a temporary file and renamed into place once complete (and, if
+// expectedChecksum is set, verified), so a failed write never leaves a
+// partial shard behind.
+func (h *Handler) writeShard(req UploadRequest, src io.Reader, expectedChecksum string) (int64, string, error) {
+	shardDir := filepath.Join(h.storage.GetDataDir(), "shards", req.BucketName, req.ObjectKey)
+	if err := os.MkdirAll(shardDir, 0755); err != nil {
+		return 0, "", fmt.Errorf("failed to create shard directory: %w", err)
+	}
+
+	shardPath := filepath.Join(shardDir, fmt.Sprintf("%s.shard", req.ShardID))
+	tmpFile, err := os.CreateTemp(shardDir, fmt.Sprintf("%s.shard.tmp-*", req.ShardID))
 	if err != nil {
-		h.logger.Error("Failed to create shard file", zap.Error(err))
-		http.Error(w, "Failed to create file", http.StatusInternalServerError)
-		return
+		return 0, "", fmt.Errorf("failed to create shard file: %w", err)
 	}
-	defer outFile.Close()
+	defer os.Remove(tmpFile.Name())
+	defer tmpFile.Close()
 
-	// Copy file data and calculate checksum
+	// Copy data and calculate checksum
 	hasher := sha256.New()
-	writer := io.MultiWriter(outFile, hasher)
-
-	bytesWritten, err := io.Copy(writer, file)
+	bytesWritten, err := io.Copy(io.MultiWriter(tmpFile, hasher), src)
 	if err != nil {
-		h.logger.Error("Failed to write shard data", zap.Error(err))
-		http.Error(w, "Failed to write file", http.StatusInternalServerError)
-		return
+		return 0, "", fmt.Errorf("failed to write shard data: %w", err)
 	}
 
 	checksum := hex.EncodeToString(hasher.Sum(nil))
+	if expectedChecksum != "" && checksum != expectedChecksum {
+		return bytesWritten, checksum, ErrChecksumMismatch
+	}
+
+	if err := tmpFile.Close(); err != nil {
+		return 0, "", fmt.Errorf("failed to write shard data: %w", err)
+	}
+	if err := os.Rename(tmpFile.Name(), shardPath); err != nil {
+		return 0, "", fmt.Errorf("failed to move shard into place: %w", err)
+	}
 
-	// Create metadata file
 	metadata := map[string]interface{}{
-		"shardId":     shardID,
-		"objectKey":   objectKey,
-		"bucketName":  bucketName,
-		"shardType":   shardType,
-		"index":       index,
-		"totalShards": totalShards,
+		"shardId":     req.ShardID,
+		"objectKey":   req.ObjectKey,
+		"bucketName":  req.BucketName,
+		"shardType":   req.ShardType,
+		"index":       req.Index,
+		"totalShards": req.TotalShards,
 		"size":        bytesWritten,
 		"checksum":    checksum,
 		"uploadedAt":  time.Now(),
 		"tier":        h.storage.GetTier(),
 	}
 
-	metadataPath := filepath.Join(shardDir, fmt.Sprintf("%s.meta", shardID))
+	metadataPath := filepath.Join(shardDir, fmt.Sprintf("%s.meta", req.ShardID))
 	metadataFile, err := os.Create(metadataPath)
 	if err != nil {
-		h.logger.Error("Failed to create metadata file", zap.Error(err))
-		http.Error(w, "Failed to create metadata", http.StatusInternalServerError)
-		return
+		return 0, "", fmt.Errorf("failed to create metadata file: %w", err)
 	}
 	defer metadataFile.Close()
 
 	if err := json.NewEncoder(metadataFile).Encode(metadata); err != nil {
-		h.logger.Error("Failed to write metadata", zap.Error(err))
-		http.Error(w, "Failed to write metadata", http.StatusInternalServerError)
+		return 0, "", fmt.Errorf("failed to write metadata: %w", err)
+	}
+
+	return bytesWritten, checksum, nil
+}
+
+// FetchRequest asks a node to copy a shard from another node. The copy is
+// stored as ShardID; SourceShardID names the shard on the source node
+// (defaults to ShardID).
+type FetchRequest struct {
+	UploadRequest
+	SourceAddr    string `json:"sourceAddr"`
+	SourceShardID string `json:"sourceShardId"`
+	Checksum      string `json:"checksum"`
+}
+
+// fetchClient streams shards from other nodes; no overall timeout since
+// shards can be large, but connecting and waiting for headers are bounded
+var fetchClient = &http.Client{
+	Transport: &http.Transport{
+		Proxy:                 http.ProxyFromEnvironment,
+		ResponseHeaderTimeout: 30 * time.Second,
+		IdleConnTimeout:       90 * time.Second,
+	},
+}
+
+// HandleFetch copies a shard from another node onto this one, streaming it
+// straight to disk and verifying its checksum. Used for tier migration so
+// shard data never passes through the API.
+func (h *Handler) HandleFetch(w http.ResponseWriter, r *http.Request) {
+	startTime := time.Now()
+
+	var req FetchRequest
+	if err := json.NewDecoder(r.Body).Decode(&req); err != nil {
+		http.Error(w, "Invalid request body", http.StatusBadRequest)
+		return
+	}
+	if req.ShardID == "" || req.ObjectKey == "" || req.BucketName == "" || req.SourceAddr == "" {
+		http.Error(w, "shardId, objectKey, bucketName and sourceAddr are required", http.StatusBadRequest)
+		return
+	}
+
+	if req.SourceShardID == "" {
+		req.SourceShardID = req.ShardID
+	}
+
+	sourceURL := fmt.Sprintf("http://%s/shard/download/%s?%s", req.SourceAddr, url.PathEscape(req.SourceShardID),
+		url.Values{"bucket": {req.BucketName}, "object": {req.ObjectKey}}.Encode())
+	sourceReq, err := http.NewRequestWithContext(r.Context(), http.MethodGet, sourceURL, nil)
+	if err != nil {
+		http.Error(w, "Invalid source", http.StatusBadRequest)
+		return
+	}
+
+	resp, err := fetchClient.Do(sourceReq)
+	if err != nil {
+		h.logger.Error("Failed to fetch shard from source", zap.String("shardId", req.ShardID), zap.String("source", req.SourceAddr), zap.Error(err))
+		http.Error(w, "Failed to fetch shard from source", http.StatusBadGateway)
+		return
+	}
+	defer resp.Body.Close()
+
+	if resp.StatusCode != http.StatusOK {
+		h.logger.Error("Source refused shard fetch", zap.String("shardId", req.ShardID), zap.String("source", req.SourceAddr), zap.Int("status", resp.StatusCode))
+		http.Error(w, fmt.Sprintf("Source returned status %d", resp.StatusCode), http.StatusBadGateway)
+		return
+	}
+
+	// Verify against the caller's checksum, or the source's own
+	expected := req.Checksum
+	if expected == "" {
+		expected = resp.Header.Get("X-Shard-Checksum")
+	}
+
+	bytesWritten, checksum, err := h.writeShard(req.UploadRequest, resp.Body, expected)
+	if errors.Is(err, ErrChecksumMismatch) {
+		h.logger.Error("Fetched shard failed checksum verification",
+			zap.String("shardId", req.ShardID),
+			zap.String("expected", expected),
+			zap.String("actual", checksum))
+		http.Error(w, "Checksum mismatch", http.StatusConflict)
+		return
+	}
+	if err != nil {
+		h.logger.Error("Failed to store fetched shard", zap.String("shardId", req.ShardID), zap.Error(err))
+		http.Error(w, "Failed to store shard", http.StatusInternalServerError)
 		return
 	}
 
-	// Update storage metrics
 	h.storage.UpdateMetrics(bytesWritten, time.Since(startTime))
 
-	h.logger.Info("Shard uploaded successfully",
-		zap.String("shardId", shardID),
+	h.logger.Info("Shard fetched successfully",
+		zap.String("shardId", req.ShardID),
+		zap.String("source", req.SourceAddr),
 		zap.Int64("size", bytesWritten),
-		zap.String("checksum", checksum),
 		zap.Duration("duration", time.Since(startTime)))
 
-	// Return success response
-	response := map[string]interface{}{
-		"shardId":  shardID,
+	w.Header().Set("Content-Type", "application/json")
+	w.WriteHeader(http.StatusCreated)
+	json.NewEncoder(w).Encode(map[string]interface{}{
+		"shardId":  req.ShardID,
 		"size":     bytesWritten,
 		"checksum": checksum,
-		"message":  "Shard uploaded successfully",
-	}
+	})
+}
 
-	w.Header().Set("Content-Type", "application/json")
-	w.WriteHeader(http.StatusCreated)
-	json.NewEncoder(w).Encode(response)
+// countingResponseWriter records how many body bytes were written
+type countingResponseWriter struct {
+	http.ResponseWriter
+	written int64
+}
+
+func (c *countingResponseWriter) Write(p []byte) (int, error) {
+	n, err := c.ResponseWriter.Write(p)
+	c.written += int64(n)
+	return n, err
 }
 
 // HandleDownload handles shard download requests
@@ -237,9 +373,8 @@ func (h *Handler) HandleDownload(w http.ResponseWriter, r *http.Request) {
 		return
 	}
 
-	// Set headers
+	// Set headers (Content-Length is set by ServeContent)
 	w.Header().Set("Content-Type", "application/octet-stream")
-	w.Header().Set("Content-Length", strconv.FormatInt(fileInfo.Size(), 10))
 	w.Header().Set("Content-Disposition", fmt.Sprintf("attachment; filename=%s.shard", shardID))
 
 	if metadata != nil {
@@ -251,12 +386,11 @@ func (h *Handler) HandleDownload(w http.ResponseWriter, r *http.Request) {
 		}
 	}
 
-	// Stream file content
-	bytesServed, err := io.Copy(w, file)
-	if err != nil {
-		h.logger.Error("Failed to stream shard", zap.Error(err))
-		return
-	}
+	// Stream file content; ServeContent answers Range requests so callers
+	// can read part of a shard (e.g. one entry of a pack segment)
+	counter := &countingResponseWriter{ResponseWriter: w}
+	http.ServeContent(counter, r, fmt.Sprintf("%s.shard", shardID), fileInfo.ModTime(), file)
+	bytesServed := counter.written
 
 	// Update metrics
 	h.storage.UpdateDownloadMetrics(bytesServed, time.Since(startTime))
@@ -267,6 +401,77 @@ func (h *Handler) HandleDownload(w http.ResponseWriter, r *http.Request) {
 		zap.Duration("duration", time.Since(startTime)))
 }
 
+// HandleVerify re-reads a shard from disk and reports its checksum, so
+// integrity scrubbing does not have to transfer shard data. The checksum is
+// compared against the caller's expected checksum (the "checksum" query
+// parameter), or the one recorded when the shard was written.
+func (h *Handler) HandleVerify(w http.ResponseWriter, r *http.Request) {
+	shardID := mux.Vars(r)["shardID"]
+
+	bucketName := r.URL.Query().Get("bucket")
+	objectKey := r.URL.Query().Get("object")
+	if shardID == "" || bucketName == "" || objectKey == "" {
+		http.Error(w, "Shard ID, bucket and object parameters are required", http.StatusBadRequest)
+		return
+	}
+
+	shardDir := filepath.Join(h.storage.GetDataDir(), "shards", bucketName, objectKey)
+	shardPath := filepath.Join(shardDir, fmt.Sprintf("%s.shard", shardID))
+	metadataPath := filepath.Join(shardDir, fmt.Sprintf("%s.meta", shardID))
+
+	file, err := os.Open(shardPath)
+	if os.IsNotExist(err) {
+		http.Error(w, "Shard not found", http.StatusNotFound)
+		return
+	}
+	if err != nil {
+		h.logger.Error("Failed to open shard file", zap.String("shardId", shardID), zap.Error(err))
+		http.Error(w, "Failed to open file", http.StatusInternalServerError)
+		return
+	}
+	defer file.Close()
+
+	expected := r.URL.Query().Get("checksum")
+	if expected == "" {
+		var metadata map[string]interface{}
+		if metadataFile, err := os.Open(metadataPath); err == nil {
+			json.NewDecoder(metadataFile).Decode(&metadata)
+			metadataFile.Close()
+		}
+		expected, _ = metadata["checksum"].(string)
+	}
+
+	// A read error is reported as a failed verification: the shard is
+	// unreadable and needs repair just like a corrupt one
+	hasher := sha256.New()
+	size, err := io.Copy(hasher, file)
+	checksum := hex.EncodeToString(hasher.Sum(nil))
+	readError := ""
+	if err != nil {
+		readError = err.Error()
+		checksum = ""
+	}
+	ok := readError == "" && (expected == "" || checksum == expected)
+
+	if !ok {
+		h.logger.Warn("Shard failed verification",
+			zap.String("shardId", shardID),
+			zap.String("expected", expected),
+			zap.String("actual", checksum),
+			zap.String("error", readError))
+	}
+
+	w.Header().Set("Content-Type", "application/json")
+	json.NewEncoder(w).Encode(map[string]interface{}{
+		"shardId":  shardID,
+		"size":     size,
+		"checksum": checksum,
+		"expected": expected,
+		"ok":       ok,
+		"error":    readError,
+	})
+}
+
 // HandleDelete handles shard deletion requests
 func (h *Handler) HandleDelete(w http.ResponseWriter, r *http.Request) {
 	vars := mux.Vars(r)
@@ -290,16 +495,30 @@ func (h *Handler) HandleDelete(w http.ResponseWriter, r *http.Request) {
 		zap.String("bucketName", bucketName),
 		zap.String("objectKey", objectKey))
 
-	// Find shard files
+	if _, err := h.deleteShardFiles(bucketName, objectKey, shardID); err != nil {
+		h.logger.Error("Failed to delete shard file", zap.Error(err))
+		http.Error(w, "Failed to delete shard", http.StatusInternalServerError)
+		return
+	}
+
+	h.logger.Info("Shard deleted successfully", zap.String("shardId", shardID))
+
+	w.WriteHeader(http.StatusNoContent)
+}
+
+// deleteShardFiles removes a shard and its metadata file, reporting whether the shard existed
+func (h *Handler) deleteShardFiles(bucketName, objectKey, shardID string) (bool, error) {
 	shardDir := filepath.Join(h.storage.GetDataDir(), "shards", bucketName, objectKey)
 	shardPath := filepath.Join(shardDir, fmt.Sprintf("%s.shard", shardID))
 	metadataPath := filepath.Join(shardDir, fmt.Sprintf("%s.meta", shardID))
 
 	// Delete shard file
-	if err := os.Remove(shardPath); err != nil && !os.IsNotExist(err) {
-		h.logger.Error("Failed to delete shard file", zap.Error(err))
-		http.Error(w, "Failed to delete shard", http.StatusInternalServerError)
-		return
+	existed := true
+	if err := os.Remove(shardPath); err != nil {
+		if !os.IsNotExist(err) {
+			return false, err
+		}
+		existed = false
 	}
 
 	// Delete metadata file
@@ -313,9 +532,81 @@ func (h *Handler) HandleDelete(w http.ResponseWriter, r *http.Request) {
 		os.Remove(shardDir)
 	}
 
-	h.logger.Info("Shard deleted successfully", zap.String("shardId", shardID))
+	return existed, nil
+}
 
-	w.WriteHeader(http.StatusNoContent)
+// MaxBulkDeleteShards limits the shards deleted by one bulk request
+const MaxBulkDeleteShards = 10000
+
+// BulkDeleteRequest represents a request to delete many shards of a bucket
+type BulkDeleteRequest struct {
+	BucketName string `json:"bucket"`
+	Shards     []struct {
+		ShardID   string `json:"shardId"`
+		ObjectKey string `json:"object"`
+	} `json:"shards"`
+}
+
+// BulkDeleteResult is the outcome for one shard of a bulk delete
+type BulkDeleteResult struct {
+	ShardID string `json:"shardId"`
+	Status  string `json:"status"` // "deleted", "not_found" or "error"
+	Error   string `json:"error,omitempty"`
+}
+
+// HandleBulkDelete deletes many shards in one request
+func (h *Handler) HandleBulkDelete(w http.ResponseWriter, r *http.Request) {
+	startTime := time.Now()
+
+	var req BulkDeleteRequest
+	if err := json.NewDecoder(r.Body).Decode(&req); err != nil {
+		http.Error(w, "Invalid JSON", http.StatusBadRequest)
+		return
+	}
+
+	if req.BucketName == "" {
+		http.Error(w, "Bucket is required", http.StatusBadRequest)
+		return
+	}
+	if len(req.Shards) > MaxBulkDeleteShards {
+		http.Error(w, fmt.Sprintf("At most %d shards per request", MaxBulkDeleteShards), http.StatusRequestEntityTooLarge)
+		return
+	}
+
+	results := make([]BulkDeleteResult, 0, len(req.Shards))
+	deleted, failed := 0, 0
+	for _, shard := range req.Shards {
+		result := BulkDeleteResult{ShardID: shard.ShardID}
+		if shard.ShardID == "" || shard.ObjectKey == "" {
+			result.Status = "error"
+			result.Error = "shardId and object are required"
+			failed++
+		} else if existed, err := h.deleteShardFiles(req.BucketName, shard.ObjectKey, shard.ShardID); err != nil {
+			result.Status = "error"
+			result.Error = err.Error()
+			failed++
+		} else if existed {
+			result.Status = "deleted"
+			deleted++
+		} else {
+			result.Status = "not_found"
+		}
+		results = append(results, result)
+	}
+
+	h.logger.Info("Bulk shard delete completed",
+		zap.String("bucketName", req.BucketName),
+		zap.Int("requested", len(req.Shards)),
+		zap.Int("deleted", deleted),
+		zap.Int("failed", failed),
+		zap.Duration("duration", time.Since(startTime)))
+
+	w.Header().Set("Content-Type", "application/json")
+	json.NewEncoder(w).Encode(map[string]interface{}{
+		"results": results,
+		"deleted": deleted,
+		"failed":  failed,
+	})
 }
 
 // HandleList handles shard listing requests
@@ -342,8 +633,11 @@ func (h *Handler) HandleList(w http.ResponseWriter, r *http.Request) {
 			}
 		}
 	} else {
-		// List all shards on this node
+		// List all shards on this node, or all shards of one bucket
 		shardsDir := filepath.Join(h.storage.GetDataDir(), "shards")
+		if bucketName != "" {
+			shardsDir = filepath.Join(shardsDir, bucketName)
+		}
 		filepath.Walk(shardsDir, func(path string, info os.FileInfo, err error) error {
 			if err != nil {
 				return nil
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Benchmark the compiled forest against scikit-learn's RandomForest
+
+Trains a RandomForest like the one train_model.py trains, compiles it with
+CompiledForest and first checks equivalence: probabilities within
+--tolerance and identical labels on training rows, fresh random rows and
+rows sitting exactly on split thresholds (exits non-zero on a mismatch).
+Then compares cold start (load from disk), memory of the node arrays and per-batch latency for each --batch-sizes.
+
+Usage:
+    python benchmarks/forest_benchmark.py [--trees 100] [--max-depth 10]
+        [--batch-sizes 1,16,64,256,1024] [--repeat 50] [--tolerance 1e-6]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from typing import Callable, Tuple
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src", "inference"))
+
+import joblib  # noqa: E402
+import numpy as np  # noqa: E402
+from sklearn.ensemble import RandomForestClassifier  # noqa: E402
+
+from forest import CompiledForest  # noqa: E402
+
+N_FEATURES = 17
+
+
+def build_data(rows: int) -> Tuple[np.ndarray, np.ndarray]:
+    rng = np.random.default_rng(42)
+    X = rng.random((rows, N_FEATURES)).astype(np.float32)
+    # A few discrete columns, like the encoded categoricals and flags
+    X[:, 0] = rng.integers(0, 24, rows)
+    X[:, 15] = rng.integers(0, 4, rows)
+    y = ((X[:, 9] + 0.5 * X[:, 3] + 0.2 * rng.random(rows)) > 0.8).astype(int)
+    return X, y
+
+
+def threshold_rows(model: RandomForestClassifier, rows: int) -> np.ndarray:
+    """Rows whose features sit on (float32-rounded) split thresholds"""
+    rng = np.random.default_rng(7)
+    thresholds = np.concatenate([est.tree_.threshold[est.tree_.children_left >= 0] for est in model.estimators_])
+    features = np.concatenate([est.tree_.feature[est.tree_.children_left >= 0] for est in model.estimators_])
+    X = rng.random((rows, N_FEATURES)).astype(np.float32)
+    picks = rng.integers(0, len(thresholds), rows)
+    X[np.arange(rows), features[picks]] = thresholds[picks].astype(np.float32)
+    return X
+
+
+def check_equivalence(model: RandomForestClassifier, forest: CompiledForest, X: np.ndarray,
+                      name: str, tolerance: float):
+    expected = model.predict_proba(X)
+    actual = forest.predict_proba(X)
+    diff = float(np.abs(expected - actual).max())
+    labels_match = bool(np.array_equal(model.predict(X), forest.predict(X)))
+    print(f"{name:>12}: {len(X)} rows, max |p diff| {diff:.2e}, labels {'match' if labels_match else 'DIFFER'}")
+    if diff > tolerance or not labels_match:
+        sys.exit(f"Compiled forest diverges from scikit-learn on {name} rows")
+
+
+def best_of(fn: Callable, repeat: int) -> float:
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def sklearn_tree_bytes(model: RandomForestClassifier) -> int:
+    """Bytes of the node and value arrays behind a forest's trees"""
+    total = 0
+    for est in model.estimators_:
+        state = est.tree_.__getstate__()
+        total += state["nodes"].nbytes + state["values"].nbytes
+    return total
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--trees", type=int, default=100, help="Trees in the benchmark forest")
+    parser.add_argument("--max-depth", type=int, default=10, help="Max tree depth")
+    parser.add_argument("--batch-sizes", default="1,16,64,256,1024", help="Comma-separated batch sizes")
+    parser.add_argument("--repeat", type=int, default=50, help="Timed runs per batch size (best is kept)")
+    parser.add_argument("--tolerance", type=float, default=1e-6, help="Max allowed probability difference")
+    args = parser.parse_args()
+
+    X, y = build_data(20000)
+    model = RandomForestClassifier(n_estimators=args.trees, max_depth=args.max_depth, min_samples_split=5,
+                                   min_samples_leaf=2, random_state=42, n_jobs=1).fit(X, y)
+    forest = CompiledForest.from_sklearn(model)
+    print(f"RandomForest: {args.trees} trees, depth {forest.depth}, {len(forest.feature)} nodes")
+
+    check_equivalence(model, forest, X, "training", args.tolerance)
+    fresh = (np.random.default_rng(1).random((5000, N_FEATURES)) * 1.2 - 0.1).astype(np.float32)
+    check_equivalence(model, forest, fresh, "random", args.tolerance)
+    check_equivalence(model, forest, threshold_rows(model, 5000), "thresholds", args.tolerance)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        joblib_path = os.path.join(tmp, "tiering_model.joblib")
+        forest_path = os.path.join(tmp, "tiering_model.forest.npz")
+        joblib.dump(model, joblib_path)
+        forest.save(forest_path)
+
+        print(f"\n{'':>16} {'file KB':>10} {'load ms':>10} {'nodes KB':>10}")
+        for name, path, load, nbytes in (
+            ("scikit-learn", joblib_path, lambda: joblib.load(joblib_path), sklearn_tree_bytes(model)),
+            ("compiled forest", forest_path, lambda: CompiledForest.load(forest_path), forest.nbytes),
+        ):
+            load_time = best_of(load, 5)
+            print(f"{name:>16} {os.path.getsize(path) / 1024:>10.0f} {load_time * 1000:>10.1f} {nbytes / 1024:>10.0f}")
+
+    print(f"\n{'batch':>8} {'sklearn ms':>12} {'compiled ms':>12} {'speedup':>8}")
+    rows = build_data(max(map(int, args.batch_sizes.split(","))))[0]
+    for batch in map(int, args.batch_sizes.split(",")):
+        features = rows[:batch]
+        sklearn_time = best_of(lambda: model.predict_proba(features), args.repeat)
+        forest_time = best_of(lambda: forest.predict_proba(features), args.repeat)
+        print(f"{batch:>8} {sklearn_time * 1000:>12.3f} {forest_time * 1000:>12.3f} "
+              f"{sklearn_time / forest_time:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
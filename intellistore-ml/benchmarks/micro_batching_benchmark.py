@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Benchmark micro-batching: throughput/latency curve of concurrent predictions
+
+Closed-loop clients each send single-row predictions back to back against
+a RandomForest like the one train_model.py trains, first scored one call
+per request on the event loop (micro-batching disabled) and then through a
+MicroBatcher with each --waits-ms setting.  Prints throughput and latency
+percentiles per concurrency level.
+
+Usage:
+    python benchmarks/micro_batching_benchmark.py [--clients 1,8,32,128,512]
+        [--waits-ms 0.5,2,5] [--max-batch 256] [--duration 3] [--trees 100]
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import statistics
+import sys
+import time
+from typing import Dict, List
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src", "inference"))
+
+import numpy as np  # noqa: E402
+import structlog  # noqa: E402
+from sklearn.ensemble import RandomForestClassifier  # noqa: E402
+
+from batching import MicroBatcher  # noqa: E402
+
+N_FEATURES = 17
+
+
+def build_model(trees: int) -> RandomForestClassifier:
+    rng = np.random.default_rng(42)
+    X = rng.random((20000, N_FEATURES)).astype(np.float32)
+    y = ((X[:, 9] + 0.5 * X[:, 3] + 0.2 * rng.random(len(X))) > 0.8).astype(int)
+    model = RandomForestClassifier(n_estimators=trees, max_depth=10, min_samples_split=5,
+                                   min_samples_leaf=2, random_state=42, n_jobs=1)
+    return model.fit(X, y)
+
+
+def make_predict_batch(model):
+    def predict_batch(features: np.ndarray) -> Dict[str, np.ndarray]:
+        probabilities = model.predict_proba(features)
+        return {"prediction": probabilities.argmax(axis=1), "probability_hot": probabilities[:, 1]}
+    return predict_batch
+
+
+def percentile(values: List[float], pct: float) -> float:
+    return sorted(values)[min(len(values) - 1, int(len(values) * pct))]
+
+
+async def run_clients(predict, clients: int, duration: float) -> Dict[str, float]:
+    rows = np.random.default_rng(0).random((1024, N_FEATURES)).astype(np.float32)
+    latencies: List[float] = []
+    deadline = time.perf_counter() + duration
+
+    async def client(i: int):
+        n = i
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            await predict(rows[n % len(rows)].reshape(1, -1))
+            latencies.append(time.perf_counter() - start)
+            n += clients
+
+    start = time.perf_counter()
+    await asyncio.gather(*[client(i) for i in range(clients)])
+    elapsed = time.perf_counter() - start
+    return {
+        "throughput": len(latencies) / elapsed,
+        "p50": statistics.median(latencies),
+        "p99": percentile(latencies, 0.99),
+    }
+
+
+async def run(args):
+    model = build_model(args.trees)
+    predict_batch = make_predict_batch(model)
+
+    async def unbatched(features: np.ndarray):
+        # Yield first so concurrent requests queue on the event loop as they
+        # do in the service, then score on the loop
+        await asyncio.sleep(0)
+        return predict_batch(features)
+
+    modes = [("unbatched", None)] + [(f"wait {wait:g}ms", wait) for wait in map(float, args.waits_ms.split(","))]
+    print(f"RandomForest with {args.trees} trees, max batch {args.max_batch}, {args.duration:.0f}s per point")
+    print(f"{'mode':>12} {'clients':>8} {'pred/s':>10} {'p50 ms':>8} {'p99 ms':>8}")
+    for name, wait in modes:
+        for clients in map(int, args.clients.split(",")):
+            if wait is None:
+                stats = await run_clients(unbatched, clients, args.duration)
+            else:
+                batcher = MicroBatcher(predict_batch, max_batch_size=args.max_batch, max_wait=wait / 1000)
+                stats = await run_clients(batcher.predict, clients, args.duration)
+                await batcher.stop()
+            print(f"{name:>12} {clients:>8} {stats['throughput']:>10.0f} "
+                  f"{stats['p50'] * 1000:>8.2f} {stats['p99'] * 1000:>8.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", default="1,8,32,128,512", help="Comma-separated concurrency levels")
+    parser.add_argument("--waits-ms", default="0.5,2,5", help="Comma-separated max waits to compare")
+    parser.add_argument("--max-batch", type=int, default=256, help="Max rows per micro-batch")
+    parser.add_argument("--duration", type=float, default=3.0, help="Seconds per measurement")
+    parser.add_argument("--trees", type=int, default=100, help="Trees in the benchmark forest")
+    args = parser.parse_args()
+
+    structlog.configure(wrapper_class=structlog.make_filtering_bound_logger(logging.CRITICAL))
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
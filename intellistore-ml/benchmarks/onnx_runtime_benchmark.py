@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Benchmark ONNX Runtime inference paths for the tiering model
+
+Exports a RandomForest like the one train_model.py trains twice with
+skl2onnx: with the default zipmap output (a {label: probability} dict per
+row) and with zipmap disabled, as training now exports it.  Then times
+per-batch latency of:
+
+  default  - default SessionOptions, get_inputs() on every call and the
+             dict-per-row probabilities converted in Python (the old path)
+  tuned    - onnx_session_options() with each --threads setting, cached
+             names and IO binding buffers (OnnxRunner)
+
+Needs onnxruntime and skl2onnx.
+
+Usage:
+    python benchmarks/onnx_runtime_benchmark.py [--trees 100]
+        [--batch-sizes 1,8,32,128,256,1024] [--threads 1,2,4]
+        [--optimization all] [--repeat 200]
+"""
+
+import argparse
+import os
+import sys
+import time
+from typing import Callable
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src", "inference"))
+
+import numpy as np  # noqa: E402
+from sklearn.ensemble import RandomForestClassifier  # noqa: E402
+
+try:
+    import onnxruntime as ort
+    from skl2onnx import convert_sklearn
+    from skl2onnx.common.data_types import FloatTensorType
+except ImportError as e:
+    sys.exit(f"This benchmark needs onnxruntime and skl2onnx: {e}")
+
+from registry import OnnxRunner, onnx_session_options  # noqa: E402
+
+N_FEATURES = 17
+
+
+def build_model(trees: int) -> RandomForestClassifier:
+    rng = np.random.default_rng(42)
+    X = rng.random((20000, N_FEATURES)).astype(np.float32)
+    y = ((X[:, 9] + 0.5 * X[:, 3] + 0.2 * rng.random(len(X))) > 0.8).astype(int)
+    model = RandomForestClassifier(n_estimators=trees, max_depth=10, min_samples_split=5,
+                                   min_samples_leaf=2, random_state=42, n_jobs=1)
+    return model.fit(X, y)
+
+
+def export(model: RandomForestClassifier, zipmap: bool) -> bytes:
+    initial_type = [('float_input', FloatTensorType([None, N_FEATURES]))]
+    options = None if zipmap else {id(model): {'zipmap': False}}
+    return convert_sklearn(model, initial_types=initial_type, options=options).SerializeToString()
+
+
+def default_predict(session) -> Callable[[np.ndarray], np.ndarray]:
+    def predict(features: np.ndarray) -> np.ndarray:
+        input_name = session.get_inputs()[0].name
+        outputs = session.run(None, {input_name: features})
+        return np.array([[row[0], row[1]] for row in outputs[1]], dtype=np.float32)
+    return predict
+
+
+def tuned_predict(runner: OnnxRunner) -> Callable[[np.ndarray], np.ndarray]:
+    def predict(features: np.ndarray) -> np.ndarray:
+        return runner.run(features)[1]
+    return predict
+
+
+def best_of(fn: Callable, features: np.ndarray, repeat: int) -> float:
+    fn(features)
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(features)
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--trees", type=int, default=100, help="Trees in the benchmark forest")
+    parser.add_argument("--batch-sizes", default="1,8,32,128,256,1024", help="Comma-separated batch sizes")
+    parser.add_argument("--threads", default="1,2,4", help="Comma-separated intra-op thread counts to try")
+    parser.add_argument("--optimization", default="all", help="Graph optimization level for the tuned sessions")
+    parser.add_argument("--repeat", type=int, default=200, help="Timed runs per point (best is kept)")
+    args = parser.parse_args()
+
+    batch_sizes = [int(size) for size in args.batch_sizes.split(",")]
+    model = build_model(args.trees)
+    zipmap_model = export(model, zipmap=True)
+    tensor_model = export(model, zipmap=False)
+
+    paths = [("default", default_predict(ort.InferenceSession(zipmap_model,
+                                                               providers=["CPUExecutionProvider"])))]
+    # Bind the benchmark's batch sizes except the largest, which runs unbound
+    bind_sizes = batch_sizes[:-1]
+    for threads in map(int, args.threads.split(",")):
+        session = ort.InferenceSession(tensor_model, sess_options=onnx_session_options(threads, 1, args.optimization),
+                                       providers=["CPUExecutionProvider"])
+        paths.append((f"tuned x{threads}", tuned_predict(OnnxRunner(session, bind_sizes))))
+
+    rows = np.random.default_rng(0).random((max(batch_sizes), N_FEATURES)).astype(np.float32)
+    expected = model.predict_proba(rows)
+    for name, predict in paths:
+        diff = np.abs(predict(rows) - expected).max()
+        if diff > 1e-5:
+            sys.exit(f"{name} probabilities differ from scikit-learn by {diff:.2e}")
+
+    print(f"RandomForest with {args.trees} trees, IO binding for batch sizes {bind_sizes}")
+    print(f"{'batch':>8}" + "".join(f"{name:>14}" for name, _ in paths) + "   (ms per batch)")
+    for batch in batch_sizes:
+        features = rows[:batch]
+        timings = [best_of(predict, features, args.repeat) for _, predict in paths]
+        print(f"{batch:>8}" + "".join(f"{t * 1000:>14.3f}" for t in timings))
+
+
+if __name__ == "__main__":
+    main()
@@ -2,9 +2,16 @@
 """
 Simplified ML Inference Service for IntelliStore
 Works without external dependencies like Kafka
+
+Event features are built like the full service's (src/inference/main.py):
+FeaturePipeline.transform_events with access history looked up in the
+online feature store.  This service does not consume access logs itself;
+it serves the store's latest snapshot and reloads it when it changes.
 """
 
+import asyncio
 import json
+import sys
 import time
 import os
 from typing import Dict, Any, Optional
@@ -20,10 +27,32 @@ load_dotenv()
 from pydantic import BaseModel, Field
 import uvicorn
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "src", "inference"))
+
+from feature_store import OBJECT_HISTORY_COLUMNS, OnlineFeatureStore
+from features import HISTORY_DEFAULTS, FeaturePipeline
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Online feature store snapshot written by the full service's access-log consumer
+FEATURE_STORE_ENABLED = os.getenv("ML_FEATURE_STORE_ENABLED", "true").lower() == "true"
+FEATURE_STORE_CAPACITY = int(os.getenv("ML_FEATURE_STORE_CAPACITY", "100000"))
+FEATURE_STORE_HALF_LIFE = float(os.getenv("ML_FEATURE_STORE_HALF_LIFE", "86400"))
+FEATURE_STORE_SNAPSHOT = os.getenv("ML_FEATURE_STORE_SNAPSHOT", "data/feature_store.npz")
+FEATURE_STORE_RELOAD_INTERVAL = float(os.getenv("ML_FEATURE_STORE_RELOAD_INTERVAL", "60"))
+
+# Features the rules are given, in the trained models' order
+FEATURE_COLUMNS = [
+    'hour_of_day', 'day_of_week', 'is_weekend', 'is_business_hours', 'object_age_days', 'size', 'is_media',
+    'user_activity_level', 'bucket_popularity', 'access_count_7d', 'download_count_7d', 'unique_users_7d',
+    'avg_daily_access', 'last_access_hours_ago', 'recent_access_trend',
+]
+
+# Access history assumed without a feature store entry (this service's long-standing values)
+SIMPLE_HISTORY_DEFAULTS = {**HISTORY_DEFAULTS, 'user_activity_level': 5, 'bucket_popularity': 3}
+
 # Pydantic models
 class PredictionRequest(BaseModel):
     features: Dict[str, float] = Field(..., description="Feature values for prediction")
@@ -57,13 +86,46 @@ class SimpleMLService:
         self.start_time = time.time()
         self.model_version = "1.0.0-simple"
         self.initialized = False
+        self.pipeline = FeaturePipeline(FEATURE_COLUMNS)
+        self.feature_store: Optional[OnlineFeatureStore] = None
+        self._snapshot_mtime: Optional[float] = None
         
     async def initialize(self):
         """Initialize the service"""
         logger.info("Initializing simplified ML service")
+        if FEATURE_STORE_ENABLED:
+            await asyncio.to_thread(self.reload_feature_store)
         self.initialized = True
         logger.info("ML service initialized successfully")
     
+    def reload_feature_store(self) -> bool:
+        """Load the feature store snapshot if it changed since the last load"""
+        try:
+            mtime = os.path.getmtime(FEATURE_STORE_SNAPSHOT)
+        except OSError:
+            return False
+        if mtime == self._snapshot_mtime:
+            return False
+        
+        # Load into a new store and swap it in, so lookups never see a partial load
+        store = OnlineFeatureStore(capacity=FEATURE_STORE_CAPACITY, half_life=FEATURE_STORE_HALF_LIFE)
+        if not store.load(FEATURE_STORE_SNAPSHOT):
+            return False
+        self.feature_store = store
+        self._snapshot_mtime = mtime
+        logger.info(f"Feature store snapshot loaded from {FEATURE_STORE_SNAPSHOT} "
+                    f"({len(store.objects)} objects, {store.events_applied} events)")
+        return True
+    
+    async def follow_feature_store(self):
+        """Reload the feature store snapshot whenever it is rewritten"""
+        while True:
+            await asyncio.sleep(FEATURE_STORE_RELOAD_INTERVAL)
+            try:
+                await asyncio.to_thread(self.reload_feature_store)
+            except Exception as e:
+                logger.error(f"Feature store reload failed: {e}")
+    
     def predict_from_features(self, features: Dict[str, float]) -> Dict[str, Any]:
         """Make prediction from feature dictionary"""
         try:
@@ -76,6 +138,7 @@ class SimpleMLService:
             is_business_hours = features.get('is_business_hours', 1)
             is_media = features.get('is_media', 0)
             object_age_days = features.get('object_age_days', 1)
+            last_access_hours_ago = features.get('last_access_hours_ago', 24)
             
             # Simple scoring algorithm
             score = 0.5  # Base score
@@ -104,6 +167,12 @@ class SimpleMLService:
             elif object_age_days > 30:
                 score -= 0.2
             
+            # Access history factor (recently read objects stay hot, idle ones cool)
+            if last_access_hours_ago < 24:
+                score += 0.1
+            elif last_access_hours_ago >= 7 * 24:
+                score -= 0.1
+            
             # Ensure score is between 0 and 1
             score = max(0.0, min(1.0, score))
             
@@ -124,31 +193,21 @@ class SimpleMLService:
             raise HTTPException(status_code=500, detail=f"Prediction failed: {str(e)}")
     
     def extract_features_from_event(self, event: SimpleTieringEvent) -> Dict[str, float]:
-        """Extract features from a tiering event"""
+        """Extract features from a tiering event, with access history from the feature store"""
         current_time = time.time()
-        if event.timestamp is None:
-            event.timestamp = current_time
-        
-        # Extract basic features
-        features = {
-            'hour_of_day': float(time.localtime(current_time).tm_hour),
-            'day_of_week': float(time.localtime(current_time).tm_wday),
-            'is_weekend': float(time.localtime(current_time).tm_wday >= 5),
-            'is_business_hours': float(9 <= time.localtime(current_time).tm_hour <= 17),
-            'object_age_days': (current_time - event.timestamp) / (24 * 3600),
-            'size': float(event.size),
-            'is_media': float(event.content_type.startswith(('image/', 'video/', 'audio/'))),
-            'user_activity_level': 5.0,  # Default value
-            'bucket_popularity': 3.0,     # Default value
-            'access_count_7d': 2.0,       # Default value
-            'download_count_7d': 1.0,     # Default value
-            'unique_users_7d': 1.0,       # Default value
-            'avg_daily_access': 0.3,      # Default value
-            'last_access_hours_ago': 24.0, # Default value
-            'recent_access_trend': 1.0,   # Default value
-        }
+        events = [event.model_dump(exclude_none=True)]
         
-        return features
+        history = {col: np.full(1, value, dtype=np.float64) for col, value in SIMPLE_HISTORY_DEFAULTS.items()}
+        if self.feature_store:
+            # The store reports no accesses (and the 7-day cap on hours since
+            # the last one) for objects it has not seen; those keep the
+            # defaults, while bucket and user history still applies
+            looked_up = self.feature_store.lookup(events, current_time)
+            seen = bool(looked_up['in_table'][0])
+            history.update((col, values) for col, values in looked_up.items()
+                           if col in history and (seen or col not in OBJECT_HISTORY_COLUMNS))
+        row = self.pipeline.transform_events(events, now=current_time, history=history)[0]
+        return dict(zip(self.pipeline.feature_columns, row.tolist()))
     
     def get_health(self) -> Dict[str, Any]:
         """Get service health status"""
@@ -182,6 +241,9 @@ app.add_middleware(
 async def startup_event():
     """Initialize the service on startup"""
     await ml_service.initialize()
+    
+    if FEATURE_STORE_ENABLED:
+        asyncio.create_task(ml_service.follow_feature_store())
 
 @app.get("/health", response_model=HealthResponse)
 async def health_check():
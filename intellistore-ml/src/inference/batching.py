@@ -0,0 +1,158 @@
+"""
+Dynamic micro-batching of concurrent predictions
+
+Tree ensembles score a batch of rows far faster than the same rows one call
+at a time.  Concurrent callers (API requests, Kafka messages) queue their
+feature rows with a MicroBatcher, which flushes the queue as one matrix when
+``max_batch_size`` rows are waiting or the oldest has waited ``max_wait``
+seconds, and hands each caller its slice of the results.
+
+The model runs in a worker thread, so requests keep queuing while a batch
+is scored; under load batches grow towards ``max_batch_size`` by
+themselves, and when idle a lone request waits at most ``max_wait``.
+"""
+
+import asyncio
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+import structlog
+from prometheus_client import Counter, Histogram
+
+logger = structlog.get_logger(__name__)
+
+BATCH_FLUSHES = Counter('ml_batch_flushes_total', 'Micro-batches flushed', ['reason'])
+BATCH_QUEUE_WAIT = Histogram(
+    'ml_batch_queue_wait_seconds', 'Time a request waited in the micro-batch queue',
+    buckets=(1e-4, 5e-4, 1e-3, 2e-3, 5e-3, 1e-2, 2e-2, 5e-2, 0.1, 0.5)
+)
+
+
+class QueueFullError(Exception):
+    """Raised when more rows are pending than the batcher accepts"""
+
+
+class MicroBatcher:
+    """Coalesces concurrent prediction requests into batched model calls"""
+
+    def __init__(self,
+                 predict_fn: Callable[[np.ndarray], Dict[str, Any]],
+                 max_batch_size: int = 256,
+                 max_wait: float = 0.002,
+                 max_pending_rows: int = 100000):
+        """``predict_fn`` scores a (rows, n_features) matrix and returns a
+        dict of per-row arrays (and scalars, passed to every caller)"""
+        self.predict_fn = predict_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.max_pending_rows = max_pending_rows
+        self._pending: List[Tuple[np.ndarray, asyncio.Future, float]] = []
+        self._pending_rows = 0
+        self._arrived: Optional[asyncio.Event] = None
+        self._full: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._busy = False
+
+    def start(self):
+        """Start the flush loop on the running event loop"""
+        if self._task is None:
+            self._arrived = asyncio.Event()
+            self._full = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop the flush loop and fail requests still queued"""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        for _, future, _ in self._pending:
+            if not future.done():
+                future.set_exception(RuntimeError("Micro-batcher stopped"))
+        self._pending.clear()
+        self._pending_rows = 0
+
+    async def drain(self):
+        """Wait until queued requests are scored, then stop"""
+        while self._pending or self._busy:
+            await asyncio.sleep(max(self.max_wait, 0.001))
+        await self.stop()
+
+    async def predict(self, features: np.ndarray) -> Dict[str, Any]:
+        """Score (rows, n_features) as part of the next batch; returns this request's rows"""
+        self.start()
+        if self._pending_rows + len(features) > self.max_pending_rows:
+            raise QueueFullError(f"{self._pending_rows} rows already pending")
+
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((features, future, time.perf_counter()))
+        self._pending_rows += len(features)
+        self._arrived.set()
+        if self._pending_rows >= self.max_batch_size:
+            self._full.set()
+        return await future
+
+    def _take_batch(self) -> List[Tuple[np.ndarray, asyncio.Future, float]]:
+        """Whole requests from the head of the queue, up to max_batch_size rows (at least one request)"""
+        batch, rows = [], 0
+        while self._pending and (not batch or rows + len(self._pending[0][0]) <= self.max_batch_size):
+            request = self._pending.pop(0)
+            batch.append(request)
+            rows += len(request[0])
+        self._pending_rows -= rows
+
+        if not self._pending:
+            self._arrived.clear()
+        if self._pending_rows < self.max_batch_size:
+            self._full.clear()
+        return batch
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            await self._arrived.wait()
+
+            # Wait for a full batch, but not past the oldest request's deadline
+            reason = "full"
+            remaining = self._pending[0][2] + self.max_wait - time.perf_counter()
+            if not self._full.is_set() and remaining > 0:
+                try:
+                    await asyncio.wait_for(self._full.wait(), timeout=remaining)
+                except asyncio.TimeoutError:
+                    reason = "timeout"
+            elif not self._full.is_set():
+                reason = "timeout"
+
+            batch = self._take_batch()
+            self._busy = True
+            BATCH_FLUSHES.labels(reason=reason).inc()
+            now = time.perf_counter()
+            for _, _, queued_at in batch:
+                BATCH_QUEUE_WAIT.observe(now - queued_at)
+
+            try:
+                matrix = batch[0][0] if len(batch) == 1 else np.concatenate([features for features, _, _ in batch])
+                result = await loop.run_in_executor(None, self.predict_fn, matrix)
+            except Exception as e:
+                logger.error("Micro-batch prediction failed", rows=sum(len(f) for f, _, _ in batch), error=str(e))
+                for _, future, _ in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            finally:
+                self._busy = False
+
+            # Scatter each request's rows back to it
+            offset = 0
+            for features, future, _ in batch:
+                rows = len(features)
+                if not future.done():
+                    future.set_result({
+                        key: value[offset:offset + rows] if isinstance(value, np.ndarray) else value
+                        for key, value in result.items()
+                    })
+                offset += rows
@@ -0,0 +1,447 @@
+"""
+Online feature store of real access statistics
+
+Consumes the access-logs topic and keeps, per object, bucket and user,
+the access-history features the tiering model is trained on: 7-day
+access and download counts, 7-day unique users (HyperLogLog), time since
+the last access and an exponentially decayed access rate.
+
+Every table is preallocated NumPy arrays indexed by a slot per key (a
+stable 64-bit hash of the key maps to the slot).  Counts live in a ring of
+per-day buckets, so the 7-day window slides without replaying events, and
+unique users in per-day HyperLogLog registers merged at lookup.  Keys
+arriving once a table is full go to a count-min sketch of the same per-day
+ring (the long tail), and slots idle for longer than the window are freed
+by ``maintain``.  Lookups for a batch of events are a dict probe per key
+plus vectorized gathers.
+
+The store snapshots to an ``.npz`` file; the access-logs consumer commits
+its Kafka offsets only after a snapshot, so a restart loads the snapshot
+and replays just the events since.
+"""
+
+import copy
+import hashlib
+import math
+import os
+import time
+from typing import Any, Dict, List, Mapping, Optional
+
+import numpy as np
+import structlog
+from prometheus_client import Counter, Gauge, Histogram
+
+logger = structlog.get_logger(__name__)
+
+FEATURE_STORE_EVENTS = Counter('ml_feature_store_events_total', 'Access-log events applied to the feature store', ['action'])
+FEATURE_STORE_LOOKUPS = Counter('ml_feature_store_lookups_total', 'Object feature lookups', ['source'])
+FEATURE_STORE_KEYS = Gauge('ml_feature_store_keys', 'Keys with an exact slot', ['table'])
+FEATURE_STORE_SNAPSHOT_SECONDS = Histogram('ml_feature_store_snapshot_seconds', 'Time to write a feature store snapshot')
+
+SECONDS_PER_DAY = 86400
+WINDOW_DAYS = 7
+
+# last_access_hours_ago for objects with no access in the window (as in training)
+NO_ACCESS_HOURS = WINDOW_DAYS * 24
+
+# Access-log actions counted as accesses; downloads also count as downloads
+ACCESS_ACTIONS = ('download_object', 'upload_object', 'update_object')
+DOWNLOAD_ACTIONS = ('download_object',)
+DELETE_ACTIONS = ('delete_object',)
+# Deletes of many objects, listed in the event's ``objects``
+BATCH_DELETE_ACTIONS = ('batch_delete_objects',)
+
+# Feature columns looked up per object (the rest are per bucket and user)
+OBJECT_HISTORY_COLUMNS = ('access_count_7d', 'download_count_7d', 'unique_users_7d', 'avg_daily_access',
+                          'last_access_hours_ago', 'recent_access_trend')
+
+SNAPSHOT_VERSION = 1
+
+
+def key_hash(key: str) -> int:
+    """Stable 64-bit hash (Python's hash() is salted per process)"""
+    return int.from_bytes(hashlib.blake2b(key.encode('utf-8'), digest_size=8).digest(), 'little')
+
+
+def hll_estimate(registers: np.ndarray) -> np.ndarray:
+    """HyperLogLog cardinality per row of a (rows, m) register matrix"""
+    m = registers.shape[-1]
+    alpha = {16: 0.673, 32: 0.697, 64: 0.709}.get(m, 0.7213 / (1 + 1.079 / m))
+    estimate = alpha * m * m / np.sum(np.exp2(-registers.astype(np.float64)), axis=-1)
+    # Linear counting for small cardinalities
+    zeros = np.count_nonzero(registers == 0, axis=-1)
+    small = (estimate <= 2.5 * m) & (zeros > 0)
+    estimate[small] = m * np.log(m / zeros[small])
+    return estimate
+
+
+class RollingWindowTable:
+    """Per-key rolling-window counters in preallocated arrays, with a count-min sketch for overflow"""
+
+    def __init__(self,
+                 capacity: int,
+                 window_days: int = WINDOW_DAYS,
+                 hll_precision: int = 5,
+                 sketch_width: int = 1 << 15,
+                 sketch_depth: int = 4,
+                 half_life: float = SECONDS_PER_DAY):
+        self.capacity = capacity
+        self.window_days = window_days
+        self.ring = window_days + 1  # the window plus the day being recycled
+        self.hll_precision = hll_precision
+        self.tau = half_life / math.log(2)
+
+        registers = 1 << hll_precision
+        self.slots: Dict[int, int] = {}
+        self.free: List[int] = list(range(capacity - 1, -1, -1))
+        self.key_hash = np.zeros(capacity, dtype=np.uint64)
+        self.day = np.full((capacity, self.ring), -1, dtype=np.int32)
+        self.accesses = np.zeros((capacity, self.ring), dtype=np.uint32)
+        self.downloads = np.zeros((capacity, self.ring), dtype=np.uint32)
+        self.registers = np.zeros((capacity, self.ring, registers), dtype=np.uint8)
+        self.last_access = np.zeros(capacity, dtype=np.float64)
+        self.decayed = np.zeros(capacity, dtype=np.float32)  # decayed access count as of last_access
+
+        # [accesses, downloads] x depth x width x ring, shared by keys without a slot
+        self.sketch_day = np.full(self.ring, -1, dtype=np.int32)
+        self.sketch = np.zeros((2, sketch_depth, sketch_width, self.ring), dtype=np.uint32)
+        self.sketch_used = False
+
+    def __len__(self) -> int:
+        return len(self.slots)
+
+    def _sketch_columns(self, hashes: np.ndarray) -> np.ndarray:
+        """(depth, n) sketch columns per key hash (double hashing)"""
+        depth, width = self.sketch.shape[1:3]
+        h1 = hashes & np.uint64(0xFFFFFFFF)
+        h2 = (hashes >> np.uint64(32)) | np.uint64(1)
+        rows = np.arange(depth, dtype=np.uint64)[:, None]
+        return ((h1[None, :] + rows * h2[None, :]) % np.uint64(width)).astype(np.intp)
+
+    def _sketch_counts(self, hashes: np.ndarray) -> np.ndarray:
+        """(2, n, ring) per-day [accesses, downloads] estimates per key hash"""
+        columns = self._sketch_columns(hashes)
+        depth_index = np.arange(columns.shape[0])[:, None]
+        return self.sketch[:, depth_index, columns, :].min(axis=1)
+
+    def _allocate(self, h: int) -> Optional[int]:
+        if not self.free:
+            return None
+        slot = self.free.pop()
+        self.slots[h] = slot
+        self.key_hash[slot] = h
+
+        self.registers[slot] = 0
+        self.last_access[slot] = 0.0
+        self.decayed[slot] = 0.0
+        if not self.sketch_used:
+            self.day[slot] = -1
+            return slot
+
+        # Carry over what the sketch counted while the key had no slot
+        counts = self._sketch_counts(np.array([h], dtype=np.uint64))[:, 0, :]
+        self.day[slot] = self.sketch_day
+        self.accesses[slot] = counts[0]
+        self.downloads[slot] = counts[1]
+        seen = (self.sketch_day >= 0) & (counts[0] > 0)
+        if seen.any():
+            self.last_access[slot] = (self.sketch_day[seen].max() + 0.5) * SECONDS_PER_DAY
+            self.decayed[slot] = counts[0][seen].sum()
+        return slot
+
+    def release(self, key: str):
+        """Forget a key (its sketch counts, if any, remain)"""
+        slot = self.slots.pop(key_hash(key), None)
+        if slot is not None:
+            self.day[slot] = -1
+            self.free.append(slot)
+
+    def record(self, key: str, timestamp: float, user: Optional[str] = None, download: bool = False):
+        """Count one access to ``key`` at ``timestamp``"""
+        h = key_hash(key)
+        day = int(timestamp // SECONDS_PER_DAY)
+        j = day % self.ring
+        slot = self.slots.get(h)
+        if slot is None:
+            slot = self._allocate(h)
+
+        if slot is None:
+            # Long tail: table is full
+            if self.sketch_day[j] != day:
+                if self.sketch_day[j] > day:
+                    return  # older than the ring
+                self.sketch[:, :, :, j] = 0
+                self.sketch_day[j] = day
+                self.sketch_used = True
+            columns = self._sketch_columns(np.array([h], dtype=np.uint64))[:, 0]
+            depth_index = np.arange(len(columns))
+            self.sketch[0, depth_index, columns, j] += 1
+            if download:
+                self.sketch[1, depth_index, columns, j] += 1
+            return
+
+        if self.day[slot, j] != day:
+            if self.day[slot, j] > day:
+                return  # older than the ring
+            self.day[slot, j] = day
+            self.accesses[slot, j] = 0
+            self.downloads[slot, j] = 0
+            self.registers[slot, j] = 0
+        self.accesses[slot, j] += 1
+        if download:
+            self.downloads[slot, j] += 1
+
+        if user:
+            u = key_hash(user)
+            p = self.hll_precision
+            rest = u >> p
+            rank = min((64 - p) - rest.bit_length() + 1, 255)
+            register = u & ((1 << p) - 1)
+            if rank > self.registers[slot, j, register]:
+                self.registers[slot, j, register] = rank
+
+        # Exponentially decayed count; late events are decayed to last_access
+        elapsed = timestamp - self.last_access[slot]
+        if elapsed >= 0:
+            self.decayed[slot] = self.decayed[slot] * math.exp(-elapsed / self.tau) + 1
+            self.last_access[slot] = timestamp
+        else:
+            self.decayed[slot] += math.exp(elapsed / self.tau)
+
+    def lookup(self, keys: List[str], now: float) -> Dict[str, np.ndarray]:
+        """Window statistics per key: accesses, downloads, unique_users,
+        hours_since_access (inf if none), daily_rate and in_table"""
+        n = len(keys)
+        hashes = np.fromiter((key_hash(key) for key in keys), dtype=np.uint64, count=n)
+        slots = np.fromiter((self.slots.get(int(h), -1) for h in hashes), dtype=np.int64, count=n)
+        today = int(now // SECONDS_PER_DAY)
+        first_day = today - self.window_days + 1
+
+        accesses = np.zeros(n, dtype=np.float64)
+        downloads = np.zeros(n, dtype=np.float64)
+        unique_users = np.zeros(n, dtype=np.float64)
+        hours_since = np.full(n, np.inf)
+        daily_rate = np.zeros(n, dtype=np.float64)
+
+        found = slots >= 0
+        if found.any():
+            s = slots[found]
+            valid = (self.day[s] >= first_day) & (self.day[s] <= today)
+            accesses[found] = np.where(valid, self.accesses[s], 0).sum(axis=1)
+            downloads[found] = np.where(valid, self.downloads[s], 0).sum(axis=1)
+            registers = np.where(valid[:, :, None], self.registers[s], 0).max(axis=1)
+            unique_users[found] = hll_estimate(registers)
+            seen = self.last_access[s] > 0
+            since = np.maximum(now - self.last_access[s], 0)
+            hours_since[found] = np.where(seen, since / 3600, np.inf)
+            daily_rate[found] = self.decayed[s] * np.exp(-since / self.tau) / self.tau * SECONDS_PER_DAY
+
+        missing = ~found
+        if missing.any() and self.sketch_used:
+            valid = (self.sketch_day >= first_day) & (self.sketch_day <= today)
+            counts = np.where(valid, self._sketch_counts(hashes[missing]), 0)
+            accesses[missing] = counts[0].sum(axis=1)
+            downloads[missing] = counts[1].sum(axis=1)
+            # Without registers or timestamps: at least one user, last access
+            # mid-way through the latest day with accesses
+            unique_users[missing] = np.minimum(accesses[missing], 1)
+            latest = np.where(counts[0] > 0, self.sketch_day, -1).max(axis=1)
+            hours_since[missing] = np.where(
+                latest >= 0, np.maximum(now - (latest + 0.5) * SECONDS_PER_DAY, 0) / 3600, np.inf
+            )
+            daily_rate[missing] = accesses[missing] / self.window_days
+
+        return {
+            'accesses': accesses,
+            'downloads': downloads,
+            'unique_users': np.round(unique_users),
+            'hours_since_access': hours_since,
+            'daily_rate': daily_rate,
+            'in_table': found,
+        }
+
+    def maintain(self, now: float) -> int:
+        """Free slots with no access in the window; returns how many"""
+        if not self.slots:
+            return 0
+        used = np.fromiter(self.slots.values(), dtype=np.int64, count=len(self.slots))
+        idle = used[self.last_access[used] < now - self.window_days * SECONDS_PER_DAY]
+        for slot in idle.tolist():
+            del self.slots[int(self.key_hash[slot])]
+            self.day[slot] = -1
+            self.free.append(slot)
+        return len(idle)
+
+    def state(self) -> Dict[str, np.ndarray]:
+        used = np.zeros(self.capacity, dtype=bool)
+        used[list(self.slots.values())] = True
+        return {
+            'used': used,
+            'key_hash': self.key_hash,
+            'day': self.day,
+            'accesses': self.accesses,
+            'downloads': self.downloads,
+            'registers': self.registers,
+            'last_access': self.last_access,
+            'decayed': self.decayed,
+            'sketch_day': self.sketch_day,
+            'sketch': self.sketch,
+        }
+
+    def restore(self, state: Mapping[str, np.ndarray]):
+        """Load arrays saved by state(); they must have this table's shapes"""
+        for name, array in state.items():
+            if name != 'used' and getattr(self, name).shape != array.shape:
+                raise ValueError(f"Snapshot {name} has shape {array.shape}, expected {getattr(self, name).shape}")
+        for name, array in state.items():
+            if name != 'used':
+                setattr(self, name, array)
+        used = np.flatnonzero(state['used'])
+        self.slots = {int(h): int(slot) for h, slot in zip(self.key_hash[used], used)}
+        free = np.ones(self.capacity, dtype=bool)
+        free[used] = False
+        self.free = np.flatnonzero(free)[::-1].tolist()
+        self.sketch_used = bool((self.sketch_day >= 0).any())
+
+
+class OnlineFeatureStore:
+    """Access-history features per object, bucket and user, fed by access logs"""
+
+    TABLES = ('objects', 'buckets', 'users')
+
+    def __init__(self,
+                 capacity: int = 100000,
+                 bucket_capacity: int = 10000,
+                 user_capacity: int = 10000,
+                 half_life: float = SECONDS_PER_DAY):
+        self.objects = RollingWindowTable(capacity, half_life=half_life)
+        self.buckets = RollingWindowTable(bucket_capacity, sketch_width=1 << 12, half_life=half_life)
+        self.users = RollingWindowTable(user_capacity, sketch_width=1 << 12, half_life=half_life)
+        self.events_applied = 0
+
+    @staticmethod
+    def _object_key(bucket: str, key: str) -> str:
+        return f"{bucket}/{key}"
+
+    def record(self, event: Mapping[str, Any]) -> bool:
+        """Apply one access-log event; returns whether it affected the store"""
+        action = event.get('action')
+        bucket = event.get('bucket')
+        if bucket and action in BATCH_DELETE_ACTIONS:
+            for key in event.get('objects') or ():
+                self.objects.release(self._object_key(bucket, key))
+            FEATURE_STORE_EVENTS.labels(action=action).inc()
+            self.events_applied += 1
+            return True
+
+        key = event.get('object')
+        if not bucket or not key:
+            return False
+
+        if action in DELETE_ACTIONS:
+            self.objects.release(self._object_key(bucket, key))
+        elif action in ACCESS_ACTIONS:
+            timestamp = float(event.get('timestamp') or time.time())
+            user = event.get('user') or event.get('user_id')
+            download = action in DOWNLOAD_ACTIONS
+            self.objects.record(self._object_key(bucket, key), timestamp, user, download)
+            self.buckets.record(bucket, timestamp, user, download)
+            if user:
+                self.users.record(user, timestamp, None, download)
+        else:
+            return False
+
+        FEATURE_STORE_EVENTS.labels(action=action).inc()
+        self.events_applied += 1
+        return True
+
+    def lookup(self, events: List[Mapping[str, Any]], now: Optional[float] = None) -> Dict[str, np.ndarray]:
+        """Access-history feature columns for tiering events (bucket_name, object_key, user)
+
+        Also returns ``in_table``, whether each object has a slot in the
+        object table (not a model feature).
+        """
+        if now is None:
+            now = time.time()
+        buckets = [str(event.get('bucket_name', '')) for event in events]
+        objects = self.objects.lookup(
+            [self._object_key(bucket, event.get('object_key', '')) for bucket, event in zip(buckets, events)], now
+        )
+        bucket_stats = self.buckets.lookup(buckets, now)
+        user_stats = self.users.lookup([str(event.get('user') or '') for event in events], now)
+
+        in_table = int(np.count_nonzero(objects['in_table']))
+        FEATURE_STORE_LOOKUPS.labels(source='table').inc(in_table)
+        FEATURE_STORE_LOOKUPS.labels(source='sketch').inc(len(events) - in_table)
+
+        accesses = objects['accesses']
+        avg_daily_access = accesses / WINDOW_DAYS
+        return {
+            'access_count_7d': accesses,
+            'download_count_7d': objects['downloads'],
+            'unique_users_7d': objects['unique_users'],
+            'avg_daily_access': avg_daily_access,
+            'last_access_hours_ago': np.minimum(objects['hours_since_access'], NO_ACCESS_HOURS),
+            # Decayed (recent) rate against the 7-day average; 1 = steady
+            'recent_access_trend': np.divide(objects['daily_rate'], avg_daily_access,
+                                             out=np.ones_like(avg_daily_access), where=avg_daily_access > 0),
+            'user_activity_level': user_stats['accesses'],
+            'bucket_popularity': bucket_stats['unique_users'],
+            'in_table': objects['in_table'],
+        }
+
+    def maintain(self, now: Optional[float] = None) -> int:
+        """Free idle slots in every table; returns how many"""
+        if now is None:
+            now = time.time()
+        freed = sum(getattr(self, name).maintain(now) for name in self.TABLES)
+        for name in self.TABLES:
+            FEATURE_STORE_KEYS.labels(table=name).set(len(getattr(self, name)))
+        return freed
+
+    def save(self, path: str):
+        """Write a snapshot atomically"""
+        start = time.perf_counter()
+        arrays = {'version': np.array(SNAPSHOT_VERSION), 'events_applied': np.array(self.events_applied)}
+        for name in self.TABLES:
+            for field, array in getattr(self, name).state().items():
+                arrays[f'{name}.{field}'] = array
+
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'wb') as f:
+            np.savez(f, **arrays)
+        os.replace(tmp_path, path)
+        FEATURE_STORE_SNAPSHOT_SECONDS.observe(time.perf_counter() - start)
+
+    def load(self, path: str) -> bool:
+        """Restore a snapshot; returns False (store unchanged) if there is none or it doesn't fit"""
+        if not os.path.exists(path):
+            return False
+        try:
+            with np.load(path, allow_pickle=False) as snapshot:
+                if int(snapshot['version']) != SNAPSHOT_VERSION:
+                    raise ValueError(f"Snapshot version {int(snapshot['version'])}")
+                states = {
+                    name: {field.split('.', 1)[1]: snapshot[field] for field in snapshot.files
+                           if field.startswith(f'{name}.')}
+                    for name in self.TABLES
+                }
+                events_applied = int(snapshot['events_applied'])
+            # Restore into copies so a bad table leaves the store untouched
+            tables = {}
+            for name in self.TABLES:
+                tables[name] = copy.copy(getattr(self, name))
+                tables[name].restore(states[name])
+            for name, table in tables.items():
+                setattr(self, name, table)
+            self.events_applied = events_applied
+        except Exception as e:
+            logger.warning("Ignoring feature store snapshot", path=path, error=str(e))
+            return False
+
+        for name in self.TABLES:
+            FEATURE_STORE_KEYS.labels(table=name).set(len(getattr(self, name)))
+        logger.info("Feature store snapshot loaded", path=path, objects=len(self.objects),
+                    events_applied=self.events_applied)
+        return True
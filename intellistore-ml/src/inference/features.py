@@ -0,0 +1,216 @@
+"""
+Columnar feature pipeline shared by training and serving
+
+FeaturePipeline turns a batch of tiering events (API requests, Kafka
+messages) or a training DataFrame into the model's float32 feature matrix
+in one pass: clock features via NumPy datetime arithmetic, categories
+through precomputed category -> code lookups, columns placed by a
+precomputed column index, then the training scaler.  Training fits the
+pipeline and saves its state in preprocessing.joblib (the usual
+``scaler`` / ``label_encoders`` / ``feature_columns`` dict); serving
+rebuilds it from there, so both sides compute identical features.
+"""
+
+import time
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Sequence, Union
+
+import numpy as np
+
+CATEGORICAL_COLUMNS = ('size_category', 'current_tier')
+
+# Size categories by size in MB: < 1, < 100, < 1000, larger
+SIZE_CATEGORIES = ('small', 'medium', 'large', 'xlarge')
+SIZE_CATEGORY_BOUNDS_MB = np.array([1, 100, 1000], dtype=np.float64)
+
+MEDIA_PREFIXES = ('image/', 'video/', 'audio/')
+
+# Access-history features an event does not carry
+HISTORY_DEFAULTS = {
+    'user_activity_level': 10,
+    'bucket_popularity': 5,
+    'access_count_7d': 2,
+    'download_count_7d': 1,
+    'unique_users_7d': 1,
+    'avg_daily_access': 0.3,
+    'last_access_hours_ago': 24,
+    'recent_access_trend': 1.0,
+}
+
+SECONDS_PER_DAY = 24 * 3600
+
+# 1970-01-01 was a Thursday (Monday = 0)
+_EPOCH_WEEKDAY = 3
+
+
+def size_categories(sizes: np.ndarray) -> np.ndarray:
+    """Index into SIZE_CATEGORIES per object size in bytes"""
+    return np.searchsorted(SIZE_CATEGORY_BOUNDS_MB, np.asarray(sizes, dtype=np.float64) / (1024 * 1024), side='right')
+
+
+def clock_features(timestamps: np.ndarray, utc_offset: Optional[float] = None) -> Dict[str, np.ndarray]:
+    """Local hour of day, weekday and derived flags per epoch timestamp
+
+    ``utc_offset`` (seconds) defaults to the local timezone's offset now.
+    """
+    if utc_offset is None:
+        utc_offset = time.localtime().tm_gmtoff
+    local = (np.asarray(timestamps, dtype=np.float64) + utc_offset).astype('datetime64[s]')
+    days = local.astype('datetime64[D]')
+    hour = (local - days).astype('timedelta64[h]').astype(np.int64)
+    weekday = (days.astype(np.int64) + _EPOCH_WEEKDAY) % 7
+    return {
+        'hour_of_day': hour,
+        'day_of_week': weekday,
+        'is_weekend': weekday >= 5,
+        'is_business_hours': (hour >= 9) & (hour <= 17),
+    }
+
+
+class FeaturePipeline:
+    """Builds (rows, n_features) float32 model inputs from columns, events or frames"""
+
+    def __init__(self,
+                 feature_columns: Sequence[str],
+                 label_encoders: Optional[Dict[str, Any]] = None,
+                 scaler: Any = None):
+        self.feature_columns = list(feature_columns)
+        self.column_index = {col: i for i, col in enumerate(self.feature_columns)}
+        self.label_encoders = label_encoders or {}
+        self.scaler = None
+        self._mean = None
+        self._scale = None
+        self.set_scaler(scaler)
+
+        # category -> code as the encoder's transform() would give it
+        self._codes = {
+            col: {str(cls): code for code, cls in enumerate(encoder.classes_)}
+            for col, encoder in self.label_encoders.items()
+        }
+        size_codes = self._codes.get('size_category', {})
+        self._size_category_codes = np.array([size_codes.get(cat, 0) for cat in SIZE_CATEGORIES], dtype=np.float32)
+
+    @classmethod
+    def from_preprocessing(cls, preprocessing: Mapping[str, Any]) -> "FeaturePipeline":
+        """Pipeline from the objects saved in preprocessing.joblib"""
+        return cls(preprocessing['feature_columns'],
+                   label_encoders=preprocessing.get('label_encoders'),
+                   scaler=preprocessing.get('scaler'))
+
+    @classmethod
+    def fit(cls, df, target: str = 'target', scale: bool = True) -> "FeaturePipeline":
+        """Fit label encoders (and a StandardScaler) on a training DataFrame"""
+        from sklearn.preprocessing import LabelEncoder, StandardScaler
+
+        label_encoders = {}
+        feature_columns = []
+        for col in df.columns:
+            if col == target:
+                continue
+            if col in CATEGORICAL_COLUMNS:
+                label_encoders[col] = LabelEncoder().fit(df[col].astype(str))
+            else:
+                feature_columns.append(col)
+        feature_columns += [f'{col}_encoded' for col in label_encoders]
+
+        pipeline = cls(feature_columns, label_encoders=label_encoders)
+        if scale:
+            pipeline.set_scaler(StandardScaler().fit(pipeline.transform_frame(df)))
+        return pipeline
+
+    def to_preprocessing(self) -> Dict[str, Any]:
+        """State to save as preprocessing.joblib"""
+        return {
+            'scaler': self.scaler,
+            'label_encoders': self.label_encoders,
+            'feature_columns': self.feature_columns,
+        }
+
+    def set_scaler(self, scaler: Any):
+        """Apply ``scaler`` (a fitted StandardScaler, or None) to every matrix built from now on"""
+        self.scaler = scaler
+        mean = getattr(scaler, 'mean_', None)
+        scale = getattr(scaler, 'scale_', None)
+        self._mean = None if mean is None else np.asarray(mean, dtype=np.float32)
+        self._scale = None if scale is None else np.asarray(scale, dtype=np.float32)
+
+    def scale(self, matrix: np.ndarray) -> np.ndarray:
+        """Scale a raw feature matrix in place, as in training"""
+        if self._mean is not None:
+            matrix -= self._mean
+        if self._scale is not None:
+            matrix /= self._scale
+        return matrix
+
+    def encode(self, column: str, values: Iterable[Any]) -> np.ndarray:
+        """Codes of categorical ``values`` (unknown categories are 0)"""
+        values = np.asarray(values).astype(str)
+        codes = self._codes.get(column)
+        if not codes:
+            return np.zeros(len(values), dtype=np.float32)
+        uniques, inverse = np.unique(values, return_inverse=True)
+        lookup = np.array([codes.get(value, 0) for value in uniques], dtype=np.float32)
+        return lookup[inverse.reshape(-1)]
+
+    def transform_columns(self,
+                          columns: Mapping[str, Any],
+                          rows: Optional[int] = None,
+                          defaults: Optional[Mapping[str, float]] = None) -> np.ndarray:
+        """Matrix from raw feature columns; absent features take ``defaults`` or 0"""
+        if rows is None:
+            rows = len(next(iter(columns.values()))) if columns else 0
+        matrix = np.zeros((rows, len(self.feature_columns)), dtype=np.float32)
+        if defaults:
+            for col, value in defaults.items():
+                i = self.column_index.get(col)
+                if i is not None and col not in columns:
+                    matrix[:, i] = value
+        for col, values in columns.items():
+            i = self.column_index.get(col)
+            if i is None:
+                continue
+            values = np.asarray(values, dtype=np.float32)
+            if values.shape != (rows,):
+                raise ValueError(f"Column {col} has {values.size} values, expected {rows}")
+            matrix[:, i] = values
+        return self.scale(matrix)
+
+    def transform_frame(self, df) -> np.ndarray:
+        """Matrix from a DataFrame of raw training columns (categoricals as strings)"""
+        columns = {col: df[col].to_numpy() for col in df.columns if col in self.column_index}
+        for col in self.label_encoders:
+            if col in df.columns:
+                columns[f'{col}_encoded'] = self.encode(col, df[col].to_numpy())
+        return self.transform_columns(columns, len(df))
+
+    def transform_events(self,
+                         events: List[Mapping[str, Any]],
+                         now: Union[float, np.ndarray, None] = None,
+                         history: Optional[Mapping[str, np.ndarray]] = None) -> np.ndarray:
+        """Matrix from tiering events (timestamp, size, current_tier, content_type)
+
+        Clock features describe ``now`` (the time of the decision, or one
+        per event when replaying history), object age is measured from each
+        event's timestamp, and access-history features come from ``history``
+        columns (see OnlineFeatureStore), falling back to HISTORY_DEFAULTS.
+        """
+        if now is None:
+            now = time.time()
+        now = np.asarray(now, dtype=np.float64)
+        rows = len(events)
+        timestamps = np.fromiter((event.get('timestamp', np.nan) for event in events), dtype=np.float64, count=rows)
+        timestamps = np.where(np.isnan(timestamps), now, timestamps)
+        sizes = np.fromiter((event.get('size', 0) for event in events), dtype=np.float64, count=rows)
+        is_media = np.fromiter((event.get('content_type', '').startswith(MEDIA_PREFIXES) for event in events),
+                               dtype=bool, count=rows)
+
+        columns = dict(history or {})
+        columns.update((name, np.broadcast_to(value, rows))
+                       for name, value in clock_features(np.atleast_1d(now)).items())
+        columns['object_age_days'] = (now - timestamps) / SECONDS_PER_DAY
+        columns['size'] = sizes
+        columns['is_media'] = is_media
+        columns['size_category_encoded'] = self._size_category_codes[size_categories(sizes)]
+        columns['current_tier_encoded'] = self.encode(
+            'current_tier', [event.get('current_tier', 'hot') for event in events]
+        )
+        return self.transform_columns(columns, rows, defaults=HISTORY_DEFAULTS)
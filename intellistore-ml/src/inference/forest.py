@@ -0,0 +1,183 @@
+"""
+Tree-ensemble compilation to flat NumPy arrays
+
+CompiledForest flattens a trained scikit-learn forest (RandomForest,
+ExtraTrees or a single decision tree classifier) into contiguous node
+arrays: split feature, threshold, left/right child and leaf class
+probabilities.  Leaves are their own children with an always-true split,
+so a batch is evaluated by stepping every (row, tree) pair one level per
+iteration for max-depth iterations, without Python-level branching.
+
+The arrays are saved as ``tiering_model.forest.npz`` next to the other
+model artifacts.  Loading them needs only NumPy, is much faster than
+unpickling the estimator, and predicts the same probabilities as
+``predict_proba``.
+
+Usage:
+    python src/inference/forest.py <model version dir>   # compile its tiering_model.joblib
+"""
+
+import os
+from typing import Any
+
+import numpy as np
+
+FOREST_MODEL_FILE = "tiering_model.forest.npz"
+
+# Rows evaluated per pass, bounding the (rows, trees) working arrays
+DEFAULT_CHUNK_ROWS = 512
+
+
+class CompiledForest:
+    """Vectorized evaluator over a forest's flattened node arrays"""
+
+    def __init__(self,
+                 feature: np.ndarray,
+                 threshold: np.ndarray,
+                 children: np.ndarray,
+                 values: np.ndarray,
+                 roots: np.ndarray,
+                 depth: int,
+                 classes: np.ndarray,
+                 n_features: int):
+        self.feature = np.ascontiguousarray(feature, dtype=np.int32)
+        self.threshold = np.ascontiguousarray(threshold, dtype=np.float32)
+        # (nodes, 2): [left, right]
+        self.children = np.ascontiguousarray(children, dtype=np.int32)
+        # (nodes, classes) class probabilities, meaningful at leaves
+        self.values = np.ascontiguousarray(values, dtype=np.float32)
+        # Per-class rows of values: 1-D gathers are much faster than values[leaves]
+        self._class_values = np.ascontiguousarray(self.values.T)
+        self.roots = np.ascontiguousarray(roots, dtype=np.int32)
+        self.depth = int(depth)
+        self.classes = np.asarray(classes)
+        self.n_features = int(n_features)
+
+    @classmethod
+    def from_sklearn(cls, model: Any) -> "CompiledForest":
+        """Flatten a fitted tree classifier or forest of them"""
+        estimators = getattr(model, "estimators_", None) or [model]
+        features, thresholds, children, values, roots = [], [], [], [], []
+        offset = 0
+        depth = 0
+        for estimator in estimators:
+            tree = estimator.tree_
+            n = tree.node_count
+            nodes = np.arange(n, dtype=np.int64)
+            is_leaf = tree.children_left < 0
+
+            # Leaves send every row to themselves
+            left = np.where(is_leaf, nodes, tree.children_left) + offset
+            right = np.where(is_leaf, nodes, tree.children_right) + offset
+            feature = np.where(is_leaf, 0, tree.feature)
+
+            # Trees compare float32 inputs with float64 thresholds; the
+            # largest float32 not above each threshold splits identically
+            threshold = tree.threshold.astype(np.float32)
+            rounded_up = threshold.astype(np.float64) > tree.threshold
+            threshold[rounded_up] = np.nextafter(threshold[rounded_up], np.float32(-np.inf))
+            threshold[is_leaf] = np.inf
+
+            value = tree.value[:, 0, :].astype(np.float64)
+            value /= np.maximum(value.sum(axis=1, keepdims=True), np.finfo(np.float64).tiny)
+
+            features.append(feature)
+            thresholds.append(threshold)
+            children.append(np.stack([left, right], axis=1))
+            values.append(value)
+            roots.append(offset)
+            depth = max(depth, tree.max_depth)
+            offset += n
+
+        return cls(
+            feature=np.concatenate(features),
+            threshold=np.concatenate(thresholds),
+            children=np.concatenate(children),
+            values=np.concatenate(values),
+            roots=np.array(roots),
+            depth=depth,
+            classes=model.classes_,
+            n_features=model.n_features_in_,
+        )
+
+    @property
+    def n_trees(self) -> int:
+        return len(self.roots)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(a.nbytes for a in (self.feature, self.threshold, self.children, self.values, self.roots))
+
+    def save(self, path: str):
+        """Write the node arrays to ``path`` (.npz)"""
+        tmp_path = f"{path}.tmp.npz"
+        np.savez(tmp_path, feature=self.feature, threshold=self.threshold, children=self.children,
+                 values=self.values, roots=self.roots, depth=self.depth, classes=self.classes,
+                 n_features=self.n_features)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> "CompiledForest":
+        with np.load(path, allow_pickle=False) as data:
+            return cls(data["feature"], data["threshold"], data["children"], data["values"], data["roots"],
+                       int(data["depth"]), data["classes"], int(data["n_features"]))
+
+    def _leaves(self, X: np.ndarray) -> np.ndarray:
+        """(rows, trees) leaf index reached by each row in each tree"""
+        rows = len(X)
+        shape = (rows, self.n_trees)
+        # Flat offsets so X[row, feature] is one gather over X.ravel()
+        row_offsets = (np.arange(rows, dtype=np.int32) * self.n_features)[:, None]
+        flat = X.ravel()
+        children = self.children.ravel()
+        nodes = np.broadcast_to(self.roots, shape).copy()
+        # Working buffers reused across levels
+        index = np.empty(shape, dtype=np.int32)
+        x = np.empty(shape, dtype=np.float32)
+        threshold = np.empty(shape, dtype=np.float32)
+        go_right = np.empty(shape, dtype=bool)
+        for _ in range(self.depth):
+            np.take(self.feature, nodes, out=index)
+            index += row_offsets
+            np.take(flat, index, out=x)
+            np.take(self.threshold, nodes, out=threshold)
+            np.greater(x, threshold, out=go_right)
+            # children[node, go_right] through the flattened (nodes, 2) array
+            nodes *= 2
+            nodes += go_right
+            np.take(children, nodes, out=nodes)
+        return nodes
+
+    def predict_proba(self, X: np.ndarray, chunk_rows: int = DEFAULT_CHUNK_ROWS) -> np.ndarray:
+        """(rows, classes) probabilities averaged over the trees"""
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        if X.ndim != 2 or X.shape[1] != self.n_features:
+            raise ValueError(f"Expected (rows, {self.n_features}) features, got {X.shape}")
+        probabilities = np.empty((len(X), self.values.shape[1]), dtype=np.float64)
+        for start in range(0, len(X), chunk_rows):
+            leaves = self._leaves(X[start:start + chunk_rows])
+            for c, class_values in enumerate(self._class_values):
+                probabilities[start:start + chunk_rows, c] = np.take(class_values, leaves).sum(axis=1, dtype=np.float64)
+        probabilities /= self.n_trees
+        return probabilities
+
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        return self.classes[self.predict_proba(X).argmax(axis=1)]
+
+
+def compile_model_dir(path: str) -> str:
+    """Compile ``path``/tiering_model.joblib into ``path``/tiering_model.forest.npz"""
+    import joblib
+
+    forest = CompiledForest.from_sklearn(joblib.load(os.path.join(path, "tiering_model.joblib")))
+    output = os.path.join(path, FOREST_MODEL_FILE)
+    forest.save(output)
+    return output
+
+
+if __name__ == "__main__":
+    import sys
+
+    if len(sys.argv) != 2:
+        sys.exit(__doc__)
+    print(f"Compiled forest saved to {compile_model_dir(sys.argv[1])}")
@@ -3,21 +3,34 @@ ML Inference Service for IntelliStore Hot/Cold Tiering
 """
 
 import asyncio
+import io
 import json
+import os
+import random
 import time
-from typing import Dict, List, Any, Optional
+from typing import Callable, Dict, List, Any, Optional, Set, Tuple
 
-import joblib
 import numpy as np
-import onnxruntime as ort
 import structlog
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
 from kafka import KafkaConsumer, KafkaProducer
 from prometheus_client import Counter, Histogram, Gauge, generate_latest
 from pydantic import BaseModel, Field
 from starlette.responses import Response
 
+from batching import MicroBatcher, QueueFullError
+from feature_store import OnlineFeatureStore
+from prediction_cache import PredictionCache
+from registry import CANDIDATE_MODES, ONNXRUNTIME_AVAILABLE, LoadedModel, ModelRegistry, onnx_session_options
+
+# Arrow IPC request bodies are optional
+try:
+    import pyarrow as pa
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
 # Configure logging
 structlog.configure(
     processors=[
@@ -44,6 +57,62 @@ COLD_PREDICTIONS = Counter('ml_cold_predictions_total', 'Total cold predictions'
 MODEL_LOAD_TIME = Gauge('ml_model_load_time_seconds', 'Model load time')
 KAFKA_MESSAGES_PROCESSED = Counter('ml_kafka_messages_processed_total', 'Kafka messages processed')
 KAFKA_PROCESSING_ERRORS = Counter('ml_kafka_processing_errors_total', 'Kafka processing errors')
+INFERENCE_ROWS = Counter('ml_inference_rows_total', 'Rows scored (rate = throughput)')
+INFERENCE_BATCH_SIZE = Histogram(
+    'ml_inference_batch_size', 'Rows per model invocation',
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024, 4096, 16384, 65536)
+)
+INFERENCE_ROW_LATENCY = Histogram(
+    'ml_inference_row_latency_seconds', 'Model invocation latency divided by rows scored',
+    buckets=(1e-7, 5e-7, 1e-6, 5e-6, 1e-5, 5e-5, 1e-4, 5e-4, 1e-3, 5e-3, 1e-2, 5e-2)
+)
+MODEL_INFERENCE_LATENCY = Histogram('ml_model_inference_latency_seconds', 'Model invocation latency per version', ['version'])
+MODEL_ROWS = Counter('ml_model_rows_total', 'Rows scored per model version (shadow included)', ['version'])
+MODEL_ROLE = Gauge('ml_model_role', 'Loaded model versions by role (active, shadow, canary)', ['version', 'role'])
+MODEL_SWAPS = Counter('ml_model_swaps_total', 'Model version loads for activation or as candidate', ['outcome'])
+SHADOW_PREDICTIONS = Counter('ml_shadow_predictions_total', 'Shadow rows by agreement with the active model', ['version', 'result'])
+SHADOW_PROBABILITY_DIFF = Histogram(
+    'ml_shadow_probability_diff', 'Mean |probability_hot difference| of a shadow batch vs the active model', ['version'],
+    buckets=(0.001, 0.005, 0.01, 0.02, 0.05, 0.1, 0.2, 0.5, 1.0)
+)
+
+# Largest batch accepted by /predict/batch
+MAX_BATCH_ROWS = int(os.getenv("ML_MAX_BATCH_ROWS", "100000"))
+
+# Micro-batching of concurrent /predict, /predict/event and Kafka requests
+BATCHING_ENABLED = os.getenv("ML_BATCHING_ENABLED", "true").lower() == "true"
+BATCH_MAX_SIZE = int(os.getenv("ML_BATCH_MAX_SIZE", "256"))
+BATCH_MAX_WAIT_MS = float(os.getenv("ML_BATCH_MAX_WAIT_MS", "2"))
+BATCH_MAX_PENDING_ROWS = int(os.getenv("ML_BATCH_MAX_PENDING_ROWS", "100000"))
+
+# Online feature store fed by the access-logs topic
+FEATURE_STORE_ENABLED = os.getenv("ML_FEATURE_STORE_ENABLED", "true").lower() == "true"
+FEATURE_STORE_CAPACITY = int(os.getenv("ML_FEATURE_STORE_CAPACITY", "100000"))
+FEATURE_STORE_HALF_LIFE = float(os.getenv("ML_FEATURE_STORE_HALF_LIFE", "86400"))
+FEATURE_STORE_SNAPSHOT = os.getenv("ML_FEATURE_STORE_SNAPSHOT", "data/feature_store.npz")
+FEATURE_STORE_SNAPSHOT_INTERVAL = float(os.getenv("ML_FEATURE_STORE_SNAPSHOT_INTERVAL", "300"))
+
+# Model registry: versioned models, hot reload and shadow/canary candidates
+MODEL_DIR = os.getenv("ML_MODEL_DIR", "models")
+MODEL_WATCH_INTERVAL = float(os.getenv("ML_MODEL_WATCH_INTERVAL", "10"))
+MODEL_WARMUP_ROWS = int(os.getenv("ML_MODEL_WARMUP_ROWS", "256"))
+
+# ONNX Runtime sessions: thread pools (0 = ONNX Runtime default), graph
+# optimization level and batch sizes with preallocated IO binding buffers
+ORT_INTRA_OP_THREADS = int(os.getenv("ML_ORT_INTRA_OP_THREADS", "0"))
+ORT_INTER_OP_THREADS = int(os.getenv("ML_ORT_INTER_OP_THREADS", "0"))
+ORT_GRAPH_OPTIMIZATION = os.getenv("ML_ORT_GRAPH_OPTIMIZATION", "all")
+ORT_BIND_BATCH_SIZES = [int(size) for size in os.getenv("ML_ORT_BIND_BATCH_SIZES", "1,8,32,128,256").split(",") if size]
+
+# Cache of predictions by quantized feature vector (per model version)
+PREDICTION_CACHE_ENABLED = os.getenv("ML_PREDICTION_CACHE_ENABLED", "true").lower() == "true"
+PREDICTION_CACHE_SIZE = int(os.getenv("ML_PREDICTION_CACHE_SIZE", "100000"))
+PREDICTION_CACHE_TTL = float(os.getenv("ML_PREDICTION_CACHE_TTL", "300"))
+PREDICTION_CACHE_QUANTUM = float(os.getenv("ML_PREDICTION_CACHE_QUANTUM", "0.001"))
+
+# Content types of binary /predict/batch bodies
+ARROW_CONTENT_TYPES = ("application/vnd.apache.arrow.stream", "application/vnd.apache.arrow.file")
+NUMPY_CONTENT_TYPES = ("application/x-npy", "application/x-npz", "application/octet-stream")
 
 # Pydantic models
 class PredictionRequest(BaseModel):
@@ -58,6 +127,24 @@ class PredictionResponse(BaseModel):
     model_version: str = Field(..., description="Model version used")
 
 
+class BatchPredictionRequest(BaseModel):
+    columns: Dict[str, List[float]] = Field(..., description="Feature name -> one value per row; missing features are 0")
+
+
+class BatchPredictionResponse(BaseModel):
+    prediction: List[str] = Field(..., description="Predicted tier per row")
+    confidence: List[float] = Field(..., description="Prediction confidence per row")
+    probability_hot: List[float] = Field(..., description="Probability of being hot per row")
+    probability_cold: List[float] = Field(..., description="Probability of being cold per row")
+    model_version: str = Field(..., description="Model version used")
+    rows: int = Field(..., description="Rows scored")
+
+
+class CandidateRequest(BaseModel):
+    mode: str = Field("shadow", description="'shadow' (scored alongside, not served) or 'canary' (serves a fraction)")
+    fraction: Optional[float] = Field(None, ge=0, le=1, description="Fraction of requests (default 1 for shadow, 0.05 for canary)")
+
+
 class HealthResponse(BaseModel):
     status: str
     model_loaded: bool
@@ -79,15 +166,42 @@ class MLInferenceService:
     """ML Inference Service for hot/cold tiering predictions"""
     
     def __init__(self):
-        self.model = None
-        self.onnx_session = None
-        self.preprocessing = None
-        self.model_metadata = None
-        self.feature_columns = None
+        self.registry = ModelRegistry(
+            MODEL_DIR,
+            session_options=onnx_session_options(
+                ORT_INTRA_OP_THREADS, ORT_INTER_OP_THREADS, ORT_GRAPH_OPTIMIZATION
+            ) if ONNXRUNTIME_AVAILABLE else None,
+            bind_batch_sizes=ORT_BIND_BATCH_SIZES
+        )
+        self.active: Optional[LoadedModel] = None
+        self.candidate: Optional[LoadedModel] = None
+        self.candidate_mode: Optional[str] = None
+        self.candidate_fraction = 0.0
         self.start_time = time.time()
         self.kafka_consumer = None
         self.kafka_producer = None
+        self.access_log_consumer = None
         self.running = False
+        self.feature_store = OnlineFeatureStore(
+            capacity=FEATURE_STORE_CAPACITY,
+            half_life=FEATURE_STORE_HALF_LIFE
+        ) if FEATURE_STORE_ENABLED else None
+        self.prediction_cache = PredictionCache(
+            max_entries=PREDICTION_CACHE_SIZE,
+            ttl=PREDICTION_CACHE_TTL,
+            quantum=PREDICTION_CACHE_QUANTUM
+        ) if PREDICTION_CACHE_ENABLED else None
+        self._swap_lock = asyncio.Lock()
+        self._background: Set[asyncio.Task] = set()
+        self._failed_versions: Set[str] = set()
+    
+    @property
+    def model_metadata(self) -> Optional[Dict[str, Any]]:
+        return self.active.metadata if self.active else None
+    
+    @property
+    def feature_columns(self) -> Optional[List[str]]:
+        return self.active.feature_columns if self.active else None
         
     async def initialize(self):
         """Initialize the ML service"""
@@ -97,6 +211,10 @@ class MLInferenceService:
             # Load model and preprocessing
             await self._load_model()
             
+            # Restore access statistics from the last snapshot
+            if self.feature_store:
+                await asyncio.to_thread(self.feature_store.load, FEATURE_STORE_SNAPSHOT)
+            
             # Initialize Kafka
             await self._initialize_kafka()
             
@@ -107,41 +225,173 @@ class MLInferenceService:
             raise
     
     async def _load_model(self):
-        """Load the trained model and preprocessing objects"""
+        """Load the current model version (and candidate, if one is set)"""
         try:
-            start_time = time.time()
-            
-            # Load ONNX model (preferred for production)
-            try:
-                self.onnx_session = ort.InferenceSession("models/tiering_model.onnx")
-                logger.info("Loaded ONNX model successfully")
-            except Exception as e:
-                logger.warning("Failed to load ONNX model, falling back to joblib", error=str(e))
-                
-                # Fallback to joblib model
-                self.model = joblib.load("models/tiering_model.joblib")
-                logger.info("Loaded joblib model successfully")
-            
-            # Load preprocessing objects
-            self.preprocessing = joblib.load("models/preprocessing.joblib")
-            self.feature_columns = self.preprocessing['feature_columns']
-            
-            # Load model metadata
-            with open("models/model_metadata.json", 'r') as f:
-                self.model_metadata = json.load(f)
+            await self.activate()
             
-            load_time = time.time() - start_time
-            MODEL_LOAD_TIME.set(load_time)
-            
-            logger.info("Model loaded successfully", 
-                       model_version=self.model_metadata.get('model_version', 'unknown'),
-                       load_time=load_time,
-                       features=len(self.feature_columns))
+            if self.registry.enabled:
+                try:
+                    candidate = self.registry.candidate()
+                    if candidate:
+                        await self.set_candidate(candidate["version"], candidate["mode"], candidate["fraction"])
+                except Exception as e:
+                    logger.warning("Failed to load candidate model", error=str(e))
             
         except Exception as e:
             logger.error("Failed to load model", error=str(e))
             raise
     
+    def _prepare_model(self, version: Optional[str]) -> LoadedModel:
+        """Load and warm up a model version (blocking; runs in a worker thread)"""
+        start_time = time.time()
+        model = self.registry.load(version)
+        model.warm_up(rows=MODEL_WARMUP_ROWS)
+        
+        load_time = time.time() - start_time
+        MODEL_LOAD_TIME.set(load_time)
+        logger.info("Model loaded successfully",
+                   model_version=model.version,
+                   model_type=model.model_type,
+                   load_time=load_time,
+                   features=len(model.feature_columns))
+        
+        if BATCHING_ENABLED:
+            model.batcher = MicroBatcher(
+                lambda features: self.predict_batch(features, model, shadow=self._is_shadow(model)),
+                max_batch_size=BATCH_MAX_SIZE,
+                max_wait=BATCH_MAX_WAIT_MS / 1000,
+                max_pending_rows=BATCH_MAX_PENDING_ROWS
+            )
+        return model
+    
+    async def _load_version(self, version: Optional[str]) -> LoadedModel:
+        try:
+            model = await asyncio.to_thread(self._prepare_model, version)
+        except Exception:
+            MODEL_SWAPS.labels(outcome="failed").inc()
+            raise
+        MODEL_SWAPS.labels(outcome="loaded").inc()
+        return model
+    
+    async def activate(self, version: Optional[str] = None, persist: bool = False) -> LoadedModel:
+        """Load, warm up and atomically swap in ``version`` (default: the registry's current)"""
+        async with self._swap_lock:
+            if self.candidate and self.candidate.version == version:
+                model = self.candidate
+                self.candidate, self.candidate_mode, self.candidate_fraction = None, None, 0.0
+                if persist:
+                    self.registry.clear_candidate()
+            else:
+                model = await self._load_version(version)
+            self._swap_active(model)
+            if persist:
+                self.registry.set_current(model.version)
+            return model
+    
+    def _swap_active(self, model: LoadedModel):
+        previous, self.active = self.active, model
+        self._failed_versions.discard(model.version)
+        self._update_roles()
+        if previous is not None and previous is not model:
+            self._retire(previous)
+        logger.info("Active model swapped",
+                   model_version=model.version,
+                   previous_version=previous.version if previous else None)
+    
+    async def set_candidate(self, version: str, mode: str, fraction: float, persist: bool = False) -> LoadedModel:
+        """Load ``version`` as a shadow or canary candidate next to the active model"""
+        if mode not in CANDIDATE_MODES:
+            raise ValueError(f"Unknown candidate mode {mode!r}")
+        async with self._swap_lock:
+            if self.candidate and self.candidate.version == version:
+                model = self.candidate
+            else:
+                model = await self._load_version(version)
+            previous = self.candidate
+            self.candidate, self.candidate_mode, self.candidate_fraction = model, mode, fraction
+            if persist:
+                self.registry.set_candidate(version, mode, fraction)
+            self._update_roles()
+            if previous is not None and previous is not model:
+                self._retire(previous)
+            logger.info("Candidate model set", model_version=version, mode=mode, fraction=fraction)
+            return model
+    
+    async def clear_candidate(self, persist: bool = False):
+        """Stop shadowing or canarying the candidate"""
+        async with self._swap_lock:
+            previous = self.candidate
+            self.candidate, self.candidate_mode, self.candidate_fraction = None, None, 0.0
+            if persist:
+                self.registry.clear_candidate()
+            self._update_roles()
+            if previous is not None:
+                self._retire(previous)
+    
+    async def promote_candidate(self) -> LoadedModel:
+        """Make the candidate the active model"""
+        if self.candidate is None:
+            raise ValueError("No candidate model")
+        return await self.activate(self.candidate.version, persist=True)
+    
+    def _update_roles(self):
+        MODEL_ROLE.clear()
+        if self.active:
+            MODEL_ROLE.labels(version=self.active.version, role="active").set(1)
+        if self.candidate:
+            MODEL_ROLE.labels(version=self.candidate.version, role=self.candidate_mode).set(1)
+    
+    def _retire(self, model: LoadedModel):
+        """Let requests already queued on a swapped-out model finish, then release it"""
+        if self.prediction_cache is not None:
+            self.prediction_cache.invalidate(model.version)
+        if model.batcher:
+            self._spawn(model.batcher.drain())
+    
+    def _spawn(self, coro):
+        task = asyncio.create_task(coro)
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+    
+    async def watch_registry(self):
+        """Follow the registry's CURRENT and CANDIDATE pointers"""
+        while True:
+            await asyncio.sleep(MODEL_WATCH_INTERVAL)
+            if not self.registry.enabled:
+                continue
+            try:
+                current = self.registry.current_version()
+                if current and current != self.active.version and current not in self._failed_versions:
+                    try:
+                        await self.activate(current)
+                    except Exception as e:
+                        # Retried only once the pointer changes
+                        self._failed_versions.add(current)
+                        logger.error("Failed to activate model version", model_version=current, error=str(e))
+                
+                candidate = self.registry.candidate()
+                if candidate is None:
+                    if self.candidate:
+                        await self.clear_candidate()
+                elif (not self.candidate
+                      or (self.candidate.version, self.candidate_mode, self.candidate_fraction)
+                      != (candidate["version"], candidate["mode"], candidate["fraction"])):
+                    if candidate["version"] not in self._failed_versions:
+                        try:
+                            await self.set_candidate(candidate["version"], candidate["mode"], candidate["fraction"])
+                        except Exception as e:
+                            self._failed_versions.add(candidate["version"])
+                            logger.error("Failed to load candidate model", model_version=candidate["version"], error=str(e))
+                
+            except Exception as e:
+                logger.error("Model registry watch failed", error=str(e))
+    
+    async def close(self):
+        """Stop the micro-batchers of loaded models"""
+        for model in (self.active, self.candidate):
+            if model and model.batcher:
+                await model.batcher.stop()
+    
     async def _initialize_kafka(self):
         """Initialize Kafka consumer and producer"""
         try:
@@ -158,6 +408,18 @@ class MLInferenceService:
                 enable_auto_commit=True
             )
             
+            # Create consumer for the feature store; offsets are committed
+            # after each snapshot, so a restart replays events since then
+            if self.feature_store:
+                self.access_log_consumer = KafkaConsumer(
+                    'access-logs',
+                    bootstrap_servers=kafka_brokers,
+                    group_id='ml-feature-store',
+                    value_deserializer=lambda m: json.loads(m.decode('utf-8')),
+                    auto_offset_reset='earliest',
+                    enable_auto_commit=False
+                )
+            
             # Create producer for tiering decisions
             self.kafka_producer = KafkaProducer(
                 bootstrap_servers=kafka_brokers,
@@ -172,154 +434,213 @@ class MLInferenceService:
             logger.error("Failed to initialize Kafka", error=str(e))
             # Don't raise - service can still work for direct API calls
     
-    def _extract_features(self, event_data: Dict[str, Any]) -> np.ndarray:
-        """Extract features from event data"""
+    def predict_batch(self, features: np.ndarray, model: Optional[LoadedModel] = None, shadow: bool = False) -> Dict[str, Any]:
+        """Score a (rows, n_features) matrix with one model invocation
+        
+        Returns columns: ``prediction`` (1 = hot), ``probability_hot`` and
+        ``probability_cold`` as arrays, plus ``model_version``.
+        """
+        model = model or self.active
         try:
-            # Current time
-            current_time = time.time()
-            
-            # Extract basic features
-            features = {
-                'hour_of_day': time.localtime(current_time).tm_hour,
-                'day_of_week': time.localtime(current_time).tm_wday,
-                'is_weekend': int(time.localtime(current_time).tm_wday >= 5),
-                'is_business_hours': int(9 <= time.localtime(current_time).tm_hour <= 17),
-                'object_age_days': (current_time - event_data.get('timestamp', current_time)) / (24 * 3600),
-                'size': event_data.get('size', 0),
-                'is_media': int(event_data.get('content_type', '').startswith(('image/', 'video/', 'audio/'))),
-                'user_activity_level': 10,  # Default value - would be calculated from historical data
-                'bucket_popularity': 5,     # Default value - would be calculated from historical data
-                'access_count_7d': 2,       # Default value - would be calculated from historical data
-                'download_count_7d': 1,     # Default value - would be calculated from historical data
-                'unique_users_7d': 1,       # Default value - would be calculated from historical data
-                'avg_daily_access': 0.3,    # Default value - would be calculated from historical data
-                'last_access_hours_ago': 24, # Default value - would be calculated from historical data
-                'recent_access_trend': 1.0, # Default value - would be calculated from historical data
-            }
-            
-            # Handle categorical features
-            current_tier = event_data.get('current_tier', 'hot')
-            size_mb = features['size'] / (1024 * 1024)
-            
-            if size_mb < 1:
-                size_category = 'small'
-            elif size_mb < 100:
-                size_category = 'medium'
-            elif size_mb < 1000:
-                size_category = 'large'
-            else:
-                size_category = 'xlarge'
-            
-            # Encode categorical features
-            label_encoders = self.preprocessing['label_encoders']
-            
-            if 'size_category' in label_encoders:
-                try:
-                    features['size_category_encoded'] = label_encoders['size_category'].transform([size_category])[0]
-                except ValueError:
-                    features['size_category_encoded'] = 0  # Default for unknown categories
+            features = np.ascontiguousarray(features, dtype=np.float32)
+            rows = features.shape[0]
+            start_time = time.perf_counter()
             
-            if 'current_tier' in label_encoders:
-                try:
-                    features['current_tier_encoded'] = label_encoders['current_tier'].transform([current_tier])[0]
-                except ValueError:
-                    features['current_tier_encoded'] = 0  # Default for unknown categories
+            prediction, probabilities = model.run(features)
             
-            # Create feature vector in the correct order
-            feature_vector = []
-            for col in self.feature_columns:
-                feature_vector.append(features.get(col, 0))
+            elapsed = time.perf_counter() - start_time
+            MODEL_INFERENCE_LATENCY.labels(version=model.version).observe(elapsed)
+            MODEL_ROWS.labels(version=model.version).inc(rows)
+            if not shadow:
+                INFERENCE_LATENCY.observe(elapsed)
+                INFERENCE_REQUESTS.inc()
+                INFERENCE_ROWS.inc(rows)
+                INFERENCE_BATCH_SIZE.observe(rows)
+                if rows:
+                    INFERENCE_ROW_LATENCY.observe(elapsed / rows)
+                
+                hot = int(np.count_nonzero(prediction == 1))
+                HOT_PREDICTIONS.inc(hot)
+                COLD_PREDICTIONS.inc(rows - hot)
             
-            return np.array(feature_vector, dtype=np.float32).reshape(1, -1)
+            return {
+                "prediction": prediction,
+                "probability_cold": np.asarray(probabilities[:, 0], dtype=np.float64),
+                "probability_hot": np.asarray(probabilities[:, 1], dtype=np.float64),
+                "model_version": model.version
+            }
             
         except Exception as e:
-            logger.error("Failed to extract features", error=str(e))
+            logger.error("Batch prediction failed", rows=len(features), model_version=model.version, error=str(e))
             raise
     
     def predict(self, features: np.ndarray) -> Dict[str, Any]:
         """Make prediction using the loaded model"""
+        return self._row_result(self.predict_batch(features))
+    
+    def _is_shadow(self, model: LoadedModel) -> bool:
+        return model is self.candidate and self.candidate_mode == "shadow"
+    
+    def _route(self) -> LoadedModel:
+        """Model serving the next request: the canary for its fraction of requests, else the active model"""
+        candidate = self.candidate
+        if candidate and self.candidate_mode == "canary" and random.random() < self.candidate_fraction:
+            return candidate
+        return self.active
+    
+    async def _run_model(self, model: LoadedModel, features: np.ndarray, offload: bool, shadow: bool = False) -> Dict[str, Any]:
+        if offload:
+            # Off the event loop, so large batches don't stall micro-batched requests
+            return await asyncio.to_thread(self.predict_batch, features, model, shadow)
+        if model.batcher:
+            # Batched with concurrent requests
+            return await model.batcher.predict(features)
+        return self.predict_batch(features, model, shadow)
+    
+    async def score(self, build: Callable[[LoadedModel], np.ndarray], offload: bool = False,
+                    cache: bool = True) -> Dict[str, Any]:
+        """Build features for the routed model version and score them
+        
+        ``build`` makes the feature matrix with a given model's pipeline, so
+        each version (and the shadow candidate) gets inputs it was trained on.
+        With ``cache``, rows go through the prediction cache.
+        """
+        model = self._route()
+        features = build(model)
+        if cache and self.prediction_cache is not None:
+            result = await self._score_cached(model, features, offload)
+        else:
+            result = await self._run_model(model, features, offload)
+        
+        candidate = self.candidate
+        if (candidate and self.candidate_mode == "shadow" and model is self.active
+                and random.random() < self.candidate_fraction):
+            self._spawn(self._shadow_score(candidate, build, result))
+        return result
+    
+    async def _score_cached(self, model: LoadedModel, features: np.ndarray, offload: bool) -> Dict[str, Any]:
+        """Score only the rows whose quantized features are not cached, once per distinct row"""
+        cache = self.prediction_cache
+        keys, cacheable = cache.keys(features)
+        hit, result = cache.get(model.version, keys, cacheable)
+        result["model_version"] = model.version
+        
+        hits = int(np.count_nonzero(hit))
+        if hits:
+            hot = int(np.count_nonzero(result["prediction"][hit] == 1))
+            HOT_PREDICTIONS.inc(hot)
+            COLD_PREDICTIONS.inc(hits - hot)
+        if hits == len(keys):
+            return result
+        
+        miss = np.flatnonzero(~hit)
+        repeated = miss[cacheable[miss]]
+        uncacheable = miss[~cacheable[miss]]
+        unique_keys, first, inverse = np.unique(keys[repeated], return_index=True, return_inverse=True)
+        scored_rows = np.concatenate([repeated[first], uncacheable])
+        scored = await self._run_model(model, features[scored_rows], offload)
+        
+        unique = len(unique_keys)
+        for column in ("prediction", "probability_cold", "probability_hot"):
+            values = np.asarray(scored[column])
+            result[column][repeated] = values[:unique][inverse.reshape(-1)]
+            result[column][uncacheable] = values[unique:]
+        
+        # Not for a model swapped out while it was scoring
+        if model is self.active or model is self.candidate:
+            cache.put(model.version, unique_keys, {
+                column: np.asarray(scored[column])[:unique]
+                for column in ("prediction", "probability_cold", "probability_hot")
+            })
+        return result
+    
+    async def _shadow_score(self, candidate: LoadedModel, build: Callable[[LoadedModel], np.ndarray], primary: Dict[str, Any]):
+        """Score the same inputs with the shadow candidate and compare (never served)"""
         try:
-            with INFERENCE_LATENCY.time():
-                INFERENCE_REQUESTS.inc()
-                
-                if self.onnx_session:
-                    # Use ONNX model
-                    input_name = self.onnx_session.get_inputs()[0].name
-                    outputs = self.onnx_session.run(None, {input_name: features})
-                    probabilities = outputs[1][0]  # Get probabilities
-                    prediction = outputs[0][0]     # Get prediction
-                else:
-                    # Use scikit-learn model
-                    probabilities = self.model.predict_proba(features)[0]
-                    prediction = self.model.predict(features)[0]
-                
-                # Extract probabilities
-                prob_cold = float(probabilities[0])
-                prob_hot = float(probabilities[1])
-                
-                # Determine prediction
-                predicted_tier = "hot" if prediction == 1 else "cold"
-                confidence = max(prob_hot, prob_cold)
-                
-                # Update metrics
-                if predicted_tier == "hot":
-                    HOT_PREDICTIONS.inc()
-                else:
-                    COLD_PREDICTIONS.inc()
-                
-                return {
-                    "prediction": predicted_tier,
-                    "confidence": confidence,
-                    "probability_hot": prob_hot,
-                    "probability_cold": prob_cold,
-                    "model_version": self.model_metadata.get('model_version', 'unknown')
-                }
-                
+            result = await self._run_model(candidate, build(candidate), offload=candidate.batcher is None, shadow=True)
+            agree = int(np.count_nonzero(result["prediction"] == primary["prediction"]))
+            rows = len(result["prediction"])
+            SHADOW_PREDICTIONS.labels(version=candidate.version, result="agree").inc(agree)
+            SHADOW_PREDICTIONS.labels(version=candidate.version, result="disagree").inc(rows - agree)
+            if rows:
+                SHADOW_PROBABILITY_DIFF.labels(version=candidate.version).observe(
+                    float(np.mean(np.abs(result["probability_hot"] - primary["probability_hot"])))
+                )
         except Exception as e:
-            logger.error("Prediction failed", error=str(e))
-            raise
+            SHADOW_PREDICTIONS.labels(version=candidate.version, result="error").inc()
+            logger.warning("Shadow scoring failed", model_version=candidate.version, error=str(e))
+    
+    async def score_events(self, events: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Score tiering events, one row per event"""
+        now = time.time()
+        history = self.feature_store.lookup(events, now) if self.feature_store else None
+        return await self.score(lambda model: model.pipeline.transform_events(events, now=now, history=history))
+    
+    def _row_result(self, result: Dict[str, Any], row: int = 0) -> Dict[str, Any]:
+        """Prediction for one row of a predict_batch result"""
+        prob_cold = float(result["probability_cold"][row])
+        prob_hot = float(result["probability_hot"][row])
+        
+        return {
+            "prediction": "hot" if result["prediction"][row] == 1 else "cold",
+            "confidence": max(prob_hot, prob_cold),
+            "probability_hot": prob_hot,
+            "probability_cold": prob_cold,
+            "model_version": result["model_version"]
+        }
     
-    async def process_kafka_message(self, message):
-        """Process a message from Kafka"""
+    async def process_kafka_messages(self, messages: List[Any]):
+        """Process a polled batch of Kafka messages with one feature pass and model call"""
         try:
-            KAFKA_MESSAGES_PROCESSED.inc()
-            
-            event_data = message.value
-            logger.debug("Processing Kafka message", 
-                        bucket=event_data.get('bucket_name'),
-                        object=event_data.get('object_key'))
+            events = [message.value for message in messages]
             
-            # Extract features
-            features = self._extract_features(event_data)
-            
-            # Make prediction
-            result = self.predict(features)
-            
-            # Check if object should be migrated to hot tier
-            hot_threshold = 0.8  # Configurable threshold
-            if result['probability_hot'] >= hot_threshold:
-                # Publish migration request
-                migration_request = {
-                    'timestamp': time.time(),
-                    'bucket_name': event_data.get('bucket_name'),
-                    'object_key': event_data.get('object_key'),
-                    'current_tier': event_data.get('current_tier', 'cold'),
-                    'recommended_tier': 'hot',
-                    'confidence': result['confidence'],
-                    'probability_hot': result['probability_hot'],
-                    'model_version': result['model_version']
-                }
-                
-                if self.kafka_producer:
-                    self.kafka_producer.send('tiering-requests', migration_request)
-                    logger.info("Published hot tier migration request",
-                               bucket=event_data.get('bucket_name'),
-                               object=event_data.get('object_key'),
-                               confidence=result['confidence'])
+            # Extract features and make prediction (batched with concurrent requests)
+            results = await self.score_events(events)
             
         except Exception as e:
+            if len(messages) > 1:
+                # Isolate the bad message(s) rather than losing the batch
+                logger.warning("Kafka batch failed, processing messages one by one",
+                              messages=len(messages), error=str(e))
+                for message in messages:
+                    await self.process_kafka_messages([message])
+                return
+            KAFKA_MESSAGES_PROCESSED.inc()
             KAFKA_PROCESSING_ERRORS.inc()
             logger.error("Failed to process Kafka message", error=str(e))
+            return
+        
+        KAFKA_MESSAGES_PROCESSED.inc(len(messages))
+        for row, event_data in enumerate(events):
+            try:
+                self._publish_decision(event_data, self._row_result(results, row))
+            except Exception as e:
+                KAFKA_PROCESSING_ERRORS.inc()
+                logger.error("Failed to process Kafka message", error=str(e))
+    
+    def _publish_decision(self, event_data: Dict[str, Any], result: Dict[str, Any]):
+        """Publish a hot tier migration request if the prediction calls for one"""
+        # Check if object should be migrated to hot tier
+        hot_threshold = 0.8  # Configurable threshold
+        if result['probability_hot'] >= hot_threshold:
+            # Publish migration request
+            migration_request = {
+                'timestamp': time.time(),
+                'bucket_name': event_data.get('bucket_name'),
+                'object_key': event_data.get('object_key'),
+                'current_tier': event_data.get('current_tier', 'cold'),
+                'recommended_tier': 'hot',
+                'confidence': result['confidence'],
+                'probability_hot': result['probability_hot'],
+                'model_version': result['model_version']
+            }
+            
+            if self.kafka_producer:
+                self.kafka_producer.send('tiering-requests', migration_request)
+                logger.info("Published hot tier migration request",
+                           bucket=event_data.get('bucket_name'),
+                           object=event_data.get('object_key'),
+                           confidence=result['confidence'])
     
     async def start_kafka_consumer(self):
         """Start consuming messages from Kafka"""
@@ -333,12 +654,14 @@ class MLInferenceService:
         try:
             while self.running:
                 try:
-                    # Poll for messages with timeout
-                    message_batch = self.kafka_consumer.poll(timeout_ms=1000)
+                    # Poll for messages with timeout (in a thread, so the
+                    # event loop keeps serving API requests meanwhile)
+                    message_batch = await asyncio.to_thread(self.kafka_consumer.poll, timeout_ms=1000)
                     
-                    for topic_partition, messages in message_batch.items():
-                        for message in messages:
-                            await self.process_kafka_message(message)
+                    # Each poll is featurized and scored as one batch
+                    messages = [message for partition in message_batch.values() for message in partition]
+                    if messages:
+                        await self.process_kafka_messages(messages)
                     
                     # Small delay to prevent busy waiting
                     await asyncio.sleep(0.1)
@@ -354,16 +677,58 @@ class MLInferenceService:
                 self.kafka_consumer.close()
             logger.info("Kafka consumer stopped")
     
+    async def start_feature_store_consumer(self):
+        """Apply access-log events to the feature store and snapshot it periodically"""
+        if not self.access_log_consumer:
+            return
+        
+        self.running = True
+        last_snapshot = time.time()
+        logger.info("Starting feature store consumer")
+        
+        try:
+            while self.running:
+                try:
+                    message_batch = await asyncio.to_thread(self.access_log_consumer.poll, timeout_ms=1000)
+                    for messages in message_batch.values():
+                        for message in messages:
+                            self.feature_store.record(message.value)
+                    
+                    if time.time() - last_snapshot >= FEATURE_STORE_SNAPSHOT_INTERVAL:
+                        await self._snapshot_feature_store()
+                        last_snapshot = time.time()
+                    
+                except Exception as e:
+                    logger.error("Error in feature store consumer loop", error=str(e))
+                    await asyncio.sleep(5)  # Wait before retrying
+                    
+        finally:
+            try:
+                await self._snapshot_feature_store()
+            except Exception as e:
+                logger.error("Final feature store snapshot failed", error=str(e))
+            self.access_log_consumer.close()
+            logger.info("Feature store consumer stopped")
+    
+    async def _snapshot_feature_store(self):
+        """Free idle keys, snapshot the store and commit the events it covers"""
+        self.feature_store.maintain()
+        await asyncio.to_thread(self.feature_store.save, FEATURE_STORE_SNAPSHOT)
+        await asyncio.to_thread(self.access_log_consumer.commit)
+        logger.debug("Feature store snapshot written",
+                    path=FEATURE_STORE_SNAPSHOT,
+                    objects=len(self.feature_store.objects))
+    
     def stop_kafka_consumer(self):
-        """Stop the Kafka consumer"""
+        """Stop the Kafka consumers"""
         self.running = False
     
     def get_health(self) -> Dict[str, Any]:
         """Get service health status"""
         return {
-            "status": "healthy" if (self.model or self.onnx_session) else "unhealthy",
-            "model_loaded": bool(self.model or self.onnx_session),
-            "model_version": self.model_metadata.get('model_version', 'unknown') if self.model_metadata else 'unknown',
+            "status": "healthy" if self.active else "unhealthy",
+            "model_loaded": self.active is not None,
+            "model_version": self.active.version if self.active else 'unknown',
             "uptime_seconds": time.time() - self.start_time
         }
 
@@ -395,32 +760,114 @@ async def startup_event():
     
     # Start Kafka consumer in background
     asyncio.create_task(ml_service.start_kafka_consumer())
+    asyncio.create_task(ml_service.start_feature_store_consumer())
+    
+    # Follow the model registry for new versions
+    asyncio.create_task(ml_service.watch_registry())
 
 
 @app.on_event("shutdown")
 async def shutdown_event():
     """Cleanup on shutdown"""
     ml_service.stop_kafka_consumer()
+    await ml_service.close()
 
 
 @app.post("/predict", response_model=PredictionResponse)
 async def predict(request: PredictionRequest):
     """Make a prediction for object tiering"""
     try:
-        # Convert request to feature array
-        feature_vector = []
-        for col in ml_service.feature_columns:
-            feature_vector.append(request.features.get(col, 0))
+        # Convert request to feature array and make prediction
+        columns = {col: [value] for col, value in request.features.items()}
+        result = await ml_service.score(lambda model: model.pipeline.transform_columns(columns, 1))
+        
+        return PredictionResponse(**ml_service._row_result(result))
+        
+    except QueueFullError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except Exception as e:
+        logger.error("Prediction endpoint failed", error=str(e))
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+def _columns_builder(columns: Dict[str, Any], rows: Optional[int] = None) -> Tuple[int, Callable[[LoadedModel], np.ndarray]]:
+    """Row count and feature builder for named columns (validated up front)"""
+    if rows is None:
+        rows = len(next(iter(columns.values()))) if columns else 0
+    for col, values in columns.items():
+        if np.shape(values) != (rows,):
+            raise ValueError(f"Column {col} has {np.size(values)} values, expected {rows}")
+    return rows, lambda model: model.pipeline.transform_columns(columns, rows)
+
+
+def _parse_batch_body(body: bytes, content_type: str) -> Tuple[int, Callable[[LoadedModel], np.ndarray]]:
+    """Row count and feature builder for a columnar /predict/batch body"""
+    if content_type in ARROW_CONTENT_TYPES:
+        if not PYARROW_AVAILABLE:
+            raise HTTPException(status_code=415, detail="Arrow bodies need pyarrow installed")
+        reader = pa.ipc.open_file(pa.BufferReader(body)) if content_type.endswith(".file") else pa.ipc.open_stream(body)
+        table = reader.read_all()
+        columns = {name: table.column(name).to_numpy() for name in table.column_names}
+        return _columns_builder(columns, table.num_rows)
+    
+    if content_type in NUMPY_CONTENT_TYPES:
+        loaded = np.load(io.BytesIO(body), allow_pickle=False)
+        if isinstance(loaded, np.lib.npyio.NpzFile):
+            # .npz: one named array per feature column
+            with loaded:
+                columns = {name: loaded[name] for name in loaded.files}
+            return _columns_builder(columns)
+        # .npy: a (rows, n_features) matrix in feature_columns order
+        if loaded.ndim != 2 or loaded.shape[1] != len(ml_service.feature_columns):
+            raise ValueError(f"Expected a (rows, {len(ml_service.feature_columns)}) matrix, got {loaded.shape}")
+        raw = loaded.astype(np.float32)
+        return len(raw), lambda model: model.pipeline.scale(raw.copy())
+    
+    request = BatchPredictionRequest.model_validate_json(body)
+    return _columns_builder(request.columns)
+
+
+@app.post("/predict/batch", response_model=BatchPredictionResponse)
+async def predict_batch(request: Request):
+    """Score many objects with one model invocation
+    
+    The body holds feature columns: JSON ``{"columns": {"feature": [...]}}``,
+    an Arrow IPC stream or file, a NumPy ``.npz`` of named columns, or a
+    ``.npy`` matrix in ``/model/info`` feature order.
+    """
+    try:
+        if not ml_service.active:
+            raise HTTPException(status_code=503, detail="Model not loaded")
         
-        features = np.array(feature_vector, dtype=np.float32).reshape(1, -1)
+        content_type = request.headers.get("content-type", "application/json").split(";")[0].strip()
+        try:
+            rows, build = _parse_batch_body(await request.body(), content_type)
+        except HTTPException:
+            raise
+        except Exception as e:
+            raise HTTPException(status_code=422, detail=f"Invalid batch body: {e}")
+        
+        if rows > MAX_BATCH_ROWS:
+            raise HTTPException(status_code=413, detail=f"Batch of {rows} rows exceeds {MAX_BATCH_ROWS}")
         
-        # Make prediction
-        result = ml_service.predict(features)
+        # Bulk scoring bypasses the prediction cache rather than flushing it
+        result = await ml_service.score(build, offload=True, cache=False)
+        prob_hot = result["probability_hot"]
+        prob_cold = result["probability_cold"]
         
-        return PredictionResponse(**result)
+        return BatchPredictionResponse(
+            prediction=np.where(result["prediction"] == 1, "hot", "cold").tolist(),
+            confidence=np.maximum(prob_hot, prob_cold).tolist(),
+            probability_hot=prob_hot.tolist(),
+            probability_cold=prob_cold.tolist(),
+            model_version=result["model_version"],
+            rows=rows
+        )
         
+    except HTTPException:
+        raise
     except Exception as e:
-        logger.error("Prediction endpoint failed", error=str(e))
+        logger.error("Batch prediction endpoint failed", error=str(e))
         raise HTTPException(status_code=500, detail=str(e))
 
 
@@ -428,14 +875,13 @@ async def predict(request: PredictionRequest):
 async def predict_from_event(event: TieringEvent):
     """Make a prediction from a tiering event"""
     try:
-        # Extract features from event
-        features = ml_service._extract_features(event.dict())
+        # Extract features from event and make prediction
+        result = await ml_service.score_events([event.dict()])
         
-        # Make prediction
-        result = ml_service.predict(features)
-        
-        return PredictionResponse(**result)
+        return PredictionResponse(**ml_service._row_result(result))
         
+    except QueueFullError as e:
+        raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
         logger.error("Event prediction failed", error=str(e))
         raise HTTPException(status_code=500, detail=str(e))
@@ -463,10 +909,103 @@ async def model_info():
     return {
         "model_metadata": ml_service.model_metadata,
         "feature_columns": ml_service.feature_columns,
-        "model_type": "ONNX" if ml_service.onnx_session else "scikit-learn"
+        "model_type": ml_service.active.model_type
+    }
+
+
+def _model_summary(model: Optional[LoadedModel]) -> Optional[Dict[str, Any]]:
+    if model is None:
+        return None
+    return {
+        "version": model.version,
+        "model_type": model.model_type,
+        "training_date": model.metadata.get("training_date"),
+        "evaluation_results": model.metadata.get("evaluation_results")
     }
 
 
+@app.get("/models")
+async def list_models():
+    """Registry versions, the active model and the shadow/canary candidate"""
+    try:
+        candidate = _model_summary(ml_service.candidate)
+        if candidate:
+            candidate.update(mode=ml_service.candidate_mode, fraction=ml_service.candidate_fraction)
+        return {
+            "registry": ml_service.registry.enabled,
+            "versions": ml_service.registry.versions(),
+            "active": _model_summary(ml_service.active),
+            "candidate": candidate
+        }
+    except Exception as e:
+        logger.error("Failed to list models", error=str(e))
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.post("/models/candidate/promote")
+async def promote_candidate():
+    """Make the shadow/canary candidate the active model"""
+    try:
+        if not ml_service.candidate:
+            raise HTTPException(status_code=404, detail="No candidate model")
+        model = await ml_service.promote_candidate()
+        return {"active": _model_summary(model)}
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error("Failed to promote candidate model", error=str(e))
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.delete("/models/candidate")
+async def clear_candidate():
+    """Stop shadowing/canarying the candidate"""
+    try:
+        await ml_service.clear_candidate(persist=ml_service.registry.enabled)
+        return {"candidate": None}
+    except Exception as e:
+        logger.error("Failed to clear candidate model", error=str(e))
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+def _require_version(version: str):
+    if not ml_service.registry.enabled:
+        raise HTTPException(status_code=409, detail=f"No model registry in {ml_service.registry.registry_dir}")
+    if version not in ml_service.registry.versions():
+        raise HTTPException(status_code=404, detail=f"Model version {version} not found")
+
+
+@app.post("/models/{version}/activate")
+async def activate_model(version: str):
+    """Load, warm up and swap in a registry version, and make it CURRENT"""
+    try:
+        _require_version(version)
+        model = await ml_service.activate(version, persist=True)
+        return {"active": _model_summary(model)}
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error("Failed to activate model", model_version=version, error=str(e))
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.post("/models/{version}/candidate")
+async def set_candidate_model(version: str, request: CandidateRequest):
+    """Load a registry version as shadow or canary candidate"""
+    try:
+        _require_version(version)
+        if request.mode not in CANDIDATE_MODES:
+            raise HTTPException(status_code=422, detail=f"Mode must be one of {', '.join(CANDIDATE_MODES)}")
+        fraction = request.fraction if request.fraction is not None else (1.0 if request.mode == "shadow" else 0.05)
+        model = await ml_service.set_candidate(version, request.mode, fraction, persist=True)
+        return {"candidate": dict(_model_summary(model), mode=request.mode, fraction=fraction)}
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error("Failed to set candidate model", model_version=version, error=str(e))
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
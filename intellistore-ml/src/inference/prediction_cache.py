@@ -0,0 +1,124 @@
+"""
+Prediction cache keyed by quantized feature vectors
+
+Bursts of tiering events (many uploads to one bucket in the same hour,
+similar sizes, default access history) build identical or near-identical
+feature rows.  PredictionCache rounds each row of the model's input
+matrix to a multiple of ``quantum`` (inputs are standardized, so a
+quantum is a fraction of a feature's spread) and remembers the
+prediction per (model version, rounded row) in an LRU with a TTL.  The
+key is the rounded row's bytes, so distinct rows never share an entry.
+
+Rows within a batch are deduplicated by the same key, so only unique,
+uncached rows reach the model.  Entries of a model version are dropped
+when that version is unloaded.
+"""
+
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+from prometheus_client import Counter, Gauge
+
+PREDICTION_CACHE_LOOKUPS = Counter('ml_prediction_cache_lookups_total', 'Rows looked up in the prediction cache', ['result'])
+PREDICTION_CACHE_ENTRIES = Gauge('ml_prediction_cache_entries', 'Predictions held in the prediction cache')
+PREDICTION_CACHE_EVICTIONS = Counter('ml_prediction_cache_evictions_total', 'Prediction cache entries dropped', ['reason'])
+
+class PredictionCache:
+    """LRU + TTL cache of per-row predictions"""
+
+    def __init__(self, max_entries: int = 100000, ttl: float = 300.0, quantum: float = 1e-3):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.quantum = quantum
+        # (version, quantized row bytes) -> (expires_at, prediction, probability_cold, probability_hot)
+        self._entries: "OrderedDict[Tuple[str, bytes], Tuple[float, Any, float, float]]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def keys(self, features: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Key per row (its quantized features as bytes), and which rows can be cached
+
+        Keys are a 1-D void array: np.unique groups equal rows and
+        ``tolist()`` gives the bytes.  Rows with non-finite or out-of-range
+        values are not cacheable.
+        """
+        quantized = np.rint(features / self.quantum)
+        cacheable = np.all(np.abs(quantized) < 2.0 ** 62, axis=1)
+        quantized[~cacheable] = 0
+
+        row_bytes = 8 * features.shape[1]
+        keys = np.ascontiguousarray(quantized, dtype=np.int64).view(np.dtype((np.void, row_bytes)))
+        return keys.reshape(-1), cacheable
+
+    def get(self, version: str, keys: np.ndarray, cacheable: np.ndarray,
+            now: Optional[float] = None) -> Tuple[np.ndarray, Dict[str, np.ndarray]]:
+        """Hit mask and cached prediction columns (valid where hit) for ``keys``"""
+        if now is None:
+            now = time.time()
+        rows = len(keys)
+        hit = np.zeros(rows, dtype=bool)
+        prediction = np.zeros(rows, dtype=np.int64)
+        probability_cold = np.zeros(rows, dtype=np.float64)
+        probability_hot = np.zeros(rows, dtype=np.float64)
+        hit_rows, entries = [], []
+        expired = 0
+        candidates = np.flatnonzero(cacheable)
+        for row, key in zip(candidates.tolist(), keys[candidates].tolist()):
+            key = (version, key)
+            entry = self._entries.get(key)
+            if entry is None:
+                continue
+            if entry[0] <= now:
+                del self._entries[key]
+                expired += 1
+                continue
+            self._entries.move_to_end(key)
+            hit_rows.append(row)
+            entries.append(entry)
+
+        if entries:
+            _, prediction[hit_rows], probability_cold[hit_rows], probability_hot[hit_rows] = zip(*entries)
+            hit[hit_rows] = True
+
+        hits = len(hit_rows)
+        PREDICTION_CACHE_LOOKUPS.labels(result='hit').inc(hits)
+        PREDICTION_CACHE_LOOKUPS.labels(result='miss').inc(rows - hits)
+        if expired:
+            PREDICTION_CACHE_EVICTIONS.labels(reason='expired').inc(expired)
+            PREDICTION_CACHE_ENTRIES.set(len(self._entries))
+        return hit, {
+            'prediction': prediction,
+            'probability_cold': probability_cold,
+            'probability_hot': probability_hot,
+        }
+
+    def put(self, version: str, keys: np.ndarray, result: Dict[str, Any], now: Optional[float] = None):
+        """Remember each row of a predict_batch ``result`` under its key"""
+        if now is None:
+            now = time.time()
+        expires_at = now + self.ttl
+        for key, prediction, probability_cold, probability_hot in zip(
+                keys.tolist(), result['prediction'].tolist(),
+                result['probability_cold'].tolist(), result['probability_hot'].tolist()):
+            self._entries[(version, key)] = (expires_at, prediction, probability_cold, probability_hot)
+            self._entries.move_to_end((version, key))
+
+        evicted = 0
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            evicted += 1
+        if evicted:
+            PREDICTION_CACHE_EVICTIONS.labels(reason='capacity').inc(evicted)
+        PREDICTION_CACHE_ENTRIES.set(len(self._entries))
+
+    def invalidate(self, version: str):
+        """Drop every prediction made by model ``version``"""
+        stale = [key for key in self._entries if key[0] == version]
+        for key in stale:
+            del self._entries[key]
+        if stale:
+            PREDICTION_CACHE_EVICTIONS.labels(reason='invalidated').inc(len(stale))
+        PREDICTION_CACHE_ENTRIES.set(len(self._entries))
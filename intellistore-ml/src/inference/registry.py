@@ -0,0 +1,324 @@
+"""
+Versioned model registry
+
+Each trained model is a directory of the usual artifacts under
+``<model dir>/registry/<version>/``; two pointer files pick what is served:
+
+    registry/<version>/tiering_model.onnx     (or tiering_model.forest.npz / .joblib)
+    registry/<version>/preprocessing.joblib
+    registry/<version>/model_metadata.json
+    registry/CURRENT      version serving traffic
+    registry/CANDIDATE    {"version": ..., "mode": "shadow" | "canary", "fraction": ...}
+
+The inference service loads a version into a LoadedModel in the
+background, warms it up and swaps it in, so a retrained model rolls out
+without a restart.  Without a registry directory the flat model directory
+(models/tiering_model.onnx, ...) is loaded as a single unversioned model.
+"""
+
+import bisect
+import json
+import os
+import threading
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import joblib
+import numpy as np
+import structlog
+
+from features import FeaturePipeline
+from forest import FOREST_MODEL_FILE, CompiledForest
+
+# ONNX Runtime is preferred for serving; compiled forests and scikit-learn
+# models work without it
+try:
+    import onnxruntime as ort
+    ONNXRUNTIME_AVAILABLE = True
+except ImportError:
+    ONNXRUNTIME_AVAILABLE = False
+
+logger = structlog.get_logger(__name__)
+
+CANDIDATE_MODES = ("shadow", "canary")
+
+GRAPH_OPTIMIZATION_LEVELS = ("disabled", "basic", "extended", "all")
+
+ONNX_MODEL_FILE = "tiering_model.onnx"
+JOBLIB_MODEL_FILE = "tiering_model.joblib"
+PREPROCESSING_FILE = "preprocessing.joblib"
+METADATA_FILE = "model_metadata.json"
+
+
+def _write_atomic(path: str, content: str):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        f.write(content)
+    os.replace(tmp_path, path)
+
+
+def onnx_session_options(intra_op_threads: int = 0,
+                         inter_op_threads: int = 0,
+                         graph_optimization: str = "all"):
+    """SessionOptions for serving; 0 threads leaves the count to ONNX Runtime"""
+    if graph_optimization not in GRAPH_OPTIMIZATION_LEVELS:
+        raise ValueError(f"Unknown graph optimization level {graph_optimization!r}")
+    options = ort.SessionOptions()
+    options.intra_op_num_threads = intra_op_threads
+    options.inter_op_num_threads = inter_op_threads
+    options.graph_optimization_level = {
+        "disabled": ort.GraphOptimizationLevel.ORT_DISABLE_ALL,
+        "basic": ort.GraphOptimizationLevel.ORT_ENABLE_BASIC,
+        "extended": ort.GraphOptimizationLevel.ORT_ENABLE_EXTENDED,
+        "all": ort.GraphOptimizationLevel.ORT_ENABLE_ALL,
+    }[graph_optimization]
+    options.execution_mode = (ort.ExecutionMode.ORT_PARALLEL if inter_op_threads > 1
+                              else ort.ExecutionMode.ORT_SEQUENTIAL)
+    return options
+
+
+class OnnxRunner:
+    """Runs an ONNX Runtime session with cached input/output names
+
+    For models exported without zipmap (tensor probabilities), IO bindings
+    with preallocated input and output buffers are set up for each of
+    ``bind_batch_sizes``.  A batch runs through the smallest binding that
+    fits it, with stale padding rows scored and discarded; batches larger
+    than every binding, or arriving while theirs is in use, run unbound.
+    """
+
+    def __init__(self, session, bind_batch_sizes: Sequence[int] = ()):
+        self.session = session
+        model_input = session.get_inputs()[0]
+        self.input_name = model_input.name
+        self.output_names = [output.name for output in session.get_outputs()]
+        label_output, probability_output = session.get_outputs()[:2]
+
+        self._bindings: Dict[int, tuple] = {}
+        n_features = model_input.shape[1]
+        # zipmap outputs (one {label: probability} map per row) can't be bound
+        bindable = (isinstance(n_features, int)
+                    and label_output.type == "tensor(int64)"
+                    and probability_output.type == "tensor(float)")
+        if bindable:
+            for rows in sorted(set(bind_batch_sizes)):
+                self._bindings[rows] = self._bind(rows, n_features)
+        self.batch_sizes = sorted(self._bindings)
+
+    def _bind(self, rows: int, n_features: int) -> tuple:
+        features = np.zeros((rows, n_features), dtype=np.float32)
+        labels = np.zeros(rows, dtype=np.int64)
+        probabilities = np.zeros((rows, 2), dtype=np.float32)
+        binding = self.session.io_binding()
+        binding.bind_input(self.input_name, "cpu", 0, np.float32, features.shape, features.ctypes.data)
+        binding.bind_output(self.output_names[0], "cpu", 0, np.int64, labels.shape, labels.ctypes.data)
+        binding.bind_output(self.output_names[1], "cpu", 0, np.float32, probabilities.shape,
+                            probabilities.ctypes.data)
+        return threading.Lock(), binding, features, labels, probabilities
+
+    def run(self, features: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        rows = len(features)
+        i = bisect.bisect_left(self.batch_sizes, rows)
+        if i < len(self.batch_sizes):
+            lock, binding, inputs, labels, probabilities = self._bindings[self.batch_sizes[i]]
+            if lock.acquire(blocking=False):
+                try:
+                    inputs[:rows] = features
+                    self.session.run_with_iobinding(binding)
+                    return labels[:rows].copy(), probabilities[:rows].copy()
+                finally:
+                    lock.release()
+
+        outputs = self.session.run(self.output_names[:2], {self.input_name: features})
+        prediction = np.asarray(outputs[0])
+        probabilities = outputs[1]
+        # Models exported with zipmap emit one {label: probability} map per row
+        if isinstance(probabilities, list):
+            probabilities = np.array([[row[0], row[1]] for row in probabilities], dtype=np.float32)
+        return prediction, np.asarray(probabilities)
+
+
+class LoadedModel:
+    """One model version: its artifacts, feature pipeline and raw inference"""
+
+    def __init__(self,
+                 version: str,
+                 path: str,
+                 metadata: Dict[str, Any],
+                 preprocessing: Dict[str, Any],
+                 onnx_session=None,
+                 forest: Optional[CompiledForest] = None,
+                 model=None,
+                 bind_batch_sizes: Sequence[int] = ()):
+        self.version = version
+        self.path = path
+        self.metadata = metadata
+        self.preprocessing = preprocessing
+        self.onnx_session = onnx_session
+        self.onnx = OnnxRunner(onnx_session, bind_batch_sizes) if onnx_session else None
+        self.forest = forest
+        self.model = model
+        self.pipeline = FeaturePipeline.from_preprocessing(preprocessing)
+        self.feature_columns = self.pipeline.feature_columns
+        # Micro-batcher scoring with this version (set up by the service)
+        self.batcher = None
+
+    @property
+    def model_type(self) -> str:
+        if self.onnx_session:
+            return "ONNX"
+        return "compiled-forest" if self.forest else "scikit-learn"
+
+    def run(self, features: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Predicted labels and (rows, 2) [cold, hot] probabilities for a float32 matrix"""
+        if self.onnx is not None:
+            return self.onnx.run(features)
+
+        if self.forest is not None:
+            probabilities = self.forest.predict_proba(features)
+            return self.forest.classes[probabilities.argmax(axis=1)], probabilities
+
+        probabilities = np.asarray(self.model.predict_proba(features))
+        prediction = np.asarray(self.model.predict(features))
+        return prediction, probabilities
+
+    def warm_up(self, rows: int = 256, iterations: int = 3):
+        """Score synthetic batches so the first real requests don't pay for
+        lazy initialization; raises if the model's output is unusable"""
+        rng = np.random.default_rng(0)
+        # Every IO binding too, so its buffers are allocated before real traffic
+        bound_rows = self.onnx.batch_sizes if self.onnx else []
+        for batch_rows in sorted({1, rows, *bound_rows}):
+            for _ in range(iterations):
+                features = self.pipeline.scale(
+                    rng.random((batch_rows, len(self.feature_columns))).astype(np.float32)
+                )
+                prediction, probabilities = self.run(features)
+                if prediction.shape != (batch_rows,) or probabilities.shape != (batch_rows, 2):
+                    raise ValueError(f"Model {self.version} returned shapes {prediction.shape}, {probabilities.shape}")
+                if not np.all(np.isfinite(probabilities)):
+                    raise ValueError(f"Model {self.version} returned non-finite probabilities")
+
+
+def load_model_dir(path: str,
+                   version: Optional[str] = None,
+                   session_options=None,
+                   bind_batch_sizes: Sequence[int] = ()) -> LoadedModel:
+    """Load the artifacts in ``path`` (blocking; run off the event loop)"""
+    with open(os.path.join(path, METADATA_FILE), "r") as f:
+        metadata = json.load(f)
+    version = version or metadata.get("model_version", "unknown")
+
+    onnx_session = None
+    forest = None
+    model = None
+    onnx_path = os.path.join(path, ONNX_MODEL_FILE)
+    if ONNXRUNTIME_AVAILABLE and os.path.exists(onnx_path):
+        try:
+            onnx_session = ort.InferenceSession(onnx_path, sess_options=session_options,
+                                                providers=["CPUExecutionProvider"])
+        except Exception as e:
+            logger.warning("Failed to load ONNX model, falling back", version=version, error=str(e))
+    forest_path = os.path.join(path, FOREST_MODEL_FILE)
+    if onnx_session is None and os.path.exists(forest_path):
+        try:
+            forest = CompiledForest.load(forest_path)
+        except Exception as e:
+            logger.warning("Failed to load compiled forest, falling back to joblib", version=version, error=str(e))
+    if onnx_session is None and forest is None:
+        model = joblib.load(os.path.join(path, JOBLIB_MODEL_FILE))
+
+    preprocessing = joblib.load(os.path.join(path, PREPROCESSING_FILE))
+    return LoadedModel(version, path, metadata, preprocessing, onnx_session=onnx_session,
+                       forest=forest, model=model, bind_batch_sizes=bind_batch_sizes)
+
+
+class ModelRegistry:
+    """Model versions and the CURRENT / CANDIDATE pointers in a model directory"""
+
+    def __init__(self,
+                 model_dir: str = "models",
+                 session_options=None,
+                 bind_batch_sizes: Sequence[int] = ()):
+        self.model_dir = model_dir
+        self.registry_dir = os.path.join(model_dir, "registry")
+        # How ONNX models are loaded: see onnx_session_options and OnnxRunner
+        self.session_options = session_options
+        self.bind_batch_sizes = tuple(bind_batch_sizes)
+
+    @property
+    def enabled(self) -> bool:
+        return os.path.isdir(self.registry_dir)
+
+    def version_dir(self, version: str) -> str:
+        if not version or os.sep in version or version.startswith("."):
+            raise ValueError(f"Invalid model version {version!r}")
+        return os.path.join(self.registry_dir, version)
+
+    def versions(self) -> List[str]:
+        """Versions with a complete set of artifacts, oldest name first"""
+        if not self.enabled:
+            return []
+        return sorted(
+            name for name in os.listdir(self.registry_dir)
+            if os.path.isfile(os.path.join(self.registry_dir, name, METADATA_FILE))
+        )
+
+    def current_version(self) -> Optional[str]:
+        """Version CURRENT points at, else the newest version"""
+        try:
+            with open(os.path.join(self.registry_dir, "CURRENT")) as f:
+                version = f.read().strip()
+            if version:
+                return version
+        except FileNotFoundError:
+            pass
+        versions = self.versions()
+        return versions[-1] if versions else None
+
+    def candidate(self) -> Optional[Dict[str, Any]]:
+        """The CANDIDATE pointer: version, mode and fraction, or None"""
+        try:
+            with open(os.path.join(self.registry_dir, "CANDIDATE")) as f:
+                candidate = json.load(f)
+        except FileNotFoundError:
+            return None
+        mode = candidate.get("mode", "shadow")
+        if mode not in CANDIDATE_MODES:
+            raise ValueError(f"Unknown candidate mode {mode!r}")
+        # Shadow all requests by default, but canary only a few
+        default_fraction = 1.0 if mode == "shadow" else 0.05
+        return {
+            "version": candidate["version"],
+            "mode": mode,
+            "fraction": float(candidate.get("fraction", default_fraction)),
+        }
+
+    def set_current(self, version: str):
+        self.version_dir(version)
+        os.makedirs(self.registry_dir, exist_ok=True)
+        _write_atomic(os.path.join(self.registry_dir, "CURRENT"), version + "\n")
+
+    def set_candidate(self, version: str, mode: str, fraction: float):
+        self.version_dir(version)
+        if mode not in CANDIDATE_MODES:
+            raise ValueError(f"Unknown candidate mode {mode!r}")
+        os.makedirs(self.registry_dir, exist_ok=True)
+        _write_atomic(os.path.join(self.registry_dir, "CANDIDATE"),
+                      json.dumps({"version": version, "mode": mode, "fraction": fraction}) + "\n")
+
+    def clear_candidate(self):
+        try:
+            os.remove(os.path.join(self.registry_dir, "CANDIDATE"))
+        except FileNotFoundError:
+            pass
+
+    def load(self, version: Optional[str] = None) -> LoadedModel:
+        """Load ``version`` (default: current); the flat model directory if there is no registry"""
+        if not self.enabled:
+            return load_model_dir(self.model_dir, session_options=self.session_options,
+                                  bind_batch_sizes=self.bind_batch_sizes)
+        version = version or self.current_version()
+        if version is None:
+            raise FileNotFoundError(f"No model versions in {self.registry_dir}")
+        return load_model_dir(self.version_dir(version), version, session_options=self.session_options,
+                              bind_batch_sizes=self.bind_batch_sizes)
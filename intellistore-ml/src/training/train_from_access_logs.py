@@ -0,0 +1,481 @@
+"""
+Train the tiering model on real access-log history
+
+Reads access-log events exported from the access-logs topic (JSON lines or
+Parquet files, in time order) in chunks and replays them through the same
+OnlineFeatureStore and FeaturePipeline the inference service uses, so each
+training row has the features serving would have computed at that moment:
+rolling 7-day access counts, unique users, recency and decayed rates.
+
+Every upload, download or update is a tiering decision point (sampled with
+--sample-rate).  Its features are looked up before the events of its
+window (--window-events) are applied, so they never include the future,
+and its label looks ahead: hot if the object is downloaded at least
+--hot-accesses times within --horizon hours.  Decisions whose horizon runs
+past the end of the history are dropped.
+
+Memory is bounded by the chunk size, the feature store capacity and the
+decisions waiting for their horizon, not by the length of the history:
+
+  pass 1  labeled raw feature rows are spilled to --work-dir in chunks of
+          --chunk-size rows while the scaler is fitted with partial_fit
+  pass 2  the chunks are streamed through the model: SGD logistic
+          regression or an MLP with partial_fit, or a random forest grown
+          by --trees-per-chunk warm-started trees per chunk up to
+          --max-trees, after which each chunk's trees replace the oldest
+
+The newest --test-fraction of rows is held out for evaluation, and the
+model is saved as a new registry version like train_model.py does.
+
+Usage:
+    python src/training/train_from_access_logs.py exports/access-logs/ [--model sgd|mlp|forest]
+        [--chunk-size 1000000] [--horizon 24] [--hot-accesses 1] [--sample-rate 0.1]
+"""
+
+import argparse
+import glob
+import json
+import os
+import sys
+import tempfile
+import time
+from collections import OrderedDict, deque
+from typing import Any, Deque, Dict, Iterator, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.linear_model import SGDClassifier
+from sklearn.neural_network import MLPClassifier
+from sklearn.preprocessing import LabelEncoder, StandardScaler
+
+from train_model import PYARROW_AVAILABLE, evaluation_metrics, save_model_artifacts
+
+# train_model puts the inference package on sys.path
+from feature_store import (ACCESS_ACTIONS, BATCH_DELETE_ACTIONS, DELETE_ACTIONS, DOWNLOAD_ACTIONS,  # noqa: E402
+                           OnlineFeatureStore)
+from features import SIZE_CATEGORIES, FeaturePipeline  # noqa: E402
+
+if PYARROW_AVAILABLE:
+    import pyarrow.parquet as pq
+
+MODEL_KINDS = ('sgd', 'mlp', 'forest')
+CLASSES = np.array([0, 1])
+
+# Numeric model inputs, in the order train_model.py's synthetic data has them
+NUMERIC_FEATURES = [
+    'hour_of_day', 'day_of_week', 'is_weekend', 'is_business_hours', 'object_age_days', 'size', 'is_media',
+    'user_activity_level', 'bucket_popularity', 'access_count_7d', 'download_count_7d', 'unique_users_7d',
+    'avg_daily_access', 'last_access_hours_ago', 'recent_access_trend',
+]
+
+SECONDS_PER_HOUR = 3600
+
+
+def build_pipeline() -> FeaturePipeline:
+    """Unscaled pipeline with encoders over every known category"""
+    label_encoders = {
+        'size_category': LabelEncoder().fit(list(SIZE_CATEGORIES)),
+        'current_tier': LabelEncoder().fit(['cold', 'hot']),
+    }
+    return FeaturePipeline(NUMERIC_FEATURES + [f'{col}_encoded' for col in label_encoders], label_encoders)
+
+
+def log_files(paths: Sequence[str]) -> List[str]:
+    """Files to read, in name order; directories contribute their .jsonl/.json/.parquet files"""
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            for pattern in ('*.jsonl', '*.json', '*.parquet'):
+                files.extend(glob.glob(os.path.join(path, pattern)))
+        else:
+            files.append(path)
+    return sorted(files)
+
+
+def iter_access_log_events(paths: Sequence[str], chunk_size: int = 100000) -> Iterator[List[Dict[str, Any]]]:
+    """Access-log events from JSON lines or Parquet files, ``chunk_size`` at a time"""
+    for path in log_files(paths):
+        if path.endswith('.parquet'):
+            if not PYARROW_AVAILABLE:
+                raise RuntimeError(f"Reading {path} requires pyarrow")
+            for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_size):
+                yield batch.to_pylist()
+            continue
+
+        with open(path, 'r') as f:
+            chunk = []
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                chunk.append(json.loads(line))
+                if len(chunk) >= chunk_size:
+                    yield chunk
+                    chunk = []
+            if chunk:
+                yield chunk
+
+
+class _DecisionBlock:
+    """Feature rows of one window's decisions, waiting for their labels"""
+
+    __slots__ = ('features', 'counts', 'resolved', 'remaining')
+
+    def __init__(self, features: np.ndarray):
+        self.features = features
+        self.counts = np.zeros(len(features), dtype=np.int64)
+        self.resolved = np.zeros(len(features), dtype=bool)
+        self.remaining = len(features)
+
+
+class AccessLogSampler:
+    """Replays access-log events and emits (raw features, label) blocks for decision points
+
+    Labels come from per-object download counters: a decision remembers
+    its object's counter and, once the stream passes its horizon, the
+    difference is the downloads in between.  Counters exist only for
+    objects with decisions in flight.
+    """
+
+    def __init__(self,
+                 pipeline: FeaturePipeline,
+                 horizon_hours: float = 24.0,
+                 hot_accesses: int = 1,
+                 sample_rate: float = 0.1,
+                 window_events: int = 1024,
+                 store_capacity: int = 100000,
+                 half_life: float = 86400.0,
+                 catalog_capacity: int = 1000000,
+                 seed: int = 42):
+        self.pipeline = pipeline
+        self.horizon = horizon_hours * SECONDS_PER_HOUR
+        self.hot_accesses = hot_accesses
+        self.sample_rate = sample_rate
+        self.window_events = window_events
+        self.store = OnlineFeatureStore(capacity=store_capacity, half_life=half_life)
+        self.rng = np.random.default_rng(seed)
+
+        # Object key -> (first seen / uploaded at, content type), LRU-bounded
+        self.catalog: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self.catalog_capacity = catalog_capacity
+
+        # Download counters and in-flight decisions per object
+        self.downloads: Dict[str, int] = {}
+        self.in_flight: Dict[str, int] = {}
+        # (deadline, block, row, object key, counter at decision), in deadline order
+        self.deadlines: Deque[Tuple[float, _DecisionBlock, int, str, int]] = deque()
+        self.blocks: Deque[_DecisionBlock] = deque()
+
+        self.events_seen = 0
+        self.decisions = 0
+
+    def _describe(self, key: str, event: Mapping[str, Any], timestamp: float) -> Tuple[float, str]:
+        """(created, content type) of an object, updating the catalog with ``event``"""
+        metadata = event.get('metadata') or {}
+        if event.get('action') == 'upload_object' or key not in self.catalog:
+            self.catalog[key] = (timestamp, metadata.get('content_type') or event.get('content_type') or '')
+            if len(self.catalog) > self.catalog_capacity:
+                self.catalog.popitem(last=False)
+        else:
+            self.catalog.move_to_end(key)
+        return self.catalog[key]
+
+    def _resolve_until(self, timestamp: float):
+        """Label every decision whose horizon ended before ``timestamp``"""
+        while self.deadlines and self.deadlines[0][0] < timestamp:
+            _, block, row, key, base = self.deadlines.popleft()
+            block.counts[row] = self.downloads[key] - base
+            block.resolved[row] = True
+            block.remaining -= 1
+            self.in_flight[key] -= 1
+            if not self.in_flight[key]:
+                del self.in_flight[key]
+                del self.downloads[key]
+
+    def _labeled(self, block: _DecisionBlock, rows=slice(None)) -> Tuple[np.ndarray, np.ndarray]:
+        return block.features[rows], (block.counts[rows] >= self.hot_accesses).astype(np.int8)
+
+    def _window(self, window: List[Mapping[str, Any]]):
+        timestamps = [float(event.get('timestamp') or 0) for event in window]
+        sampled = self.rng.random(len(window)) < self.sample_rate
+
+        # Decision points, described as the tiering events serving scores
+        decisions, decision_rows, decision_times = [], [], []
+        for i, event in enumerate(window):
+            action = event.get('action')
+            bucket, obj = event.get('bucket'), event.get('object')
+            if bucket and action in BATCH_DELETE_ACTIONS:
+                for deleted in event.get('objects') or ():
+                    self.catalog.pop(f"{bucket}/{deleted}", None)
+                continue
+            if not bucket or not obj:
+                continue
+            key = f"{bucket}/{obj}"
+            if action in DELETE_ACTIONS:
+                self.catalog.pop(key, None)
+                continue
+            if action not in ACCESS_ACTIONS:
+                continue
+            created, content_type = self._describe(key, event, timestamps[i])
+            if sampled[i]:
+                decisions.append({
+                    'timestamp': created,
+                    'size': event.get('size') or 0,
+                    'current_tier': event.get('tier') or 'hot',
+                    'content_type': content_type,
+                    'bucket_name': bucket,
+                    'object_key': obj,
+                    'user': event.get('user') or event.get('user_id') or '',
+                })
+                decision_rows.append(i)
+                decision_times.append(timestamps[i])
+
+        # Features from the history before this window
+        block = None
+        if decisions:
+            now = np.array(decision_times)
+            history = self.store.lookup(decisions, now=float(now.min()))
+            block = _DecisionBlock(self.pipeline.transform_events(decisions, now=now, history=history))
+            self.blocks.append(block)
+            self.decisions += len(decisions)
+
+        # Apply the window, counting downloads towards decisions in flight
+        decision_index = {row: n for n, row in enumerate(decision_rows)}
+        for i, event in enumerate(window):
+            self._resolve_until(timestamps[i])
+            self.store.record(event)
+            key = f"{event.get('bucket')}/{event.get('object')}"
+            if event.get('action') in DOWNLOAD_ACTIONS and key in self.downloads:
+                self.downloads[key] += 1
+            n = decision_index.get(i)
+            if n is not None:
+                self.downloads.setdefault(key, 0)
+                self.in_flight[key] = self.in_flight.get(key, 0) + 1
+                self.deadlines.append((timestamps[i] + self.horizon, block, n, key, self.downloads[key]))
+        self.events_seen += len(window)
+
+    def feed(self, events: List[Mapping[str, Any]]) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+        """Apply a chunk of events; yields blocks of decisions whose labels are final"""
+        events = sorted(events, key=lambda event: float(event.get('timestamp') or 0))
+        for start in range(0, len(events), self.window_events):
+            self._window(events[start:start + self.window_events])
+            while self.blocks and not self.blocks[0].remaining:
+                yield self._labeled(self.blocks.popleft())
+        if events:
+            # Free idle feature store slots, as the service does periodically
+            self.store.maintain(float(events[-1].get('timestamp') or 0))
+
+    def finish(self) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+        """Labeled decisions left once the history ends; unresolved ones are dropped"""
+        while self.blocks:
+            block = self.blocks.popleft()
+            yield self._labeled(block, block.resolved)
+        self.deadlines.clear()
+        self.downloads.clear()
+        self.in_flight.clear()
+
+
+def spill_samples(sampler: AccessLogSampler,
+                  event_chunks: Iterator[List[Dict[str, Any]]],
+                  work_dir: str,
+                  chunk_rows: int = 1000000) -> Tuple[List[str], int, StandardScaler]:
+    """Pass 1: write labeled raw feature chunks to ``work_dir`` and fit the scaler"""
+    scaler = StandardScaler()
+    paths: List[str] = []
+    features: List[np.ndarray] = []
+    labels: List[np.ndarray] = []
+    buffered = 0
+    total = 0
+
+    def flush():
+        nonlocal buffered, total
+        if not buffered:
+            return
+        X = np.concatenate(features)
+        y = np.concatenate(labels)
+        features.clear()
+        labels.clear()
+        path = os.path.join(work_dir, f"chunk_{len(paths):05d}.npz")
+        np.savez(path, X=X, y=y)
+        scaler.partial_fit(X)
+        paths.append(path)
+        total += buffered
+        buffered = 0
+
+    def add(blocks: Iterator[Tuple[np.ndarray, np.ndarray]]):
+        nonlocal buffered
+        for X, y in blocks:
+            features.append(X)
+            labels.append(y)
+            buffered += len(y)
+            if buffered >= chunk_rows:
+                flush()
+
+    for events in event_chunks:
+        add(sampler.feed(events))
+        print(f"  {sampler.events_seen} events, {sampler.decisions} decisions, {total + buffered} labeled")
+    add(sampler.finish())
+    flush()
+    return paths, total, scaler
+
+
+def make_model(kind: str, trees_per_chunk: int = 4, seed: int = 42, max_trees: int = 100):
+    if kind == 'sgd':
+        return SGDClassifier(loss='log_loss', alpha=1e-5, random_state=seed)
+    if kind == 'mlp':
+        return MLPClassifier(hidden_layer_sizes=(32, 16), random_state=seed)
+    if kind == 'forest':
+        return RandomForestClassifier(n_estimators=min(trees_per_chunk, max_trees), max_depth=10, min_samples_split=5,
+                                      min_samples_leaf=2, warm_start=True, random_state=seed, n_jobs=-1)
+    raise ValueError(f"Unknown model kind {kind!r}")
+
+
+def fit_chunk(model, X: np.ndarray, y: np.ndarray, trees_per_chunk: int, rng: np.random.Generator,
+              max_trees: int = 100):
+    """Update ``model`` with one chunk of (scaled) rows"""
+    if isinstance(model, RandomForestClassifier):
+        # Every tree needs both classes to agree with the forest's classes_
+        if len(np.unique(y)) < len(CLASSES):
+            return
+        if hasattr(model, 'estimators_'):
+            # Past max_trees the oldest trees make room, keeping the forest's size fixed
+            new_trees = min(trees_per_chunk, max_trees)
+            excess = len(model.estimators_) + new_trees - max_trees
+            if excess > 0:
+                del model.estimators_[:excess]
+            model.n_estimators = len(model.estimators_) + new_trees
+        model.fit(X, y)
+        return
+    # Rows are in time order; shuffle within the chunk for SGD
+    order = rng.permutation(len(y))
+    model.partial_fit(X[order], y[order], classes=CLASSES)
+
+
+def train_incremental(model,
+                      pipeline: FeaturePipeline,
+                      chunk_paths: Sequence[str],
+                      total_rows: int,
+                      test_fraction: float = 0.1,
+                      epochs: int = 1,
+                      trees_per_chunk: int = 4,
+                      max_trees: int = 100,
+                      seed: int = 42) -> Dict:
+    """Pass 2: train on the oldest rows chunk by chunk, then evaluate on the newest"""
+    n_train = int(total_rows * (1 - test_fraction))
+    rng = np.random.default_rng(seed)
+
+    def chunks() -> Iterator[Tuple[np.ndarray, np.ndarray, int]]:
+        offset = 0
+        for path in chunk_paths:
+            with np.load(path) as data:
+                X, y = data['X'], data['y']
+            yield pipeline.scale(X), y, offset
+            offset += len(y)
+
+    for epoch in range(epochs):
+        for X, y, offset in chunks():
+            train_rows = min(len(y), max(0, n_train - offset))
+            if not train_rows:
+                break
+            fit_chunk(model, X[:train_rows], y[:train_rows], trees_per_chunk, rng, max_trees)
+        print(f"  epoch {epoch + 1}/{epochs} done")
+    if isinstance(model, RandomForestClassifier) and not hasattr(model, 'estimators_'):
+        raise ValueError("No training chunk has both hot and cold decisions")
+
+    y_test, y_pred, y_pred_proba = [], [], []
+    for X, y, offset in chunks():
+        test_from = min(len(y), max(0, n_train - offset))
+        if test_from == len(y):
+            continue
+        y_test.append(y[test_from:])
+        y_pred.append(model.predict(X[test_from:]))
+        y_pred_proba.append(model.predict_proba(X[test_from:])[:, 1])
+    return evaluation_metrics(np.concatenate(y_test), np.concatenate(y_pred), np.concatenate(y_pred_proba))
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("paths", nargs="+", help="Access-log export files or directories (.jsonl/.json/.parquet)")
+    parser.add_argument("--model", choices=MODEL_KINDS, default="sgd", help="Incrementally trained model")
+    parser.add_argument("--chunk-size", type=int, default=1000000, help="Events read, and rows spilled, per chunk")
+    parser.add_argument("--window-events", type=int, default=1024, help="Events per feature lookup window")
+    parser.add_argument("--horizon", type=float, default=24.0, help="Hours a decision's label looks ahead")
+    parser.add_argument("--hot-accesses", type=int, default=1, help="Downloads within the horizon that make it hot")
+    parser.add_argument("--sample-rate", type=float, default=0.1, help="Fraction of accesses used as decisions")
+    parser.add_argument("--store-capacity", type=int, default=100000, help="Feature store object slots (as serving)")
+    parser.add_argument("--half-life", type=float, default=86400.0, help="Feature store decay half-life (as serving)")
+    parser.add_argument("--test-fraction", type=float, default=0.1, help="Newest rows held out for evaluation")
+    parser.add_argument("--epochs", type=int, default=1, help="Passes over the training chunks")
+    parser.add_argument("--trees-per-chunk", type=int, default=4, help="Trees added per chunk with --model forest")
+    parser.add_argument("--max-trees", type=int, default=100, help="Forest size cap; newer trees replace the oldest")
+    parser.add_argument("--work-dir", help="Directory for spilled feature chunks (default: a temporary one)")
+    parser.add_argument("--model-dir", default="models", help="Model registry directory")
+    parser.add_argument("--no-activate", action="store_true", help="Save the version without moving CURRENT")
+    parser.add_argument("--seed", type=int, default=42, help="Random seed")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None):
+    """Access-log training pipeline"""
+    args = parse_args(argv)
+    start_time = time.time()
+    print("Starting IntelliStore ML training from access logs...")
+
+    pipeline = build_pipeline()
+    sampler = AccessLogSampler(
+        pipeline,
+        horizon_hours=args.horizon,
+        hot_accesses=args.hot_accesses,
+        sample_rate=args.sample_rate,
+        window_events=args.window_events,
+        store_capacity=args.store_capacity,
+        half_life=args.half_life,
+        seed=args.seed
+    )
+
+    with tempfile.TemporaryDirectory(dir=args.work_dir) as work_dir:
+        print("Building features from access logs...")
+        chunk_paths, total_rows, scaler = spill_samples(
+            sampler, iter_access_log_events(args.paths, args.chunk_size), work_dir, args.chunk_size
+        )
+        if not total_rows:
+            sys.exit("No labeled decisions in the access logs")
+        pipeline.set_scaler(scaler)
+        print(f"{total_rows} labeled decisions from {sampler.events_seen} events in {len(chunk_paths)} chunks")
+
+        print(f"Training {args.model} model...")
+        model = make_model(args.model, args.trees_per_chunk, args.seed, args.max_trees)
+        evaluation_results = train_incremental(
+            model, pipeline, chunk_paths, total_rows,
+            test_fraction=args.test_fraction,
+            epochs=args.epochs,
+            trees_per_chunk=args.trees_per_chunk,
+            max_trees=args.max_trees,
+            seed=args.seed
+        )
+
+    print("\nSaving model artifacts...")
+    save_model_artifacts(
+        model,
+        pipeline.to_preprocessing(),
+        evaluation_results,
+        pipeline.feature_columns,
+        model_dir=args.model_dir,
+        activate=not args.no_activate,
+        extra_metadata={
+            'training_data': {
+                'source': 'access_logs',
+                'files': log_files(args.paths),
+                'events': sampler.events_seen,
+                'samples': total_rows,
+                'horizon_hours': args.horizon,
+                'hot_accesses': args.hot_accesses,
+                'sample_rate': args.sample_rate,
+            }
+        }
+    )
+    print(f"Training completed in {time.time() - start_time:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,11 +2,13 @@
 Training script for IntelliStore hot/cold tiering model
 """
 
+import argparse
 import json
 import os
+import sys
 import time
-from datetime import datetime, timedelta
-from typing import Dict, List, Tuple
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional, Tuple, Union
 
 import joblib
 import numpy as np
@@ -14,181 +16,176 @@ import pandas as pd
 from sklearn.ensemble import RandomForestClassifier
 from sklearn.metrics import classification_report, confusion_matrix, roc_auc_score
 from sklearn.model_selection import train_test_split, cross_val_score
-from sklearn.preprocessing import LabelEncoder, StandardScaler
 import onnx
 import skl2onnx
 from skl2onnx import convert_sklearn
 from skl2onnx.common.data_types import FloatTensorType
 
+# Parquet output of synthetic data is optional
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
 
-def generate_synthetic_data(n_samples: int = 10000) -> pd.DataFrame:
-    """Generate synthetic training data for hot/cold tiering"""
-    np.random.seed(42)
-    
-    data = []
-    
-    for i in range(n_samples):
-        # Time-based features
-        timestamp = datetime.now() - timedelta(days=np.random.randint(0, 365))
-        hour_of_day = timestamp.hour
-        day_of_week = timestamp.weekday()
-        is_weekend = int(day_of_week >= 5)
-        is_business_hours = int(9 <= hour_of_day <= 17)
-        
-        # Object characteristics
-        size = np.random.lognormal(mean=10, sigma=2)  # Log-normal distribution for file sizes
-        size_mb = size / (1024 * 1024)
-        
-        if size_mb < 1:
-            size_category = 'small'
-        elif size_mb < 100:
-            size_category = 'medium'
-        elif size_mb < 1000:
-            size_category = 'large'
-        else:
-            size_category = 'xlarge'
-        
-        # Content type (affects access patterns)
-        content_types = ['image/', 'video/', 'audio/', 'text/', 'application/']
-        content_type = np.random.choice(content_types, p=[0.3, 0.2, 0.1, 0.2, 0.2])
-        is_media = int(content_type in ['image/', 'video/', 'audio/'])
-        
-        # Current tier
-        current_tier = np.random.choice(['hot', 'cold'], p=[0.3, 0.7])
-        
-        # Access patterns (these would normally come from historical data)
-        base_activity = np.random.exponential(scale=5)
-        
-        # Business hours and weekdays have higher activity
-        if is_business_hours:
-            base_activity *= 1.5
-        if not is_weekend:
-            base_activity *= 1.3
-        
-        # Media files tend to have different access patterns
-        if is_media:
-            base_activity *= 0.8
-        
-        # Larger files tend to be accessed less frequently
-        if size_category in ['large', 'xlarge']:
-            base_activity *= 0.6
-        
-        user_activity_level = max(1, int(base_activity))
-        bucket_popularity = np.random.poisson(lam=5) + 1
-        
-        # Recent access patterns
-        access_count_7d = np.random.poisson(lam=base_activity * 0.7)
-        download_count_7d = max(0, access_count_7d - np.random.poisson(lam=2))
-        unique_users_7d = min(access_count_7d, np.random.poisson(lam=base_activity * 0.3) + 1)
-        
-        # Derived features
-        avg_daily_access = access_count_7d / 7.0
-        last_access_hours_ago = np.random.exponential(scale=48) if access_count_7d > 0 else 168
-        
-        # Trend calculation (simplified)
-        recent_access_trend = np.random.normal(loc=1.0, scale=0.3)
-        
-        # Object age
-        object_age_days = np.random.exponential(scale=30)
-        
-        # Target variable (hot/cold prediction)
-        # Hot tier probability based on access patterns
-        hot_probability = 0.1  # Base probability
-        
-        # Recent access increases hot probability
-        if access_count_7d > 5:
-            hot_probability += 0.4
-        elif access_count_7d > 2:
-            hot_probability += 0.2
-        elif access_count_7d > 0:
-            hot_probability += 0.1
-        
-        # Business hours access increases probability
-        if is_business_hours and access_count_7d > 0:
-            hot_probability += 0.2
-        
-        # Recent access time
-        if last_access_hours_ago < 24:
-            hot_probability += 0.3
-        elif last_access_hours_ago < 72:
-            hot_probability += 0.1
-        
-        # User activity level
-        if user_activity_level > 10:
-            hot_probability += 0.2
-        
-        # Size considerations (smaller files more likely to be hot)
-        if size_category == 'small':
-            hot_probability += 0.1
-        elif size_category in ['large', 'xlarge']:
-            hot_probability -= 0.1
-        
-        # Current tier bias (objects already in hot tier more likely to stay)
-        if current_tier == 'hot':
-            hot_probability += 0.2
-        
-        # Ensure probability is in valid range
-        hot_probability = max(0.05, min(0.95, hot_probability))
-        
-        # Generate target
-        target = int(np.random.random() < hot_probability)
-        
-        data.append({
-            'hour_of_day': hour_of_day,
-            'day_of_week': day_of_week,
-            'is_weekend': is_weekend,
-            'is_business_hours': is_business_hours,
-            'object_age_days': object_age_days,
-            'size': size,
-            'size_category': size_category,
-            'is_media': is_media,
-            'current_tier': current_tier,
-            'user_activity_level': user_activity_level,
-            'bucket_popularity': bucket_popularity,
-            'access_count_7d': access_count_7d,
-            'download_count_7d': download_count_7d,
-            'unique_users_7d': unique_users_7d,
-            'avg_daily_access': avg_daily_access,
-            'last_access_hours_ago': last_access_hours_ago,
-            'recent_access_trend': recent_access_trend,
-            'target': target
-        })
-    
-    return pd.DataFrame(data)
+# Features are built by the same pipeline the inference service uses
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "inference"))
+from features import SIZE_CATEGORIES, FeaturePipeline, size_categories  # noqa: E402
+from forest import FOREST_MODEL_FILE, CompiledForest  # noqa: E402
+from registry import ModelRegistry  # noqa: E402
 
 
-def preprocess_data(df: pd.DataFrame) -> Tuple[np.ndarray, np.ndarray, Dict]:
-    """Preprocess the data for training"""
-    
-    # Separate features and target
-    X = df.drop('target', axis=1)
-    y = df['target']
-    
-    # Handle categorical variables
-    label_encoders = {}
-    categorical_columns = ['size_category', 'current_tier']
+def generate_synthetic_data(n_samples: int = 10000,
+                            seed: Union[int, np.random.SeedSequence] = 42,
+                            now: Optional[datetime] = None) -> pd.DataFrame:
+    """Generate synthetic training data for hot/cold tiering
+    
+    Every column is drawn as a NumPy array and the label logic is applied
+    as array operations, so millions of rows take seconds.
+    """
+    rng = np.random.default_rng(seed)
+    if now is None:
+        now = datetime.now()
+    
+    # Time-based features: objects last touched 0-364 days ago at this time of day
+    days_ago = rng.integers(0, 365, n_samples)
+    hour_of_day = np.full(n_samples, now.hour)
+    day_of_week = (now.weekday() - days_ago) % 7
+    is_weekend = (day_of_week >= 5).astype(int)
+    is_business_hours = ((hour_of_day >= 9) & (hour_of_day <= 17)).astype(int)
+    
+    # Object characteristics
+    size = rng.lognormal(mean=10, sigma=2, size=n_samples)  # Log-normal distribution for file sizes
+    size_category = size_categories(size)
+    small = size_category == SIZE_CATEGORIES.index('small')
+    large = size_category >= SIZE_CATEGORIES.index('large')
+    
+    # Content type (affects access patterns): image, video, audio, text, application
+    content_type = rng.choice(5, size=n_samples, p=[0.3, 0.2, 0.1, 0.2, 0.2])
+    is_media = (content_type < 3).astype(int)
+    
+    # Current tier
+    is_hot = rng.random(n_samples) < 0.3
+    current_tier = pd.Categorical.from_codes(is_hot.astype(np.int8), categories=['cold', 'hot'])
+    
+    # Access patterns (these would normally come from historical data)
+    base_activity = rng.exponential(scale=5, size=n_samples)
+    
+    # Business hours and weekdays have higher activity; media files and
+    # larger files are accessed less frequently
+    base_activity *= np.where(is_business_hours == 1, 1.5, 1.0)
+    base_activity *= np.where(is_weekend == 0, 1.3, 1.0)
+    base_activity *= np.where(is_media == 1, 0.8, 1.0)
+    base_activity *= np.where(large, 0.6, 1.0)
+    
+    user_activity_level = np.maximum(1, base_activity.astype(int))
+    bucket_popularity = rng.poisson(lam=5, size=n_samples) + 1
+    
+    # Recent access patterns
+    access_count_7d = rng.poisson(lam=base_activity * 0.7)
+    download_count_7d = np.maximum(0, access_count_7d - rng.poisson(lam=2, size=n_samples))
+    unique_users_7d = np.minimum(access_count_7d, rng.poisson(lam=base_activity * 0.3) + 1)
+    
+    # Derived features
+    avg_daily_access = access_count_7d / 7.0
+    last_access_hours_ago = np.where(access_count_7d > 0, rng.exponential(scale=48, size=n_samples), 168.0)
+    
+    # Trend calculation (simplified)
+    recent_access_trend = rng.normal(loc=1.0, scale=0.3, size=n_samples)
+    
+    # Object age
+    object_age_days = rng.exponential(scale=30, size=n_samples)
+    
+    # Target variable (hot/cold prediction)
+    # Hot tier probability based on access patterns, from a base of 0.1
+    hot_probability = np.full(n_samples, 0.1)
+    
+    # Recent access increases hot probability
+    hot_probability += np.select(
+        [access_count_7d > 5, access_count_7d > 2, access_count_7d > 0], [0.4, 0.2, 0.1], default=0.0
+    )
     
-    for col in categorical_columns:
-        if col in X.columns:
-            le = LabelEncoder()
-            X[f'{col}_encoded'] = le.fit_transform(X[col])
-            label_encoders[col] = le
-            X = X.drop(col, axis=1)
+    # Business hours access increases probability
+    hot_probability += np.where((is_business_hours == 1) & (access_count_7d > 0), 0.2, 0.0)
+    
+    # Recent access time
+    hot_probability += np.select([last_access_hours_ago < 24, last_access_hours_ago < 72], [0.3, 0.1], default=0.0)
+    
+    # User activity level
+    hot_probability += np.where(user_activity_level > 10, 0.2, 0.0)
+    
+    # Size considerations (smaller files more likely to be hot)
+    hot_probability += np.select([small, large], [0.1, -0.1], default=0.0)
+    
+    # Current tier bias (objects already in hot tier more likely to stay)
+    hot_probability += np.where(is_hot, 0.2, 0.0)
+    
+    # Ensure probability is in valid range
+    hot_probability = np.clip(hot_probability, 0.05, 0.95)
+    
+    # Generate target
+    target = (rng.random(n_samples) < hot_probability).astype(int)
+    
+    return pd.DataFrame({
+        'hour_of_day': hour_of_day,
+        'day_of_week': day_of_week,
+        'is_weekend': is_weekend,
+        'is_business_hours': is_business_hours,
+        'object_age_days': object_age_days,
+        'size': size,
+        'size_category': pd.Categorical.from_codes(size_category, categories=list(SIZE_CATEGORIES)),
+        'is_media': is_media,
+        'current_tier': current_tier,
+        'user_activity_level': user_activity_level,
+        'bucket_popularity': bucket_popularity,
+        'access_count_7d': access_count_7d,
+        'download_count_7d': download_count_7d,
+        'unique_users_7d': unique_users_7d,
+        'avg_daily_access': avg_daily_access,
+        'last_access_hours_ago': last_access_hours_ago,
+        'recent_access_trend': recent_access_trend,
+        'target': target
+    })
+
+
+def iter_synthetic_data(n_samples: int, chunk_size: int = 1_000_000, seed: int = 42) -> Iterator[pd.DataFrame]:
+    """generate_synthetic_data in chunks of ``chunk_size`` rows, each with its own random stream"""
+    now = datetime.now()
+    n_chunks = max(1, -(-n_samples // chunk_size))
+    for i, chunk_seed in enumerate(np.random.SeedSequence(seed).spawn(n_chunks)):
+        yield generate_synthetic_data(min(chunk_size, n_samples - i * chunk_size), seed=chunk_seed, now=now)
+
+
+def write_synthetic_parquet(path: str, n_samples: int, chunk_size: int = 1_000_000, seed: int = 42) -> int:
+    """Stream synthetic data to a Parquet file, one row group per chunk; returns rows written"""
+    if not PYARROW_AVAILABLE:
+        raise RuntimeError("Writing Parquet requires pyarrow")
     
-    # Feature columns for later use
-    feature_columns = X.columns.tolist()
+    writer = None
+    rows = 0
+    try:
+        for chunk in iter_synthetic_data(n_samples, chunk_size, seed):
+            table = pa.Table.from_pandas(chunk, preserve_index=False)
+            if writer is None:
+                writer = pq.ParquetWriter(path, table.schema)
+            writer.write_table(table)
+            rows += len(chunk)
+    finally:
+        if writer is not None:
+            writer.close()
+    return rows
+
+
+def preprocess_data(df: pd.DataFrame) -> Tuple[np.ndarray, np.ndarray, Dict]:
+    """Preprocess the data for training"""
     
-    # Scale numerical features
-    scaler = StandardScaler()
-    X_scaled = scaler.fit_transform(X)
+    # Encode categoricals, order columns and fit the scaler exactly as
+    # serving will apply them
+    pipeline = FeaturePipeline.fit(df, target='target')
+    X_scaled = pipeline.transform_frame(df)
     
-    preprocessing_objects = {
-        'scaler': scaler,
-        'label_encoders': label_encoders,
-        'feature_columns': feature_columns
-    }
-    
-    return X_scaled, y.values, preprocessing_objects
+    return X_scaled, df['target'].values, pipeline.to_preprocessing()
 
 
 def train_model(X: np.ndarray, y: np.ndarray) -> RandomForestClassifier:
@@ -217,20 +214,29 @@ def evaluate_model(model, X_test: np.ndarray, y_test: np.ndarray) -> Dict:
     y_pred = model.predict(X_test)
     y_pred_proba = model.predict_proba(X_test)[:, 1]
     
+    return evaluation_metrics(y_test, y_pred, y_pred_proba)
+
+
+def evaluation_metrics(y_test: np.ndarray, y_pred: np.ndarray, y_pred_proba: np.ndarray) -> Dict:
+    """Metrics from test labels, predicted labels and hot probabilities
+    
+    The AUC is None when the test labels are all one class.
+    """
+    
     # Metrics
-    auc_score = roc_auc_score(y_test, y_pred_proba)
+    auc_score = roc_auc_score(y_test, y_pred_proba) if len(np.unique(y_test)) > 1 else None
     
-    # Classification report
-    class_report = classification_report(y_test, y_pred, output_dict=True)
+    # Classification report, with both classes even if one is absent
+    class_report = classification_report(y_test, y_pred, labels=[0, 1], output_dict=True, zero_division=0)
     
     # Confusion matrix
-    conf_matrix = confusion_matrix(y_test, y_pred)
+    conf_matrix = confusion_matrix(y_test, y_pred, labels=[0, 1])
     
     return {
         'auc_score': auc_score,
         'classification_report': class_report,
         'confusion_matrix': conf_matrix.tolist(),
-        'accuracy': class_report['accuracy'],
+        'accuracy': float(np.mean(np.asarray(y_test) == np.asarray(y_pred))),
         'precision': class_report['1']['precision'],
         'recall': class_report['1']['recall'],
         'f1_score': class_report['1']['f1-score']
@@ -238,14 +244,27 @@ def evaluate_model(model, X_test: np.ndarray, y_test: np.ndarray) -> Dict:
 
 
 def save_model_artifacts(model, preprocessing_objects: Dict, evaluation_results: Dict, 
-                        feature_columns: List[str], output_dir: str = "models"):
-    """Save all model artifacts"""
-    
+                        feature_columns: List[str], model_dir: str = "models", activate: bool = True,
+                        extra_metadata: Optional[Dict] = None):
+    """Save all model artifacts as a new version in the model registry
+    
+    With ``activate`` the registry's CURRENT pointer moves to the new version,
+    which a running inference service picks up without a restart.
+    ``extra_metadata`` (e.g. the training data used) is added to the metadata.
+    """
+    
+    registry = ModelRegistry(model_dir)
+    model_version = f"v{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+    output_dir = registry.version_dir(model_version)
     os.makedirs(output_dir, exist_ok=True)
     
     # Save the scikit-learn model
     joblib.dump(model, os.path.join(output_dir, "tiering_model.joblib"))
     
+    # Flatten tree models for NumPy-only inference without onnxruntime
+    if hasattr(model, 'estimators_') or hasattr(model, 'tree_'):
+        CompiledForest.from_sklearn(model).save(os.path.join(output_dir, FOREST_MODEL_FILE))
+    
     # Save preprocessing objects
     joblib.dump(preprocessing_objects, os.path.join(output_dir, "preprocessing.joblib"))
     
@@ -254,8 +273,10 @@ def save_model_artifacts(model, preprocessing_objects: Dict, evaluation_results:
         # Define input type
         initial_type = [('float_input', FloatTensorType([None, len(feature_columns)]))]
         
-        # Convert model
-        onnx_model = convert_sklearn(model, initial_types=initial_type)
+        # Convert model; without zipmap the probabilities are a plain
+        # (rows, 2) tensor the inference service can bind to a buffer
+        onnx_model = convert_sklearn(model, initial_types=initial_type,
+                                     options={id(model): {'zipmap': False}})
         
         # Save ONNX model
         with open(os.path.join(output_dir, "tiering_model.onnx"), "wb") as f:
@@ -268,30 +289,54 @@ def save_model_artifacts(model, preprocessing_objects: Dict, evaluation_results:
     
     # Save model metadata
     metadata = {
-        'model_version': f"v{datetime.now().strftime('%Y%m%d_%H%M%S')}",
+        'model_version': model_version,
         'training_date': datetime.now().isoformat(),
-        'model_type': 'RandomForestClassifier',
+        'model_type': type(model).__name__,
         'feature_columns': feature_columns,
         'evaluation_results': evaluation_results,
-        'model_parameters': model.get_params()
+        'model_parameters': model.get_params(),
+        **(extra_metadata or {})
     }
     
+    # Written last: the registry lists a version once its metadata exists
     with open(os.path.join(output_dir, "model_metadata.json"), 'w') as f:
         json.dump(metadata, f, indent=2)
     
+    if activate:
+        registry.set_current(model_version)
+    
     print(f"Model artifacts saved to {output_dir}/")
     print(f"Model version: {metadata['model_version']}")
-    print(f"AUC Score: {evaluation_results['auc_score']:.4f}")
+    auc_score = evaluation_results['auc_score']
+    print(f"AUC Score: {auc_score:.4f}" if auc_score is not None else "AUC Score: n/a (single-class test set)")
     print(f"Accuracy: {evaluation_results['accuracy']:.4f}")
 
 
-def main():
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Train the IntelliStore hot/cold tiering model")
+    parser.add_argument("--samples", type=int, default=10000, help="Synthetic training samples")
+    parser.add_argument("--seed", type=int, default=42, help="Random seed of the synthetic data")
+    parser.add_argument("--write-synthetic", metavar="PATH",
+                        help="Stream --samples synthetic rows to a Parquet file instead of training")
+    parser.add_argument("--chunk-size", type=int, default=1_000_000, help="Rows per Parquet row group")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None):
     """Main training pipeline"""
+    args = parse_args(argv)
+    
+    if args.write_synthetic:
+        start_time = time.time()
+        rows = write_synthetic_parquet(args.write_synthetic, args.samples, args.chunk_size, args.seed)
+        print(f"Wrote {rows} synthetic samples to {args.write_synthetic} in {time.time() - start_time:.1f}s")
+        return
+    
     print("Starting IntelliStore ML model training...")
     
     # Generate synthetic data
     print("Generating synthetic training data...")
-    df = generate_synthetic_data(n_samples=10000)
+    df = generate_synthetic_data(n_samples=args.samples, seed=args.seed)
     print(f"Generated {len(df)} samples")
     
     # Preprocess data
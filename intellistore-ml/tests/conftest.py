@@ -0,0 +1,8 @@
+"""
+Shared test setup: import path of the inference modules
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src", "inference"))
@@ -0,0 +1,117 @@
+"""
+Tests for the compiled forest: predictions must match scikit-learn's,
+including on rows sitting exactly on split thresholds
+"""
+
+import os
+
+import joblib
+import numpy as np
+import pytest
+from sklearn.ensemble import ExtraTreesClassifier, RandomForestClassifier
+from sklearn.tree import DecisionTreeClassifier
+
+from forest import FOREST_MODEL_FILE, CompiledForest, compile_model_dir
+
+N_FEATURES = 17
+TOLERANCE = 1e-6
+
+
+def build_data(rows: int, seed: int = 42):
+    rng = np.random.default_rng(seed)
+    X = rng.random((rows, N_FEATURES)).astype(np.float32)
+    # A few discrete columns, like the encoded categoricals and flags
+    X[:, 0] = rng.integers(0, 24, rows)
+    X[:, 15] = rng.integers(0, 4, rows)
+    y = ((X[:, 9] + 0.5 * X[:, 3] + 0.2 * rng.random(rows)) > 0.8).astype(int)
+    return X, y
+
+
+def threshold_rows(model, rows: int) -> np.ndarray:
+    """Rows whose features sit on (float32-rounded) split thresholds"""
+    estimators = getattr(model, "estimators_", [model])
+    rng = np.random.default_rng(7)
+    thresholds = np.concatenate([est.tree_.threshold[est.tree_.children_left >= 0] for est in estimators])
+    features = np.concatenate([est.tree_.feature[est.tree_.children_left >= 0] for est in estimators])
+    X = rng.random((rows, N_FEATURES)).astype(np.float32)
+    picks = rng.integers(0, len(thresholds), rows)
+    X[np.arange(rows), features[picks]] = thresholds[picks].astype(np.float32)
+    return X
+
+
+def assert_equivalent(model, forest: CompiledForest, X: np.ndarray):
+    np.testing.assert_allclose(forest.predict_proba(X), model.predict_proba(X), rtol=0, atol=TOLERANCE)
+    np.testing.assert_array_equal(forest.predict(X), model.predict(X))
+
+
+@pytest.fixture(scope="module")
+def model() -> RandomForestClassifier:
+    X, y = build_data(2000)
+    return RandomForestClassifier(n_estimators=20, max_depth=10, random_state=0).fit(X, y)
+
+
+@pytest.fixture(scope="module")
+def forest(model) -> CompiledForest:
+    return CompiledForest.from_sklearn(model)
+
+
+def test_matches_on_training_rows(model, forest):
+    assert_equivalent(model, forest, build_data(2000)[0])
+
+
+def test_matches_on_random_rows(model, forest):
+    assert_equivalent(model, forest, build_data(1000, seed=1)[0])
+
+
+def test_matches_on_threshold_rows(model, forest):
+    assert_equivalent(model, forest, threshold_rows(model, 2000))
+
+
+@pytest.mark.parametrize("estimator", [
+    ExtraTreesClassifier(n_estimators=10, max_depth=8, random_state=0),
+    DecisionTreeClassifier(max_depth=12, random_state=0),
+    RandomForestClassifier(n_estimators=5, random_state=0),  # unbounded depth
+])
+def test_other_estimators(estimator):
+    X, y = build_data(1000)
+    estimator.fit(X, y)
+    forest = CompiledForest.from_sklearn(estimator)
+    assert_equivalent(estimator, forest, build_data(500, seed=2)[0])
+    assert_equivalent(estimator, forest, threshold_rows(estimator, 500))
+
+
+def test_chunking_does_not_change_results(forest):
+    X = build_data(1000, seed=3)[0]
+    np.testing.assert_array_equal(forest.predict_proba(X, chunk_rows=7), forest.predict_proba(X))
+
+
+def test_single_row_and_empty_batch(model, forest):
+    X = build_data(10, seed=4)[0]
+    assert_equivalent(model, forest, X[:1])
+    assert forest.predict_proba(X[:0]).shape == (0, 2)
+
+
+def test_rejects_wrong_feature_count(forest):
+    with pytest.raises(ValueError):
+        forest.predict_proba(np.zeros((3, N_FEATURES - 1), dtype=np.float32))
+
+
+def test_save_load_round_trip(model, forest, tmp_path):
+    path = str(tmp_path / FOREST_MODEL_FILE)
+    forest.save(path)
+    loaded = CompiledForest.load(path)
+
+    assert loaded.n_trees == forest.n_trees
+    assert loaded.nbytes == forest.nbytes
+    X = threshold_rows(model, 500)
+    np.testing.assert_array_equal(loaded.predict_proba(X), forest.predict_proba(X))
+    assert_equivalent(model, loaded, X)
+    assert os.listdir(tmp_path) == [FOREST_MODEL_FILE]
+
+
+def test_compile_model_dir(model, tmp_path):
+    joblib.dump(model, tmp_path / "tiering_model.joblib")
+    path = compile_model_dir(str(tmp_path))
+
+    assert path == str(tmp_path / FOREST_MODEL_FILE)
+    assert_equivalent(model, CompiledForest.load(path), build_data(200, seed=5)[0])